@@ -1,3 +1,40 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import BankAccount, BankTransaction
+from month_log.admin import close_selected_months
+from utilities.admin import LedgerModelAdmin, money_display
+
+
+@admin.register(BankAccount)
+class BankAccountAdmin(admin.ModelAdmin):
+    """ A handful of rows per user; the balance only changes through postings """
+    list_display = ('name', 'is_default', 'balance_display', 'last_updated')
+    readonly_fields = ('current_balance', 'last_updated', 'created_at')
+
+    balance_display = money_display('current_balance', 'Balance')
+
+
+@admin.register(BankTransaction)
+class BankTransactionAdmin(LedgerModelAdmin):
+    """
+    Postings are append-only: each one moved the account balance and its rollup, so rows
+    are read-only here, and new ones come in through the bank log.
+    """
+    list_display = ('date_logged', 'account', 'transaction_type', 'amount_display', 'balance_display', 'description')
+    list_select_related = ('account',)
+    date_hierarchy = 'date_logged'  # banktx_user_date_idx
+    list_filter = ('account',)  # banktx_account_date_idx
+    search_fields = ('description',)
+    actions = [close_selected_months]
+
+    amount_display = money_display('amount', 'Amount')
+    balance_display = money_display('balance_after_transaction', 'Balance after')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
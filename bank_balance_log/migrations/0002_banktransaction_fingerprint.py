@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 07:00
+
+from django.db import migrations, models
+
+from utilities.fingerprint import compute_fingerprint
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # Rows that collide with an earlier one keep a NULL fingerprint, so existing duplicates
+    # stay visible for manual clean-up instead of failing the migration.
+    BankTransaction = apps.get_model('bank_balance_log', 'BankTransaction')
+    seen = set()
+    batch = []
+    for row in BankTransaction.objects.order_by('created_at', 'pk').iterator(chunk_size=2000):
+        fingerprint = compute_fingerprint(row.transaction_type, row.description, row.amount, row.date_logged)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        row.fingerprint = fingerprint
+        batch.append(row)
+        if len(batch) >= 2000:
+            BankTransaction.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        BankTransaction.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banktransaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2 on 2026-10-19 08:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+import utilities.money
+
+# (model, decimal column, max_digits)
+MONEY_COLUMNS = [
+    ('BankAccount', 'current_balance', 12),
+    ('BankTransaction', 'amount', 10),
+    ('BankTransaction', 'balance_after_transaction', 12),
+]
+
+
+def decimal_to_cents(apps, schema_editor):
+    # One UPDATE per column; the conversion runs inside the database, not row by row in Python.
+    for model_name, column, _ in MONEY_COLUMNS:
+        model = apps.get_model('bank_balance_log', model_name)
+        model.objects.update(**{
+            f'{column}_cents': Cast(Round(F(column) * 100), models.BigIntegerField())
+        })
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, column, max_digits in MONEY_COLUMNS:
+        model = apps.get_model('bank_balance_log', model_name)
+        model.objects.update(**{
+            # Times 0.01 rather than divided by 100, which SQLite would do in integers.
+            column: Cast(F(f'{column}_cents') * Decimal('0.01'),
+                         models.DecimalField(max_digits=max_digits, decimal_places=2))
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0002_banktransaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankaccount',
+            name='current_balance_cents',
+            field=utilities.money.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='amount_cents',
+            field=utilities.money.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='balance_after_transaction_cents',
+            field=utilities.money.MoneyField(default=0),
+        ),
+        # Reversed, RemoveField re-adds the decimal columns empty: nullable until
+        # cents_to_decimal has filled them, then this tightens them to NOT NULL again.
+        migrations.AlterField(
+            model_name='banktransaction',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='banktransaction',
+            name='balance_after_transaction',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        migrations.RemoveField(
+            model_name='bankaccount',
+            name='current_balance',
+        ),
+        migrations.RemoveField(
+            model_name='banktransaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='banktransaction',
+            name='balance_after_transaction',
+        ),
+        migrations.RenameField(
+            model_name='bankaccount',
+            old_name='current_balance_cents',
+            new_name='current_balance',
+        ),
+        migrations.RenameField(
+            model_name='banktransaction',
+            old_name='amount_cents',
+            new_name='amount',
+        ),
+        migrations.RenameField(
+            model_name='banktransaction',
+            old_name='balance_after_transaction_cents',
+            new_name='balance_after_transaction',
+        ),
+        migrations.AlterField(
+            model_name='banktransaction',
+            name='amount',
+            field=utilities.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='banktransaction',
+            name='balance_after_transaction',
+            field=utilities.money.MoneyField(),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-19 06:59
+
+import utilities.money
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    BankTransaction = apps.get_model('bank_balance_log', 'BankTransaction')
+    MonthlyTransactionRollup = apps.get_model('bank_balance_log', 'MonthlyTransactionRollup')
+
+    monthly = {}
+    for item in BankTransaction.objects.annotate(month=TruncMonth('date_logged'))\
+            .values('month', 'transaction_type').annotate(total=Sum('amount'), count=Count('id')).order_by():
+        month_start = timezone.localdate(item['month']).replace(day=1)
+        rollup = monthly.setdefault(month_start, MonthlyTransactionRollup(month_year=month_start))
+        if item['transaction_type'] == 'DEBIT':
+            rollup.total_debit, rollup.debit_count = item['total'], item['count']
+        else:
+            rollup.total_credit, rollup.credit_count = item['total'], item['count']
+    MonthlyTransactionRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0003_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyTransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.DateField(unique=True)),
+                ('total_debit', utilities.money.MoneyField(default=0)),
+                ('total_credit', utilities.money.MoneyField(default=0)),
+                ('debit_count', models.PositiveIntegerField(default=0)),
+                ('credit_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month_year'],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 08:10
+
+from django.db import migrations
+
+from utilities.search import install_fts, uninstall_fts
+
+TABLE = 'bank_balance_log_banktransaction'
+FTS_TABLE = 'bank_balance_log_banktransaction_fts'
+
+
+def create_fts(apps, schema_editor):
+    install_fts(schema_editor, TABLE, FTS_TABLE)
+
+
+def drop_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0004_monthlytransactionrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
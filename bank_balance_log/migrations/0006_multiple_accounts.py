@@ -0,0 +1,98 @@
+# Generated by Django 5.2 on 2026-10-19 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def mark_default_account(apps, schema_editor):
+    BankAccount = apps.get_model('bank_balance_log', 'BankAccount')
+    first_account = BankAccount.objects.order_by('pk').first()
+    if first_account is not None:
+        first_account.is_default = True
+        first_account.save(update_fields=['is_default'])
+
+
+def clear_rollups(apps, schema_editor):
+    # Rollups are derived data; they are rebuilt per account below
+    # (or with `manage.py rebuild_rollups` after a reverse migration).
+    apps.get_model('bank_balance_log', 'MonthlyTransactionRollup').objects.all().delete()
+
+
+def backfill_account_rollups(apps, schema_editor):
+    BankTransaction = apps.get_model('bank_balance_log', 'BankTransaction')
+    MonthlyTransactionRollup = apps.get_model('bank_balance_log', 'MonthlyTransactionRollup')
+
+    monthly = {}
+    for item in BankTransaction.objects.annotate(month=TruncMonth('date_logged'))\
+            .values('account_id', 'month', 'transaction_type')\
+            .annotate(total=Sum('amount'), count=Count('id')).order_by():
+        month_start = timezone.localdate(item['month']).replace(day=1)
+        rollup = monthly.setdefault(
+            (item['account_id'], month_start),
+            MonthlyTransactionRollup(account_id=item['account_id'], month_year=month_start))
+        if item['transaction_type'] == 'DEBIT':
+            rollup.total_debit, rollup.debit_count = item['total'], item['count']
+        else:
+            rollup.total_credit, rollup.credit_count = item['total'], item['count']
+    MonthlyTransactionRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0005_banktransaction_fts'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='bankaccount',
+            options={'ordering': ['-is_default', 'name']},
+        ),
+        migrations.AddField(
+            model_name='bankaccount',
+            name='name',
+            field=models.CharField(default='Main account', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='bankaccount',
+            name='is_default',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_default_account, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bankaccount',
+            constraint=models.UniqueConstraint(fields=['name'], name='bankaccount_unique_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='bankaccount',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=['is_default'], name='bankaccount_single_default'),
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['account', 'date_logged'], name='banktx_account_date_idx'),
+        ),
+        migrations.RunPython(clear_rollups, clear_rollups),
+        migrations.AlterModelOptions(
+            name='monthlytransactionrollup',
+            options={'ordering': ['month_year', 'account']},
+        ),
+        migrations.AlterField(
+            model_name='monthlytransactionrollup',
+            name='month_year',
+            field=models.DateField(),
+        ),
+        migrations.AddField(
+            model_name='monthlytransactionrollup',
+            name='account',
+            field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='bank_balance_log.bankaccount'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlytransactionrollup',
+            unique_together={('account', 'month_year')},
+        ),
+        migrations.RunPython(backfill_account_rollups, clear_rollups),
+    ]
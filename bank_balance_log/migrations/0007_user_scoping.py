@@ -0,0 +1,113 @@
+# Generated by Django 5.2 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.fingerprint import compute_fingerprint
+from utilities.money import from_cents
+from utilities.search import install_fts, uninstall_fts
+from utilities.tenancy import legacy_owner_id
+
+OWNED_MODELS = ['BankAccount', 'BankTransaction', 'MonthlyTransactionRollup']
+TRANSACTION_TABLE, TRANSACTION_FTS_TABLE = 'bank_balance_log_banktransaction', 'bank_balance_log_banktransaction_fts'
+
+
+def assign_legacy_owner(apps, schema_editor):
+    owner_id = legacy_owner_id(apps)
+    if owner_id is None:
+        return
+    for model_name in OWNED_MODELS:
+        apps.get_model('bank_balance_log', model_name).objects.filter(user__isnull=True).update(user_id=owner_id)
+
+
+def _refingerprint(apps, scoped: bool):
+    # Only rows 0002 fingerprinted are rehashed: the duplicates it left NULL stay NULL, and
+    # a row whose new hash collides with an earlier one is cleared the same way.
+    BankTransaction = apps.get_model('bank_balance_log', 'BankTransaction')
+    seen = set()
+    rows = list(BankTransaction.objects.filter(fingerprint__isnull=False).order_by('created_at', 'pk').only(
+        'id', 'user_id', 'transaction_type', 'description', 'amount', 'date_logged'))
+    for row in rows:
+        kind = f"{row.transaction_type}:{row.user_id or ''}" if scoped else row.transaction_type
+        fingerprint = compute_fingerprint(kind, row.description, from_cents(row.amount), row.date_logged)
+        row.fingerprint = None if fingerprint in seen else fingerprint
+        seen.add(fingerprint)
+    BankTransaction.objects.bulk_update(rows, ['fingerprint'], batch_size=1000)
+
+
+def scope_fingerprints(apps, schema_editor):
+    _refingerprint(apps, scoped=True)
+
+
+def unscope_fingerprints(apps, schema_editor):
+    _refingerprint(apps, scoped=False)
+
+
+def install_tenant_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, TRANSACTION_FTS_TABLE)
+    install_fts(schema_editor, TRANSACTION_TABLE, TRANSACTION_FTS_TABLE, tenant_column='user_id')
+
+
+def drop_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, TRANSACTION_FTS_TABLE)
+
+
+def install_plain_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, TRANSACTION_FTS_TABLE)
+    install_fts(schema_editor, TRANSACTION_TABLE, TRANSACTION_FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0006_multiple_accounts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversed last: dropping the user column rebuilds the table, so the plain index goes back after it.
+        migrations.RunPython(migrations.RunPython.noop, install_plain_fts),
+        migrations.RemoveConstraint(
+            model_name='bankaccount',
+            name='bankaccount_unique_name',
+        ),
+        migrations.RemoveConstraint(
+            model_name='bankaccount',
+            name='bankaccount_single_default',
+        ),
+        migrations.AddField(
+            model_name='bankaccount',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='banktransaction',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='monthlytransactionrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='banktransaction',
+            index=models.Index(fields=['user', 'date_logged'], name='banktx_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlytransactionrollup',
+            index=models.Index(fields=['user', 'month_year'], name='banktxrollup_user_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bankaccount',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='bankaccount_unique_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='bankaccount',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('user',), name='bankaccount_single_default'),
+        ),
+        migrations.RunPython(assign_legacy_owner, migrations.RunPython.noop),
+        migrations.RunPython(scope_fingerprints, unscope_fingerprints),
+        migrations.RunPython(install_tenant_fts, drop_fts),
+    ]
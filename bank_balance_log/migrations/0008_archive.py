@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-19 10:15
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+import utilities.money
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.archive import move_rows
+from utilities.search import install_fts, uninstall_fts
+
+FTS_TABLE = 'bank_balance_log_archivedbanktransaction_fts'
+
+
+def create_fts(apps, schema_editor):
+    install_fts(schema_editor, 'bank_balance_log_archivedbanktransaction', FTS_TABLE, tenant_column='user_id')
+
+
+def drop_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, FTS_TABLE)
+
+
+def restore_archived_rows(apps, schema_editor):
+    # Unapplying drops the archive table, so its rows go back to the live table first.
+    move_rows(apps.get_model('bank_balance_log', 'ArchivedBankTransaction').objects.all(), apps.get_model('bank_balance_log', 'BankTransaction'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0007_user_scoping'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBankTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], max_length=6)),
+                ('amount', utilities.money.MoneyField()),
+                ('description', models.CharField(max_length=255)),
+                ('balance_after_transaction', utilities.money.MoneyField()),
+                ('date_logged', models.DateTimeField()),
+                ('fingerprint', models.CharField(blank=True, editable=False, max_length=64, null=True)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('account', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bank_balance_log.bankaccount')),
+                ('user', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date_logged', '-created_at'],
+                'indexes': [models.Index(fields=['user', 'date_logged'], name='archbanktx_user_date_idx'), models.Index(fields=['account', 'date_logged'], name='archbanktx_account_date_idx')],
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(migrations.RunPython.noop, restore_archived_rows),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 09:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.search import install_fts, uninstall_fts
+
+TRANSACTION_TABLE, TRANSACTION_FTS_TABLE = 'bank_balance_log_banktransaction', 'bank_balance_log_banktransaction_fts'
+
+
+def reinstall_fts(apps, schema_editor):
+    # Dropping the column's unique index rebuilds the table on SQLite, which drops the FTS triggers.
+    uninstall_fts(schema_editor, TRANSACTION_FTS_TABLE)
+    install_fts(schema_editor, TRANSACTION_TABLE, TRANSACTION_FTS_TABLE, tenant_column='user_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0008_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversed last, after the table has been rebuilt again.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_fts),
+        migrations.AlterField(
+            model_name='banktransaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='banktransaction',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='banktx_user_idempotency_key'),
+        ),
+        migrations.RunPython(reinstall_fts, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,38 @@
 # bank_log/models.py
 from django.db import models
+from django.db.models.functions import Now
 from django.utils import timezone
-from decimal import Decimal
 
-class BankAccount(models.Model):
+from utilities.fingerprint import compute_fingerprint
+from utilities.money import MoneyField, from_cents
+from utilities.tenancy import TenantOwnedModel, get_current_user_id
+
+class BankAccount(TenantOwnedModel):
     """
-    Represents a user's bank account. For simplicity, one account per user.
+    A bank account with its running balance. Each posting locks only its own account row
+    where the backend has row locks; on SQLite postings serialize on the database lock
+    (see BankLogService.record_transaction_sync).
     """
-    current_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    name = models.CharField(max_length=100, default='Main account')
+    # Postings that don't name an account (e.g. expenses from month_log) go to the default one.
+    is_default = models.BooleanField(default=False)
+    current_balance = MoneyField(default=0)  # minor units (cents)
     last_updated = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['-is_default', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='bankaccount_unique_name'),
+            # One default account per user
+            models.UniqueConstraint(fields=['user'], condition=models.Q(is_default=True),
+                                    name='bankaccount_single_default'),
+        ]
+
     def __str__(self):
-        return f"{self.current_balance}"
+        return f"{self.name}: {from_cents(self.current_balance)}"
 
-class BankTransaction(models.Model):
+class BankTransaction(TenantOwnedModel):
     """
     Stores individual bank transactions (debit or credit).
     """
@@ -24,17 +42,106 @@ class BankTransaction(models.Model):
 
     account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='transactions')
     transaction_type = models.CharField(max_length=6, choices=TransactionType.choices)
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField()  # minor units (cents)
     description = models.CharField(max_length=255)
     # Stores the balance of the account *after* this transaction was processed.
-    balance_after_transaction = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after_transaction = MoneyField()
     date_logged = models.DateTimeField(default=timezone.now)
+    # Content hash of (description, amount, date_logged, transaction_type); the unique index rejects duplicates on insert.
+    fingerprint = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # Optional client-supplied key so a retried request maps onto the row it already created;
+    # unique per user (see Meta), so one user's keys never clash with or reveal another's.
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # FTS5 index over description, kept in sync by triggers (see migrations 0005 and 0007)
+    FTS_TABLE = 'bank_balance_log_banktransaction_fts'
+    FTS_TENANT_COLUMN = 'user_id'
+    # Rows of closed months move here (see utilities.archive)
+    ARCHIVE_MODEL = 'bank_balance_log.ArchivedBankTransaction'
+
+    class Meta:
+        ordering = ['-date_logged', '-created_at']
+        indexes = [
+            # All-accounts listings are per user; per-account ones use the second index
+            models.Index(fields=['user', 'date_logged'], name='banktx_user_date_idx'),
+            models.Index(fields=['account', 'date_logged'], name='banktx_account_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='banktx_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} - {from_cents(self.amount)} for {self.date_logged.strftime('%Y-%m-%d')}"
+
+    def compute_fingerprint(self) -> str:
+        # The owner is part of the hash, so two users can post identical transactions.
+        return compute_fingerprint(f"{self.transaction_type}:{self.user_id or ''}", self.description,
+                                   from_cents(self.amount), self.date_logged)
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            self.user_id = get_current_user_id()
+        self.fingerprint = self.compute_fingerprint()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fingerprint' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'fingerprint']
+        super().save(*args, **kwargs)
+
+class ArchivedBankTransaction(TenantOwnedModel):
+    """
+    Bank postings of closed months, moved out of BankTransaction so the hot table only holds open months.
+    Same columns and ids as BankTransaction; read-only until the month is reopened.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the id the row had in BankTransaction
+    account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='+', db_index=False)
+    transaction_type = models.CharField(max_length=6, choices=BankTransaction.TransactionType.choices)
+    amount = MoneyField()  # minor units (cents)
+    description = models.CharField(max_length=255)
+    balance_after_transaction = MoneyField()
+    date_logged = models.DateTimeField()
+    # Not unique here: closed months refuse new postings, so nothing is deduplicated against the archive.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    FTS_TABLE = 'bank_balance_log_archivedbanktransaction_fts'
+    FTS_TENANT_COLUMN = 'user_id'
+
     class Meta:
         ordering = ['-date_logged', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'date_logged'], name='archbanktx_user_date_idx'),
+            models.Index(fields=['account', 'date_logged'], name='archbanktx_account_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} - {from_cents(self.amount)} for {self.date_logged.strftime('%Y-%m-%d')} (archived)"
+
+class MonthlyTransactionRollup(TenantOwnedModel):
+    """
+    Pre-aggregated debit/credit totals per account per month, maintained by BankLogService on every posting.
+    All-accounts figures are sums over the month's rows.
+    """
+    account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='monthly_rollups')
+    # First day of the month
+    month_year = models.DateField()
+    total_debit = MoneyField(default=0)  # minor units (cents)
+    total_credit = MoneyField(default=0)
+    debit_count = models.PositiveIntegerField(default=0)
+    credit_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('account', 'month_year')
+        indexes = [
+            models.Index(fields=['user', 'month_year'], name='banktxrollup_user_month_idx'),
+        ]
+        ordering = ['month_year', 'account']
 
     def __str__(self):
-        return f"{self.transaction_type} - {self.amount} for {self.date_logged.strftime('%Y-%m-%d')}"
+        return f"{self.month_year.strftime('%Y-%m')} - {self.account_id} - Debit: {from_cents(self.total_debit)} / Credit: {from_cents(self.total_credit)}"
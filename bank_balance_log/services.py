@@ -2,23 +2,40 @@
 from datetime import date 
 from typing import List, Optional
 from django.contrib.auth import get_user_model # type: ignore
-from django.db import transaction 
-from django.db.models.functions import TruncDate # type: ignore
+from django.db import IntegrityError, transaction 
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth # type: ignore
 from asgiref.sync import sync_to_async # type: ignore
 from django.utils import timezone
-import math # For math.ceil
 
-from .models import BankAccount, BankTransaction
+from .models import ArchivedBankTransaction, BankAccount, BankTransaction, MonthlyTransactionRollup
+from utilities.money import to_cents
 from schema.bank_balance_log.bank_balance_log_schema import (
     BankAccountCreateOrUpdate, BankAccountSchema,
     BankTransactionCreateRequest, BankTransactionSchema,
     BankDateFilterSchema, BankTransactionFilterInputSchema, 
-    BankLogContextData, PaginationDetails # Updated Schemas
+    BankLogContextData # Updated Schemas
 )
-from schema.list_schema import PaginationDetails
+from schema.list_schema import ListServiceConfig
+from utilities.archive import ensure_month_open, month_of, move_rows, source_model_for
+from utilities.autocomplete import DescriptionIndex
+from utilities.dates import add_month, day_bounds
+from utilities.instrumentation import instrument_service, timed
+from utilities.list_service import ListService
 
 User = get_user_model()
 
+# Columns BankTransactionSchema needs from each listed row
+TRANSACTION_LIST_COLUMNS = [
+    'id', 'account_id', 'transaction_type', 'amount', 'description',
+    'balance_after_transaction', 'date_logged', 'created_at', 'updated_at',
+]
+
+# Per-process description autocomplete, fed by record_transaction()
+transaction_descriptions = DescriptionIndex('bank_balance_log', 'BankTransaction')
+
+
+@instrument_service
 class BankLogService:
 
     @staticmethod
@@ -29,115 +46,153 @@ class BankLogService:
         except BankTransaction.DoesNotExist:
             return None
 
+    @staticmethod
+    def get_default_account_sync() -> BankAccount:
+        """ The account postings go to when they don't name one; created on first use """
+        account = BankAccount.objects.filter(is_default=True).first()
+        if account is not None:
+            return account
+        try:
+            with transaction.atomic():
+                return BankAccount.objects.create(is_default=True)
+        except IntegrityError:
+            # Another writer created it first.
+            return BankAccount.objects.get(is_default=True)
+
     @staticmethod
     @sync_to_async
     def set_or_update_bank_balance(balance_data: BankAccountCreateOrUpdate) -> BankAccountSchema:
-        account, created = BankAccount.objects.update_or_create(
-            defaults={'current_balance': balance_data.initial_balance, 'last_updated': timezone.now()}
-        )
+        defaults = {'current_balance': to_cents(balance_data.initial_balance), 'last_updated': timezone.now()}
+        if balance_data.account_id:
+            if balance_data.name:
+                defaults['name'] = balance_data.name
+            BankAccount.objects.filter(pk=balance_data.account_id).update(**defaults)
+            account = BankAccount.objects.get(pk=balance_data.account_id)
+        elif balance_data.name:
+            account, created = BankAccount.objects.update_or_create(name=balance_data.name, defaults=defaults)
+        else:
+            account = BankLogService.get_default_account_sync()
+            BankAccount.objects.filter(pk=account.pk).update(**defaults)
+            account.refresh_from_db()
         return BankAccountSchema.model_validate(account)
 
     @staticmethod
     @sync_to_async
-    def get_bank_account_details() -> Optional[BankAccountSchema]:
-        try:
-            account = BankAccount.objects.get()
-            return BankAccountSchema.model_validate(account)
-        except BankAccount.DoesNotExist:
-            return None
+    def get_bank_account_details(account_id: Optional[int] = None) -> Optional[BankAccountSchema]:
+        accounts = BankAccount.objects.filter(pk=account_id) if account_id else BankAccount.objects.filter(is_default=True)
+        account = accounts.first()
+        return BankAccountSchema.model_validate(account) if account else None
 
     @staticmethod
-    async def record_transaction(user: User, transaction_data: BankTransactionCreateRequest) -> BankTransaction:
-        @sync_to_async
-        def _atomic_transaction_operation() -> BankTransaction:
-            with transaction.atomic():
-                account, created = BankAccount.objects.get_or_create(user=user)
-                new_balance = account.current_balance
-                if transaction_data.transaction_type == BankTransaction.TransactionType.DEBIT:
-                    new_balance -= transaction_data.amount
-                else: new_balance += transaction_data.amount
-                account.current_balance = new_balance
-                account.last_updated = timezone.now()
-                account.save() 
-                bank_tx = BankTransaction.objects.create(
-                    user=user, account=account,
-                    transaction_type=transaction_data.transaction_type,
-                    amount=transaction_data.amount, 
-                    description=transaction_data.description,
-                    balance_after_transaction=account.current_balance, 
-                    date_logged=transaction_data.date_logged or timezone.now()
-                )
-                return bank_tx
-        return await _atomic_transaction_operation()
+    @sync_to_async
+    def list_accounts() -> List[BankAccountSchema]:
+        return [BankAccountSchema.model_validate(account) for account in BankAccount.objects.all()]
+
+    @staticmethod
+    def record_transaction_sync(transaction_data: BankTransactionCreateRequest) -> BankTransaction:
+        """
+        Posts a debit/credit against the balance of `account_id` (or the default account).
+        The account row is read with select_for_update(): on backends with row locks
+        (PostgreSQL, MySQL) only that account is locked, so postings to different accounts
+        don't wait on each other. SQLite, the configured backend, has no row locks; there
+        the call is a no-op and every posting serializes on the database write lock. With
+        SQLite's default deferred transactions, concurrent writers can also fail with
+        "database is locked" (benchmarks/load.py shows it at 20 users); the
+        'transaction_mode': 'IMMEDIATE' database option makes them queue instead.
+        Raises IntegrityError when the fingerprint or idempotency key already exists;
+        the surrounding atomic block rolls the balance change back with it.
+        Raises BankAccount.DoesNotExist for an unknown account_id and
+        utilities.archive.MonthClosedError when date_logged falls in a closed month.
+        Inside a caller's atomic block the posting commits (or rolls back) with the caller's writes;
+        the caller then feeds transaction_descriptions once committed.
+        """
+        account_id = transaction_data.account_id or BankLogService.get_default_account_sync().pk
+        date_logged = transaction_data.date_logged or timezone.now()
+        if timezone.is_naive(date_logged):
+            date_logged = timezone.make_aware(date_logged)
+        with transaction.atomic():
+            ensure_month_open(date_logged)
+            account = BankAccount.objects.select_for_update().get(pk=account_id)
+            amount_cents = to_cents(transaction_data.amount)
+            new_balance = account.current_balance
+            if transaction_data.transaction_type == BankTransaction.TransactionType.DEBIT:
+                new_balance -= amount_cents
+            else: new_balance += amount_cents
+            account.current_balance = new_balance
+            account.last_updated = timezone.now()
+            account.save(update_fields=['current_balance', 'last_updated'])
+            bank_tx = BankTransaction.objects.create(
+                account=account,
+                transaction_type=transaction_data.transaction_type,
+                amount=amount_cents, 
+                description=transaction_data.description,
+                balance_after_transaction=account.current_balance, 
+                date_logged=date_logged,
+                idempotency_key=transaction_data.idempotency_key or None,
+            )
+            BankLogService.apply_transaction_to_rollup(
+                account.pk, bank_tx.transaction_type, bank_tx.date_logged, bank_tx.amount, 1)
+        return bank_tx
+
+    @staticmethod
+    async def record_transaction(transaction_data: BankTransactionCreateRequest) -> BankTransaction:
+        """ Async entry point of record_transaction_sync (same errors) """
+        bank_tx = await sync_to_async(BankLogService.record_transaction_sync)(transaction_data)
+        transaction_descriptions.record(bank_tx.description, bank_tx.date_logged)
+        return bank_tx
+
+    @staticmethod
+    async def suggest_descriptions(prefix: str) -> List[str]:
+        """ Autocomplete for the add-transaction row; only the first call of a process reads the DB """
+        if not transaction_descriptions.built:
+            await sync_to_async(transaction_descriptions.ensure_built)()
+        return transaction_descriptions.suggest(prefix)
 
     @staticmethod
     @sync_to_async
-    def get_transactions_context_data(params: BankTransactionFilterInputSchema) -> BankLogContextData:
-        account_details_schema: Optional[BankAccountSchema] = None
-        try:
-            account = BankAccount.objects.get()
-            account_details_schema = BankAccountSchema.model_validate(account)
-        except BankAccount.DoesNotExist:
-            pass 
+    def get_transaction_by_idempotency_key(idempotency_key: str) -> Optional[BankTransaction]:
+        return BankTransaction.objects.filter(idempotency_key=idempotency_key).first()
 
-        # Base queryset
-        transaction_queryset = BankTransaction.objects.all()
+    @staticmethod
+    @sync_to_async
+    def get_transactions_context_data(params: BankTransactionFilterInputSchema) -> BankLogContextData:
+        # A handful of rows; the all-accounts balance is the sum of their running totals.
+        accounts = [BankAccountSchema.model_validate(account) for account in BankAccount.objects.all()]
+        account_details_schema = next((account for account in accounts if account.id == params.account_id), None)
 
-        # Apply filters
+        list_filter = {}
+        if params.account_id:
+            list_filter['account_id'] = params.account_id
+        period = None
         if params.filter_date:
-            transaction_queryset = transaction_queryset.filter(date_logged__date=params.filter_date)
+            period = day_bounds(params.filter_date)
         elif params.filter_month_year:
             year, month = map(int, params.filter_month_year.split('-'))
-            transaction_queryset = transaction_queryset.filter(date_logged__year=year, date_logged__month=month)
-        
+            period = day_bounds(date(year, month, 1), add_month(date(year, month, 1)))
+        if period:
+            list_filter.update(date_logged__gte=period[0], date_logged__lt=period[1])
         if params.transaction_type:
-            transaction_queryset = transaction_queryset.filter(transaction_type=params.transaction_type)
+            list_filter['transaction_type'] = params.transaction_type
+        # A closed month's postings are read from the archive table
+        source = source_model_for(BankTransaction, month_of(period[0])) if period else BankTransaction
 
-        # Apply sorting
-        if params.sort_by:
-            transaction_queryset = transaction_queryset.order_by(params.sort_by)
-        else:
-            transaction_queryset = transaction_queryset.order_by('-date_logged', '-created_at') 
-
-        # Pagination
-        total_items = transaction_queryset.count()
-        total_pages = math.ceil(total_items / params.page_size) if params.page_size > 0 else 0
-        if total_pages == 0 and total_items > 0: total_pages = 1
-
-        current_page = params.page
-        if current_page > total_pages and total_pages > 0 : current_page = total_pages
-        if current_page < 1: current_page = 1
-
-        start_item_index = (current_page - 1) * params.page_size
-        end_item_index = start_item_index + params.page_size
-        paginated_transactions_qs = transaction_queryset[start_item_index:end_item_index]
-
-        processed_transaction_schemas = [BankTransactionSchema.model_validate(tx) for tx in paginated_transactions_qs]
-        
-        pagination_details = PaginationDetails(
-            current_page=current_page,
-            page_size=params.page_size,
-            total_items=total_items,
-            total_pages=total_pages,
-            page_range=list(range(1, total_pages + 1)),
-            has_next_page=current_page < total_pages,
-            has_previous_page=current_page > 1,
-            next_page_number=current_page + 1 if current_page < total_pages else None,
-            previous_page_number=current_page - 1 if current_page > 1 else None,
-            start_item_index=start_item_index if total_items > 0 else None,
-            end_item_index=end_item_index -1 if total_items > 0 else None,
-            display_start_item=start_item_index + 1 if total_items > 0 else 0,
-            display_end_item=min(end_item_index, total_items) if total_items > 0 else 0,
-            per_page_options=[5, 10, 15, 20, 25]
-        )
-
-        return BankLogContextData(
-            bank_account=account_details_schema,
-            transactions=processed_transaction_schemas,
-            date_filters=BankLogService._get_last_n_unique_transaction_dates_sync(10),
-            pagination=pagination_details,
-            current_filters_applied=params,
-        )
+        listing = ListService.get_list_sync(ListServiceConfig(
+            app='bank_balance_log', model=source.__name__, filter=list_filter,
+            query=params.search or '', sort_by=params.sort_by or '', sorting='-date_logged',
+            page=params.page, page_limit=params.page_size,
+            requested_columns=TRANSACTION_LIST_COLUMNS, hidden_columns=[],
+        ))
+        date_filters = BankLogService._get_last_n_unique_transaction_dates_sync(10)
+        with timed('pydantic'):
+            return BankLogContextData(
+                bank_account=account_details_schema,
+                accounts=accounts,
+                total_balance=sum(account.current_balance for account in accounts),
+                transactions=[BankTransactionSchema.model_validate(row) for row in listing.data],
+                date_filters=date_filters,
+                pagination=listing.pagination,
+                current_filters_applied=params,
+            )
 
     @staticmethod
     def _get_last_n_unique_transaction_dates_sync(count: int) -> List[BankDateFilterSchema]:
@@ -156,3 +211,77 @@ class BankLogService:
                     display_text=log_date.strftime('%b %d, %Y')
                 ))
         return date_filters
+
+    @staticmethod
+    def archive_month_sync(period_start, period_end) -> int:
+        """ Moves the current tenant's postings in [period_start, period_end) to the archive; run in the close's transaction """
+        moved = move_rows(BankTransaction.objects.filter(date_logged__gte=period_start, date_logged__lt=period_end),
+                          ArchivedBankTransaction)
+        transaction_descriptions.reset()
+        return moved
+
+    @staticmethod
+    def restore_month_sync(period_start, period_end) -> int:
+        """ Reverse of archive_month_sync """
+        moved = move_rows(ArchivedBankTransaction.objects.filter(
+            date_logged__gte=period_start, date_logged__lt=period_end), BankTransaction)
+        transaction_descriptions.reset()
+        return moved
+
+    @staticmethod
+    def apply_transaction_to_rollup(account_id: int, transaction_type: str, date_logged,
+                                    amount_cents: int, count_delta: int) -> None:
+        """
+        Adds one posting (or removes it, with negative deltas) to the account's MonthlyTransactionRollup row.
+        Must run inside the caller's atomic block so the rollup commits with the row.
+        """
+        lookup = {'account_id': account_id, 'month_year': timezone.localdate(date_logged).replace(day=1)}
+        if transaction_type == BankTransaction.TransactionType.DEBIT:
+            amount_field, count_field = 'total_debit', 'debit_count'
+        else:
+            amount_field, count_field = 'total_credit', 'credit_count'
+        deltas = {
+            amount_field: F(amount_field) + amount_cents,
+            count_field: F(count_field) + count_delta,
+            'updated_at': timezone.now(),
+        }
+        if MonthlyTransactionRollup.objects.filter(**lookup).update(**deltas):
+            return
+        try:
+            with transaction.atomic():
+                MonthlyTransactionRollup.objects.create(**lookup, **{amount_field: amount_cents, count_field: count_delta})
+        except IntegrityError:
+            # Another writer created the month first; fall back to the increment.
+            MonthlyTransactionRollup.objects.filter(**lookup).update(**deltas)
+
+    @staticmethod
+    def rebuild_rollups_sync() -> int:
+        """
+        Recomputes MonthlyTransactionRollup from BankTransaction and its archive with one
+        grouped query each, for every user when run without a tenant, otherwise for the current one.
+        """
+        totals: dict[tuple[int, date], MonthlyTransactionRollup] = {}
+        grouped = [
+            item
+            for source in (BankTransaction, ArchivedBankTransaction)
+            for item in source.objects
+            .annotate(month=TruncMonth('date_logged'))
+            .values('user_id', 'account_id', 'month', 'transaction_type')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        ]
+        for item in grouped:
+            month_start = timezone.localdate(item['month']).replace(day=1)
+            rollup = totals.setdefault(
+                (item['account_id'], month_start),
+                MonthlyTransactionRollup(user_id=item['user_id'], account_id=item['account_id'], month_year=month_start))
+            if item['transaction_type'] == BankTransaction.TransactionType.DEBIT:
+                rollup.total_debit += item['total']
+                rollup.debit_count += item['count']
+            else:
+                rollup.total_credit += item['total']
+                rollup.credit_count += item['count']
+        with transaction.atomic():
+            MonthlyTransactionRollup.objects.all().delete()
+            MonthlyTransactionRollup.objects.bulk_create(totals.values(), batch_size=1000)
+        return len(totals)
@@ -1,3 +1,244 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bank_balance_log.models import BankAccount, BankTransaction, MonthlyTransactionRollup
+from bank_balance_log.services import BankLogService, transaction_descriptions
+from month_log.models import Expense
+from month_log.services import MonthlyIncomeService
+from schema.bank_balance_log.bank_balance_log_schema import BankTransactionCreateRequest
+from utilities.fingerprint import compute_fingerprint
+from utilities.money import from_cents
+from utilities.tenancy import tenant
+from utilities.testing import QueryBudgetTestCase
+from utilities.variables import ErrorMessages
+
+HTMX = {'HX-Request': 'true'}
+
+
+class BankLogQueryBudgetTests(QueryBudgetTestCase):
+    """ Exact query counts of every bank_balance_log view and HTMX action (see month_log/tests.py) """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('budget', password='x')
+        now = timezone.now()
+        cls.month = now.strftime('%Y-%m')
+        with tenant(cls.user.pk):
+            cls.account = BankAccount.objects.create(name='Main account', is_default=True, current_balance=500_000)
+            for i in range(5):
+                BankTransaction.objects.create(
+                    account=cls.account, transaction_type=BankTransaction.TransactionType.DEBIT,
+                    amount=1_000 * (i + 1), balance_after_transaction=500_000 - 1_000 * (i + 1),
+                    description=f'transfer {i}', date_logged=now - timedelta(minutes=i),
+                )
+            BankLogService.rebuild_rollups_sync()
+
+    def setUp(self):
+        transaction_descriptions.reset()
+        self.client.force_login(self.user)
+
+    def test_main_page(self):
+        self.assertRequestBudget(7, 'get', reverse('bank_balance_log:bank_log_main'), {'filter_month_year': self.month})
+
+    def test_sort_htmx(self):
+        self.assertRequestBudget(7, 'get', reverse('bank_balance_log:bank_log_main'),
+                                 {'filter_month_year': self.month, 'sort_by': '-amount'},
+                                 headers={**HTMX, 'HX-Target': 'Htb_Htable'})
+
+    def test_page_htmx(self):
+        self.assertRequestBudget(7, 'get', reverse('bank_balance_log:bank_log_main'),
+                                 {'filter_month_year': self.month, 'page': '2', 'page_size': '2'},
+                                 headers={**HTMX, 'HX-Target': 'Htb_Htable'})
+
+    def test_set_bank_balance(self):
+        # The balance update and re-read, then the same queries as the main page.
+        self.assertRequestBudget(9, 'post', reverse('bank_balance_log:set_bank_balance') + f'?filter_month_year={self.month}',
+                                 {'initial_balance': '4500.00', 'account_id': self.account.pk}, headers=HTMX)
+
+    def test_add_form(self):
+        self.assertRequestBudget(3, 'get', reverse('bank_balance_log:add_transaction_form_row'), headers=HTMX)
+
+    def test_description_suggestions(self):
+        self.assertRequestBudget(3, 'get', reverse('bank_balance_log:transaction_description_suggestions'),
+                                 {'description': 'tr'}, headers=HTMX)
+
+    def test_save_new(self):
+        self.assertRequestBudget(10, 'post', reverse('bank_balance_log:save_new_transaction'), {
+            'amount': '5.00', 'transaction_type': 'DEBIT', 'description': 'coffee',
+            'date_logged': timezone.now().isoformat(), 'idempotency_key': 'budget-save-new',
+        }, headers=HTMX)
+
+    def test_cancel_add(self):
+        self.assertRequestBudget(2, 'get', reverse('bank_balance_log:cancel_add_transaction_row'), headers=HTMX)
+
+
+class TransactionDedupTests(TestCase):
+    """ Fingerprint dedup and idempotency-key replay of save_new_transaction """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('dedup', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.data = {'amount': '5.00', 'transaction_type': 'CREDIT', 'description': 'refund',
+                     'date_logged': (timezone.now() - timedelta(hours=1)).isoformat()}
+
+    def test_duplicate_posting_is_rejected(self):
+        url = reverse('bank_balance_log:save_new_transaction')
+        self.assertEqual(self.client.post(url, self.data, headers=HTMX).status_code, 200)
+        response = self.client.post(url, self.data, headers=HTMX)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['errors'], ErrorMessages.DUPLICATE_ENTRY)
+        with tenant(self.user.pk):
+            self.assertEqual(BankAccount.objects.get().current_balance, 500)
+
+    def test_retry_with_the_same_key_replays_the_posting(self):
+        url = reverse('bank_balance_log:save_new_transaction')
+        first = self.client.post(url, self.data, headers={**HTMX, 'Idempotency-Key': 'retry-1'})
+        second = self.client.post(url, self.data, headers={**HTMX, 'Idempotency-Key': 'retry-1'})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        with tenant(self.user.pk):
+            self.assertEqual(BankTransaction.objects.count(), 1)
+
+    def test_idempotency_keys_are_per_user(self):
+        url = reverse('bank_balance_log:save_new_transaction')
+        self.client.post(url, self.data, headers={**HTMX, 'Idempotency-Key': 'shared-key'})
+        other = get_user_model().objects.create_user('other', password='x')
+        self.client.force_login(other)
+        response = self.client.post(url, {**self.data, 'description': 'other refund'},
+                                    headers={**HTMX, 'Idempotency-Key': 'shared-key'})
+        self.assertEqual(response.status_code, 200)
+        with tenant(other.pk):
+            posting = BankTransaction.objects.get()
+            self.assertEqual((posting.description, posting.idempotency_key), ('other refund', 'shared-key'))
+        self.assertEqual(BankTransaction.objects.filter(idempotency_key='shared-key').count(), 2)
+
+
+class FingerprintMigrationTests(TransactionTestCase):
+    """ Migrating a database from before fingerprints that already holds identical postings """
+    before = [('bank_balance_log', '0001_initial')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        account = apps.get_model('bank_balance_log', 'BankAccount').objects.create(current_balance=Decimal('100.00'))
+        logged_at = timezone.now().replace(microsecond=0)
+        for description in ('refund', 'refund', 'salary'):
+            apps.get_model('bank_balance_log', 'BankTransaction').objects.create(
+                account=account, transaction_type='CREDIT', amount=Decimal('5.00'), description=description,
+                balance_after_transaction=Decimal('105.00'), date_logged=logged_at)
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.latest)
+
+    def test_duplicates_keep_a_null_fingerprint(self):
+        MigrationExecutor(connection).migrate(self.latest)
+        postings = list(BankTransaction.objects.order_by('pk'))
+        self.assertEqual([posting.user_id for posting in postings], [self.owner.pk] * 3)
+        self.assertIsNone(postings[1].fingerprint)
+        for posting in (postings[0], postings[2]):
+            self.assertEqual(posting.fingerprint, compute_fingerprint(
+                f"CREDIT:{self.owner.pk}", posting.description, from_cents(posting.amount), posting.date_logged))
+
+
+
+class MoneyMigrationTests(TransactionTestCase):
+    """ Unapplying the move to integer cents on a database that holds postings """
+    cents = [('bank_balance_log', '0003_money_minor_units')]
+    decimals = [('bank_balance_log', '0002_banktransaction_fingerprint')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.cents)
+        apps = executor.loader.project_state(self.cents).apps
+        account = apps.get_model('bank_balance_log', 'BankAccount').objects.create(current_balance=10_550)
+        apps.get_model('bank_balance_log', 'BankTransaction').objects.create(
+            account=account, transaction_type='CREDIT', amount=505, description='refund',
+            balance_after_transaction=10_550, date_logged=timezone.now())
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.latest)
+
+    def test_reverse_restores_decimal_amounts(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.decimals)
+        apps = executor.loader.project_state(self.decimals).apps
+        account = apps.get_model('bank_balance_log', 'BankAccount').objects.get()
+        posting = apps.get_model('bank_balance_log', 'BankTransaction').objects.get()
+        self.assertEqual(account.current_balance, Decimal('105.50'))
+        self.assertEqual((posting.amount, posting.balance_after_transaction), (Decimal('5.05'), Decimal('105.50')))
+
+class MultiAccountPostingTests(TestCase):
+    """ Postings move their own account's balance and rollup row """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('accounts', password='x')
+        with tenant(cls.user.pk):
+            cls.main = BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+            cls.savings = BankAccount.objects.create(name='Savings', current_balance=50_000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _post(self, transaction_type, amount, description, account=None):
+        data = {'transaction_type': transaction_type, 'amount': amount, 'description': description}
+        if account:
+            data['account_id'] = account.pk
+        return self.client.post(reverse('bank_balance_log:save_new_transaction'), data, headers=HTMX)
+
+    def test_postings_stay_on_their_account(self):
+        self._post('DEBIT', '100.00', 'transfer out')
+        self._post('CREDIT', '100.00', 'transfer in', self.savings)
+        self._post('DEBIT', '20.00', 'fee', self.savings)
+        self.main.refresh_from_db()
+        self.savings.refresh_from_db()
+        self.assertEqual((self.main.current_balance, self.savings.current_balance), (90_000, 58_000))
+        with tenant(self.user.pk):
+            rollups = {account_id: (debit, credit, debits, credits)
+                       for account_id, debit, credit, debits, credits in MonthlyTransactionRollup.objects.values_list(
+                           'account_id', 'total_debit', 'total_credit', 'debit_count', 'credit_count')}
+            self.assertEqual(rollups, {self.main.pk: (10_000, 0, 1, 0), self.savings.pk: (2_000, 10_000, 1, 1)})
+            self.assertEqual(BankTransaction.objects.get(description='fee').balance_after_transaction, 58_000)
+            BankLogService.rebuild_rollups_sync()
+            self.assertEqual(MonthlyTransactionRollup.objects.get(account=self.savings).total_credit, 10_000)
+
+    def test_listing_filters_by_account(self):
+        self._post('DEBIT', '1.00', 'main coffee')
+        self._post('DEBIT', '2.00', 'savings coffee', self.savings)
+        response = self.client.get(reverse('bank_balance_log:bank_log_main'), {'account_id': self.savings.pk})
+        self.assertContains(response, 'savings coffee')
+        self.assertNotContains(response, 'main coffee')
+
+    def test_another_users_account_is_not_found(self):
+        other = get_user_model().objects.create_user('other', password='x')
+        with tenant(other.pk):
+            foreign = BankAccount.objects.create(name='Theirs', is_default=True, current_balance=0)
+        self.assertEqual(self._post('CREDIT', '5.00', 'sneaky', foreign).status_code, 404)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.current_balance, 0)
+
+    def test_deleted_expense_is_credited_to_the_debited_account(self):
+        with tenant(self.user.pk):
+            expense = Expense.objects.create(amount=3_000, description='shoes')
+            BankLogService.record_transaction_sync(BankTransactionCreateRequest(
+                transaction_type='DEBIT', amount='30.00', description='Monthly Expense: shoes',
+                account_id=self.savings.pk, idempotency_key=f'expense-{expense.pk}'))
+            async_to_sync(MonthlyIncomeService.delete_expense)(expense.pk)
+        self.main.refresh_from_db()
+        self.savings.refresh_from_db()
+        self.assertEqual((self.main.current_balance, self.savings.current_balance), (100_000, 50_000))
@@ -13,6 +13,7 @@ urlpatterns = [
     path('transaction/add-form/', views.add_bank_transaction_form_row_view, name='add_transaction_form_row'),
     path('transaction/save-new/', views.save_new_bank_transaction_view, name='save_new_transaction'),
     path('transaction/cancel-add/', views.cancel_add_bank_transaction_row_view, name='cancel_add_transaction_row'),
+    path('transaction/description-suggestions/', views.transaction_description_suggestions_view, name='transaction_description_suggestions'),
     
     # No edit/delete for bank transactions as per requirement
 ]
@@ -4,14 +4,20 @@ from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST, require_GET, require_http_methods  # type: ignore
 from pydantic import ValidationError
 import json
+import uuid
 from datetime import datetime
 from django.utils import timezone
 from django.urls import reverse
+from django.db import IntegrityError
 from schema.bank_balance_log.bank_balance_log_schema import (
     BankAccountCreateOrUpdate, BankTransactionCreateRequest,
     BankTransactionFilterInputSchema, BankTransactionSchema, BankLogContextData  # Updated schema
 )
+from bank_balance_log.models import BankAccount
 from bank_balance_log.services import BankLogService
+from utilities.archive import MonthClosedError
+from utilities.instrumentation import timed
+from utilities.variables import ErrorMessages
 from typing import Optional
 
 
@@ -45,7 +51,9 @@ def _get_bank_filter_params_from_request(request_get_dict: dict) -> BankTransact
         'page': page,
         'page_size': page_size,
         'sort_by': request_get_dict.get('sort_by'),
-        'transaction_type': request_get_dict.get('transaction_type')
+        'transaction_type': request_get_dict.get('transaction_type'),
+        'account_id': request_get_dict.get('account_id') or None,
+        'search': request_get_dict.get('search') or None,
     }
 
     if filter_data.get('filter_date'):
@@ -71,15 +79,13 @@ def _get_bank_filter_params_from_request(request_get_dict: dict) -> BankTransact
 # --- Main View & Balance Setting ---
 
 
-@require_GET
-async def bank_log_main_view(request: HttpRequest) -> HttpResponse:
-    filters = _get_bank_filter_params_from_request(request.GET.dict())
-    # Call the refactored service method
-    context_data: BankLogContextData = await BankLogService.get_transactions_context_data(filters)
-    print(context_data.model_dump())
+def _bank_log_context(context_data: BankLogContextData) -> dict:
+    """ Context of the transaction table (cotton/components/table/index.html) """
+    with timed('pydantic'):
+        data = context_data.model_dump()
 
-    context = {
-        'data': context_data.model_dump(),  # Contains pagination and all other data
+    return {
+        'data': data,  # Contains pagination and all other data
         'add_button': {
             'name': 'Add Transaction',
             'url': reverse('bank_balance_log:add_transaction_form_row'),
@@ -97,6 +103,14 @@ async def bank_log_main_view(request: HttpRequest) -> HttpResponse:
         ],
     }
 
+
+@require_GET
+async def bank_log_main_view(request: HttpRequest) -> HttpResponse:
+    filters = _get_bank_filter_params_from_request(request.GET.dict())
+    # Call the refactored service method
+    context_data: BankLogContextData = await BankLogService.get_transactions_context_data(filters)
+    context = _bank_log_context(context_data)
+
     template_name = 'cotton/components/table/index.html' if request.htmx else 'bank_balance_log/index.html'
     # Example for targeting only table body
     if request.htmx and request.headers.get("HX-Target") == "Htb_Htable":
@@ -114,6 +128,9 @@ async def set_bank_balance_view(request: HttpRequest) -> HttpResponse:
             request) if request.content_type == 'application/json' else request.POST.dict()
         if raw_data is None:
             return JsonResponse({'errors': "Invalid data format."}, status=400)
+        for optional_field in ('account_id', 'name'):
+            if not raw_data.get(optional_field):
+                raw_data.pop(optional_field, None)
         balance_data = BankAccountCreateOrUpdate.model_validate(raw_data)
     except ValidationError as e:
         return JsonResponse({'errors': e.errors(include_input=False)}, status=400)
@@ -125,17 +142,22 @@ async def set_bank_balance_view(request: HttpRequest) -> HttpResponse:
     filters = _get_bank_filter_params_from_request(request.GET.dict())
     context_data = await BankLogService.get_transactions_context_data(filters)
     context = {
-        'log_data': context_data,
+        **_bank_log_context(context_data),
         'balance_update_success_message': "Bank balance updated successfully."
     }
-    return render(request, 'cotton/components/table/table.html', context)
+    return render(request, 'cotton/components/table/index.html', context)
 
 
 # --- HTMX Inline Bank Transaction Row Views ---
 
 @require_GET
 async def add_bank_transaction_form_row_view(request: HttpRequest) -> HttpResponse:
-    return render(request, 'bank_balance_log/partials/add_row.html', {})
+    # Each rendered form carries its own key so a double-submitted row is only posted once.
+    return render(request, 'bank_balance_log/partials/add_row.html', {
+        'idempotency_key': uuid.uuid4().hex,
+        'accounts': await BankLogService.list_accounts(),
+        'account_id': request.GET.get('account_id', ''),
+    })
 
 
 @require_POST
@@ -153,6 +175,10 @@ async def save_new_bank_transaction_view(request: HttpRequest) -> HttpResponse:
                 pass
         else:
             raw_data.pop('date_logged', None)
+        if not raw_data.get('account_id'):
+            raw_data.pop('account_id', None)
+        if not raw_data.get('idempotency_key'):
+            raw_data['idempotency_key'] = request.headers.get('Idempotency-Key')
         transaction_data_create = BankTransactionCreateRequest.model_validate(
             raw_data)
     except ValidationError as e:
@@ -162,6 +188,16 @@ async def save_new_bank_transaction_view(request: HttpRequest) -> HttpResponse:
 
     try:
         new_transaction_obj = await BankLogService.record_transaction(transaction_data_create)
+    except IntegrityError:
+        # A retry carrying the same idempotency key gets the row it already created.
+        new_transaction_obj = await BankLogService.get_transaction_by_idempotency_key(
+            transaction_data_create.idempotency_key) if transaction_data_create.idempotency_key else None
+        if not new_transaction_obj:
+            return JsonResponse({'errors': ErrorMessages.DUPLICATE_ENTRY}, status=409)
+    except BankAccount.DoesNotExist:
+        return JsonResponse({'errors': "Bank account not found."}, status=404)
+    except MonthClosedError as e:
+        return JsonResponse({'errors': ErrorMessages.MONTH_CLOSED.format(month=str(e))}, status=409)
     except Exception as service_e:
         return JsonResponse({'errors': f"Failed to record transaction: {str(service_e)}"}, status=500)
 
@@ -171,6 +207,13 @@ async def save_new_bank_transaction_view(request: HttpRequest) -> HttpResponse:
     return render(request, 'bank_balance_log/partials/row.html', context)
 
 
+@require_GET
+async def transaction_description_suggestions_view(request: HttpRequest) -> HttpResponse:
+    """ <option> list for a description datalist, served from the in-memory index """
+    suggestions = await BankLogService.suggest_descriptions(request.GET.get('description', '')[:100])
+    return render(request, 'bank_balance_log/partials/description_suggestions.html', {'suggestions': suggestions})
+
+
 @require_http_methods(["GET", "POST"])
 async def cancel_add_bank_transaction_row_view(request: HttpRequest) -> HttpResponse:
     return HttpResponse(status=200)
@@ -0,0 +1,103 @@
+"""
+Fixtures of the endpoint benchmarks: a file-backed test database and one seeded user per
+dataset size, created once per session; each size has its own user, so the datasets
+coexist and tenancy keeps their pages apart.
+"""
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+from utilities.seeding import seed_ledger
+
+SEED_MONTHS = 12
+WARMUP_ROUNDS = 3
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_test_environment, django_db_blocker, tmp_path_factory):
+    """
+    The test database, in a file rather than in memory (the async views query from
+    sync_to_async threads on their own connections), created for the benchmarks even
+    though they carry no django_db marker: they share one seeded dataset per size instead
+    of a per-test transaction.
+    """
+    connections['default'].settings_dict['TEST']['NAME'] = str(tmp_path_factory.mktemp('bench') / 'bench.sqlite3')
+    with django_db_blocker.unblock():
+        config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    yield
+    with django_db_blocker.unblock():
+        teardown_databases(config, verbosity=0)
+
+
+@pytest.fixture(scope='session')
+def bench_db(django_db_setup, django_db_blocker):
+    """ Database access for the whole session, outside per-test transactions (the data is seeded once) """
+    with django_db_blocker.unblock():
+        yield
+
+
+@pytest.fixture(scope='session')
+def bench_user(bench_db, bench_size):
+    """ A user owning `bench_size` expenses (and their bank postings) over the last SEED_MONTHS months """
+    user = get_user_model().objects.create_user(f'bench-{bench_size}', password='bench')
+    seed_ledger(user.pk, expenses=bench_size, months=SEED_MONTHS, seed=bench_size)
+    return user
+
+
+class BenchmarkRecorder:
+    """ Times request callables and checks the p95 against the baseline """
+
+    def __init__(self, config):
+        self.rounds = config.getoption('--bench-rounds')
+        self.threshold = config.getoption('--bench-threshold')
+        self.update_baseline = config.getoption('--bench-update-baseline')
+        self.baseline_path = Path(config.getoption('--bench-baseline'))
+        self.baseline = json.loads(self.baseline_path.read_text()) if self.baseline_path.exists() else {}
+        self.results = {}
+
+    async def measure(self, name: str, request, expected_status: int = 200) -> dict:
+        """ Awaits request(i) for warm-up and timed rounds; returns (and records) the latency figures """
+        for i in range(WARMUP_ROUNDS):
+            response = await request(i)
+            assert response.status_code == expected_status, (name, response.status_code, response.content[:300])
+        timings = []
+        for i in range(WARMUP_ROUNDS, WARMUP_ROUNDS + self.rounds):
+            started = time.perf_counter()
+            response = await request(i)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == expected_status, (name, response.status_code)
+        timings.sort()
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        result = {'p50_ms': round(percentiles[49], 3), 'p95_ms': round(percentiles[94], 3),
+                  'max_ms': round(timings[-1], 3), 'rounds': self.rounds}
+        self.results[name] = result
+        return result
+
+    def check(self, name: str) -> None:
+        result, reference = self.results[name], self.baseline.get(name)
+        if self.update_baseline or reference is None:
+            return
+        limit = reference['p95_ms'] * (1 + self.threshold)
+        assert result['p95_ms'] <= limit, (
+            f"{name}: p95 {result['p95_ms']:.2f} ms exceeds the baseline {reference['p95_ms']:.2f} ms "
+            f"by more than {self.threshold:.0%} (p50 {result['p50_ms']:.2f} ms vs {reference['p50_ms']:.2f} ms)"
+        )
+
+    def finish(self) -> None:
+        if self.update_baseline and self.results:
+            self.baseline.update(self.results)
+            self.baseline_path.write_text(json.dumps(dict(sorted(self.baseline.items())), indent=2) + '\n')
+
+
+@pytest.fixture(scope='session')
+def bench_recorder(request):
+    recorder = BenchmarkRecorder(request.config)
+    request.config._bench_recorder = recorder
+    yield recorder
+    recorder.finish()
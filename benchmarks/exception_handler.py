@@ -0,0 +1,133 @@
+"""
+Error-path benchmark: utilities.exception_handler against the previous implementation.
+
+The previous handle_exception() found its caller with inspect.stack(), which builds a
+FrameInfo (source file read + context lines) for every frame on the stack, then picked
+the message through an isinstance chain. The current one reads a single frame with
+sys._getframe() (or takes the name bound by @handles_exceptions) and resolves the
+message once per exception class along the MRO. Both run at the same stack depth, with
+the module logger attached to a NullHandler so log output is not what is measured.
+
+Usage:
+    python -m benchmarks.exception_handler [--calls 2000] [--depth 40] [--repeat 3]
+"""
+import argparse
+import inspect
+import logging
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expenses_log.settings")
+django.setup()
+
+from django.core.exceptions import ObjectDoesNotExist  # noqa: E402
+from django.db import IntegrityError  # noqa: E402
+
+from utilities import exception_handler  # noqa: E402
+from utilities.exception_handler import handle_exception, handles_exceptions  # noqa: E402
+from utilities.variables import ExceptionMessages  # noqa: E402
+
+CASES = [
+    ("ObjectDoesNotExist", lambda: ObjectDoesNotExist("Expense matching query does not exist.")),
+    ("IntegrityError", lambda: IntegrityError("UNIQUE constraint failed")),
+    ("KeyError", lambda: KeyError("amount")),
+    ("RuntimeError (unexpected)", lambda: RuntimeError("boom")),
+]
+
+
+def _legacy_location():
+    stack = inspect.stack()
+    class_name = stack[2].frame.f_locals.get("self", None).__class__.__name__ if "self" in stack[2].frame.f_locals else ""
+    function_name = stack[1].function
+    return f"{class_name}.{function_name}" if class_name else function_name
+
+
+def _legacy_handle_exception(e, extra_info=""):
+    # Location capture plus the head of the old isinstance chain; the rest of the chain
+    # costs the same few isinstance() calls whichever branch is taken.
+    logger = exception_handler.logger
+    error_location = _legacy_location()
+    if isinstance(e, ObjectDoesNotExist):
+        logger.error(f"Object not found: {error_location} {extra_info}: {str(e)}", exc_info=True)
+        raise ObjectDoesNotExist(ExceptionMessages.NOT_FOUND)
+    elif isinstance(e, IntegrityError):
+        logger.error(f"Integrity error: {error_location} {extra_info}: {str(e)}", exc_info=True)
+        raise IntegrityError(ExceptionMessages.DATA_CONFLICT)
+    elif isinstance(e, KeyError):
+        logger.exception(f"Key error: {error_location} {extra_info}: {str(e)}")
+        raise KeyError(ExceptionMessages.MISSING_FIELDS)
+    logger.critical(f"Unexpected error: {error_location} {extra_info}: {str(e)}", exc_info=True)
+    raise ValueError(ExceptionMessages.EXCEPTION_ERROR)
+
+
+class Service:
+    def legacy(self, make):
+        try:
+            raise make()
+        except Exception as e:
+            _legacy_handle_exception(e)
+
+    def current(self, make):
+        try:
+            raise make()
+        except Exception as e:
+            handle_exception(e)
+
+    @handles_exceptions
+    def decorated(self, make):
+        raise make()
+
+
+def _at_depth(depth: int, fn):
+    """ Calls fn() `depth` frames down, like a service method under the ASGI/Django stack """
+    if depth:
+        return _at_depth(depth - 1, fn)
+    return fn()
+
+
+def _best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(calls: int, depth: int, repeat: int) -> list[tuple[str, str, float]]:
+    service = Service()
+    results = []
+    for label, make in CASES:
+        for variant in ("legacy", "current", "decorated"):
+            method = getattr(service, variant)
+
+            def loop():
+                for _ in range(calls):
+                    try:
+                        method(make)
+                    except Exception:
+                        pass
+
+            results.append((label, variant, _best_of(repeat, lambda: _at_depth(depth, loop)) / calls))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=40, help="Extra frames below the handler.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logger = exception_handler.logger
+    logger.handlers, logger.propagate = [logging.NullHandler()], False
+
+    print(f"calls={args.calls:,} depth={args.depth} repeat={args.repeat} (best of, per call)")
+    for label, variant, elapsed in run(args.calls, args.depth, args.repeat):
+        print(f"{label:<28} {variant:<10} {elapsed * 1e6:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
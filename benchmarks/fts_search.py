@@ -0,0 +1,124 @@
+"""
+Description search benchmark: LIKE '%term%' vs the FTS5 index ListService uses.
+
+Builds a throwaway SQLite table shaped like month_log_expense with the same FTS5
+table and triggers as migration 0005, then times the engine's query shapes
+(COUNT + one page, ordered the way ListService orders them) for prefix
+searches, alone and combined with a month filter.
+
+Usage:
+    python -m benchmarks.fts_search [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+from utilities.list_service import SEARCH_RANK_MAX_MATCHES
+from utilities.search import build_fts_query, fts_install_sql, period_tokens
+
+TABLE = "expense"
+FTS_TABLE = "expense_fts"
+WORDS = [
+    "groceries", "fuel", "rent", "electricity", "water", "internet", "coffee", "lunch", "dinner",
+    "pharmacy", "doctor", "taxi", "train", "movie", "books", "gym", "insurance", "phone", "gift",
+    "clothes", "shoes", "repairs", "parking", "snacks", "bakery", "market", "station", "store",
+]
+MONTH = ("2025-03-01 00:00:00", "2025-04-01 00:00:00")
+MONTH_PERIODS = period_tokens(datetime(2025, 3, 1), datetime(2025, 4, 1))
+
+
+def _build_database(rows: int, seed: int) -> sqlite3.Connection:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, description varchar(255), "
+                 "amount bigint, date_logged datetime)")
+    conn.execute(f"CREATE INDEX {TABLE}_date ON {TABLE} (date_logged)")
+    for statement in fts_install_sql(TABLE, FTS_TABLE):
+        conn.execute(statement)
+
+    def generate():
+        for _ in range(rows):
+            description = " ".join(rng.sample(WORDS, rng.randint(1, 3))) + f" #{rng.randint(1, 50_000)}"
+            day = f"20{rng.randint(20, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00"
+            yield description, rng.randint(100, 500_000), day
+
+    conn.executemany(f"INSERT INTO {TABLE} (description, amount, date_logged) VALUES (?, ?, ?)", generate())
+    conn.commit()
+    return conn
+
+
+def _order(total: int) -> str:
+    # ListService ranks small match sets by bm25 and keeps newest-first for broad ones.
+    if total <= SEARCH_RANK_MAX_MATCHES:
+        return f"{FTS_TABLE}.rank, {TABLE}.id DESC"
+    return f"date_logged DESC, {TABLE}.id DESC"
+
+
+def _best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(rows: int, repeat: int, seed: int, page: int = 10) -> list[tuple[str, float, str]]:
+    conn = _build_database(rows, seed)
+    results = []
+    for text in ("gro", "fuel stat", "insurance 4242"):
+        match = build_fts_query(text)
+        month_match = build_fts_query(text, MONTH_PERIODS)
+        words = [f"%{word}%" for word in text.split()]
+        like = " AND ".join(["description LIKE ?"] * len(words))
+        # Same shape ListService builds: join the FTS table on rowid, order by its bm25 rank.
+        joined = f"{TABLE}, {FTS_TABLE} WHERE {FTS_TABLE}.rowid = {TABLE}.id AND {FTS_TABLE} MATCH ?"
+        cases = {
+            "LIKE, all rows": (
+                lambda: conn.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {like}", words).fetchone()[0],
+                lambda total: conn.execute(f"SELECT id FROM {TABLE} WHERE {like} "
+                                     f"ORDER BY date_logged DESC LIMIT ?", (*words, page)).fetchall(),
+            ),
+            "FTS5, all rows": (
+                lambda: conn.execute(f"SELECT COUNT(*) FROM {joined}", (match,)).fetchone()[0],
+                lambda total: conn.execute(f"SELECT id FROM {joined} ORDER BY {_order(total)} LIMIT ?",
+                                           (match, page)).fetchall(),
+            ),
+            "LIKE, one month": (
+                lambda: conn.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE date_logged >= ? AND date_logged < ? "
+                                     f"AND {like}", (*MONTH, *words)).fetchone()[0],
+                lambda total: conn.execute(f"SELECT id FROM {TABLE} WHERE date_logged >= ? AND date_logged < ? "
+                                     f"AND {like} ORDER BY date_logged DESC LIMIT ?",
+                                     (*MONTH, *words, page)).fetchall(),
+            ),
+            "FTS5, one month": (
+                lambda: conn.execute(f"SELECT COUNT(*) FROM {joined} AND date_logged >= ? AND date_logged < ?",
+                                     (month_match, *MONTH)).fetchone()[0],
+                lambda total: conn.execute(f"SELECT id FROM {joined} AND date_logged >= ? AND date_logged < ? "
+                                           f"ORDER BY {_order(total)} LIMIT ?", (month_match, *MONTH, page)).fetchall(),
+            ),
+        }
+        for label, (count_query, page_query) in cases.items():
+            count_elapsed, total = _best_of(repeat, count_query)
+            page_elapsed, _ = _best_of(repeat, lambda: page_query(total))
+            results.append((f"{text!r:<18} {label}", count_elapsed + page_elapsed, f"{total:,} matches"))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows:,} repeat={args.repeat} (best of, COUNT + one page)")
+    for label, elapsed, note in run(args.rows, args.repeat, args.seed):
+        print(f"{label:<48} {elapsed * 1000:>10.2f} ms  {note}")
+
+
+if __name__ == "__main__":
+    main()
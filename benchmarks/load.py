@@ -0,0 +1,512 @@
+"""
+Load test of the ASGI application: concurrent users driving a mix of list, sort, page, add
+and delete requests, reporting throughput, latency histograms and errors, with "database
+is locked" failures counted apart.
+
+By default the app runs in-process: forked worker processes each serve their share of the
+users from expenses_log.asgi's application, called directly on one event loop (no sockets,
+so client overhead is part of the latency), against a dedicated SQLite file seeded with
+seed_ledger. With --url the users talk HTTP/1.1 to a server instead (using the database
+of the settings), optionally started for each run from --server-cmd.
+
+Options taking comma-separated values are swept; every combination is one run:
+    --concurrency       users, each sending its next request as soon as the last one returns
+    --workers           server processes (in-process, or {workers} in --server-cmd)
+    --threads           requests a worker runs at once, 0 for no limit ({threads} in
+                        --server-cmd). Django's ASGI handler gives every request its own
+                        thread for sync_to_async calls, so this bounds the threads in use;
+                        the other requests queue, and the wait is part of their latency.
+    --db-timeout, --journal-mode, --transaction-mode
+                        SQLite OPTIONS of the in-process workers
+
+Usage:
+    python -m benchmarks.load [--concurrency 50,100,250,500] [--duration 15] [--workers 1,2]
+        [--threads 0,32] [--journal-mode delete,wal] [--db-timeout 5] [--json results.json]
+    python -m benchmarks.load --url http://127.0.0.1:8001 --workers 1,4 \\
+        --server-cmd "uvicorn expenses_log.asgi:application --port 8001 --workers {workers}"
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shlex
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expenses_log.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from django.utils.crypto import get_random_string  # noqa: E402
+
+from month_log.models import Expense  # noqa: E402
+from utilities.seeding import seed_ledger  # noqa: E402
+
+OPERATIONS = ("list", "sort", "page", "add", "delete")
+SORT_KEYS = ("amount", "-amount", "description", "-date_logged")
+WORDS = ("coffee", "lunch", "groceries", "fuel", "taxi", "books", "pharmacy", "bakery")
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000)
+LOCK_MESSAGES = (b"database is locked", b"database table is locked")
+DELETE_POOL_PER_USER = 5_000
+LOAD_USER_PREFIX = "load-"
+
+
+class RunConfig(NamedTuple):
+    concurrency: int
+    workers: int
+    threads: int
+    db_timeout: float
+    journal_mode: str
+    transaction_mode: str
+
+
+class LoadUser(NamedTuple):
+    """ One simulated user: whose session it uses and the expenses it may delete """
+    session_key: str
+    csrf_token: str
+    deletable: List[int]
+
+
+# --- Fixture data ---
+
+def prepare_users(users: int, expenses: int, reseed: bool) -> List[Tuple[int, str]]:
+    """ Seeded load-N users (created once) and a fresh session for each """
+    user_model = get_user_model()
+    if reseed:
+        user_model.objects.filter(username__startswith=LOAD_USER_PREFIX).delete()
+    sessions = []
+    for index in range(users):
+        user, created = user_model.objects.get_or_create(username=f"{LOAD_USER_PREFIX}{index}")
+        if created:
+            seed_ledger(user.pk, expenses, months=12, seed=index)
+        client = Client()
+        client.force_login(user)
+        sessions.append((user.pk, client.cookies[settings.SESSION_COOKIE_NAME].value))
+    return sessions
+
+
+def assign_users(sessions: List[Tuple[int, str]], concurrency: int) -> List[LoadUser]:
+    """ Simulated users round-robin over the sessions; ones sharing a session get disjoint rows to delete """
+    sharing = defaultdict(list)
+    for index in range(concurrency):
+        sharing[index % len(sessions)].append(index)
+    load_users: List[Optional[LoadUser]] = [None] * concurrency
+    for session_index, indexes in sharing.items():
+        user_id, session_key = sessions[session_index]
+        ids = list(Expense._base_manager.filter(user_id=user_id).order_by("-date_logged")
+                   .values_list("id", flat=True)[:DELETE_POOL_PER_USER])
+        for offset, index in enumerate(indexes):
+            load_users[index] = LoadUser(session_key, get_random_string(32), ids[offset::len(indexes)])
+    return load_users
+
+
+# --- Transports ---
+
+def asgi_transport(application, threads: int):
+    """ send(method, path, query, headers, body) calling the ASGI callable directly """
+    limit = asyncio.Semaphore(threads) if threads else None
+
+    async def call(method, path, query, headers, body):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "headers": headers, "client": ("127.0.0.1", 50000), "server": ("localhost", 80),
+        }
+        finished = asyncio.Event()
+        requested = False
+        status, chunks = 0, []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    finished.set()
+
+        await application(scope, receive, send)
+        finished.set()
+        return status, b"".join(chunks)
+
+    async def send_request(*request):
+        if limit is None:
+            return await call(*request)
+        async with limit:
+            return await call(*request)
+    return send_request
+
+
+class HttpConnection:
+    """ A keep-alive HTTP/1.1 connection of one simulated user """
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method, path, query, headers, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        target = f"{path}?{query}" if query else path
+        lines = [f"{method} {target} HTTP/1.1", f"Content-Length: {len(body)}"]
+        lines += [f"{name.decode()}: {value.decode()}" for name, value in headers]
+        try:
+            self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+            await self.writer.drain()
+            status = int((await self.reader.readline()).split()[1])
+            response_headers = {}
+            while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+            if "content-length" in response_headers:
+                content = await self.reader.readexactly(int(response_headers["content-length"]))
+            elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+                parts = []
+                while size := int((await self.reader.readline()).split(b";")[0], 16):
+                    parts.append(await self.reader.readexactly(size))
+                    await self.reader.readline()
+                await self.reader.readline()
+                content = b"".join(parts)
+            else:
+                content = await self.reader.read()
+                await self.close()
+            if response_headers.get("connection", "").lower() == "close":
+                await self.close()
+            return status, content
+        except BaseException:
+            await self.close()
+            raise
+
+
+# --- Users ---
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    def record(self, operation: str, elapsed_ms: float, status: int, content: bytes) -> None:
+        self.latencies[operation].append(elapsed_ms)
+        self.statuses[operation][status] += 1
+        if status >= 400:
+            # The services report a failed write as a 400 carrying the database error.
+            locked = any(message in content for message in LOCK_MESSAGES)
+            self.errors["database is locked" if locked else f"http {status}"] += 1
+
+    def as_dict(self) -> dict:
+        return {"latencies": dict(self.latencies), "statuses": {op: dict(c) for op, c in self.statuses.items()},
+                "errors": dict(self.errors)}
+
+
+def build_request(operation: str, load_user: LoadUser, rng: random.Random, urls: Dict[str, str], host: str):
+    month = timezone.now().strftime("%Y-%m")
+    headers = [(b"host", host.encode()),
+               (b"cookie", f"{settings.SESSION_COOKIE_NAME}={load_user.session_key}; "
+                           f"{settings.CSRF_COOKIE_NAME}={load_user.csrf_token}".encode())]
+    htmx = [(b"hx-request", b"true")]
+    if operation == "list":
+        return "GET", urls["list"], urlencode({"filter_month_year": month}), headers, b""
+    if operation == "sort":
+        query = {"filter_month_year": month, "sort_by": rng.choice(SORT_KEYS), "target_body": "1"}
+        return "GET", urls["list"], urlencode(query), headers + htmx, b""
+    if operation == "page":
+        query = {"filter_month_year": month, "page": rng.randint(1, 5), "target_body": "1"}
+        return "GET", urls["list"], urlencode(query), headers + htmx, b""
+    post_headers = headers + htmx + [(b"x-csrftoken", load_user.csrf_token.encode()),
+                                     (b"content-type", b"application/x-www-form-urlencoded")]
+    if operation == "add":
+        body = urlencode({"amount": f"{rng.randint(100, 5_000) / 100:.2f}",
+                          "description": f"load {rng.choice(WORDS)} {rng.choice(WORDS)}",
+                          "date_logged": timezone.now().isoformat(), "idempotency_key": uuid.uuid4().hex})
+        return "POST", urls["add"], "", post_headers, body.encode()
+    return "POST", urls["delete"].format(pk=load_user.deletable.pop()), "", post_headers, b""
+
+
+async def run_users(send_for, load_users: List[LoadUser], mix: Dict[str, int], urls: Dict[str, str], host: str,
+                    start_at: float, warmup: float, duration: float, seed: int) -> Stats:
+    """ Runs every user from wall-clock `start_at`; only requests sent after the warm-up are recorded """
+    stats = Stats()
+    operations, weights = list(mix), list(mix.values())
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def user(index: int, load_user: LoadUser):
+        rng = random.Random(seed * 100_003 + index)
+        send = send_for(index)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            if operation == "delete" and not load_user.deletable:
+                operation = "add"
+            request = build_request(operation, load_user, rng, urls, host)
+            started = time.perf_counter()
+            try:
+                status, content = await send(*request)
+            except Exception as e:
+                if started >= measure_from:
+                    stats.errors[type(e).__name__] += 1
+                continue
+            if started >= measure_from:
+                stats.record(operation, (time.perf_counter() - started) * 1000, status, content)
+
+    await asyncio.gather(*(user(index, load_user) for index, load_user in enumerate(load_users)))
+    return stats
+
+
+# --- In-process workers ---
+
+class LockLogCounter(logging.Handler):
+    """ Counts log records about SQLite lock errors, e.g. the 500s the exception handler logs """
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        text = record.getMessage()
+        if record.exc_info and record.exc_info[1] is not None:
+            text += str(record.exc_info[1])
+        if any(message.decode() in text for message in LOCK_MESSAGES):
+            self.count += 1
+
+
+def _serve_in_process(config: RunConfig, load_users, mix, urls, start_at, warmup, duration, seed, pipe):
+    """ Worker process body: the app on its own loop, driven by this worker's share of the users """
+    options = connections["default"].settings_dict["OPTIONS"]
+    options["timeout"] = config.db_timeout
+    options["transaction_mode"] = config.transaction_mode.upper() if config.transaction_mode != "deferred" else None
+    counter = LockLogCounter()
+    logging.getLogger("django").handlers = []  # the 500s are counted here, not printed
+    logging.root.handlers = [counter]
+
+    from expenses_log.asgi import application
+    send = asgi_transport(application, config.threads)
+    stats = asyncio.run(run_users(lambda index: send, load_users, mix, urls, "localhost",
+                                  start_at, warmup, duration, seed))
+    result = stats.as_dict()
+    result["lock_errors_logged"] = counter.count
+    pipe.send(result)
+    pipe.close()
+
+
+def run_in_process(config: RunConfig, load_users, mix, urls, warmup, duration, seed) -> List[dict]:
+    context = multiprocessing.get_context("fork")
+    # The journal mode is a property of the file: set it once, as a change needs the only connection.
+    with connections["default"].cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode={config.journal_mode}")
+    connections.close_all()
+    start_at = time.time() + 1.0 + 0.2 * config.workers
+    workers = []
+    for index in range(config.workers):
+        receiver, sender = context.Pipe(duplex=False)
+        share = load_users[index::config.workers]
+        process = context.Process(target=_serve_in_process, args=(
+            config, share, mix, urls, start_at, warmup, duration, seed + index, sender))
+        process.start()
+        workers.append((process, receiver))
+    results = [receiver.recv() for _, receiver in workers]
+    for process, _ in workers:
+        process.join()
+    return results
+
+
+# --- Over a socket ---
+
+def _wait_for_port(host: str, port: int, timeout: float) -> None:
+    async def probe():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return asyncio.run(probe())
+        except OSError:
+            if time.time() > deadline:
+                raise SystemExit(f"Nothing listens on {host}:{port} after {timeout:.0f}s")
+            time.sleep(0.2)
+
+
+def run_over_socket(config: RunConfig, url: str, server_cmd: Optional[str], load_users, mix, urls,
+                    warmup, duration, seed) -> List[dict]:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    server = None
+    if server_cmd:
+        server = subprocess.Popen(shlex.split(server_cmd.format(workers=config.workers, threads=config.threads)))
+    try:
+        _wait_for_port(host, port, timeout=30)
+
+        async def drive():
+            connections_by_user = {index: HttpConnection(host, port) for index in range(len(load_users))}
+            try:
+                return await run_users(lambda index: connections_by_user[index].request, load_users, mix, urls,
+                                       parts.netloc, time.time(), warmup, duration, seed)
+            finally:
+                for connection in connections_by_user.values():
+                    await connection.close()
+        return [asyncio.run(drive()).as_dict()]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+# --- Report ---
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def _histogram(latencies: List[float]) -> List[int]:
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for value in latencies:
+        counts[next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if value <= bound), len(HISTOGRAM_BOUNDS_MS))] += 1
+    return counts
+
+
+def summarize(config: RunConfig, worker_results: List[dict], duration: float) -> dict:
+    latencies, errors = defaultdict(list), Counter()
+    for result in worker_results:
+        for operation, values in result["latencies"].items():
+            latencies[operation].extend(values)
+        errors.update(result["errors"])
+    everything = sorted(value for values in latencies.values() for value in values)
+    operations = {}
+    for operation in [op for op in OPERATIONS if op in latencies] + ["all"]:
+        ordered = everything if operation == "all" else sorted(latencies[operation])
+        operations[operation] = {
+            "count": len(ordered), "p50_ms": round(_percentile(ordered, 0.50), 2),
+            "p95_ms": round(_percentile(ordered, 0.95), 2), "p99_ms": round(_percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0, "histogram": _histogram(ordered),
+        }
+    return {
+        "config": config._asdict(), "requests": len(everything),
+        "throughput_rps": round(len(everything) / duration, 1), "errors": dict(errors),
+        "lock_errors_logged": sum(result.get("lock_errors_logged", 0) for result in worker_results),
+        "operations": operations,
+    }
+
+
+def print_summary(summary: dict, in_process: bool) -> None:
+    config = summary["config"]
+    print(f"concurrency={config['concurrency']} workers={config['workers']} threads={config['threads'] or 'unlimited'}"
+          + (f" journal={config['journal_mode']} timeout={config['db_timeout']}s tx={config['transaction_mode']}"
+             if in_process else ""))
+    errors = ", ".join(f"{kind}: {count}" for kind, count in sorted(summary["errors"].items())) or "none"
+    print(f"  {summary['requests']} requests, {summary['throughput_rps']} req/s; errors: {errors}"
+          + (f"; lock errors logged: {summary['lock_errors_logged']}" if in_process else ""))
+    print(f"  {'operation':<10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for operation, figures in summary["operations"].items():
+        print(f"  {operation:<10} {figures['count']:>7} {figures['p50_ms']:>9.1f} {figures['p95_ms']:>9.1f} "
+              f"{figures['p99_ms']:>9.1f} {figures['max_ms']:>9.1f}")
+    histogram = summary["operations"]["all"]["histogram"]
+    peak = max(histogram) or 1
+    labels = [f"<= {bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f"> {HISTOGRAM_BOUNDS_MS[-1]}"]
+    print("  latency (all operations), ms:")
+    for label, count in zip(labels, histogram):
+        if count:
+            print(f"    {label:>9} {count:>7} {'#' * max(1, round(40 * count / peak))}")
+    print()
+
+
+def _values(text: str, kind=str) -> list:
+    return [kind(value) for value in text.split(",") if value.strip()]
+
+
+def _mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (expected {', '.join(OPERATIONS)})")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="50,100,250,500")
+    parser.add_argument("--workers", default="1")
+    parser.add_argument("--threads", default="0")
+    parser.add_argument("--db-timeout", default="5", help="Seconds SQLite waits for a lock.")
+    parser.add_argument("--journal-mode", default="delete", help="delete, wal, ...")
+    parser.add_argument("--transaction-mode", default="deferred", help="deferred, immediate or exclusive.")
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per run.")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", type=_mix, default=_mix("list=40,sort=20,page=20,add=10,delete=10"))
+    parser.add_argument("--users", type=int, default=10, help="Seeded accounts the simulated users log in as.")
+    parser.add_argument("--expenses", type=int, default=2_000, help="Expenses seeded per account.")
+    parser.add_argument("--database", type=Path, default=Path(tempfile.gettempdir()) / "expenses_log_load.sqlite3",
+                        help="SQLite file of the in-process runs.")
+    parser.add_argument("--reseed", action="store_true", help="Recreate the load accounts and their data.")
+    parser.add_argument("--debug", action="store_true", help="Keep DEBUG on in-process (off by default, as deployed).")
+    parser.add_argument("--url", help="Drive the server at this URL instead of the in-process app.")
+    parser.add_argument("--server-cmd", help="Command starting the server for each run; {workers}, {threads}.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write every run's figures here.")
+    args = parser.parse_args()
+
+    in_process = args.url is None
+    sweeps = [_values(args.concurrency, int), _values(args.workers, int), _values(args.threads, int),
+              _values(args.db_timeout, float), _values(args.journal_mode), _values(args.transaction_mode)]
+    if not in_process and not args.server_cmd and (len(sweeps[1]) > 1 or len(sweeps[2]) > 1):
+        parser.error("sweeping --workers or --threads over --url needs --server-cmd")
+    if in_process:
+        connections["default"].settings_dict["NAME"] = str(args.database)
+        settings.DEBUG = args.debug
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "localhost"]
+        call_command("migrate", verbosity=0)
+
+    sessions = prepare_users(args.users, args.expenses, args.reseed)
+    urls = {"list": reverse("monthly_log:monthly_log_main"), "add": reverse("monthly_log:save_new_expense"),
+            "delete": reverse("monthly_log:delete_expense", args=[0]).replace("/0/", "/{pk}/")}
+    summaries = []
+    for config in itertools.starmap(RunConfig, itertools.product(*sweeps)):
+        load_users = assign_users(sessions, config.concurrency)
+        if in_process:
+            results = run_in_process(config, load_users, args.mix, urls, args.warmup, args.duration, args.seed)
+        else:
+            results = run_over_socket(config, args.url, args.server_cmd, load_users, args.mix, urls,
+                                      args.warmup, args.duration, args.seed)
+        summary = summarize(config, results, args.duration)
+        print_summary(summary, in_process)
+        summaries.append(summary)
+    if args.json:
+        args.json.write_text(json.dumps({"histogram_bounds_ms": HISTOGRAM_BOUNDS_MS, "runs": summaries}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
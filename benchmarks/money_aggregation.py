@@ -0,0 +1,116 @@
+"""
+Aggregation benchmark: DecimalField storage vs integer minor units (MoneyField) on SQLite.
+
+Reproduces what Django does for each layout without needing the project database:
+    * DecimalField  -> column declared ``decimal``; every value read goes through the
+                       sqlite backend's float -> Decimal converter, and SUM() is done in
+                       floating point by SQLite.
+    * MoneyField    -> column declared ``bigint``; values come back as ints, SUM() is exact.
+
+Usage:
+    python -m benchmarks.money_aggregation [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import decimal
+import random
+import sqlite3
+import time
+from decimal import Decimal
+
+# Same converter the Django sqlite3 backend installs for DecimalField(decimal_places=2).
+_create_decimal = decimal.Context(prec=15).create_decimal_from_float
+_quantize_value = Decimal(1).scaleb(-2)
+
+
+def _django_decimal_converter(value):
+    return _create_decimal(value).quantize(_quantize_value, context=decimal.Context(prec=15)) if value is not None else None
+
+
+def _build_database(rows: int, seed: int) -> tuple[sqlite3.Connection, int]:
+    rng = random.Random(seed)
+    cents = [rng.randint(1, 5_000_00) for _ in range(rows)]
+    months = [rng.randint(1, 12) for _ in range(rows)]
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE expense_decimal (id integer PRIMARY KEY, month integer, amount decimal NOT NULL)")
+    conn.execute("CREATE TABLE expense_cents (id integer PRIMARY KEY, month integer, amount bigint NOT NULL)")
+    # Django stores Decimal parameters as strings; SQLite's NUMERIC affinity turns them into REAL.
+    conn.executemany(
+        "INSERT INTO expense_decimal (month, amount) VALUES (?, ?)",
+        ((m, str(Decimal(c) / 100)) for m, c in zip(months, cents))
+    )
+    conn.executemany("INSERT INTO expense_cents (month, amount) VALUES (?, ?)", zip(months, cents))
+    conn.commit()
+    return conn, sum(cents)
+
+
+def _best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(rows: int, repeat: int, seed: int) -> list[tuple[str, float, str]]:
+    conn, exact_total_cents = _build_database(rows, seed)
+    exact_total = Decimal(exact_total_cents) / 100
+    results = []
+
+    def decimal_sum():
+        (value,) = conn.execute("SELECT SUM(amount) FROM expense_decimal").fetchone()
+        return _django_decimal_converter(value)
+
+    def cents_sum():
+        (value,) = conn.execute("SELECT SUM(amount) FROM expense_cents").fetchone()
+        return value
+
+    def decimal_grouped():
+        return {m: _django_decimal_converter(v) for m, v in conn.execute(
+            "SELECT month, SUM(amount) FROM expense_decimal GROUP BY month")}
+
+    def cents_grouped():
+        return dict(conn.execute("SELECT month, SUM(amount) FROM expense_cents GROUP BY month"))
+
+    def decimal_rows():
+        total = Decimal(0)
+        for (value,) in conn.execute("SELECT amount FROM expense_decimal"):
+            total += _django_decimal_converter(value)
+        return total
+
+    def cents_rows():
+        total = 0
+        for (value,) in conn.execute("SELECT amount FROM expense_cents"):
+            total += value
+        return total
+
+    elapsed, value = _best_of(repeat, decimal_sum)
+    results.append(("SUM() decimal column", elapsed, f"{value} (exact: {value == exact_total})"))
+    elapsed, value = _best_of(repeat, cents_sum)
+    results.append(("SUM() bigint cents", elapsed, f"{Decimal(value) / 100} (exact: {value == exact_total_cents})"))
+    elapsed, _ = _best_of(repeat, decimal_grouped)
+    results.append(("GROUP BY month decimal", elapsed, ""))
+    elapsed, _ = _best_of(repeat, cents_grouped)
+    results.append(("GROUP BY month bigint cents", elapsed, ""))
+    elapsed, value = _best_of(repeat, decimal_rows)
+    results.append(("read + convert every row decimal", elapsed, f"{value}"))
+    elapsed, value = _best_of(repeat, cents_rows)
+    results.append(("read every row bigint cents", elapsed, f"{Decimal(value) / 100}"))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows:,} repeat={args.repeat} (best of)")
+    for label, elapsed, note in run(args.rows, args.repeat, args.seed):
+        print(f"{label:<36} {elapsed * 1000:>10.2f} ms  {note}")
+
+
+if __name__ == "__main__":
+    main()
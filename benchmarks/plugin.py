@@ -0,0 +1,57 @@
+"""
+pytest plugin for the endpoint benchmarks (benchmarks/test_endpoints.py), loaded for
+every run by pytest.ini so its options exist wherever pytest is started; the fixtures
+are in benchmarks/conftest.py.
+
+Options:
+    --benchmark                 run them (they are skipped otherwise)
+    --bench-sizes 10000,100000  rows of expenses (and of bank postings) per seeded dataset
+    --bench-rounds 30           timed requests per endpoint, after a short warm-up
+    --bench-baseline PATH       JSON baseline, default benchmarks/baseline.json
+    --bench-threshold 0.25      allowed p95 slowdown against the baseline (0.25 = +25%)
+    --bench-update-baseline     write this run's figures to the baseline instead of comparing
+"""
+from pathlib import Path
+
+import pytest
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark', action='store_true', help="Run the endpoint benchmarks.")
+    group.addoption('--bench-sizes', default='10000', help="Comma-separated dataset sizes (rows).")
+    group.addoption('--bench-rounds', type=int, default=30, help="Timed requests per endpoint.")
+    group.addoption('--bench-baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file.")
+    group.addoption('--bench-threshold', type=float, default=0.25, help="Allowed p95 regression ratio.")
+    group.addoption('--bench-update-baseline', action='store_true', help="Rewrite the baseline file.")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason="endpoint benchmarks run with --benchmark")
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_generate_tests(metafunc):
+    if 'bench_size' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--bench-sizes').split(',') if size]
+        metafunc.parametrize('bench_size', sizes, ids=[f"{size // 1000}k" for size in sizes], scope='session')
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = getattr(config, '_bench_recorder', None)
+    if not recorder or not recorder.results:
+        return
+    terminalreporter.section('endpoint latency')
+    for name, result in sorted(recorder.results.items()):
+        reference = recorder.baseline.get(name)
+        versus = f"  (baseline p95 {reference['p95_ms']:.2f})" if reference and not recorder.update_baseline else ''
+        terminalreporter.write_line(
+            f"{name:<44} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms{versus}")
+    if recorder.update_baseline:
+        terminalreporter.write_line(f"baseline written to {recorder.baseline_path}")
@@ -0,0 +1,87 @@
+"""
+Sample table benchmark: sorting every row per request vs pages of a SortedGrid.
+
+For each sort the table offers, times what a header click costs: a full sorted() of
+the rows plus one page (the old get_list_from_rows path), against a page read from the
+column's cached permutation in both directions, first and last page. The one-off
+permutation builds and the cost of keeping them current on append/update are reported
+separately.
+
+Usage:
+    python -m benchmarks.sampletable_grid [--rows 1000000] [--repeat 5] [--page-size 25]
+"""
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expenses_log.settings")
+django.setup()
+
+from sampletable.services import PEOPLE_COLUMNS, PEOPLE_SCHEMA, PeopleService, generate_people  # noqa: E402
+from schema.list_schema import ListServiceConfig  # noqa: E402
+from utilities.columnar import ColumnStore  # noqa: E402
+from utilities.grid import SortedGrid  # noqa: E402
+from utilities.list_service import ListService  # noqa: E402
+
+SORTS = ("name", "-name", "age", "-age", "city", "")
+
+
+def _best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(rows: int, repeat: int, seed: int, page_size: int) -> list[tuple[str, float, str]]:
+    started = time.perf_counter()
+    people = generate_people(rows, seed)
+    results = [("generate rows", time.perf_counter() - started, f"{rows:,} rows")]
+    grid = PeopleService._grid = SortedGrid(ColumnStore.from_rows(PEOPLE_SCHEMA, people))
+    last_page = -(-rows // page_size)
+
+    for column in ("name", "email", "age", "job", "city"):
+        elapsed, _ = _best_of(1, lambda: grid._order(column))
+        results.append((f"build permutation {column}", elapsed, "once per column and process"))
+
+    for sort_by in SORTS:
+        def full_sort():
+            return ListService.get_list_from_rows(ListServiceConfig(
+                app='sampletable', model='people', sort_by=sort_by, page_limit=page_size,
+                default_column=['name', 'email', 'age', 'job', 'city'], hidden_columns=['id'],
+            ), people, PEOPLE_COLUMNS)
+
+        elapsed, _ = _best_of(min(repeat, 2), full_sort)
+        results.append((f"{sort_by or '(none)':<6} sort every row, page 1", elapsed, ""))
+        for page in (1, last_page):
+            elapsed, listing = _best_of(repeat, lambda: PeopleService.get_list(sort_by, page, page_size))
+            results.append((f"{sort_by or '(none)':<6} grid, page {page:,}", elapsed, f"{len(listing.data)} rows"))
+
+    grid.append({**people[0], 'id': rows + 1})
+    elapsed, _ = _best_of(repeat, lambda: grid.append({**people[1], 'id': len(grid) + 1}))
+    results.append(("append one row", elapsed, "5 permutations kept"))
+    elapsed, _ = _best_of(repeat, lambda: grid.update(2, {'age': grid.rows[2]['age'] % 72 + 18, 'city': 'Avalon'}))
+    results.append(("update age + city of one row", elapsed, "2 permutations moved"))
+    PeopleService._grid = None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"rows={args.rows:,} repeat={args.repeat} page_size={args.page_size} (best of)")
+    for label, elapsed, note in run(args.rows, args.repeat, args.seed, args.page_size):
+        print(f"{label:<40} {elapsed * 1000:>10.3f} ms  {note}")
+
+
+if __name__ == "__main__":
+    main()
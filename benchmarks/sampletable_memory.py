@@ -0,0 +1,95 @@
+"""
+Sample table memory benchmark: bytes per row of the people data in each layout.
+
+    dict rows       a list of one dict per person (the table's original layout)
+    column store    utilities.columnar.ColumnStore in memory: typed arrays, dictionary-
+                    encoded job/city, UTF-8 name/email
+    memory-mapped   the same store saved and opened memory-mapped: the columns are file
+                    pages in the OS page cache, shared by every worker that maps them,
+                    and only the manifest's category tables are on the heap
+
+Heap figures are what tracemalloc sees allocated and still held after the build (Python
+objects and numpy buffers, not allocator slack); each sorted column adds a 4-byte
+permutation per row on top. The last lines scale the figures to N worker processes.
+
+Usage:
+    python -m benchmarks.sampletable_memory [--rows 1000000] [--workers 1,4,8]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expenses_log.settings")
+django.setup()
+
+from sampletable.services import PEOPLE_SCHEMA, build_people_store, generate_people  # noqa: E402
+from utilities.columnar import ColumnStore  # noqa: E402
+from utilities.grid import SortedGrid  # noqa: E402
+
+
+def _held(build):
+    """ (result, bytes it still holds once built) """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, held
+
+
+def run(rows: int, seed: int, workers: list[int]) -> list[tuple[str, float, str]]:
+    results = []
+    people, dict_bytes = _held(lambda: generate_people(rows, seed))
+    del people
+    results.append(("dict rows", dict_bytes / rows, "per process"))
+
+    store, store_bytes = _held(lambda: build_people_store(rows, seed))
+    results.append(("column store", store_bytes / rows, "per process"))
+    for column, size in store.nbytes().items():
+        results.append((f"  {column} ({PEOPLE_SCHEMA[column]})", size / rows, ""))
+
+    grid = SortedGrid(store)
+    _, permutation_bytes = _held(lambda: [grid._order(column) for column in grid.columns])
+    results.append((f"  + {len(grid.columns)} sort permutations", permutation_bytes / rows, "per process"))
+    del grid
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "people"
+        store.save(path)
+        file_bytes = sum(item.stat().st_size for item in path.iterdir())
+        opened, mapped_heap = _held(lambda: ColumnStore.open(path, PEOPLE_SCHEMA))
+        assert opened[rows - 1] == store[rows - 1]
+        del opened
+    results.append(("memory-mapped: heap", mapped_heap / rows, "per process"))
+    results.append(("memory-mapped: file pages", file_bytes / rows, "shared by every process"))
+
+    for count in workers:
+        results.append((f"workers={count}: dict rows", count * dict_bytes / rows, "total"))
+        results.append((f"workers={count}: column store", count * store_bytes / rows, "total"))
+        results.append((f"workers={count}: memory-mapped", (count * mapped_heap + file_bytes) / rows, "total"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", default="1,4,8", help="Worker counts to scale the figures to.")
+    args = parser.parse_args()
+
+    workers = [int(value) for value in args.workers.split(",") if value.strip()]
+    print(f"rows={args.rows:,} (bytes per row)")
+    for label, per_row, note in run(args.rows, args.seed, workers):
+        print(f"{label:<36} {per_row:>10.1f} B  {note}")
+
+
+if __name__ == "__main__":
+    main()
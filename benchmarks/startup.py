@@ -0,0 +1,171 @@
+"""
+Startup benchmark: import time and cold start of the ASGI application per settings profile
+(EXPENSES_LOG_ENV), checked against benchmarks/startup_budget.json.
+
+Each run spawns a fresh interpreter that imports expenses_log.asgi (Django setup, apps,
+URLconf, middleware) and sends one request straight into the ASGI callable, then a
+second one. Reported, as the median over the runs:
+
+    import_ms               importing expenses_log.asgi, inside the child
+    first_request_ms        the first request: URL resolution, template compilation,
+                            first-use imports
+    warm_request_ms         the same request again
+    spawn_to_response_ms    process spawn to the first response, as the parent sees it
+                            (interpreter startup included)
+
+The request is the login page, which needs no database. The figures depend on the
+machine; rerun with --update-budget (which leaves 50% headroom) after a deliberate change.
+
+Usage:
+    python -m benchmarks.startup [--profiles development,production] [--runs 7]
+        [--imports 15] [--check] [--update-budget]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET = Path(__file__).with_name('startup_budget.json')
+BUDGET_HEADROOM = 1.5
+FIGURES = ('import_ms', 'first_request_ms', 'warm_request_ms', 'spawn_to_response_ms')
+REQUEST_PATH = '/accounts/login/'
+
+# Runs in the child: no project code may be imported before the clock starts.
+CHILD = r'''
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+from expenses_log.asgi import application
+imported = time.perf_counter()
+
+async def request(path):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 50000), "server": ("localhost", 80)}
+    sent = []
+    async def receive():
+        if not sent:
+            sent.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+    status = []
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    await application(scope, receive, send)
+    return status[0]
+
+async def main():
+    first_status = await request(sys.argv[1])
+    first = time.perf_counter()
+    print(json.dumps({"status": first_status, "import_ms": (imported - started) * 1000,
+                      "first_request_ms": (first - imported) * 1000}), flush=True)
+    before_warm = time.perf_counter()
+    await request(sys.argv[1])
+    print(json.dumps({"warm_request_ms": (time.perf_counter() - before_warm) * 1000}), flush=True)
+
+asyncio.run(main())
+'''
+
+
+def _environment(profile: str) -> Dict[str, str]:
+    environment = dict(os.environ, EXPENSES_LOG_ENV=profile, DJANGO_SETTINGS_MODULE='expenses_log.settings')
+    environment.setdefault('DJANGO_SECRET_KEY', 'startup-benchmark')
+    environment['DJANGO_ALLOWED_HOSTS'] = 'localhost'
+    environment['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), environment.get('PYTHONPATH')]))
+    environment.pop('PYTHONDONTWRITEBYTECODE', None)  # bytecode caches are warm in any real deployment
+    return environment
+
+
+def measure_once(profile: str) -> Dict[str, float]:
+    spawned = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', CHILD, REQUEST_PATH], cwd=ROOT, env=_environment(profile),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    first_line = child.stdout.readline()
+    responded = time.perf_counter()
+    rest, errors = child.communicate(timeout=120)
+    if child.returncode or not first_line:
+        raise RuntimeError(f"{profile} startup run failed:\n{errors}")
+    figures = json.loads(first_line)
+    if figures.pop('status') != 200:
+        raise RuntimeError(f"{profile}: {REQUEST_PATH} did not answer 200:\n{errors}")
+    figures.update(json.loads(rest.splitlines()[0]))
+    figures['spawn_to_response_ms'] = (responded - spawned) * 1000
+    return figures
+
+
+def measure(profile: str, runs: int) -> Dict[str, float]:
+    """ Median of each figure over `runs` cold starts, after one discarded run to warm the OS file cache """
+    measure_once(profile)
+    samples = [measure_once(profile) for _ in range(runs)]
+    return {figure: round(statistics.median(sample[figure] for sample in samples), 1) for figure in FIGURES}
+
+
+def slowest_imports(profile: str, count: int) -> List[tuple[float, str]]:
+    """ (ms, package) of the `count` top-level packages taking longest to import, from python -X importtime """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import expenses_log.asgi'], cwd=ROOT,
+                            env=_environment(profile), capture_output=True, text=True, timeout=120)
+    by_package: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)', line)
+        if match:
+            package = match.group(2).split('.')[0]
+            by_package[package] = by_package.get(package, 0.0) + int(match.group(1)) / 1000
+    return sorted(((elapsed, package) for package, elapsed in by_package.items()), reverse=True)[:count]
+
+
+def over_budget(results: Dict[str, Dict[str, float]], budget: Dict[str, Dict[str, float]]) -> List[str]:
+    failures = []
+    for profile, figures in results.items():
+        for figure, limit in budget.get(profile, {}).items():
+            if figures.get(figure, 0) > limit:
+                failures.append(f"{profile} {figure}: {figures[figure]:.1f} ms over the {limit:.1f} ms budget")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", default="development,production")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--imports", type=int, default=0, help="Also list the N top-level packages slowest to import, per profile.")
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET)
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when a figure is over budget.")
+    parser.add_argument("--update-budget", action="store_true",
+                        help=f"Write this run's figures times {BUDGET_HEADROOM} as the budget.")
+    args = parser.parse_args()
+
+    budget = json.loads(args.budget.read_text()) if args.budget.exists() else {}
+    results = {}
+    print(f"runs={args.runs} (median), request GET {REQUEST_PATH}")
+    print(f"{'profile':<12} " + " ".join(f"{figure:>21}" for figure in FIGURES))
+    for profile in [value.strip() for value in args.profiles.split(",") if value.strip()]:
+        results[profile] = measure(profile, args.runs)
+        limits = budget.get(profile, {})
+        print(f"{profile:<12} " + " ".join(
+            f"{results[profile][figure]:>10.1f} / {limits[figure]:>8.1f}" if figure in limits
+            else f"{results[profile][figure]:>21.1f}" for figure in FIGURES))
+        for elapsed, module in slowest_imports(profile, args.imports):
+            print(f"    {elapsed:>8.1f} ms  {module}")
+
+    if args.update_budget:
+        for profile, figures in results.items():
+            budget[profile] = {figure: round(value * BUDGET_HEADROOM, 1) for figure, value in figures.items()}
+        args.budget.write_text(json.dumps(budget, indent=2, sort_keys=True) + "\n")
+        print(f"budget written to {args.budget}")
+        return
+    failures = over_budget(results, budget)
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
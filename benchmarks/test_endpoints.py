@@ -0,0 +1,110 @@
+"""
+Endpoint latency benchmarks: p50/p95 of the list pages, their HTMX sort/page/search
+calls, and saves and deletes, against seeded datasets (see plugin.py).
+
+Usage:
+    python -m pytest benchmarks --benchmark [--bench-sizes 10000,100000,1000000]
+    python -m pytest benchmarks --benchmark --bench-update-baseline   # record a new baseline
+"""
+import uuid
+
+import pytest
+import pytest_asyncio
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.asyncio]
+
+HTMX = {'HX-Request': 'true'}
+
+
+@pytest_asyncio.fixture
+async def client(bench_user):
+    client = AsyncClient()
+    await client.aforce_login(bench_user)
+    return client
+
+
+def _month() -> str:
+    return timezone.now().strftime('%Y-%m')
+
+
+async def _bench_get(bench_recorder, bench_size, client, name, url, params=None, headers=None):
+    full_name = f"{name}@{bench_size}"
+    await bench_recorder.measure(full_name, lambda i: client.get(url, params or {}, headers=headers or {}))
+    bench_recorder.check(full_name)
+
+
+async def test_monthly_log_main(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'monthly_log_main',
+                     reverse('monthly_log:monthly_log_main'), {'filter_month_year': _month()})
+
+
+async def test_monthly_log_sort(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'monthly_log_sort',
+                     reverse('monthly_log:monthly_log_main'),
+                     {'filter_month_year': _month(), 'sort_by': '-amount', 'target_body': '1'}, HTMX)
+
+
+async def test_monthly_log_page(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'monthly_log_page',
+                     reverse('monthly_log:monthly_log_main'),
+                     {'filter_month_year': _month(), 'page': '5', 'target_body': '1'}, HTMX)
+
+
+async def test_monthly_log_search(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'monthly_log_search',
+                     reverse('monthly_log:monthly_log_main'),
+                     {'filter_month_year': _month(), 'search': 'coff', 'target_body': '1'}, HTMX)
+
+
+async def test_bank_log_main(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'bank_log_main',
+                     reverse('bank_balance_log:bank_log_main'), {'filter_month_year': _month()})
+
+
+async def test_bank_log_sort(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'bank_log_sort',
+                     reverse('bank_balance_log:bank_log_main'),
+                     {'filter_month_year': _month(), 'sort_by': '-amount'}, {**HTMX, 'HX-Target': 'Htb_Htable'})
+
+
+async def test_bank_log_page(bench_recorder, bench_size, client):
+    await _bench_get(bench_recorder, bench_size, client, 'bank_log_page',
+                     reverse('bank_balance_log:bank_log_main'),
+                     {'filter_month_year': _month(), 'page': '5'}, {**HTMX, 'HX-Target': 'Htb_Htable'})
+
+
+async def test_expense_save_and_delete(bench_recorder, bench_size, client):
+    """ Saves go through the expense row and its bank posting; each saved row is then deleted (timed too) """
+    saved_ids = []
+
+    async def save(i):
+        response = await client.post(reverse('monthly_log:save_new_expense'), {
+            'amount': '12.34', 'description': f'benchmark lunch {i}',
+            'date_logged': timezone.now().isoformat(), 'idempotency_key': uuid.uuid4().hex,
+        }, headers=HTMX)
+        if response.status_code == 200:
+            saved_ids.append(response.context['row'].id)
+        return response
+
+    async def delete(i):
+        return await client.post(reverse('monthly_log:delete_expense', args=[saved_ids[i]]), headers=HTMX)
+
+    for name, request in ((f'expense_save@{bench_size}', save), (f'expense_delete@{bench_size}', delete)):
+        await bench_recorder.measure(name, request)
+    for name in (f'expense_save@{bench_size}', f'expense_delete@{bench_size}'):
+        bench_recorder.check(name)
+
+
+async def test_bank_transaction_save(bench_recorder, bench_size, client):
+    async def save(i):
+        return await client.post(reverse('bank_balance_log:save_new_transaction'), {
+            'amount': '5.00', 'transaction_type': 'DEBIT', 'description': f'benchmark transfer {i}',
+            'date_logged': timezone.now().isoformat(), 'idempotency_key': uuid.uuid4().hex,
+        }, headers=HTMX)
+
+    name = f'bank_transaction_save@{bench_size}'
+    await bench_recorder.measure(name, save)
+    bench_recorder.check(name)
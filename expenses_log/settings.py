@@ -10,22 +10,36 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Settings profile, from the environment: "development" (the default) runs with DEBUG
+# and the live-reload tooling; "production" drops both, keeps database connections open
+# and takes its secrets and hosts from the environment.
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+ENVIRONMENT = os.environ.get('EXPENSES_LOG_ENV', 'development')
+if ENVIRONMENT not in ('development', 'production'):
+    raise ImproperlyConfigured(f"EXPENSES_LOG_ENV must be 'development' or 'production', not '{ENVIRONMENT}'")
+PRODUCTION = ENVIRONMENT == 'production'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-*w905sd2%lzyp#4^f(k+zl&x+lz9mhw+)$#yl3cg##lw8xi6%*'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', '')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured("DJANGO_SECRET_KEY must be set in production")
+    SECRET_KEY = 'django-insecure-*w905sd2%lzyp#4^f(k+zl&x+lz9mhw+)$#yl3cg##lw8xi6%*'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+# Comma-separated, e.g. "expenses.example.com,localhost"
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # Application definition
@@ -42,9 +56,13 @@ DJANGO_APPS = [
 
 # Third-Party Apps
 THIRD_PARTY_APPS = [
-    'tailwind',
     'django_htmx',
     'django_cotton',
+]
+
+# Development tooling: Tailwind's build commands and live reload
+DEV_APPS = [] if PRODUCTION else [
+    'tailwind',
     'django_browser_reload',
 ]
 
@@ -57,29 +75,52 @@ LOCAL_APPS = [
 ]
 
 # Combine All Apps
-INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
+INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + DEV_APPS + LOCAL_APPS
 
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware.
+    'utilities.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utilities.profiling.ProfilingMiddleware',
+    # Every app page needs a user; the tenant middleware then scopes all service queries to them.
+    'django.contrib.auth.middleware.LoginRequiredMiddleware',
+    'utilities.tenancy.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_browser_reload.middleware.BrowserReloadMiddleware',
+    *([] if PRODUCTION else ['django_browser_reload.middleware.BrowserReloadMiddleware']),
     'django_htmx.middleware.HtmxMiddleware',
 ]
 
 ROOT_URLCONF = 'expenses_log.urls'
 
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = '/monthly-log/'
+
+# Compiled templates are cached per process in both profiles (runserver's autoreloader
+# clears the cache when a template changes). django-cotton only installs its loader and
+# tags on an engine it recognises as DjangoTemplates, so for TimedDjangoTemplates they
+# are listed here.
+TEMPLATE_LOADERS = [
+    ('django.template.loaders.cached.Loader', [
+        'django_cotton.cotton_loader.Loader',
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, recording render time for PerformanceMiddleware
+        'BACKEND': 'utilities.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
+            'builtins': ['django_cotton.templatetags.cotton'],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -100,6 +141,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Production reuses a thread's connection across requests for up to 10 minutes,
+        # checking it first. Sync workers (expenses_log.wsgi) keep their threads; under
+        # ASGI each request's sync_to_async calls get a fresh thread, so there a
+        # connection lasts one request either way.
+        'CONN_MAX_AGE': 600 if PRODUCTION else 0,
+        'CONN_HEALTH_CHECKS': PRODUCTION,
     }
 }
 
@@ -147,6 +194,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 TAILWIND_APP_NAME = 'theme'
 
+# Request instrumentation (utilities.instrumentation.PerformanceMiddleware)
+SERVER_TIMING_HEADER = DEBUG
+PERF_SLOW_REQUEST_MS = 500
+PERF_MAX_QUERIES = 50
+
+# On-demand profiling (utilities.profiling): staff send "X-Profile: sample|cprofile";
+# PROFILE_SAMPLE_RATES profiles a fraction of requests per path prefix, e.g. {'/monthly-log/': 0.01}.
+PROFILE_DIR = None  # default: <tmp>/expenses_log_profiles
+PROFILE_KEEP = 50
+PROFILE_SAMPLE_RATES = {}
+PROFILE_SAMPLE_MODE = 'sample'
+
+# Rows the sample table generates (sampletable.services.PeopleService); with a directory
+# set, the first process saves them there and every worker memory-maps the same copy.
+SAMPLETABLE_ROWS = 50
+SAMPLETABLE_STORE_DIR = None
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
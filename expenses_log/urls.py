@@ -14,13 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from utilities.profiling import profile_download_view, profile_list_view
+
 urlpatterns = [
+    path('admin/profiles/', profile_list_view, name='profile_list'),
+    path('admin/profiles/<str:name>', profile_download_view, name='profile_download'),
     path('admin/', admin.site.urls),
-    path("__reload__", include("django_browser_reload.urls")),
+    path('accounts/', include('django.contrib.auth.urls')),
     path('monthly-log/', include('month_log.urls')),
     path('sampletable/', include('sampletable.urls')),
     path('bank-balance-log/', include('bank_balance_log.urls')),
 ]
+
+if 'django_browser_reload' in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__reload__", include("django_browser_reload.urls")))
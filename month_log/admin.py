@@ -1,3 +1,87 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
-# Register your models here.
+from .models import Expense, MonthlySalary
+from .services import ExpenseRollupService, MonthCloseService, MonthlyIncomeService
+from utilities.admin import LedgerModelAdmin, money_display
+from utilities.archive import month_of
+
+
+@admin.action(description="Close the months of the selected rows (snapshot + archive)")
+def close_selected_months(modeladmin, request, queryset):
+    """ Shared by the Expense and BankTransaction admins; goes through MonthCloseService """
+    months = sorted({month_of(date_logged) for date_logged in queryset.values_list('date_logged', flat=True)})
+    closed = []
+    for month_year in months:
+        try:
+            closed.append(MonthCloseService.close_month_sync(month_year))
+        except ValueError as e:
+            modeladmin.message_user(request, f"{month_year:%b %Y}: {e}", messages.WARNING)
+    if closed:
+        modeladmin.message_user(request, f"Closed {', '.join(f'{c.month_year:%b %Y}' for c in closed)}.")
+
+
+@admin.register(Expense)
+class ExpenseAdmin(LedgerModelAdmin):
+    """
+    Amount, date and category feed the rollups and the bank debit, so they are read-only
+    here and new expenses come in through the monthly log; deletes go through the batch
+    service path, which also updates the rollups and credits the bank.
+    """
+    list_display = ('date_logged', 'description', 'amount_display', 'category', 'created_at')
+    list_select_related = ('category',)
+    date_hierarchy = 'date_logged'  # expense_user_date_idx
+    list_filter = ('category',)  # expense_category_date_idx
+    search_fields = ('description',)
+    readonly_fields = ('amount', 'date_logged', 'category', 'monthly_salary_ref', 'fingerprint',
+                       'idempotency_key', 'created_at', 'updated_at')
+    actions = ['delete_with_reversal', close_selected_months]
+
+    amount_display = money_display('amount', 'Amount')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # The stock bulk delete would leave the rollups and the bank balance behind.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_model(self, request, obj):
+        MonthlyIncomeService.delete_expenses_sync([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        MonthlyIncomeService.delete_expenses_sync(queryset.values_list('pk', flat=True))
+
+    @admin.action(description="Delete selected expenses and credit the bank", permissions=['delete'])
+    def delete_with_reversal(self, request, queryset):
+        deleted = MonthlyIncomeService.delete_expenses_sync(queryset.values_list('pk', flat=True))
+        self.message_user(request, f"Deleted {deleted} expenses; the rollups and bank balance were updated.")
+
+
+@admin.register(MonthlySalary)
+class MonthlySalaryAdmin(LedgerModelAdmin):
+    """ Salary writes also update the month's rollup row, as set_or_update_monthly_salary does """
+    list_display = ('month_year', 'salary_display', 'updated_at')
+    date_hierarchy = 'month_year'  # unique (user, month_year)
+    readonly_fields = ('created_at', 'updated_at')
+
+    salary_display = money_display('salary_amount', 'Salary')
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            ExpenseRollupService.set_salary(obj.month_year, obj.salary_amount)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            ExpenseRollupService.set_salary(obj.month_year, 0)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            months = list(queryset.values_list('month_year', flat=True))
+            super().delete_queryset(request, queryset)
+            for month_year in months:
+                ExpenseRollupService.set_salary(month_year, 0)
@@ -0,0 +1,187 @@
+# month_log/forecast.py
+import calendar
+from datetime import date, datetime, time
+from typing import List
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce, ExtractDay, ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import ArchivedExpense, Category, Expense, MonthlySalary
+from bank_balance_log.models import BankAccount
+from schema.month_log.month_log_schema import (
+    ForecastInputSchema, ForecastSchema, WhatIfScenarioInput
+)
+
+# When no what-if scenarios are requested, suggest cutting the biggest spending categories.
+DEFAULT_SCENARIO_COUNT = 3
+DEFAULT_CUT_PERCENT = 20.0
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_number(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+
+class ForecastService:
+    """
+    Month-end projection and what-if simulation over columnar NumPy arrays.
+    All expense rows for the history window, archived ones included, come back in a single query;
+    everything after that is array arithmetic, with Python loops only over the user's
+    categories and the requested scenarios. What-if cuts apply per category; uncategorised
+    spend counts towards every projection but cannot be cut.
+    """
+
+    @staticmethod
+    @sync_to_async
+    def get_forecast(params: ForecastInputSchema) -> ForecastSchema:
+        year, month = map(int, params.month_year.split('-'))
+        month_start = date(year, month, 1)
+        history_start = _add_months(month_start, -params.history_months)
+        next_month_start = _add_months(month_start, 1)
+        days_in_month = calendar.monthrange(year, month)[1]
+
+        today = timezone.localdate()
+        if today >= next_month_start:
+            days_elapsed = days_in_month
+        elif today >= month_start:
+            days_elapsed = today.day
+        else:
+            days_elapsed = 0
+
+        # --- One query (hot table UNION ALL the archive of closed months), unpacked into columns ---
+        def window_rows(model):
+            return model.objects.filter(
+                date_logged__gte=timezone.make_aware(datetime.combine(history_start, time.min)),
+                date_logged__lt=timezone.make_aware(datetime.combine(next_month_start, time.min)),
+            ).annotate(
+                year=ExtractYear('date_logged'), month=ExtractMonth('date_logged'), day=ExtractDay('date_logged'),
+                category_group=Coalesce('category_id', Value(0)),
+            ).values_list('year', 'month', 'day', 'amount', 'category_group').order_by()
+        rows = list(window_rows(Expense).union(window_rows(ArchivedExpense), all=True))
+
+        # One group per category of the user, spent on in the window or not; group 0 is uncategorised.
+        category_names = dict(Category.objects.values_list('id', 'name'))
+        group_ids = np.array([0, *sorted(category_names)], dtype=np.int64)
+        group_count = len(group_ids)
+
+        history = params.history_months
+        if rows:
+            years, months, days, amounts, category_ids = zip(*rows)
+            month_idx = np.array(years, dtype=np.int64) * 12 + np.array(months, dtype=np.int64) - 1 \
+                - _month_number(history_start)
+            days = np.array(days, dtype=np.int64)
+            amounts = np.array(amounts, dtype=np.int64)
+            category_ids = np.array(category_ids, dtype=np.int64)
+            group_idx = np.minimum(np.searchsorted(group_ids, category_ids), group_count - 1)
+            group_idx[group_ids[group_idx] != category_ids] = 0
+        else:
+            month_idx = days = amounts = group_idx = np.empty(0, dtype=np.int64)
+
+        # --- Month-end projection ---
+        totals = np.bincount(month_idx, weights=amounts, minlength=history + 1)
+        to_date_mask = days <= days_elapsed
+        to_date = np.bincount(month_idx[to_date_mask], weights=amounts[to_date_mask], minlength=history + 1)
+        spent_to_date = float(to_date[history])
+
+        # Months with no expenses at all (e.g. before the log was started) would drag the averages down.
+        active_months = totals[:history] > 0
+        history_months_used = int(active_months.sum())
+        if history_months_used:
+            remaining = float((totals[:history] - to_date[:history])[active_months].mean())
+        elif days_elapsed:
+            remaining = spent_to_date / days_elapsed * (days_in_month - days_elapsed)
+        else:
+            remaining = 0.0
+        projected_spend = spent_to_date + remaining
+
+        salaries = dict(MonthlySalary.objects.filter(
+            month_year__gte=history_start, month_year__lte=month_start
+        ).values_list('month_year', 'salary_amount'))
+        if month_start in salaries:
+            salary = salaries[month_start]
+        else:
+            salary = int(np.mean(list(salaries.values()))) if salaries else 0
+
+        projected_bank_balance = None
+        if days_elapsed < days_in_month:
+            # Projected against the combined balance of all accounts.
+            current_balance = BankAccount.objects.aggregate(total=Sum('current_balance'))['total']
+            if current_balance is not None:
+                projected_bank_balance = int(round(current_balance - remaining))
+
+        # --- What-if scenarios: (scenarios x categories) multipliers against per-category baselines ---
+        if history_months_used:
+            past_mask = month_idx < history
+            grid = np.bincount(
+                month_idx[past_mask] * group_count + group_idx[past_mask],
+                weights=amounts[past_mask], minlength=history * group_count
+            ).reshape(history, group_count)
+            group_baseline = grid[active_months].mean(axis=0)
+        elif days_elapsed:
+            current_mask = month_idx == history
+            group_baseline = np.bincount(
+                group_idx[current_mask], weights=amounts[current_mask], minlength=group_count
+            ) * (days_in_month / days_elapsed)
+        else:
+            group_baseline = np.zeros(group_count)
+
+        group_names = [None, *(category_names[category_id] for category_id in group_ids[1:].tolist())]
+        scenarios: List[WhatIfScenarioInput] = list(params.scenarios)
+        if not scenarios:
+            top_groups = np.argsort(group_baseline[1:])[::-1][:DEFAULT_SCENARIO_COUNT] + 1
+            scenarios = [
+                WhatIfScenarioInput(group=group_names[i], cut_percent=DEFAULT_CUT_PERCENT)
+                for i in top_groups if group_baseline[i] > 0
+            ]
+
+        # Category names are matched case-insensitively; an exact spelling wins over a casefolded one.
+        group_lookup = {name.casefold(): i for i, name in enumerate(group_names) if name is not None}
+        group_lookup.update({name: i for i, name in enumerate(group_names) if name is not None})
+        multipliers = np.ones((len(scenarios) + 1, group_count))  # row 0 is the baseline
+        labels = ["Baseline"]
+        for row, scenario in enumerate(scenarios, start=1):
+            group_name = scenario.group.strip()
+            group = group_lookup.get(group_name, group_lookup.get(group_name.casefold()))
+            if group is None:
+                raise ValueError(f"Unknown category for a what-if scenario: {group_name}")
+            multipliers[row, group] = 1 - scenario.cut_percent / 100
+            labels.append(f"Cut {group_names[group]} by {scenario.cut_percent:g}%")
+
+        monthly_spend = multipliers @ group_baseline
+        monthly_savings = salary - monthly_spend
+        cumulative_savings = monthly_savings[:, None] * np.arange(1, params.horizon_months + 1)[None, :]
+        savings_delta = cumulative_savings[:, -1] - cumulative_savings[0, -1]
+
+        monthly_spend_cents = np.rint(monthly_spend).astype(np.int64).tolist()
+        monthly_savings_cents = np.rint(monthly_savings).astype(np.int64).tolist()
+        cumulative_cents = np.rint(cumulative_savings).astype(np.int64).tolist()
+        delta_cents = np.rint(savings_delta).astype(np.int64).tolist()
+
+        return ForecastSchema(
+            month_year=params.month_year,
+            days_elapsed=days_elapsed,
+            days_in_month=days_in_month,
+            history_months_used=history_months_used,
+            salary_amount=salary,
+            spent_to_date=int(round(spent_to_date)),
+            projected_spend=int(round(projected_spend)),
+            projected_savings=int(round(salary - projected_spend)),
+            projected_bank_balance=projected_bank_balance,
+            scenarios=[
+                {
+                    'label': labels[i],
+                    'monthly_spend': monthly_spend_cents[i],
+                    'monthly_savings': monthly_savings_cents[i],
+                    'cumulative_savings': cumulative_cents[i],
+                    'savings_delta': delta_cents[i],
+                }
+                for i in range(len(labels))
+            ],
+        )
@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bank_balance_log.models import MonthlyTransactionRollup
+from month_log.models import ClosedMonth, MonthlyRollup
+from month_log.services import MonthCloseService
+from utilities.tenancy import tenant
+
+
+def _parse_month(value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f"'{value}' is not a YYYY-MM month.")
+
+
+class Command(BaseCommand):
+    help = ("Close every month before --before (default: January of the current year) for each user: "
+            "snapshot its summary and move its expenses and bank postings to the archive tables.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="First month to keep open, YYYY-MM.")
+        parser.add_argument('--user', help="Only this username.")
+        parser.add_argument('--reopen', metavar='YYYY-MM',
+                            help="Reopen this month instead, moving its rows back into the live tables.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"No user named '{options['user']}'.")
+
+        if options['reopen']:
+            month_start = _parse_month(options['reopen'])
+            for user in users:
+                with tenant(user.pk):
+                    if MonthCloseService.reopen_month_sync(month_start):
+                        self.stdout.write(f"{user}: reopened {month_start:%Y-%m}")
+            return
+
+        current_month = timezone.localdate().replace(day=1)
+        before = _parse_month(options['before']) if options['before'] else current_month.replace(month=1)
+        # The current month is never closed.
+        before = min(before, current_month)
+        closed_total = 0
+        for user in users:
+            with tenant(user.pk):
+                # Every month with ledger activity has a rollup row in one of the two apps.
+                months = set(MonthlyRollup.objects.filter(month_year__lt=before).values_list('month_year', flat=True))
+                months.update(MonthlyTransactionRollup.objects.filter(
+                    month_year__lt=before).values_list('month_year', flat=True))
+                months.difference_update(ClosedMonth.objects.values_list('month_year', flat=True))
+                for month_start in sorted(months):
+                    snapshot = MonthCloseService.close_month_sync(month_start)
+                    closed_total += 1
+                    self.stdout.write(f"{user}: closed {month_start:%Y-%m} ({snapshot.expense_count} expenses)")
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed_total} months."))
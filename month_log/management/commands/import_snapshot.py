@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.snapshot import SnapshotError, import_snapshot
+
+
+class Command(BaseCommand):
+    help = ("Load a snapshot written by export_snapshot in one transaction. "
+            "Users are matched by username (existing ones are kept); ledger tables must be empty unless --flush.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--flush', action='store_true', help="Delete the current ledger rows first.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            counts = import_snapshot(options['directory'], using=options['database'], flush=options['flush'])
+        except (SnapshotError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        for label, rows in counts.items():
+            self.stdout.write(f"{label}: {rows}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {sum(counts.values())} rows in {time.perf_counter() - started:.2f}s."
+        ))
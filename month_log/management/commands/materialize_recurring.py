@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from month_log.services import RecurringExpenseService
+from utilities.archive import MonthClosedError
+from utilities.tenancy import tenant
+
+
+class Command(BaseCommand):
+    help = ("Create the expenses of every recurring template due in a month (default: the current one), "
+            "with one bank debit per account. Safe to re-run; schedule it for the first of each month.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to materialize, YYYY-MM.")
+        parser.add_argument('--user', help="Only this username.")
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month_start = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"'{options['month']}' is not a YYYY-MM month.")
+        else:
+            month_start = timezone.localdate().replace(day=1)
+
+        users = get_user_model().objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"No user named '{options['user']}'.")
+
+        created_total = skipped_total = 0
+        for user in users:
+            with tenant(user.pk):
+                try:
+                    created, skipped = RecurringExpenseService.materialize_month_sync(month_start)
+                except MonthClosedError:
+                    self.stderr.write(f"{user}: {month_start:%Y-%m} is closed, skipped.")
+                    continue
+            created_total += created
+            skipped_total += skipped
+            if created:
+                self.stdout.write(f"{user}: {created} expenses for {month_start:%Y-%m}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created_total} recurring expenses for {month_start:%Y-%m}; "
+            f"{skipped_total} already existed."
+        ))
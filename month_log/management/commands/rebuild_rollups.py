@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from bank_balance_log.services import BankLogService
+from month_log.services import ExpenseRollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute the expense and bank rollup tables from the ledger rows (e.g. after a bulk load)."
+
+    def handle(self, *args, **options):
+        daily_count, monthly_count, category_count = ExpenseRollupService.rebuild_rollups_sync()
+        bank_monthly_count = BankLogService.rebuild_rollups_sync()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {daily_count} daily, {monthly_count} monthly and {category_count} category expense rollups, "
+            f"{bank_monthly_count} monthly bank rollups."
+        ))
@@ -0,0 +1,49 @@
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities.money import to_cents
+from utilities.seeding import SeedError, seed_ledger
+
+
+class Command(BaseCommand):
+    help = ("Generate a synthetic ledger for USERNAME (created if missing): monthly salaries, expenses and their "
+            "bank postings with running balances. The same --seed and months always give the same rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--expenses', type=int, default=5_000, help="Expenses in total, spread over the months.")
+        parser.add_argument('--months', type=int, default=36)
+        parser.add_argument('--end-month', help="Last month, YYYY-MM (default: the current one, up to now).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--opening-balance', default='2000.00', help="Balance of a new bank account.")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes writing month ranges in parallel (SQLite file databases).")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        end_month = None
+        if options['end_month']:
+            try:
+                end_month = datetime.strptime(options['end_month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"'{options['end_month']}' is not a YYYY-MM month.")
+        if options['months'] < 1 or options['expenses'] < 0 or options['workers'] < 1:
+            raise CommandError("--months and --workers must be positive, --expenses not negative.")
+
+        user, _ = get_user_model()._default_manager.db_manager(options['database']).get_or_create(
+            username=options['username'])
+        started = time.perf_counter()
+        try:
+            counts = seed_ledger(user.pk, options['expenses'], options['months'], end_month, options['seed'],
+                                 to_cents(options['opening_balance']), options['workers'], options['database'])
+        except SeedError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+        total_rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {', '.join(f'{rows} {label}' for label, rows in counts.items())} for {user.username} "
+            f"in {elapsed:.2f}s ({total_rows / elapsed:,.0f} rows/s)."
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 07:00
+
+from django.db import migrations, models
+
+from utilities.fingerprint import compute_fingerprint
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # Rows that collide with an earlier one keep a NULL fingerprint, so existing duplicates
+    # stay visible for manual clean-up instead of failing the migration.
+    Expense = apps.get_model('month_log', 'Expense')
+    seen = set()
+    batch = []
+    for row in Expense.objects.order_by('created_at', 'pk').iterator(chunk_size=2000):
+        fingerprint = compute_fingerprint('EXPENSE', row.description, row.amount, row.date_logged)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        row.fingerprint = fingerprint
+        batch.append(row)
+        if len(batch) >= 2000:
+            Expense.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        Expense.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
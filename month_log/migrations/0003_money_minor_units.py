@@ -0,0 +1,85 @@
+# Generated by Django 5.2 on 2026-10-19 08:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+import utilities.money
+
+# (model, decimal column, max_digits)
+MONEY_COLUMNS = [
+    ('MonthlySalary', 'salary_amount', 10),
+    ('Expense', 'amount', 10),
+]
+
+
+def decimal_to_cents(apps, schema_editor):
+    # One UPDATE per column; the conversion runs inside the database, not row by row in Python.
+    for model_name, column, _ in MONEY_COLUMNS:
+        model = apps.get_model('month_log', model_name)
+        model.objects.update(**{
+            f'{column}_cents': Cast(Round(F(column) * 100), models.BigIntegerField())
+        })
+
+
+def cents_to_decimal(apps, schema_editor):
+    for model_name, column, max_digits in MONEY_COLUMNS:
+        model = apps.get_model('month_log', model_name)
+        model.objects.update(**{
+            # Times 0.01 rather than divided by 100, which SQLite would do in integers.
+            column: Cast(F(f'{column}_cents') * Decimal('0.01'),
+                         models.DecimalField(max_digits=max_digits, decimal_places=2))
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0002_expense_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlysalary',
+            name='salary_amount_cents',
+            field=utilities.money.MoneyField(default=0),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='amount_cents',
+            field=utilities.money.MoneyField(default=0),
+        ),
+        # Reversed, RemoveField re-adds the decimal column empty: nullable until
+        # cents_to_decimal has filled it, then this tightens it to NOT NULL again.
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(decimal_to_cents, cents_to_decimal),
+        migrations.RemoveField(
+            model_name='monthlysalary',
+            name='salary_amount',
+        ),
+        migrations.RemoveField(
+            model_name='expense',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='monthlysalary',
+            old_name='salary_amount_cents',
+            new_name='salary_amount',
+        ),
+        migrations.RenameField(
+            model_name='expense',
+            old_name='amount_cents',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=utilities.money.MoneyField(),
+        ),
+    ]
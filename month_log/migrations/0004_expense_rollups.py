@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-19 06:59
+
+import utilities.money
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Expense = apps.get_model('month_log', 'Expense')
+    MonthlySalary = apps.get_model('month_log', 'MonthlySalary')
+    DailyExpenseRollup = apps.get_model('month_log', 'DailyExpenseRollup')
+    MonthlyRollup = apps.get_model('month_log', 'MonthlyRollup')
+
+    DailyExpenseRollup.objects.bulk_create([
+        DailyExpenseRollup(day=item['day'], total_spent=item['total'], expense_count=item['count'])
+        for item in Expense.objects.annotate(day=TruncDate('date_logged'))
+        .values('day').annotate(total=Sum('amount'), count=Count('id')).order_by()
+    ], batch_size=1000)
+
+    monthly = {}
+    for item in Expense.objects.annotate(month=TruncMonth('date_logged'))\
+            .values('month').annotate(total=Sum('amount'), count=Count('id')).order_by():
+        month_start = timezone.localdate(item['month']).replace(day=1)
+        monthly[month_start] = MonthlyRollup(month_year=month_start, total_spent=item['total'], expense_count=item['count'])
+    for month_year, salary_amount in MonthlySalary.objects.values_list('month_year', 'salary_amount'):
+        monthly.setdefault(month_year, MonthlyRollup(month_year=month_year)).salary_amount = salary_amount
+    MonthlyRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0003_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('total_spent', utilities.money.MoneyField(default=0)),
+                ('expense_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.DateField(unique=True)),
+                ('total_spent', utilities.money.MoneyField(default=0)),
+                ('expense_count', models.PositiveIntegerField(default=0)),
+                ('salary_amount', utilities.money.MoneyField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['month_year'],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,147 @@
+# Generated by Django 5.2 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.fingerprint import compute_fingerprint
+from utilities.money import from_cents
+from utilities.search import install_fts, uninstall_fts
+from utilities.tenancy import legacy_owner_id
+
+OWNED_MODELS = ['MonthlySalary', 'Category', 'Expense', 'DailyExpenseRollup', 'MonthlyRollup', 'CategoryMonthlyRollup']
+EXPENSE_TABLE, EXPENSE_FTS_TABLE = 'month_log_expense', 'month_log_expense_fts'
+
+
+def assign_legacy_owner(apps, schema_editor):
+    owner_id = legacy_owner_id(apps)
+    if owner_id is None:
+        return
+    for model_name in OWNED_MODELS:
+        apps.get_model('month_log', model_name).objects.filter(user__isnull=True).update(user_id=owner_id)
+
+
+def _refingerprint(apps, scoped: bool):
+    # Only rows 0002 fingerprinted are rehashed: the duplicates it left NULL stay NULL, and
+    # a row whose new hash collides with an earlier one is cleared the same way.
+    Expense = apps.get_model('month_log', 'Expense')
+    seen = set()
+    rows = list(Expense.objects.filter(fingerprint__isnull=False).order_by('created_at', 'pk').only(
+        'id', 'user_id', 'description', 'amount', 'date_logged'))
+    for row in rows:
+        kind = f"EXPENSE:{row.user_id or ''}" if scoped else 'EXPENSE'
+        fingerprint = compute_fingerprint(kind, row.description, from_cents(row.amount), row.date_logged)
+        row.fingerprint = None if fingerprint in seen else fingerprint
+        seen.add(fingerprint)
+    Expense.objects.bulk_update(rows, ['fingerprint'], batch_size=1000)
+
+
+def scope_fingerprints(apps, schema_editor):
+    _refingerprint(apps, scoped=True)
+
+
+def unscope_fingerprints(apps, schema_editor):
+    _refingerprint(apps, scoped=False)
+
+
+def install_tenant_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, EXPENSE_FTS_TABLE)
+    install_fts(schema_editor, EXPENSE_TABLE, EXPENSE_FTS_TABLE, tenant_column='user_id')
+
+
+def drop_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, EXPENSE_FTS_TABLE)
+
+
+def install_plain_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, EXPENSE_FTS_TABLE)
+    install_fts(schema_editor, EXPENSE_TABLE, EXPENSE_FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0006_expense_categories'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversed last: dropping the user column rebuilds the table, so the plain index goes back after it.
+        migrations.RunPython(migrations.RunPython.noop, install_plain_fts),
+        migrations.AlterUniqueTogether(
+            name='monthlysalary',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='categorymonthlyrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='dailyexpenserollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='monthlyrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='monthlysalary',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='dailyexpenserollup',
+            name='day',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='monthlyrollup',
+            name='month_year',
+            field=models.DateField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='category',
+            unique_together={('user', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyexpenserollup',
+            unique_together={('user', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlyrollup',
+            unique_together={('user', 'month_year')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlysalary',
+            unique_together={('user', 'month_year')},
+        ),
+        migrations.AddIndex(
+            model_name='categorymonthlyrollup',
+            index=models.Index(fields=['user', 'month_year'], name='catrollup_user_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date_logged'], name='expense_user_date_idx'),
+        ),
+        migrations.RunPython(assign_legacy_owner, migrations.RunPython.noop),
+        migrations.RunPython(scope_fingerprints, unscope_fingerprints),
+        migrations.RunPython(install_tenant_fts, drop_fts),
+    ]
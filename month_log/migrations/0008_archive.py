@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-19 10:15
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+import utilities.money
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.archive import move_rows
+from utilities.search import install_fts, uninstall_fts
+
+FTS_TABLE = 'month_log_archivedexpense_fts'
+
+
+def create_fts(apps, schema_editor):
+    install_fts(schema_editor, 'month_log_archivedexpense', FTS_TABLE, tenant_column='user_id')
+
+
+def drop_fts(apps, schema_editor):
+    uninstall_fts(schema_editor, FTS_TABLE)
+
+
+def restore_archived_rows(apps, schema_editor):
+    # Unapplying drops the archive table, so its rows go back to the live table first.
+    move_rows(apps.get_model('month_log', 'ArchivedExpense').objects.all(), apps.get_model('month_log', 'Expense'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0007_user_scoping'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedExpense',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', utilities.money.MoneyField()),
+                ('description', models.CharField(max_length=255)),
+                ('date_logged', models.DateTimeField()),
+                ('fingerprint', models.CharField(blank=True, editable=False, max_length=64, null=True)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('category', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='month_log.category')),
+                ('monthly_salary_ref', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='month_log.monthlysalary')),
+                ('user', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date_logged'],
+                'indexes': [models.Index(fields=['user', 'date_logged'], name='archexpense_user_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClosedMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.DateField()),
+                ('salary_amount', utilities.money.MoneyField(default=0)),
+                ('total_spent', utilities.money.MoneyField(default=0)),
+                ('expense_count', models.PositiveIntegerField(default=0)),
+                ('total_debit', utilities.money.MoneyField(default=0)),
+                ('total_credit', utilities.money.MoneyField(default=0)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month_year'],
+                'unique_together': {('user', 'month_year')},
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(migrations.RunPython.noop, restore_archived_rows),
+    ]
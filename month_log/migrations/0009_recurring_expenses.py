@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-19 10:40
+
+import django.db.models.deletion
+import utilities.money
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_balance_log', '0008_archive'),
+        ('month_log', '0008_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringExpense',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('amount', utilities.money.MoneyField()),
+                ('day_of_month', models.PositiveSmallIntegerField(default=1)),
+                ('start_month', models.DateField()),
+                ('end_month', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_expenses', to='bank_balance_log.bankaccount')),
+                ('category', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_expenses', to='month_log.category')),
+                ('user', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day_of_month', 'description'],
+                'indexes': [models.Index(fields=['user', 'is_active'], name='recurring_user_active_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('day_of_month__gte', 1), ('day_of_month__lte', 31)), name='recurring_day_of_month_range')],
+            },
+        ),
+    ]
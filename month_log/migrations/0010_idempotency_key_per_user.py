@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 09:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+from utilities.search import install_fts, uninstall_fts
+
+EXPENSE_TABLE, EXPENSE_FTS_TABLE = 'month_log_expense', 'month_log_expense_fts'
+
+
+def reinstall_fts(apps, schema_editor):
+    # Dropping the column's unique index rebuilds the table on SQLite, which drops the FTS triggers.
+    uninstall_fts(schema_editor, EXPENSE_FTS_TABLE)
+    install_fts(schema_editor, EXPENSE_TABLE, EXPENSE_FTS_TABLE, tenant_column='user_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('month_log', '0009_recurring_expenses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reversed last, after the table has been rebuilt again.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_fts),
+        migrations.AlterField(
+            model_name='expense',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='expense_user_idempotency_key'),
+        ),
+        migrations.RunPython(reinstall_fts, migrations.RunPython.noop),
+    ]
@@ -2,13 +2,17 @@
 from django.utils import timezone
 from django.conf import settings
 from django.db import models
-from decimal import Decimal
+from django.db.models.functions import Now
 
-class MonthlySalary(models.Model):
+from utilities.fingerprint import compute_fingerprint
+from utilities.money import MoneyField, from_cents
+from utilities.tenancy import TenantOwnedModel, get_current_user_id
+
+class MonthlySalary(TenantOwnedModel):
     """
     Stores the user's declared monthly salary for a specific month.
     """
-    salary_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    salary_amount = MoneyField(default=0)  # minor units (cents)
     # Stores the first day of the month for which this salary applies
     month_year = models.DateField() 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -16,13 +20,71 @@ class MonthlySalary(models.Model):
 
     class Meta:
         # Ensures a user can only have one salary entry per month
-        unique_together = ('month_year',)
+        unique_together = ('user', 'month_year')
         ordering = ['-month_year', '-updated_at']
 
     def __str__(self):
-        return f"{self.month_year.strftime('%Y-%m')} - Salary: {self.salary_amount}"
+        return f"{self.month_year.strftime('%Y-%m')} - Salary: {from_cents(self.salary_amount)}"
 
-class Expense(models.Model):
+class Category(TenantOwnedModel):
+    """
+    Spending category an expense can be filed under, with an optional monthly budget.
+    """
+    name = models.CharField(max_length=100)
+    # Spend per calendar month above which add_expense warns; null means no budget.
+    monthly_budget = MoneyField(null=True, blank=True)  # minor units (cents)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'categories'
+        unique_together = ('user', 'name')
+
+    def __str__(self):
+        return self.name
+
+class RecurringExpense(TenantOwnedModel):
+    """
+    Template for an expense that repeats every month (rent, subscriptions, EMIs).
+    `manage.py materialize_recurring` turns the templates due in a month into Expense rows;
+    each occurrence carries the idempotency key "recurring-<template id>-<YYYYMM>", so a
+    re-run skips occurrences that already exist.
+    """
+    description = models.CharField(max_length=255)
+    amount = MoneyField()  # minor units (cents)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='recurring_expenses', db_index=False)
+    # Account the month's debit goes to; the default account when empty.
+    account = models.ForeignKey('bank_balance_log.BankAccount', on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='recurring_expenses', db_index=False)
+    # Day of the month the occurrence is dated; clamped to the month's last day (31 -> 30 Apr, 28/29 Feb).
+    day_of_month = models.PositiveSmallIntegerField(default=1)
+    # First and last month (first day of the month) the template is due; no end month means open-ended.
+    start_month = models.DateField()
+    end_month = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day_of_month', 'description']
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='recurring_user_active_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(day_of_month__gte=1, day_of_month__lte=31),
+                                   name='recurring_day_of_month_range'),
+        ]
+
+    def __str__(self):
+        return f"Day {self.day_of_month} - {from_cents(self.amount)} - {self.description}"
+
+    def occurrence_key(self, month_year) -> str:
+        """ Idempotency key of this template's Expense row for the month starting `month_year` """
+        return f"recurring-{self.pk}-{month_year:%Y%m}"
+
+class Expense(TenantOwnedModel):
     """
     Stores individual expense records for a user.
     """
@@ -30,16 +92,162 @@ class Expense(models.Model):
     # Useful if you want to tie expenses directly to a declared salary for a month.
     # For simplicity in calculating running balances, we might primarily rely on the expense's date.
     monthly_salary_ref = models.ForeignKey(MonthlySalary, on_delete=models.SET_NULL, null=True, blank=True, related_name='related_expenses')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # The (category, date_logged) index below also serves plain category lookups.
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='expenses', db_index=False)
+    amount = MoneyField()  # minor units (cents)
     description = models.CharField(max_length=255)
     date_logged = models.DateTimeField(default=timezone.now) # Changed from auto_now_add for more control if needed, but default to now.
+    # Content hash of (description, amount, date_logged); the unique index rejects re-submitted rows on insert.
+    fingerprint = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # Optional client-supplied key so a retried request maps onto the row it already created;
+    # unique per user (see Meta), so one user's keys never clash with or reveal another's.
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    FINGERPRINT_KIND = 'EXPENSE'
+    # FTS5 index over description, kept in sync by triggers (see migrations 0005 and 0007)
+    FTS_TABLE = 'month_log_expense_fts'
+    FTS_TENANT_COLUMN = 'user_id'
+    # Rows of closed months move here (see utilities.archive)
+    ARCHIVE_MODEL = 'month_log.ArchivedExpense'
+
+    class Meta:
+        ordering = ['-date_logged']
+        indexes = [
+            # Every listing and range scan is per user
+            models.Index(fields=['user', 'date_logged'], name='expense_user_date_idx'),
+            models.Index(fields=['category', 'date_logged'], name='expense_category_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='expense_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date_logged.strftime('%Y-%m-%d %H:%M')} - Amount: {from_cents(self.amount)} - {self.description}"
+
+    def compute_fingerprint(self) -> str:
+        # The owner is part of the hash, so two users can log identical expenses.
+        return compute_fingerprint(f"{self.FINGERPRINT_KIND}:{self.user_id or ''}", self.description,
+                                   from_cents(self.amount), self.date_logged)
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            self.user_id = get_current_user_id()
+        self.fingerprint = self.compute_fingerprint()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fingerprint' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'fingerprint']
+        super().save(*args, **kwargs)
+
+
+class ArchivedExpense(TenantOwnedModel):
+    """
+    Expense rows of closed months, moved out of Expense so the hot table only holds open months.
+    Same columns and ids as Expense; read-only until the month is reopened.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the id the row had in Expense
+    monthly_salary_ref = models.ForeignKey(MonthlySalary, on_delete=models.SET_NULL, null=True, blank=True,
+                                           related_name='+', db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='+', db_index=False)
+    amount = MoneyField()  # minor units (cents)
+    description = models.CharField(max_length=255)
+    date_logged = models.DateTimeField()
+    # Not unique here: closed months refuse new rows, so nothing is deduplicated against the archive.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    FTS_TABLE = 'month_log_archivedexpense_fts'
+    FTS_TENANT_COLUMN = 'user_id'
+
     class Meta:
         ordering = ['-date_logged']
+        indexes = [
+            models.Index(fields=['user', 'date_logged'], name='archexpense_user_date_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.date_logged.strftime('%Y-%m-%d %H:%M')} - Amount: {self.amount} - {self.description}"
+        return f"{self.date_logged.strftime('%Y-%m-%d %H:%M')} - Amount: {from_cents(self.amount)} - {self.description} (archived)"
+
+
+class DailyExpenseRollup(TenantOwnedModel):
+    """
+    Pre-aggregated spend per calendar day, maintained by the service layer on every expense write.
+    Chart endpoints read these rows instead of aggregating the Expense table.
+    """
+    day = models.DateField()
+    total_spent = MoneyField(default=0)  # minor units (cents)
+    expense_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'day')
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.day.strftime('%Y-%m-%d')} - Spent: {from_cents(self.total_spent)}"
+
+class MonthlyRollup(TenantOwnedModel):
+    """
+    Pre-aggregated spend per month plus the declared salary, maintained on write.
+    """
+    # First day of the month, same convention as MonthlySalary.month_year
+    month_year = models.DateField()
+    total_spent = MoneyField(default=0)  # minor units (cents)
+    expense_count = models.PositiveIntegerField(default=0)
+    salary_amount = MoneyField(default=0)  # copied from MonthlySalary on write
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'month_year')
+        ordering = ['month_year']
 
+    def __str__(self):
+        return f"{self.month_year.strftime('%Y-%m')} - Spent: {from_cents(self.total_spent)}"
+
+class CategoryMonthlyRollup(TenantOwnedModel):
+    """
+    Pre-aggregated spend per category per month, maintained on write.
+    Uncategorised expenses only count towards MonthlyRollup.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month_year = models.DateField()  # first day of the month
+    total_spent = MoneyField(default=0)  # minor units (cents)
+    expense_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('category', 'month_year')
+        indexes = [
+            models.Index(fields=['user', 'month_year'], name='catrollup_user_month_idx'),
+        ]
+        ordering = ['month_year', 'category']
+
+    def __str__(self):
+        return f"{self.month_year.strftime('%Y-%m')} - {self.category_id} - Spent: {from_cents(self.total_spent)}"
+
+class ClosedMonth(TenantOwnedModel):
+    """
+    Snapshot of a closed month: the summary figures frozen at close time.
+    While this row exists the month's expenses and bank postings live in the archive
+    tables and writes dated in the month are refused.
+    """
+    month_year = models.DateField()  # first day of the month
+    salary_amount = MoneyField(default=0)  # minor units (cents)
+    total_spent = MoneyField(default=0)
+    expense_count = models.PositiveIntegerField(default=0)
+    total_debit = MoneyField(default=0)  # all accounts
+    total_credit = MoneyField(default=0)
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'month_year')
+        ordering = ['-month_year']
+
+    def __str__(self):
+        return f"{self.month_year.strftime('%Y-%m')} - Closed - Spent: {from_cents(self.total_spent)}"
@@ -1,27 +1,51 @@
 # month_log/services.py
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from datetime import date
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.db.models.functions import TruncDate
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
 from asgiref.sync import sync_to_async
 from django.utils import timezone
-import math  # For math.ceil
 
-from .models import MonthlySalary, Expense
+from .models import (
+    MonthlySalary, Expense, ArchivedExpense, Category, RecurringExpense, ClosedMonth,
+    DailyExpenseRollup, MonthlyRollup, CategoryMonthlyRollup,
+)
 from schema.month_log.month_log_schema import (
-    MonthlySalaryCreate, MonthlySalarySchema,
+    MonthlySalaryCreate, MonthlySalarySchema, CategoryCreate, CategorySchema, CategoryBreakdownSchema,
     ExpenseCreate, ExpenseUpdate, ExpenseSchema, DateFilterSchema,
-    ExpenseFilterInputSchema, MonthlyLogContextData  # Updated schema
+    ExpenseFilterInputSchema, MonthlyLogContextData,  # Updated schema
+    MonthCloseInputSchema, ClosedMonthSchema, RecurringExpenseCreate, RecurringExpenseSchema,
+    ChartDataFilterInputSchema, ChartDataSchema,
+    MonthRangeInputSchema, MonthComparisonSchema
 )
-from schema.list_schema import PaginationDetails
-from bank_balance_log.services import BankLogService
+from schema.list_schema import ListServiceConfig
+from bank_balance_log.models import BankAccount, BankTransaction, MonthlyTransactionRollup
+from bank_balance_log.services import BankLogService, transaction_descriptions
 from schema.bank_balance_log.bank_balance_log_schema import BankTransactionCreateRequest
+from utilities.archive import MonthClosedError, ensure_month_open, month_of, move_rows
+from utilities.autocomplete import DescriptionIndex
+from utilities.dates import add_month, day_bounds
+from utilities.instrumentation import instrument_service, timed
+from utilities.list_service import ListService
+from utilities.money import from_cents, to_cents
+from utilities.tenancy import get_current_user_id
+from utilities.variables import ErrorMessages
 
 User = get_user_model()
 
+# Columns ExpenseSchema needs from each listed row
+EXPENSE_LIST_COLUMNS = ['id', 'amount', 'description', 'category_id', 'date_logged', 'created_at', 'updated_at']
+
+# Per-process description autocomplete, fed by add/update/delete below
+expense_descriptions = DescriptionIndex('month_log', 'Expense')
+
 
+@instrument_service
 class MonthlyIncomeService:
 
     @staticmethod
@@ -37,10 +61,12 @@ class MonthlyIncomeService:
     def set_or_update_monthly_salary(salary_data: MonthlySalaryCreate) -> MonthlySalarySchema:
         target_month_year = date(
             salary_data.month_year.year, salary_data.month_year.month, 1)
-        salary_obj, created = MonthlySalary.objects.update_or_create(
-            month_year=target_month_year,
-            defaults={'salary_amount': salary_data.salary_amount}
-        )
+        with transaction.atomic():
+            salary_obj, created = MonthlySalary.objects.update_or_create(
+                month_year=target_month_year,
+                defaults={'salary_amount': to_cents(salary_data.salary_amount)}
+            )
+            ExpenseRollupService.set_salary(target_month_year, salary_obj.salary_amount)
         return MonthlySalarySchema.model_validate(salary_obj)
 
     @staticmethod
@@ -54,31 +80,86 @@ class MonthlyIncomeService:
         except MonthlySalary.DoesNotExist:
             return None
 
+    @staticmethod
+    @sync_to_async
+    def list_categories() -> List[CategorySchema]:
+        return [CategorySchema.model_validate(category) for category in Category.objects.all()]
+
+    @staticmethod
+    @sync_to_async
+    def save_category(category_data: CategoryCreate) -> CategorySchema:
+        """ Creates the category or updates the budget of the one with the same name """
+        monthly_budget = to_cents(category_data.monthly_budget) if category_data.monthly_budget else None
+        category_obj, created = Category.objects.update_or_create(
+            name=category_data.name.strip(), defaults={'monthly_budget': monthly_budget})
+        return CategorySchema.model_validate(category_obj)
+
     @staticmethod
     async def add_expense(expense_data: ExpenseCreate) -> Tuple[Optional[Expense], Optional[str]]:
+        """
+        Returns (expense, None) on success, or (expense, warning) when the expense takes its
+        category over the monthly budget; (None, error) when nothing was saved.
+        """
         expense_date_logged = expense_data.date_logged or timezone.now()
+        if timezone.is_naive(expense_date_logged):
+            expense_date_logged = timezone.make_aware(expense_date_logged)
         new_expense_obj = None
+        budget_warning = None
         try:
             @sync_to_async
             def _create_expense_atomically():
-                return Expense.objects.create(
-                    amount=expense_data.amount,
-                    description=expense_data.description, date_logged=expense_date_logged
-                )
-            new_expense_obj = await _create_expense_atomically()
+                category = None
+                if expense_data.category_id:
+                    category = Category.objects.filter(pk=expense_data.category_id).first()
+                    if category is None:
+                        raise Category.DoesNotExist
+                with transaction.atomic():
+                    ensure_month_open(expense_date_logged)
+                    expense_obj = Expense.objects.create(
+                        amount=to_cents(expense_data.amount), category=category,
+                        description=expense_data.description, date_logged=expense_date_logged,
+                        idempotency_key=expense_data.idempotency_key or None,
+                    )
+                    ExpenseRollupService.apply_expense_delta(
+                        expense_obj.date_logged, expense_obj.amount, 1, expense_obj.category_id)
+                    return expense_obj, ExpenseRollupService.check_budget(category, expense_obj.date_logged)
+            try:
+                new_expense_obj, budget_warning = await _create_expense_atomically()
+            except Category.DoesNotExist:
+                return None, "Category not found."
+            except MonthClosedError as e:
+                return None, ErrorMessages.MONTH_CLOSED.format(month=str(e))
+            except IntegrityError:
+                # Unique fingerprint / idempotency key hit: the row is already logged.
+                return None, ErrorMessages.DUPLICATE_ENTRY
             bank_transaction_data = BankTransactionCreateRequest(
-                transaction_type="DEBIT", amount=new_expense_obj.amount,
+                transaction_type="DEBIT", amount=from_cents(new_expense_obj.amount),
                 description=f"Monthly Expense: {new_expense_obj.description}",
-                date_logged=new_expense_obj.date_logged
+                date_logged=new_expense_obj.date_logged,
+                idempotency_key=f"expense-{new_expense_obj.pk}",
             )
             await BankLogService.record_transaction(transaction_data=bank_transaction_data)
-            return new_expense_obj, None
+            expense_descriptions.record(new_expense_obj.description, new_expense_obj.date_logged)
+            return new_expense_obj, budget_warning
         except Exception as e:
             if new_expense_obj and new_expense_obj.pk:
-                await sync_to_async(new_expense_obj.delete)()
+                await MonthlyIncomeService._remove_expense(new_expense_obj)
                 return None, f"Bank transaction failed: {str(e)}. Expense creation was rolled back."
             return None, f"Failed to add expense or log bank transaction: {str(e)}"
 
+    @staticmethod
+    @sync_to_async
+    def _remove_expense(expense_obj: Expense) -> None:
+        with transaction.atomic():
+            expense_obj.delete()
+            ExpenseRollupService.apply_expense_delta(
+                expense_obj.date_logged, -expense_obj.amount, -1, expense_obj.category_id)
+
+    @staticmethod
+    @sync_to_async
+    def get_expense_by_idempotency_key(idempotency_key: str) -> Optional[Expense]:
+        return Expense.objects.filter(idempotency_key=idempotency_key).first()
+
     @staticmethod
     async def update_expense(expense_id: int, expense_data: ExpenseUpdate) -> Tuple[Optional[Expense], Optional[str]]:
         try:
@@ -86,11 +167,34 @@ class MonthlyIncomeService:
             updated_fields = expense_data.model_dump(exclude_unset=True)
             if not updated_fields:
                 return expense_obj, "No update data provided."
+            if "amount" in updated_fields:
+                updated_fields["amount"] = to_cents(updated_fields["amount"])
+            if updated_fields.get("category_id") and not await sync_to_async(
+                    Category.objects.filter(pk=updated_fields["category_id"]).exists)():
+                return None, "Category not found."
             original_amount = expense_obj.amount
             original_date = expense_obj.date_logged
+            original_category_id = expense_obj.category_id
+            original_description = expense_obj.description
             for field, value in updated_fields.items():
                 setattr(expense_obj, field, value)
-            await sync_to_async(expense_obj.save)()
+
+            @sync_to_async
+            def _save_expense_atomically():
+                with transaction.atomic():
+                    # Only open months are in Expense, but the new date may move the row into a closed one.
+                    ensure_month_open(expense_obj.date_logged)
+                    expense_obj.save()
+                    if (expense_obj.amount, expense_obj.date_logged, expense_obj.category_id) != \
+                            (original_amount, original_date, original_category_id):
+                        ExpenseRollupService.apply_expense_delta(
+                            original_date, -original_amount, -1, original_category_id)
+                        ExpenseRollupService.apply_expense_delta(
+                            expense_obj.date_logged, expense_obj.amount, 1, expense_obj.category_id)
+            await _save_expense_atomically()
+            if expense_obj.description != original_description:
+                expense_descriptions.forget(original_description)
+                expense_descriptions.record(expense_obj.description, expense_obj.date_logged)
             warning_message = ""
             if "amount" in updated_fields and updated_fields["amount"] != original_amount:
                 warning_message += " Expense amount changed; please review bank log."
@@ -99,6 +203,11 @@ class MonthlyIncomeService:
             return expense_obj, warning_message if warning_message else "Expense updated successfully."
         except Expense.DoesNotExist:
             return None, "Expense not found."
+        except MonthClosedError as e:
+            return None, ErrorMessages.MONTH_CLOSED.format(month=str(e))
+        except IntegrityError:
+            # The edit made the row identical (same fingerprint) to one already logged.
+            return None, ErrorMessages.DUPLICATE_ENTRY
         except Exception as e:
             return None, f"Error updating expense: {str(e)}"
 
@@ -107,10 +216,14 @@ class MonthlyIncomeService:
         try:
             expense_obj = await sync_to_async(Expense.objects.get)(pk=expense_id)
             comp_amount, comp_desc = expense_obj.amount, expense_obj.description
-            await sync_to_async(expense_obj.delete)()
+            # Credit the reversal to the account the expense was debited from.
+            original_posting = await BankLogService.get_transaction_by_idempotency_key(f"expense-{expense_obj.pk}")
+            await MonthlyIncomeService._remove_expense(expense_obj)
+            expense_descriptions.forget(comp_desc)
             bank_tx_data = BankTransactionCreateRequest(
-                transaction_type="CREDIT", amount=comp_amount,
-                description=f"Reversal for deleted expense: {comp_desc}", date_logged=timezone.now()
+                transaction_type="CREDIT", amount=from_cents(comp_amount),
+                description=f"Reversal for deleted expense: {comp_desc}", date_logged=timezone.now(),
+                account_id=original_posting.account_id if original_posting else None,
             )
             try:
                 await BankLogService.record_transaction(transaction_data=bank_tx_data)
@@ -122,6 +235,46 @@ class MonthlyIncomeService:
         except Exception as e:
             return False, f"Error deleting expense: {str(e)}"
 
+    @staticmethod
+    def delete_expenses_sync(expense_ids: Iterable[int]) -> int:
+        """
+        Batch delete_expense: removes the rows, takes them out of the rollups with one increment
+        per touched rollup row and credits one aggregated reversal per account the expenses were
+        debited from, all in one transaction. Returns the number of expenses deleted.
+        """
+        expenses = list(Expense.objects.filter(pk__in=list(expense_ids)))
+        if not expenses:
+            return 0
+        debited_accounts = dict(BankTransaction.objects.filter(
+            idempotency_key__in=[f"expense-{expense.pk}" for expense in expenses]
+        ).values_list('idempotency_key', 'account_id'))
+        credits: dict[Optional[int], List[Expense]] = defaultdict(list)
+        for expense in expenses:
+            credits[debited_accounts.get(f"expense-{expense.pk}")].append(expense)
+        with transaction.atomic():
+            Expense.objects.filter(pk__in=[expense.pk for expense in expenses]).delete()
+            ExpenseRollupService.apply_expense_batch(expenses, sign=-1)
+            postings = [
+                BankLogService.record_transaction_sync(BankTransactionCreateRequest(
+                    transaction_type="CREDIT", amount=from_cents(sum(expense.amount for expense in deleted)),
+                    description=f"Reversal for {len(deleted)} deleted expenses", date_logged=timezone.now(),
+                    account_id=account_id,
+                ))
+                for account_id, deleted in credits.items()
+            ]
+        for expense in expenses:
+            expense_descriptions.forget(expense.description)
+        for posting in postings:
+            transaction_descriptions.record(posting.description, posting.date_logged)
+        return len(expenses)
+
+    @staticmethod
+    async def suggest_descriptions(prefix: str) -> List[str]:
+        """ Autocomplete for the add-expense row; only the first call of a process reads the DB """
+        if not expense_descriptions.built:
+            await sync_to_async(expense_descriptions.ensure_built)()
+        return expense_descriptions.suggest(prefix)
+
     @staticmethod
     @sync_to_async
     def get_expenses_context_data(params: ExpenseFilterInputSchema) -> MonthlyLogContextData:
@@ -139,7 +292,7 @@ class MonthlyIncomeService:
             target_period_date.year, target_period_date.month, 1)
 
         current_salary_schema: Optional[MonthlySalarySchema] = None
-        salary_amount_for_month = Decimal('0.00')
+        salary_amount_for_month = 0  # cents
         try:
             salary_obj = MonthlySalary.objects.get(
                 month_year=target_month_for_salary)
@@ -149,47 +302,26 @@ class MonthlyIncomeService:
         except MonthlySalary.DoesNotExist:
             pass
 
-        # Base queryset
-        expense_queryset = Expense.objects.all()
+        # A closed month is served from its snapshot and the archive table
+        closed_month = ClosedMonth.objects.filter(month_year=target_month_for_salary).first()
+        source = ArchivedExpense if closed_month else Expense
 
-        # Apply date filtering for the list of expenses
+        # Listing: filtered by day or month as half-open datetime ranges so the date_logged index applies
         if params.filter_date:
-            expense_queryset = expense_queryset.filter(
-                date_logged__date=params.filter_date)
-        elif params.filter_month_year:
-            year, month = map(int, params.filter_month_year.split('-'))
-            expense_queryset = expense_queryset.filter(
-                date_logged__year=year, date_logged__month=month)
-        else:  # Default to current month if no specific filter
-            expense_queryset = expense_queryset.filter(
-                date_logged__year=today.year, date_logged__month=today.month)
-
-        # Apply sorting
-        if params.sort_by:
-            expense_queryset = expense_queryset.order_by(params.sort_by)
+            period_start, period_end = day_bounds(params.filter_date)
         else:
-            expense_queryset = expense_queryset.order_by('-date_logged')
-
-        # Pagination
-        total_items = expense_queryset.count()
-        total_pages = math.ceil(
-            total_items / params.page_size) if params.page_size > 0 else 0
-        if total_pages == 0 and total_items > 0:
-            total_pages = 1  # Ensure at least one page if items exist
-
-        current_page = params.page
-        if current_page > total_pages and total_pages > 0:
-            current_page = total_pages  # Cap current page
-        if current_page < 1:
-            current_page = 1
-
-        start_item_index = (current_page - 1) * params.page_size
-        end_item_index = start_item_index + params.page_size
-        paginated_expenses_qs = expense_queryset[start_item_index:end_item_index]
+            period_start, period_end = day_bounds(target_month_for_salary, add_month(target_month_for_salary))
+        listing = ListService.get_list_sync(ListServiceConfig(
+            app='month_log', model=source.__name__,
+            filter={'date_logged__gte': period_start, 'date_logged__lt': period_end},
+            query=params.search or '', sort_by=params.sort_by or '', sorting='-date_logged',
+            page=params.page, page_limit=params.page_size,
+            requested_columns=EXPENSE_LIST_COLUMNS, hidden_columns=[],
+        ))
 
         # Calculate summary for the *entire* filtered period (month or day) for display
         # This queryset is for the summary figures like "total spent"
-        summary_period_queryset = Expense.objects.all()
+        summary_period_queryset = source.objects.all()
         if params.filter_date:  # Summary for specific day
             summary_period_queryset = summary_period_queryset.filter(
                 date_logged__date=params.filter_date)
@@ -201,10 +333,9 @@ class MonthlyIncomeService:
 
         total_spent_for_period_dict = summary_period_queryset.aggregate(
             total_spent=Sum('amount'))
-        total_spent_for_period = total_spent_for_period_dict['total_spent'] or Decimal(
-            '0.00')
+        total_spent_for_period = total_spent_for_period_dict['total_spent'] or 0
 
-        saved_amount_for_period = Decimal('0.00')
+        saved_amount_for_period = 0
         # "Saved amount" makes most sense when viewing a full month against a monthly salary
         if not params.filter_date:
             saved_amount_for_period = salary_amount_for_month - total_spent_for_period
@@ -216,75 +347,187 @@ class MonthlyIncomeService:
         # Assuming expenses are filtered by a single month or day.
 
         # Fetch all expenses for the month of the target_period_date for balance calculation
-        all_expenses_for_balance_month_qs = Expense.objects.filter(
+        all_expenses_for_balance_month_qs = source.objects.filter(
             date_logged__year=target_month_for_salary.year,  # Use salary month as reference
             date_logged__month=target_month_for_salary.month
         ).order_by('date_logged', 'created_at')
 
-        running_balance_map: dict[int, Decimal] = {}
-        current_running_spent_for_balance_calc = Decimal('0.00')
-        for exp_for_bal in all_expenses_for_balance_month_qs:
-            current_running_spent_for_balance_calc += exp_for_bal.amount
-            running_balance_map[exp_for_bal.id] = salary_amount_for_month - \
+        running_balance_map: dict[int, int] = {}
+        current_running_spent_for_balance_calc = 0
+        for exp_id, exp_amount in all_expenses_for_balance_month_qs.values_list('id', 'amount'):
+            current_running_spent_for_balance_calc += exp_amount
+            running_balance_map[exp_id] = salary_amount_for_month - \
                 current_running_spent_for_balance_calc
 
-        for expense_obj in paginated_expenses_qs:
-            schema_obj = ExpenseSchema.model_validate(expense_obj)
-            # Get balance from the map; this assumes expense_obj is within the target_month_for_salary
-            if expense_obj.date_logged.year == target_month_for_salary.year and \
-               expense_obj.date_logged.month == target_month_for_salary.month:
-                schema_obj.balance_after_this_expense_in_month = running_balance_map.get(
-                    expense_obj.id)
-            else:  # Should not happen if filters are by month/day
-                schema_obj.balance_after_this_expense_in_month = None
-            processed_expenses_schemas.append(schema_obj)
-
-        pagination_details = PaginationDetails(
-            current_page=current_page,
-            page_size=params.page_size,
-            total_items=total_items,
-            total_pages=total_pages,
-            has_next_page=current_page < total_pages,
-            has_previous_page=current_page > 1,
-            next_page_number=current_page + 1 if current_page < total_pages else None,
-            previous_page_number=current_page - 1 if current_page > 1 else None,
-            start_item_index=start_item_index if total_items > 0 else None,
-            # -1 because end_item_index is exclusive for slicing
-            end_item_index=end_item_index - 1 if total_items > 0 else None,
-            display_start_item=start_item_index + 1 if total_items > 0 else 0,
-            display_end_item=min(
-                end_item_index, total_items) if total_items > 0 else 0,
-            page_range=[5, 10, 15, 20, 25]
-        )
+        with timed('pydantic'):
+            for row in listing.data:
+                schema_obj = ExpenseSchema.model_validate(row)
+                # Every listed row falls inside target_month_for_salary, so the map covers it.
+                running_balance = running_balance_map.get(row['id'])
+                schema_obj.balance_after_this_expense_in_month = from_cents(
+                    running_balance) if running_balance is not None else None
+                processed_expenses_schemas.append(schema_obj)
+
+        date_filters = MonthlyIncomeService._get_last_n_unique_expense_dates_sync(10)
+        with timed('pydantic'):
+            return MonthlyLogContextData(
+                current_salary=current_salary_schema,
+                total_spent_for_period=total_spent_for_period,
+                saved_amount_for_period=saved_amount_for_period,
+                expenses=processed_expenses_schemas,
+                date_filters=date_filters,
+                pagination=listing.pagination,
+                closed_month=ClosedMonthSchema.model_validate(closed_month) if closed_month else None,
+                current_filters_applied=params
+            )
+
+    @staticmethod
+    @sync_to_async
+    def get_chart_data(params: ChartDataFilterInputSchema) -> ChartDataSchema:
+        """
+        Builds the chart series for [start_date, end_date] from the rollup tables only:
+        three indexed range scans, no aggregation over Expense/BankTransaction.
+        """
+        start_month = params.start_date.replace(day=1)
+        daily_totals = dict(DailyExpenseRollup.objects.filter(
+            day__range=(params.start_date, params.end_date)
+        ).values_list('day', 'total_spent'))
+        monthly_salaries = dict(MonthlyRollup.objects.filter(
+            month_year__range=(start_month, params.end_date)
+        ).values_list('month_year', 'salary_amount'))
+        # All accounts: one row per month summed over the per-account rollups.
+        monthly_flow = [
+            {'month_year': month_year.strftime('%Y-%m'), 'total_debit': total_debit, 'total_credit': total_credit}
+            for month_year, total_debit, total_credit in MonthlyTransactionRollup.objects.filter(
+                month_year__range=(start_month, params.end_date)
+            ).values('month_year').annotate(
+                debit=Sum('total_debit'), credit=Sum('total_credit')
+            ).order_by('month_year').values_list('month_year', 'debit', 'credit')
+        ]
+
+        # Cumulative spend restarts each month, when the next salary lands.
+        # If the range starts mid-month, seed the running total with that month's earlier days.
+        cumulative = 0
+        if params.start_date.day != 1:
+            cumulative = DailyExpenseRollup.objects.filter(
+                day__gte=start_month, day__lt=params.start_date
+            ).aggregate(total=Sum('total_spent'))['total'] or 0
+
+        # Plain dicts, validated in one pass by ChartDataSchema below.
+        daily_spend: List[dict] = []
+        cumulative_spend: List[dict] = []
+        current_day = params.start_date
+        while current_day <= params.end_date:
+            if current_day.day == 1:
+                cumulative = 0
+            spent = daily_totals.get(current_day, 0)
+            cumulative += spent
+            daily_spend.append({'date': current_day, 'total_spent': spent})
+            cumulative_spend.append({
+                'date': current_day, 'cumulative_spent': cumulative,
+                'salary_amount': monthly_salaries.get(current_day.replace(day=1), 0),
+            })
+            current_day += timedelta(days=1)
+
+        return ChartDataSchema.model_validate({
+            'start_date': params.start_date,
+            'end_date': params.end_date,
+            'daily_spend': daily_spend,
+            'cumulative_spend': cumulative_spend,
+            'monthly_flow': monthly_flow,
+        })
 
-        return MonthlyLogContextData(
-            current_salary=current_salary_schema,
-            total_spent_for_period=total_spent_for_period,
-            saved_amount_for_period=saved_amount_for_period,
-            expenses=processed_expenses_schemas,
-            date_filters=MonthlyIncomeService._get_last_n_unique_expense_dates_sync(
-                10),
-            pagination=pagination_details,
-            current_filters_applied=params
+    @staticmethod
+    @sync_to_async
+    def get_month_comparison(params: MonthRangeInputSchema) -> MonthComparisonSchema:
+        """
+        Salary, spend, savings and count per month for the whole span in one indexed
+        range query on MonthlyRollup; months without a rollup row show as zeros.
+        """
+        start_year, start_month = map(int, params.start_month.split('-'))
+        end_year, end_month = map(int, params.end_month.split('-'))
+        range_start, range_end = date(start_year, start_month, 1), date(end_year, end_month, 1)
+        rollups = {
+            month_year: (salary_amount, total_spent, expense_count)
+            for month_year, salary_amount, total_spent, expense_count in MonthlyRollup.objects.filter(
+                month_year__range=(range_start, range_end)
+            ).values_list('month_year', 'salary_amount', 'total_spent', 'expense_count')
+        }
+
+        months = []
+        total_salary = total_spent = total_count = 0
+        month_index = start_year * 12 + start_month - 1
+        while month_index <= end_year * 12 + end_month - 1:
+            month_year = date(month_index // 12, month_index % 12 + 1, 1)
+            salary_amount, spent, expense_count = rollups.get(month_year, (0, 0, 0))
+            months.append({
+                'month_year': month_year.strftime('%Y-%m'), 'salary_amount': salary_amount,
+                'total_spent': spent, 'saved_amount': salary_amount - spent, 'expense_count': expense_count,
+            })
+            total_salary += salary_amount
+            total_spent += spent
+            total_count += expense_count
+            month_index += 1
+
+        return MonthComparisonSchema(
+            months=months,
+            total_salary=total_salary,
+            total_spent=total_spent,
+            total_saved=total_salary - total_spent,
+            total_expense_count=total_count,
         )
 
+    @staticmethod
     @sync_to_async
+    def get_category_breakdown(month_year: str) -> CategoryBreakdownSchema:
+        """
+        Spend, count and budget headroom per category for one month (YYYY-MM), read from
+        CategoryMonthlyRollup and MonthlyRollup; the Expense table is not touched.
+        """
+        year, month = map(int, month_year.split('-'))
+        month_start = date(year, month, 1)
+        month_rollup = MonthlyRollup.objects.filter(month_year=month_start).values_list('total_spent', flat=True).first()
+        spent_by_category = {
+            category_id: (total_spent, expense_count)
+            for category_id, total_spent, expense_count in CategoryMonthlyRollup.objects.filter(
+                month_year=month_start).values_list('category_id', 'total_spent', 'expense_count')
+        }
+
+        rows = []
+        categorised_spent = 0
+        for category_id, name, monthly_budget in Category.objects.values_list('id', 'name', 'monthly_budget'):
+            spent, expense_count = spent_by_category.get(category_id, (0, 0))
+            categorised_spent += spent
+            rows.append({
+                'category_id': category_id, 'name': name, 'total_spent': spent, 'expense_count': expense_count,
+                'monthly_budget': monthly_budget,
+                'budget_remaining': monthly_budget - spent if monthly_budget is not None else None,
+            })
+        rows.sort(key=lambda row: row['total_spent'], reverse=True)
+        total_spent = month_rollup or 0
+        return CategoryBreakdownSchema.model_validate({
+            'month_year': month_start.strftime('%Y-%m'),
+            'categories': rows,
+            'uncategorised_spent': total_spent - categorised_spent,
+            'total_spent': total_spent,
+        })
+
     @staticmethod
-    def get_sum_for_balance(exp_obj, user_obj):
-        return Expense.objects.filter(
-            user=user_obj, date_logged__year=exp_obj.date_logged.year,
+    @sync_to_async
+    def get_sum_for_balance(exp_obj) -> Decimal:
+        return from_cents(Expense.objects.filter(
+            date_logged__year=exp_obj.date_logged.year,
             date_logged__month=exp_obj.date_logged.month, date_logged__lte=exp_obj.date_logged
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        ).aggregate(total=Sum('amount'))['total'] or 0)
 
-    @sync_to_async
     @staticmethod
-    def get_sum(exp_obj, user_obj):
-        return Expense.objects.filter(
-            user=user_obj,
+    @sync_to_async
+    def get_sum(exp_obj) -> Decimal:
+        return from_cents(Expense.objects.filter(
             date_logged__year=exp_obj.date_logged.year,
             date_logged__month=exp_obj.date_logged.month,
             date_logged__lte=exp_obj.date_logged
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        ).aggregate(total=Sum('amount'))['total'] or 0)
 
     @staticmethod
     def _get_last_n_unique_expense_dates_sync(count: int) -> List[DateFilterSchema]:
@@ -303,3 +546,280 @@ class MonthlyIncomeService:
                     display_text=log_date.strftime('%b %d, %Y')
                 ))
         return date_filters
+
+
+@instrument_service
+class MonthCloseService:
+    """
+    Closes past months: the month's summary is frozen into a ClosedMonth snapshot and its
+    Expense and BankTransaction rows move into the archive tables, so the hot tables only
+    hold open months. Rollup rows stay put, so charts and comparisons read them as before;
+    listings of a closed month are routed to the archive by the context services.
+    Runs for the current tenant (see utilities.tenancy).
+    """
+
+    @staticmethod
+    def close_month_sync(month_year: date) -> ClosedMonthSchema:
+        """ Closes the month containing `month_year`; closing an already closed month returns its snapshot """
+        month_start = month_of(month_year)
+        if month_start >= timezone.localdate().replace(day=1):
+            raise ValueError("Only past months can be closed.")
+        period_start, period_end = day_bounds(month_start, add_month(month_start))
+        with transaction.atomic():
+            salary_amount, total_spent, expense_count = MonthlyRollup.objects.filter(
+                month_year=month_start
+            ).values_list('salary_amount', 'total_spent', 'expense_count').first() or (0, 0, 0)
+            flow = MonthlyTransactionRollup.objects.filter(month_year=month_start).aggregate(
+                debit=Sum('total_debit'), credit=Sum('total_credit'))
+            closed_month, created = ClosedMonth.objects.get_or_create(month_year=month_start, defaults={
+                'salary_amount': salary_amount, 'total_spent': total_spent, 'expense_count': expense_count,
+                'total_debit': flow['debit'] or 0, 'total_credit': flow['credit'] or 0,
+            })
+            if created:
+                move_rows(Expense.objects.filter(date_logged__gte=period_start, date_logged__lt=period_end),
+                          ArchivedExpense)
+                BankLogService.archive_month_sync(period_start, period_end)
+        if created:
+            expense_descriptions.reset()
+        return ClosedMonthSchema.model_validate(closed_month)
+
+    @staticmethod
+    def reopen_month_sync(month_year: date) -> bool:
+        """ Moves a closed month's rows back into the hot tables and drops its snapshot; False if it wasn't closed """
+        month_start = month_of(month_year)
+        period_start, period_end = day_bounds(month_start, add_month(month_start))
+        with transaction.atomic():
+            deleted, _ = ClosedMonth.objects.filter(month_year=month_start).delete()
+            if not deleted:
+                return False
+            move_rows(ArchivedExpense.objects.filter(date_logged__gte=period_start, date_logged__lt=period_end),
+                      Expense)
+            BankLogService.restore_month_sync(period_start, period_end)
+        expense_descriptions.reset()
+        return True
+
+    @staticmethod
+    @sync_to_async
+    def close_month(params: MonthCloseInputSchema) -> ClosedMonthSchema:
+        year, month = map(int, params.month_year.split('-'))
+        return MonthCloseService.close_month_sync(date(year, month, 1))
+
+
+@instrument_service
+class RecurringExpenseService:
+    """
+    Recurring expense templates and their materialization into Expense rows, one month at a time.
+    """
+
+    @staticmethod
+    @sync_to_async
+    def save_template(template_data: RecurringExpenseCreate) -> RecurringExpenseSchema:
+        """ Raises Category.DoesNotExist / BankAccount.DoesNotExist for ids the user doesn't own """
+        if template_data.category_id and not Category.objects.filter(pk=template_data.category_id).exists():
+            raise Category.DoesNotExist
+        if template_data.account_id and not BankAccount.objects.filter(pk=template_data.account_id).exists():
+            raise BankAccount.DoesNotExist
+        template = RecurringExpense.objects.create(
+            description=template_data.description.strip(), amount=to_cents(template_data.amount),
+            day_of_month=template_data.day_of_month, category_id=template_data.category_id,
+            account_id=template_data.account_id, start_month=template_data.start_month,
+            end_month=template_data.end_month,
+        )
+        return RecurringExpenseSchema.model_validate(template)
+
+    @staticmethod
+    def materialize_month_sync(month_year: date) -> Tuple[int, int]:
+        """
+        Creates the current tenant's Expense rows for every template due in the month of
+        `month_year`: one existence query, one bulk_create, one increment per touched rollup
+        row and one aggregated bank debit per account, all in a single transaction.
+        Occurrences that already exist (same template key, or the same expense logged by
+        hand) are skipped, so a re-run only adds what is missing. Returns (created, skipped).
+        Raises MonthClosedError for a closed month.
+        """
+        month_start = month_of(month_year)
+        last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+        templates = RecurringExpense.objects.filter(is_active=True, start_month__lte=month_start).filter(
+            Q(end_month__isnull=True) | Q(end_month__gte=month_start))
+        user_id = get_current_user_id()
+        candidates: List[Tuple[RecurringExpense, Expense]] = []
+        for template in templates:
+            occurrence_day = month_start.replace(day=min(template.day_of_month, last_day))
+            expense = Expense(
+                user_id=user_id, amount=template.amount, category_id=template.category_id,
+                description=template.description,
+                date_logged=timezone.make_aware(datetime.combine(occurrence_day, time.min)),
+                idempotency_key=template.occurrence_key(month_start),
+            )
+            # bulk_create skips save(), which is what normally fills this in.
+            expense.fingerprint = expense.compute_fingerprint()
+            candidates.append((template, expense))
+        if not candidates:
+            return 0, 0
+
+        with transaction.atomic():
+            ensure_month_open(month_start)
+            keys = [expense.idempotency_key for _, expense in candidates]
+            fingerprints = [expense.fingerprint for _, expense in candidates]
+            seen = set()
+            for idempotency_key, fingerprint in Expense.objects.filter(
+                    Q(idempotency_key__in=keys) | Q(fingerprint__in=fingerprints)
+            ).values_list('idempotency_key', 'fingerprint'):
+                seen.update((idempotency_key, fingerprint))
+            new_rows: List[Tuple[RecurringExpense, Expense]] = []
+            for template, expense in candidates:
+                if expense.idempotency_key in seen or expense.fingerprint in seen:
+                    continue
+                seen.update((expense.idempotency_key, expense.fingerprint))
+                new_rows.append((template, expense))
+            if not new_rows:
+                return 0, len(candidates)
+
+            new_expenses = Expense.objects.bulk_create([expense for _, expense in new_rows], batch_size=1000)
+            ExpenseRollupService.apply_expense_batch(new_expenses)
+            debits: dict[Optional[int], List[Expense]] = defaultdict(list)
+            for template, expense in new_rows:
+                debits[template.account_id].append(expense)
+            postings = [
+                BankLogService.record_transaction_sync(BankTransactionCreateRequest(
+                    transaction_type="DEBIT", amount=from_cents(sum(expense.amount for expense in expenses)),
+                    description=f"Recurring expenses {month_start:%b %Y} ({len(expenses)} items)",
+                    date_logged=timezone.make_aware(datetime.combine(month_start, time.min)),
+                    account_id=account_id,
+                    idempotency_key=f"recurring-{month_start:%Y%m}-{expenses[0].pk}",
+                ))
+                for account_id, expenses in debits.items()
+            ]
+
+        for expense in new_expenses:
+            expense_descriptions.record(expense.description, expense.date_logged)
+        for posting in postings:
+            transaction_descriptions.record(posting.description, posting.date_logged)
+        return len(new_expenses), len(candidates) - len(new_expenses)
+
+
+class ExpenseRollupService:
+    """
+    Keeps DailyExpenseRollup, MonthlyRollup and CategoryMonthlyRollup in step with Expense writes.
+    The apply_* helpers must run inside the caller's atomic block so the rollup commits with the row.
+    """
+
+    @staticmethod
+    def apply_expense_delta(date_logged: datetime, amount_cents: int, count_delta: int,
+                            category_id: Optional[int] = None) -> None:
+        day = timezone.localdate(date_logged)
+        month_year = day.replace(day=1)
+        ExpenseRollupService._increment(DailyExpenseRollup, {'day': day}, amount_cents, count_delta)
+        ExpenseRollupService._increment(MonthlyRollup, {'month_year': month_year}, amount_cents, count_delta)
+        if category_id:
+            ExpenseRollupService._increment(
+                CategoryMonthlyRollup, {'category_id': category_id, 'month_year': month_year},
+                amount_cents, count_delta)
+
+    @staticmethod
+    def apply_expense_batch(expenses: Iterable[Expense], sign: int = 1) -> None:
+        """
+        apply_expense_delta for many rows, with a single increment per touched rollup row;
+        sign=-1 takes deleted rows back out.
+        """
+        daily: dict[date, List[int]] = defaultdict(lambda: [0, 0])
+        monthly: dict[date, List[int]] = defaultdict(lambda: [0, 0])
+        by_category: dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0])
+        for expense in expenses:
+            day = timezone.localdate(expense.date_logged)
+            buckets = [daily[day], monthly[day.replace(day=1)]]
+            if expense.category_id:
+                buckets.append(by_category[(expense.category_id, day.replace(day=1))])
+            for bucket in buckets:
+                bucket[0] += sign * expense.amount
+                bucket[1] += sign
+        for day, (amount_cents, count) in daily.items():
+            ExpenseRollupService._increment(DailyExpenseRollup, {'day': day}, amount_cents, count)
+        for month_year, (amount_cents, count) in monthly.items():
+            ExpenseRollupService._increment(MonthlyRollup, {'month_year': month_year}, amount_cents, count)
+        for (category_id, month_year), (amount_cents, count) in by_category.items():
+            ExpenseRollupService._increment(
+                CategoryMonthlyRollup, {'category_id': category_id, 'month_year': month_year}, amount_cents, count)
+
+    @staticmethod
+    def check_budget(category: Optional[Category], date_logged: datetime) -> Optional[str]:
+        """
+        Warning text when `category` is over its monthly budget for the month of `date_logged`.
+        Reads the single rollup row, so call it after apply_expense_delta in the same transaction.
+        """
+        if category is None or category.monthly_budget is None:
+            return None
+        month_year = timezone.localdate(date_logged).replace(day=1)
+        spent = CategoryMonthlyRollup.objects.filter(
+            category_id=category.pk, month_year=month_year
+        ).values_list('total_spent', flat=True).first() or 0
+        if spent <= category.monthly_budget:
+            return None
+        return (f"{category.name} is over its {month_year.strftime('%b %Y')} budget: "
+                f"{from_cents(spent)} spent of {from_cents(category.monthly_budget)}.")
+
+    @staticmethod
+    def set_salary(month_year: date, salary_cents: int) -> None:
+        MonthlyRollup.objects.update_or_create(month_year=month_year, defaults={'salary_amount': salary_cents})
+
+    @staticmethod
+    def _increment(model, lookup: dict, amount_cents: int, count_delta: int) -> None:
+        deltas = {
+            'total_spent': F('total_spent') + amount_cents,
+            'expense_count': F('expense_count') + count_delta,
+            'updated_at': timezone.now(),
+        }
+        if model.objects.filter(**lookup).update(**deltas):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, total_spent=amount_cents, expense_count=count_delta)
+        except IntegrityError:
+            # Another writer created the bucket first; fall back to the increment.
+            model.objects.filter(**lookup).update(**deltas)
+
+    @staticmethod
+    def rebuild_rollups_sync() -> Tuple[int, int, int]:
+        """
+        Recomputes the expense rollup tables from Expense (and the archive of closed months)
+        and MonthlySalary with grouped queries. Use after bulk loads that bypass the service
+        layer. Covers every user when run without a tenant (management command), otherwise
+        only the current one.
+        """
+        sources = (Expense, ArchivedExpense)
+        daily_rows = [
+            DailyExpenseRollup(user_id=item['user_id'], day=item['day'],
+                               total_spent=item['total'], expense_count=item['count'])
+            for source in sources
+            for item in source.objects.annotate(day=TruncDate('date_logged'))
+            .values('user_id', 'day').annotate(total=Sum('amount'), count=Count('id')).order_by()
+        ]
+        monthly: dict[tuple[Optional[int], date], MonthlyRollup] = {}
+        for source in sources:
+            for item in source.objects.annotate(month=TruncMonth('date_logged'))\
+                    .values('user_id', 'month').annotate(total=Sum('amount'), count=Count('id')).order_by():
+                month_start = timezone.localdate(item['month']).replace(day=1)
+                monthly[(item['user_id'], month_start)] = MonthlyRollup(
+                    user_id=item['user_id'], month_year=month_start,
+                    total_spent=item['total'], expense_count=item['count'])
+        for user_id, month_year, salary_amount in MonthlySalary.objects.values_list(
+                'user_id', 'month_year', 'salary_amount'):
+            rollup = monthly.setdefault((user_id, month_year), MonthlyRollup(user_id=user_id, month_year=month_year))
+            rollup.salary_amount = salary_amount
+        category_rows = [
+            CategoryMonthlyRollup(
+                user_id=item['user_id'], category_id=item['category_id'],
+                month_year=timezone.localdate(item['month']).replace(day=1),
+                total_spent=item['total'], expense_count=item['count'])
+            for source in sources
+            for item in source.objects.filter(category__isnull=False).annotate(month=TruncMonth('date_logged'))
+            .values('user_id', 'category_id', 'month').annotate(total=Sum('amount'), count=Count('id')).order_by()
+        ]
+        with transaction.atomic():
+            DailyExpenseRollup.objects.all().delete()
+            MonthlyRollup.objects.all().delete()
+            CategoryMonthlyRollup.objects.all().delete()
+            DailyExpenseRollup.objects.bulk_create(daily_rows, batch_size=1000)
+            MonthlyRollup.objects.bulk_create(monthly.values(), batch_size=1000)
+            CategoryMonthlyRollup.objects.bulk_create(category_rows, batch_size=1000)
+        return len(daily_rows), len(monthly), len(category_rows)
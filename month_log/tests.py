@@ -1,3 +1,1306 @@
-from django.test import TestCase
+import calendar
+import pstats
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bank_balance_log.models import ArchivedBankTransaction, BankAccount, BankTransaction
+from bank_balance_log.services import transaction_descriptions
+from month_log.models import (
+    ArchivedExpense, Category, CategoryMonthlyRollup, ClosedMonth, DailyExpenseRollup, Expense, MonthlyRollup,
+    MonthlySalary, RecurringExpense,
+)
+from month_log.forecast import ForecastService
+from month_log.services import (
+    ExpenseRollupService, MonthCloseService, MonthlyIncomeService, RecurringExpenseService, expense_descriptions,
+)
+from schema.list_schema import ListServiceConfig
+from schema.month_log.month_log_schema import (
+    ExpenseCreate, ExpenseSchema, ForecastInputSchema, MonthlySalaryCreate, MonthRangeInputSchema,
+)
+from utilities.autocomplete import DescriptionIndex
+from utilities.archive import MonthClosedError, delete_rows
+from utilities.dates import add_month, day_bounds
+from utilities.exception_handler import get_class_function_name, handle_exception, handles_exceptions
+from utilities.fingerprint import compute_fingerprint
+from utilities.list_service import ListService
+from utilities.money import MoneyField, from_cents, to_cents
+from utilities.profiling import list_profiles
+from utilities.search import build_fts_query
+from utilities.seeding import SeedError, seed_ledger
+from utilities.snapshot import SnapshotError, export_snapshot, import_snapshot
+from utilities.tenancy import tenant
+from utilities.testing import QueryBudgetTestCase
+from utilities.variables import ErrorMessages, ExceptionMessages
+
+HTMX = {'HX-Request': 'true'}
+
+
+class MonthLogQueryBudgetTests(QueryBudgetTestCase):
+    """
+    Exact query counts of every month_log view and HTMX action. Each request also pays
+    for its session and user lookups (2 queries). A change to a budget should come with
+    the reason in the commit; more queries on a hot path usually mean a lookup in a loop.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('budget', password='x')
+        now = timezone.now()
+        cls.month = now.strftime('%Y-%m')
+        with tenant(cls.user.pk):
+            cls.account = BankAccount.objects.create(name='Main account', is_default=True, current_balance=500_000)
+            cls.category = Category.objects.create(name='Food', monthly_budget=100_000)
+            MonthlySalary.objects.create(month_year=now.date().replace(day=1), salary_amount=300_000)
+            cls.expenses = [
+                Expense.objects.create(amount=1_000 * (i + 1), description=f'lunch {i}', category=cls.category,
+                                       date_logged=now - timedelta(minutes=i))
+                for i in range(5)
+            ]
+            ExpenseRollupService.rebuild_rollups_sync()
+
+    def setUp(self):
+        # The autocomplete indexes are per process; start each test from an unbuilt one.
+        expense_descriptions.reset()
+        transaction_descriptions.reset()
+        self.client.force_login(self.user)
+
+    def test_set_salary(self):
+        # update_or_create of the salary and of its rollup row (10 with savepoints), then the table's queries.
+        self.assertRequestBudget(19, 'post', reverse('monthly_log:set_salary') + f'?filter_month_year={self.month}',
+                                 {'month_year': f'{self.month}-01', 'salary_amount': '3500.00'}, headers=HTMX)
+
+    # --- List page ---
+
+    def test_main_page(self):
+        # The month's rows are filtered three times: the page, the total and the running balances.
+        self.assertRequestBudget(9, 'get', reverse('monthly_log:monthly_log_main'), {'filter_month_year': self.month})
+
+    def test_sort_htmx(self):
+        self.assertRequestBudget(9, 'get', reverse('monthly_log:monthly_log_main'),
+                                 {'filter_month_year': self.month, 'sort_by': '-amount', 'target_body': '1'}, headers=HTMX)
+
+    def test_page_htmx(self):
+        self.assertRequestBudget(9, 'get', reverse('monthly_log:monthly_log_main'),
+                                 {'filter_month_year': self.month, 'page': '2', 'page_size': '2', 'target_body': '1'},
+                                 headers=HTMX)
+
+    def test_search_htmx(self):
+        self.assertRequestBudget(9, 'get', reverse('monthly_log:monthly_log_main'),
+                                 {'filter_month_year': self.month, 'search': 'lun', 'target_body': '1'}, headers=HTMX)
+
+    # --- Row actions ---
+
+    def test_add_form(self):
+        self.assertRequestBudget(3, 'get', reverse('monthly_log:add_expense_form_row'), headers=HTMX)
+
+    def test_description_suggestions(self):
+        self.assertRequestBudget(3, 'get', reverse('monthly_log:expense_description_suggestions'),
+                                 {'description': 'lu'}, headers=HTMX)
+
+    def test_save_new(self):
+        self.assertRequestBudget(24, 'post', reverse('monthly_log:save_new_expense'), {
+            'amount': '12.50', 'description': 'coffee', 'date_logged': timezone.now().isoformat(),
+            'category_id': self.category.pk, 'idempotency_key': 'budget-save-new',
+        }, headers=HTMX)
+
+    def test_cancel_add(self):
+        self.assertRequestBudget(2, 'get', reverse('monthly_log:cancel_add_expense_row'), headers=HTMX)
+
+    def test_edit_form(self):
+        self.assertRequestBudget(3, 'get', reverse('monthly_log:edit_expense_form_row', args=[self.expenses[0].pk]),
+                                 headers=HTMX)
+
+    def test_save_edited(self):
+        # Loads the row twice (view and service), then the month's salary and sum for the summary.
+        self.assertRequestBudget(16, 'post', reverse('monthly_log:save_edited_expense', args=[self.expenses[0].pk]),
+                                 {'amount': '15.00', 'description': 'lunch out'}, headers=HTMX)
+
+    def test_save_edited_unchanged(self):
+        self.assertRequestBudget(5, 'post', reverse('monthly_log:save_edited_expense', args=[self.expenses[0].pk]),
+                                 {}, headers=HTMX)
+
+    def test_cancel_edit(self):
+        self.assertRequestBudget(5, 'get', reverse('monthly_log:cancel_edit_expense_row', args=[self.expenses[0].pk]),
+                                 headers=HTMX)
+
+    def test_delete(self):
+        self.assertRequestBudget(21, 'post', reverse('monthly_log:delete_expense', args=[self.expenses[1].pk]), headers=HTMX)
+
+    # --- Panels ---
+
+    def test_chart_data(self):
+        self.assertRequestBudget(5, 'get', reverse('monthly_log:chart_data'), {'start': self.month, 'end': self.month})
+
+    def test_forecast(self):
+        # The window's rows, the user's categories, the salaries and the balance.
+        self.assertRequestBudget(6, 'get', reverse('monthly_log:forecast_panel'), {'month_year': self.month})
+
+    def test_month_comparison(self):
+        self.assertRequestBudget(3, 'get', reverse('monthly_log:month_comparison'))
+
+    def test_category_breakdown(self):
+        self.assertRequestBudget(5, 'get', reverse('monthly_log:category_breakdown'), {'month_year': self.month})
+
+    def test_save_category(self):
+        self.assertRequestBudget(8, 'post', reverse('monthly_log:save_category'),
+                                 {'name': 'Travel', 'monthly_budget': '250.00'})
+
+    def test_save_recurring(self):
+        self.assertRequestBudget(3, 'post', reverse('monthly_log:save_recurring_expense'),
+                                 {'description': 'rent', 'amount': '900.00', 'day_of_month': '1'})
+
+    def test_close_month(self):
+        with tenant(self.user.pk):
+            Expense.objects.create(amount=2_000, description='old lunch',
+                                   date_logged=timezone.now() - timedelta(days=62))
+        last_month = (timezone.now() - timedelta(days=62)).strftime('%Y-%m')
+        self.assertRequestBudget(13, 'post', reverse('monthly_log:close_month'), {'month_year': last_month})
+
+
+class ExpenseDedupTests(TestCase):
+    """ Fingerprint dedup and idempotency-key replay of the expense write paths """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('dedup', password='x')
+        with tenant(cls.user.pk):
+            BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.logged_at = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+
+    def _save(self, **data):
+        return self.client.post(reverse('monthly_log:save_new_expense'), {
+            'amount': '12.50', 'description': 'coffee', 'date_logged': self.logged_at.isoformat(), **data,
+        }, headers=HTMX)
+
+    def test_resubmitted_expense_is_rejected(self):
+        self.assertEqual(self._save().status_code, 200)
+        response = self._save(description='  Coffee ')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['errors'], ErrorMessages.DUPLICATE_ENTRY)
+        with tenant(self.user.pk):
+            self.assertEqual(Expense.objects.count(), 1)
+            self.assertEqual(BankTransaction.objects.count(), 1)
+
+    def test_retry_with_the_same_key_replays_the_row(self):
+        first = self._save(idempotency_key='retry-1')
+        second = self._save(idempotency_key='retry-1')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        with tenant(self.user.pk):
+            self.assertEqual(Expense.objects.get().idempotency_key, 'retry-1')
+            self.assertEqual(BankAccount.objects.get().current_balance, 100_000 - 1_250)
+
+    def test_edit_into_a_duplicate_is_a_conflict(self):
+        self._save()
+        self._save(description='tea')
+        with tenant(self.user.pk):
+            tea = Expense.objects.get(description='tea')
+        response = self.client.post(reverse('monthly_log:save_edited_expense', args=[tea.pk]),
+                                    {'description': 'coffee'}, headers=HTMX)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['errors'], ErrorMessages.DUPLICATE_ENTRY)
+        tea.refresh_from_db()
+        self.assertEqual(tea.description, 'tea')
+
+
+
+class RunningBalanceTests(TestCase):
+    """ The balance after a row, salary less the month's spend up to it, shown in major units """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('balance', password='x')
+        cls.logged_at = (timezone.now().replace(day=1) - timedelta(days=1)).replace(
+            day=15, hour=12, minute=0, second=0, microsecond=0)
+        with tenant(cls.user.pk):
+            BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+            MonthlySalary.objects.create(month_year=cls.logged_at.date().replace(day=1), salary_amount=300_000)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_rows_carry_the_running_balance(self):
+        balances = []
+        for minutes, amount in ((0, '12.50'), (1, '0.05')):
+            response = self.client.post(reverse('monthly_log:save_new_expense'), {
+                'amount': amount, 'description': f'item {minutes}',
+                'date_logged': (self.logged_at + timedelta(minutes=minutes)).isoformat(),
+            }, headers=HTMX)
+            balances.append(response.context['row'].balance_after_this_expense_in_month)
+        self.assertEqual(balances, [Decimal('2987.50'), Decimal('2987.45')])
+        with tenant(self.user.pk):
+            first = Expense.objects.get(description='item 0')
+        response = self.client.get(reverse('monthly_log:cancel_edit_expense_row', args=[first.pk]), headers=HTMX)
+        self.assertEqual(response.context['row'].balance_after_this_expense_in_month, Decimal('2987.50'))
+
+class TenantIsolationTests(TestCase):
+    """ One user's expenses and idempotency keys are invisible to another """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice', password='x')
+        cls.bob = get_user_model().objects.create_user('bob', password='x')
+        for user in (cls.alice, cls.bob):
+            with tenant(user.pk):
+                BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+
+    def _save(self, user, **data):
+        self.client.force_login(user)
+        return self.client.post(reverse('monthly_log:save_new_expense'), {
+            'amount': '12.50', 'description': 'coffee', 'date_logged': timezone.now().isoformat(), **data,
+        }, headers=HTMX)
+
+    def test_same_idempotency_key_is_per_user(self):
+        self.assertEqual(self._save(self.alice, idempotency_key='shared-key').status_code, 200)
+        self.assertEqual(self._save(self.bob, idempotency_key='shared-key').status_code, 200)
+        for user in (self.alice, self.bob):
+            with tenant(user.pk):
+                expense = Expense.objects.get()
+                self.assertEqual((expense.user_id, expense.idempotency_key), (user.pk, 'shared-key'))
+                self.assertEqual(BankAccount.objects.get().current_balance, 100_000 - 1_250)
+
+    def test_identical_expenses_of_two_users_are_not_duplicates(self):
+        logged_at = timezone.now().isoformat()
+        self.assertEqual(self._save(self.alice, date_logged=logged_at).status_code, 200)
+        self.assertEqual(self._save(self.bob, date_logged=logged_at).status_code, 200)
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_other_users_expense_cannot_be_edited_or_listed(self):
+        self._save(self.alice, description='alice only')
+        with tenant(self.alice.pk):
+            expense = Expense.objects.get()
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('monthly_log:save_edited_expense', args=[expense.pk]),
+                                    {'description': 'mine now'}, headers=HTMX)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(self.client.get(reverse('monthly_log:monthly_log_main')), 'alice only')
+        expense.refresh_from_db()
+        self.assertEqual(expense.description, 'alice only')
+
+
+class FingerprintMigrationTests(TransactionTestCase):
+    """ Migrating a database from before fingerprints that already holds identical expenses """
+    before = [('month_log', '0001_initial')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        OldExpense = apps.get_model('month_log', 'Expense')
+        logged_at = timezone.now().replace(microsecond=0)
+        for description in ('rent', 'rent', 'coffee'):
+            OldExpense.objects.create(amount=Decimal('12.50'), description=description, date_logged=logged_at)
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.latest)
+
+    def test_duplicates_keep_a_null_fingerprint(self):
+        MigrationExecutor(connection).migrate(self.latest)
+        expenses = list(Expense.objects.order_by('pk'))
+        self.assertEqual([expense.user_id for expense in expenses], [self.owner.pk] * 3)
+        self.assertEqual([expense.amount for expense in expenses], [1_250] * 3)
+        self.assertIsNone(expenses[1].fingerprint)
+        for expense in (expenses[0], expenses[2]):
+            self.assertEqual(expense.fingerprint, compute_fingerprint(
+                f"EXPENSE:{self.owner.pk}", expense.description, from_cents(expense.amount), expense.date_logged))
+
+
+
+class MoneyMigrationTests(TransactionTestCase):
+    """ Unapplying the move to integer cents on a database that holds expenses """
+    cents = [('month_log', '0003_money_minor_units')]
+    decimals = [('month_log', '0002_expense_fingerprint')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.cents)
+        apps = executor.loader.project_state(self.cents).apps
+        apps.get_model('month_log', 'MonthlySalary').objects.create(
+            salary_amount=300_000, month_year=timezone.localdate().replace(day=1))
+        apps.get_model('month_log', 'Expense').objects.create(
+            amount=1_250, description='rent', date_logged=timezone.now())
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.latest)
+
+    def test_reverse_restores_decimal_amounts(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.decimals)
+        apps = executor.loader.project_state(self.decimals).apps
+        self.assertEqual(apps.get_model('month_log', 'MonthlySalary').objects.get().salary_amount, Decimal('3000.00'))
+        self.assertEqual(apps.get_model('month_log', 'Expense').objects.get().amount, Decimal('12.50'))
+
+class MoneyTests(SimpleTestCase):
+    """ Conversion between major units and the integer cents MoneyField stores """
+
+    def test_to_cents_rounds_half_up(self):
+        cases = [('12.50', 1250), ('0.005', 1), ('0.004', 0), ('2.675', 268), (Decimal('19.999'), 2000),
+                 (7, 700), (0.1, 10), ('-1.005', -101)]
+        for amount, cents in cases:
+            self.assertEqual(to_cents(amount), cents, amount)
+
+    def test_from_cents_is_exact_with_two_places(self):
+        self.assertEqual(str(from_cents(1250)), '12.50')
+        self.assertEqual(str(from_cents(-5)), '-0.05')
+        self.assertEqual(str(from_cents(None)), '0.00')
+        self.assertEqual(sum(map(from_cents, [10] * 3)), Decimal('0.30'))
+
+    def test_schemas_read_cents_and_keep_decimals(self):
+        now = timezone.now()
+        row = {'id': 1, 'amount': 1999, 'description': 'x', 'date_logged': now, 'created_at': now, 'updated_at': now}
+        self.assertEqual(ExpenseSchema.model_validate(row).amount, Decimal('19.99'))
+        self.assertEqual(ExpenseSchema.model_validate({**row, 'amount': Decimal('19.99')}).amount, Decimal('19.99'))
+
+    def test_form_field_edits_major_units(self):
+        field = MoneyField().formfield()
+        self.assertEqual(field.prepare_value(1250), Decimal('12.50'))
+        self.assertEqual(field.clean('12.50'), 1250)
+        self.assertFalse(field.has_changed(1250, '12.5'))
+        self.assertTrue(field.has_changed(1250, '12.51'))
+        with self.assertRaises(ValidationError):
+            field.clean('12.505')
+
+
+class MoneyStorageTests(TestCase):
+
+    def test_saved_amount_is_rounded_to_the_cent(self):
+        user = get_user_model().objects.create_user('money', password='x')
+        self.client.force_login(user)
+        response = self.client.post(reverse('monthly_log:save_new_expense'),
+                                    {'amount': '10.005', 'description': 'bus'}, headers=HTMX)
+        self.assertEqual(response.status_code, 200)
+        with tenant(user.pk):
+            self.assertEqual(Expense.objects.get().amount, 1001)
+            self.assertEqual(MonthlyRollup.objects.get().total_spent, 1001)
+            self.assertEqual(BankAccount.objects.get().current_balance, -1001)
+
+
+def _rollup_state():
+    """ Every expense rollup row of the current tenant, comparable across a rebuild """
+    return (
+        sorted(DailyExpenseRollup.objects.filter(expense_count__gt=0).values_list('day', 'total_spent', 'expense_count')),
+        sorted(MonthlyRollup.objects.values_list('month_year', 'total_spent', 'expense_count', 'salary_amount')),
+        sorted(CategoryMonthlyRollup.objects.filter(expense_count__gt=0)
+               .values_list('category_id', 'month_year', 'total_spent', 'expense_count')),
+    )
+
+
+class ExpenseRollupTests(TestCase):
+    """ The rollup tables follow every expense write, and a rebuild from Expense agrees with them """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('rollup', password='x')
+        with tenant(cls.user.pk):
+            cls.food = Category.objects.create(name='Food')
+            cls.travel = Category.objects.create(name='Travel')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.now = timezone.now().replace(microsecond=0)
+
+    def _add(self, amount, description, category=None, date_logged=None):
+        data = {'amount': amount, 'description': description, 'date_logged': (date_logged or self.now).isoformat()}
+        if category:
+            data['category_id'] = category.pk
+        self.assertEqual(self.client.post(reverse('monthly_log:save_new_expense'), data, headers=HTMX).status_code, 200)
+        with tenant(self.user.pk):
+            return Expense.objects.get(description=description)
+
+    def test_add_edit_delete_increment_the_rollups(self):
+        lunch = self._add('10.00', 'lunch', self.food)
+        self._add('2.50', 'bus')
+        taxi = self._add('30.00', 'taxi', self.travel)
+        with tenant(self.user.pk):
+            month = MonthlyRollup.objects.get()
+            self.assertEqual((month.total_spent, month.expense_count), (4_250, 3))
+            self.assertEqual(CategoryMonthlyRollup.objects.get(category=self.food).total_spent, 1_000)
+
+        self.client.post(reverse('monthly_log:save_edited_expense', args=[lunch.pk]),
+                         {'amount': '12.00', 'category_id': self.travel.pk}, headers=HTMX)
+        self.client.post(reverse('monthly_log:delete_expense', args=[taxi.pk]), headers=HTMX)
+        with tenant(self.user.pk):
+            month = MonthlyRollup.objects.get()
+            self.assertEqual((month.total_spent, month.expense_count), (1_450, 2))
+            self.assertEqual(CategoryMonthlyRollup.objects.get(category=self.food).expense_count, 0)
+            self.assertEqual(CategoryMonthlyRollup.objects.get(category=self.travel).total_spent, 1_200)
+            self.assertEqual(DailyExpenseRollup.objects.get(day=timezone.localdate(self.now)).total_spent, 1_450)
+
+    def test_rebuild_matches_the_incremental_rows(self):
+        self._add('10.00', 'lunch', self.food)
+        self._add('4.00', 'tea', self.food, self.now - timedelta(days=40))
+        bus = self._add('2.50', 'bus', None, self.now - timedelta(days=3))
+        self.client.post(reverse('monthly_log:save_edited_expense', args=[bus.pk]),
+                         {'date_logged': (self.now - timedelta(days=1)).isoformat()}, headers=HTMX)
+        with tenant(self.user.pk):
+            async_to_sync(MonthlyIncomeService.set_or_update_monthly_salary)(
+                MonthlySalaryCreate(month_year=self.now.date(), salary_amount=Decimal('500.00')))
+            incremental = _rollup_state()
+            ExpenseRollupService.rebuild_rollups_sync()
+            self.assertEqual(_rollup_state(), incremental)
+            self.assertEqual(MonthlyRollup.objects.get(month_year=self.now.date().replace(day=1)).salary_amount, 50_000)
+
+    def test_chart_data_reads_the_rollups(self):
+        self._add('10.00', 'lunch', self.food)
+        month = self.now.strftime('%Y-%m')
+        response = self.client.get(reverse('monthly_log:chart_data'), {'start': month, 'end': month})
+        today = next(day for day in response.json()['daily_spend'] if day['date'] == timezone.localdate(self.now).isoformat())
+        self.assertEqual(Decimal(today['total_spent']), Decimal('10.00'))
+
+
+def _at_noon(day):
+    return timezone.make_aware(datetime.combine(day, time(12)))
+
+
+class ForecastTests(TestCase):
+    """ Month-end projection of ForecastService over the expense history """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('forecast', password='x')
+        cls.this_month = timezone.localdate().replace(day=1)
+        cls.last_month = (cls.this_month - timedelta(days=1)).replace(day=1)
+        cls.next_month = add_month(cls.this_month)
+
+    def _forecast(self, month_year, **params):
+        with tenant(self.user.pk):
+            return async_to_sync(ForecastService.get_forecast)(
+                ForecastInputSchema(month_year=month_year.strftime('%Y-%m'), **params))
+
+    def test_future_month_projects_the_average_of_active_months(self):
+        with tenant(self.user.pk):
+            BankAccount.objects.create(name='Main account', is_default=True, current_balance=500_000)
+            MonthlySalary.objects.create(month_year=self.next_month, salary_amount=100_000)
+            # Months without expenses (before the log started) stay out of the average.
+            Expense.objects.create(amount=10_000, description='rent', date_logged=_at_noon(self.this_month.replace(day=15)))
+            Expense.objects.create(amount=30_000, description='rent', date_logged=_at_noon(self.last_month.replace(day=15)))
+        forecast = self._forecast(self.next_month)
+        self.assertEqual((forecast.days_elapsed, forecast.history_months_used), (0, 2))
+        self.assertEqual(forecast.spent_to_date, Decimal('0'))
+        self.assertEqual(forecast.projected_spend, Decimal('200.00'))
+        self.assertEqual(forecast.projected_savings, Decimal('800.00'))
+        self.assertEqual(forecast.projected_bank_balance, Decimal('4800.00'))
+
+    def test_without_history_the_month_is_projected_at_its_pace(self):
+        today = timezone.localdate()
+        with tenant(self.user.pk):
+            Expense.objects.create(amount=1_000, description='lunch', date_logged=_at_noon(today))
+            MonthlySalary.objects.create(month_year=self.this_month, salary_amount=50_000)
+        forecast = self._forecast(self.this_month)
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        self.assertEqual((forecast.days_elapsed, forecast.days_in_month), (today.day, days_in_month))
+        self.assertEqual(forecast.spent_to_date, Decimal('10.00'))
+        expected = round(1_000 + 1_000 / today.day * (days_in_month - today.day))
+        self.assertEqual(forecast.projected_spend, from_cents(expected))
+        self.assertEqual(forecast.projected_savings, from_cents(50_000 - expected))
+        self.assertIsNone(forecast.projected_bank_balance)
+
+    def test_closed_month_history_comes_from_the_archive(self):
+        with tenant(self.user.pk):
+            Expense.objects.create(amount=30_000, description='rent', date_logged=_at_noon(self.last_month.replace(day=15)))
+            ExpenseRollupService.rebuild_rollups_sync()
+            MonthCloseService.close_month_sync(self.last_month)
+            self.assertFalse(Expense.objects.exists())
+        self.assertEqual(self._forecast(self.next_month).projected_spend, Decimal('300.00'))
+
+    def test_what_if_cuts_apply_per_category(self):
+        with tenant(self.user.pk):
+            food = Category.objects.create(name='Food')
+            Category.objects.create(name='Travel')  # no spend: a valid, empty group
+            for amount, description, category in [(20_000, 'groceries', food), (10_000, 'dinner', food),
+                                                  (5_000, 'gift', None)]:
+                Expense.objects.create(amount=amount, description=description, category=category,
+                                       date_logged=_at_noon(self.last_month.replace(day=15)))
+            MonthlySalary.objects.create(month_year=self.next_month, salary_amount=100_000)
+        forecast = self._forecast(self.next_month, horizon_months=2, scenarios=[
+            {'group': 'food', 'cut_percent': 50}, {'group': 'Travel', 'cut_percent': 10}])
+        self.assertEqual([(s.label, s.monthly_spend, s.savings_delta) for s in forecast.scenarios], [
+            ('Baseline', Decimal('350.00'), Decimal('0.00')),
+            ('Cut Food by 50%', Decimal('200.00'), Decimal('300.00')),
+            ('Cut Travel by 10%', Decimal('350.00'), Decimal('0.00')),
+        ])
+        # Without scenarios the biggest spending categories are suggested; uncategorised spend is not.
+        self.assertEqual([s.label for s in self._forecast(self.next_month).scenarios],
+                         ['Baseline', 'Cut Food by 20%'])
+
+    def test_unknown_what_if_category_is_rejected(self):
+        with tenant(self.user.pk):
+            Category.objects.create(name='Food')
+        with self.assertRaises(ValueError):
+            self._forecast(self.next_month, scenarios=[{'group': 'groceries', 'cut_percent': 20}])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('monthly_log:forecast_panel'), {'whatif': 'groceries:20'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('groceries', response.json()['errors'])
+
+    def test_panel_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('monthly_log:forecast_panel'), {'month_year': 'May 2024'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('monthly_log:forecast_panel'), {'month_year': self.this_month.strftime('%Y-%m')})
+        self.assertContains(response, 'Projected spend')
+
+
+class MonthComparisonTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('compare', password='x')
+        with tenant(cls.user.pk):
+            MonthlyRollup.objects.create(month_year=date(2025, 11, 1), total_spent=40_000, expense_count=4,
+                                         salary_amount=100_000)
+            MonthlyRollup.objects.create(month_year=date(2026, 1, 1), total_spent=70_000, expense_count=7)
+
+    def test_span_fills_missing_months_with_zeros(self):
+        with tenant(self.user.pk):
+            comparison = async_to_sync(MonthlyIncomeService.get_month_comparison)(
+                MonthRangeInputSchema(start_month='2025-11', end_month='2026-01'))
+        self.assertEqual([(row.month_year, row.saved_amount, row.expense_count) for row in comparison.months], [
+            ('2025-11', Decimal('600.00'), 4), ('2025-12', Decimal('0.00'), 0), ('2026-01', Decimal('-700.00'), 7),
+        ])
+        self.assertEqual((comparison.total_salary, comparison.total_spent, comparison.total_saved),
+                         (Decimal('1000.00'), Decimal('1100.00'), Decimal('-100.00')))
+        self.assertEqual(comparison.total_expense_count, 11)
+
+    def test_range_is_validated(self):
+        self.client.force_login(self.user)
+        url = reverse('monthly_log:month_comparison')
+        for start, end in (('2026-02', '2026-01'), ('2016-01', '2026-01'), ('2026', '2026-01')):
+            self.assertEqual(self.client.get(url, {'start': start, 'end': end}).status_code, 400, (start, end))
+        self.assertContains(self.client.get(url, {'start': '2025-11', 'end': '2026-01'}), '2025-12')
+
+
+class ListServiceTests(TestCase):
+    """ Validation of request-driven filter, sort and column keys in ListService.get_list_sync """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('lists', password='x')
+        now = timezone.now()
+        with tenant(cls.user.pk):
+            # Two rows share an amount, so the pk tie-breaker decides their order.
+            cls.expenses = [
+                Expense.objects.create(amount=amount, description=f'item {i}', date_logged=now - timedelta(hours=i))
+                for i, amount in enumerate([300, 100, 300, 200])
+            ]
+
+    def _list(self, **config):
+        with tenant(self.user.pk):
+            return ListService.get_list_sync(ListServiceConfig(**{
+                'app': 'month_log', 'model': 'Expense', 'hidden_columns': [], 'requested_columns': ['id', 'amount'],
+                'sorting': '-date_logged', **config}))
+
+    def _ids(self, **config):
+        return [row['id'] for row in self._list(**config).data]
+
+    def test_sort_tokens(self):
+        first, second, third, fourth = (expense.pk for expense in self.expenses)
+        self.assertEqual(self._ids(sort_by='amount'), [second, fourth, first, third])
+        self.assertEqual(self._ids(sort_by='-amount'), [third, first, fourth, second])
+        # Third header click ("amount-") and unknown columns fall back to the default order.
+        self.assertEqual(self._ids(sort_by='amount-'), [first, second, third, fourth])
+        listing = self._list(sort_by='password')
+        self.assertEqual(listing.sorting, '-date_logged')
+
+    def test_filters_are_checked_against_columns_and_lookups(self):
+        self.assertEqual(self._list(filter={'amount__gte': 200}).pagination.total_items, 3)
+        for key in ('amount__regex', 'secret', 'user__password', 'user__username__startswith'):
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                self._list(filter={key: 'x'})
+
+    def test_unknown_requested_columns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self._list(requested_columns=['id', 'user__password'])
+
+    def test_pages_are_clamped(self):
+        listing = self._list(page=9, page_limit=3)
+        self.assertEqual((listing.pagination.current_page, len(listing.data)), (2, 1))
+        self.assertEqual(self._list(page=0, page_limit=3).pagination.current_page, 1)
+
+    def test_rows_of_other_users_are_not_listed(self):
+        other = get_user_model().objects.create_user('other', password='x')
+        with tenant(other.pk):
+            self.assertEqual(ListService.get_list_sync(ListServiceConfig(
+                app='month_log', model='Expense', hidden_columns=[])).pagination.total_items, 0)
+
+
+class DescriptionSearchTests(TestCase):
+    """ The FTS5 index follows Expense rows through its triggers """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('search', password='x')
+
+    def _search(self, text, **filters):
+        with tenant(self.user.pk):
+            listing = ListService.get_list_sync(ListServiceConfig(
+                app='month_log', model='Expense', hidden_columns=[], requested_columns=['id'],
+                query=text, filter=filters))
+        return [row['id'] for row in listing.data]
+
+    def test_inserts_updates_and_deletes_reach_the_index(self):
+        with tenant(self.user.pk):
+            expense = Expense.objects.create(amount=500, description='Grocery run')
+        self.assertEqual(self._search('groc'), [expense.pk])
+        expense.description = 'Pharmacy'
+        expense.save()
+        self.assertEqual(self._search('groc'), [])
+        self.assertEqual(self._search('pharm'), [expense.pk])
+        # Queryset updates bypass save() but not the trigger.
+        Expense.objects.filter(pk=expense.pk).update(description='Bakery')
+        self.assertEqual(self._search('bake'), [expense.pk])
+        expense.delete()
+        self.assertEqual(self._search('bake'), [])
+
+    def test_month_scoped_search_uses_the_period_tokens(self):
+        this_month = timezone.localdate().replace(day=1)
+        last_month = (this_month - timedelta(days=1)).replace(day=1)
+        with tenant(self.user.pk):
+            Expense.objects.create(amount=500, description='coffee beans', date_logged=_at_noon(last_month.replace(day=10)))
+            recent = Expense.objects.create(amount=500, description='coffee', date_logged=_at_noon(this_month))
+        period_start, period_end = day_bounds(this_month, add_month(this_month))
+        self.assertEqual(self._search('coffee', date_logged__gte=period_start, date_logged__lt=period_end), [recent.pk])
+        self.assertEqual(len(self._search('coffee')), 2)
+        # A moved row carries its new period tokens.
+        Expense.objects.filter(pk=recent.pk).update(date_logged=_at_noon(last_month.replace(day=11)))
+        self.assertEqual(self._search('coffee', date_logged__gte=period_start, date_logged__lt=period_end), [])
+
+    def test_search_text_is_never_fts_syntax(self):
+        with tenant(self.user.pk):
+            expense = Expense.objects.create(amount=500, description='tea NEAR biscuits')
+        for text in ('"tea', 'tea NEAR', 'tea*', 'tea:biscuits', '(tea'):
+            self.assertEqual(self._search(text), [expense.pk], text)
+        self.assertEqual(build_fts_query('  *:() '), '')
+        self.assertEqual(build_fts_query('tea" OR x'), 'description : ("tea"* "OR"* "x"*)')
+
+
+class DescriptionAutocompleteTests(TestCase):
+    """ DescriptionIndex keeps one partition per tenant and ranks by use count and recency """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = get_user_model().objects.create_user('alice', password='x')
+        cls.bob = get_user_model().objects.create_user('bob', password='x')
+        now = timezone.now()
+        with tenant(cls.alice.pk):
+            for i, (days_ago, description) in enumerate([(1, 'Rent'), (1, 'rent '), (2, 'Restaurant'), (90, 'Rice'),
+                                                         (90, 'Rice'), (90, 'Rice')]):
+                Expense.objects.create(amount=100, description=description,
+                                       date_logged=now - timedelta(days=days_ago, minutes=i))
+        with tenant(cls.bob.pk):
+            Expense.objects.create(amount=100, description='Repairs', date_logged=now)
+
+    def setUp(self):
+        self.index = DescriptionIndex('month_log', 'Expense')
+
+    def _suggest(self, user, prefix):
+        with tenant(user.pk):
+            return self.index.suggest(prefix)
+
+    def test_partitions_are_per_tenant(self):
+        self.assertEqual(self._suggest(self.bob, 're'), ['Repairs'])
+        self.assertEqual(self._suggest(self.alice, 're'), ['Rent', 'Restaurant'])
+        with tenant(self.alice.pk):
+            self.index.record('Refund')
+        self.assertEqual(self._suggest(self.bob, 'ref'), [])
+        self.assertEqual(self._suggest(self.alice, 'ref'), ['Refund'])
+
+    def test_ranking_decays_with_age(self):
+        # Three uses three months ago weigh less than one use yesterday.
+        self.assertEqual(self._suggest(self.alice, 'r'), ['Rent', 'Restaurant', 'Rice'])
+
+    def test_forget_drops_unused_descriptions(self):
+        self._suggest(self.alice, 'r')
+        with tenant(self.alice.pk):
+            self.index.forget('restaurant')
+            self.index.forget('Rent')
+        self.assertEqual(self._suggest(self.alice, 're'), ['Rent'])
+
+    def test_view_serves_the_signed_in_users_partition(self):
+        expense_descriptions.reset()
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('monthly_log:expense_description_suggestions'), {'description': 'Re'},
+                                   headers=HTMX)
+        self.assertContains(response, 'Repairs')
+        self.assertNotContains(response, 'Rent')
+
+
+class CategoryBreakdownTests(TestCase):
+    """ Per-category spend, budget headroom and the over-budget warning """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('categories', password='x')
+        with tenant(cls.user.pk):
+            cls.food = Category.objects.create(name='Food', monthly_budget=5_000)
+            cls.travel = Category.objects.create(name='Travel')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.month = timezone.localdate().strftime('%Y-%m')
+
+    def _add(self, amount, description, category=None):
+        data = {'amount': amount, 'description': description}
+        if category:
+            data['category_id'] = category.pk
+        return self.client.post(reverse('monthly_log:save_new_expense'), data, headers=HTMX)
+
+    def test_breakdown_reads_the_category_rollups(self):
+        self._add('30.00', 'lunch', self.food)
+        self._add('60.00', 'train', self.travel)
+        self._add('7.50', 'gift')
+        with tenant(self.user.pk):
+            breakdown = async_to_sync(MonthlyIncomeService.get_category_breakdown)(self.month)
+        self.assertEqual([(row.name, row.total_spent, row.expense_count, row.budget_remaining)
+                          for row in breakdown.categories], [
+            ('Travel', Decimal('60.00'), 1, None),
+            ('Food', Decimal('30.00'), 1, Decimal('20.00')),
+        ])
+        self.assertEqual((breakdown.uncategorised_spent, breakdown.total_spent), (Decimal('7.50'), Decimal('97.50')))
+
+    def test_going_over_budget_saves_with_a_warning(self):
+        self.assertNotIn('HX-Trigger', self._add('40.00', 'lunch', self.food))
+        response = self._add('15.00', 'dinner', self.food)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Food is over its', response['HX-Trigger'])
+        with tenant(self.user.pk):
+            self.assertEqual(Expense.objects.count(), 2)
+
+    def test_unknown_category_is_refused(self):
+        other = get_user_model().objects.create_user('other', password='x')
+        with tenant(other.pk):
+            foreign = Category.objects.create(name='Food')
+        response = self._add('5.00', 'lunch', foreign)
+        self.assertEqual(response.status_code, 400)
+        with tenant(self.user.pk):
+            self.assertFalse(Expense.objects.exists())
+
+
+class MonthCloseTests(TestCase):
+    """ Closing a month moves its rows into the archive tables; reopening moves them back """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('closer', password='x')
+        cls.other = get_user_model().objects.create_user('bystander', password='x')
+        this_month = timezone.localdate().replace(day=1)
+        cls.last_month = (this_month - timedelta(days=1)).replace(day=1)
+        cls.logged_at = timezone.make_aware(datetime.combine(cls.last_month.replace(day=10), time(12)))
+        for user in (cls.user, cls.other):
+            with tenant(user.pk):
+                BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+                async_to_sync(MonthlyIncomeService.set_or_update_monthly_salary)(
+                    MonthlySalaryCreate(month_year=cls.last_month, salary_amount=Decimal('3000.00')))
+
+    def setUp(self):
+        for user, descriptions in ((self.user, ('rent', 'groceries')), (self.other, ('rent',))):
+            self.client.force_login(user)
+            for minute, description in enumerate(descriptions):
+                self.client.post(reverse('monthly_log:save_new_expense'), {
+                    'amount': '40.00', 'description': description,
+                    'date_logged': (self.logged_at + timedelta(minutes=minute)).isoformat(),
+                }, headers=HTMX)
+        self.client.force_login(self.user)
+
+    def _close(self):
+        return self.client.post(reverse('monthly_log:close_month'), {'month_year': self.last_month.strftime('%Y-%m')})
+
+    def test_close_snapshots_and_archives_the_month(self):
+        with tenant(self.user.pk):
+            before = sorted(Expense.objects.values_list('pk', 'fingerprint'))
+        response = self._close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expense_count'], 2)
+        with tenant(self.user.pk):
+            self.assertFalse(Expense.objects.exists())
+            self.assertFalse(BankTransaction.objects.exists())
+            self.assertEqual(sorted(ArchivedExpense.objects.values_list('pk', 'fingerprint')), before)
+            self.assertEqual(ArchivedBankTransaction.objects.count(), 2)
+            closed = ClosedMonth.objects.get()
+            self.assertEqual((closed.month_year, closed.total_spent, closed.salary_amount),
+                             (self.last_month, 8_000, 300_000))
+        with tenant(self.other.pk):
+            self.assertEqual(Expense.objects.count(), 1)
+            self.assertFalse(ArchivedExpense.objects.exists())
+
+    def test_closing_twice_returns_the_same_snapshot(self):
+        first, second = self._close().json(), self._close().json()
+        self.assertEqual(first, second)
+        with tenant(self.user.pk):
+            self.assertEqual(ArchivedExpense.objects.count(), 2)
+
+    def test_writes_into_a_closed_month_are_refused(self):
+        self._close()
+        response = self.client.post(reverse('monthly_log:save_new_expense'), {
+            'amount': '1.00', 'description': 'late receipt', 'date_logged': self.logged_at.isoformat(),
+        }, headers=HTMX)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], ErrorMessages.MONTH_CLOSED.format(
+            month=self.last_month.strftime('%b %Y')))
+
+    def test_current_month_cannot_be_closed(self):
+        response = self.client.post(reverse('monthly_log:close_month'), {'month_year': timezone.localdate().strftime('%Y-%m')})
+        self.assertEqual(response.status_code, 400)
+
+    def test_reopen_restores_the_rows(self):
+        with tenant(self.user.pk):
+            before = sorted(Expense.objects.values_list('pk', 'description', 'amount', 'fingerprint', 'created_at'))
+            self._close()
+            self.assertTrue(MonthCloseService.reopen_month_sync(self.last_month))
+            self.assertFalse(MonthCloseService.reopen_month_sync(self.last_month))
+            self.assertEqual(sorted(Expense.objects.values_list(
+                'pk', 'description', 'amount', 'fingerprint', 'created_at')), before)
+            self.assertEqual(BankTransaction.objects.count(), 2)
+            self.assertFalse(ArchivedExpense.objects.exists())
+            self.assertFalse(ClosedMonth.objects.exists())
+
+    def test_delete_rows_honours_the_tenant_filter(self):
+        with tenant(self.user.pk):
+            self.assertEqual(delete_rows(Expense.objects.filter(description='rent')), 1)
+        self.assertEqual(sorted(Expense.objects.values_list('user_id', 'description')),
+                         [(self.user.pk, 'groceries'), (self.other.pk, 'rent')])
+
+
+class RecurringExpenseTests(TestCase):
+    """ Materializing recurring templates into a month's expenses """
+    month = date(2025, 2, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('recurring', password='x')
+        with tenant(cls.user.pk):
+            cls.main = BankAccount.objects.create(name='Main account', is_default=True, current_balance=500_000)
+            cls.card = BankAccount.objects.create(name='Card', current_balance=100_000)
+            cls.housing = Category.objects.create(name='Housing')
+            cls.rent = RecurringExpense.objects.create(description='Rent', amount=120_000, day_of_month=31,
+                                                       category=cls.housing, start_month=date(2025, 1, 1))
+            RecurringExpense.objects.create(description='Gym', amount=3_000, day_of_month=5,
+                                            start_month=date(2025, 1, 1))
+            RecurringExpense.objects.create(description='Streaming', amount=1_500, day_of_month=12,
+                                            account=cls.card, start_month=date(2025, 1, 1))
+            RecurringExpense.objects.create(description='Old phone plan', amount=2_000, start_month=date(2024, 1, 1),
+                                            end_month=date(2025, 1, 1))
+            RecurringExpense.objects.create(description='Paused', amount=2_000, start_month=date(2025, 1, 1),
+                                            is_active=False)
+            RecurringExpense.objects.create(description='Insurance', amount=9_000, start_month=date(2025, 3, 1))
+
+    def _materialize(self):
+        with tenant(self.user.pk):
+            return RecurringExpenseService.materialize_month_sync(self.month)
+
+    def test_due_templates_become_expenses(self):
+        self.assertEqual(self._materialize(), (3, 0))
+        with tenant(self.user.pk):
+            expenses = {expense.description: expense for expense in Expense.objects.all()}
+            self.assertEqual(set(expenses), {'Rent', 'Gym', 'Streaming'})
+            rent = expenses['Rent']
+            # Day 31 is clamped to the last day of February.
+            self.assertEqual(timezone.localdate(rent.date_logged), date(2025, 2, 28))
+            self.assertEqual((rent.amount, rent.category_id), (120_000, self.housing.pk))
+            self.assertEqual(rent.idempotency_key, f"recurring-{self.rent.pk}-202502")
+            self.assertEqual(rent.fingerprint, rent.compute_fingerprint())
+            rollup = MonthlyRollup.objects.get(month_year=self.month)
+            self.assertEqual((rollup.total_spent, rollup.expense_count), (124_500, 3))
+            self.assertEqual(CategoryMonthlyRollup.objects.get(category=self.housing).total_spent, 120_000)
+
+    def test_one_debit_per_account(self):
+        self._materialize()
+        with tenant(self.user.pk):
+            debits = dict(BankTransaction.objects.values_list('account_id', 'amount'))
+            self.assertEqual(debits, {self.main.pk: 123_000, self.card.pk: 1_500})
+            self.assertEqual(BankAccount.objects.get(pk=self.main.pk).current_balance, 500_000 - 123_000)
+            self.assertEqual(BankAccount.objects.get(pk=self.card.pk).current_balance, 100_000 - 1_500)
+
+    def test_rerun_only_adds_what_is_missing(self):
+        self._materialize()
+        self.assertEqual(self._materialize(), (0, 3))
+        with tenant(self.user.pk):
+            Expense.objects.get(description='Gym').delete()
+        self.assertEqual(self._materialize(), (1, 2))
+        with tenant(self.user.pk):
+            self.assertEqual(Expense.objects.count(), 3)
+
+    def test_expense_logged_by_hand_is_not_repeated(self):
+        with tenant(self.user.pk):
+            Expense.objects.create(description='Gym', amount=3_000,
+                                   date_logged=timezone.make_aware(datetime.combine(date(2025, 2, 5), time.min)))
+        self.assertEqual(self._materialize(), (2, 1))
+
+    def test_closed_month_is_refused(self):
+        with tenant(self.user.pk):
+            MonthCloseService.close_month_sync(self.month)
+        with self.assertRaises(MonthClosedError):
+            self._materialize()
+
+    def test_command_materializes_every_user(self):
+        other = get_user_model().objects.create_user('other', password='x')
+        with tenant(other.pk):
+            BankAccount.objects.create(name='Main account', is_default=True, current_balance=0)
+            RecurringExpense.objects.create(description='Rent', amount=80_000, start_month=date(2025, 1, 1))
+        call_command('materialize_recurring', '--month', '2025-02', stdout=StringIO())
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Expense.objects.filter(user=other).count(), 1)
+
+
+class LedgerAdminTests(TestCase):
+    """ Admin pages and actions go through the same service paths as the app """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = get_user_model().objects.create_superuser('admin', password='x')
+        this_month = timezone.localdate().replace(day=1)
+        cls.last_month = (this_month - timedelta(days=1)).replace(day=1)
+        with tenant(cls.admin_user.pk):
+            cls.account = BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+            cls.salary = MonthlySalary.objects.create(month_year=cls.last_month, salary_amount=300_000)
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+        for day, description in ((3, 'rent'), (4, 'groceries')):
+            self.client.post(reverse('monthly_log:save_new_expense'), {
+                'amount': '40.00', 'description': description,
+                'date_logged': timezone.make_aware(datetime.combine(self.last_month.replace(day=day), time(12))).isoformat(),
+            }, headers=HTMX)
+
+    def test_salary_is_edited_in_major_units(self):
+        url = reverse('admin:month_log_monthlysalary_change', args=[self.salary.pk])
+        self.assertContains(self.client.get(url), 'value="3000.00"')
+        response = self.client.post(url, {'month_year': self.last_month.isoformat(), 'salary_amount': '2500.50'})
+        self.assertEqual(response.status_code, 302)
+        self.salary.refresh_from_db()
+        self.assertEqual(self.salary.salary_amount, 250_050)
+        with tenant(self.admin_user.pk):
+            self.assertEqual(MonthlyRollup.objects.get(month_year=self.last_month).salary_amount, 250_050)
+
+    def test_duplicate_salary_month_is_a_form_error(self):
+        url = reverse('admin:month_log_monthlysalary_add')
+        response = self.client.post(url, {'month_year': self.last_month.isoformat(), 'salary_amount': '100.00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['adminform'].form.non_field_errors())
+        with tenant(self.admin_user.pk):
+            self.assertEqual(MonthlySalary.objects.get().salary_amount, 300_000)
+
+    def test_salary_month_of_another_user_can_be_added(self):
+        other = get_user_model().objects.create_user('other', password='x')
+        this_month = timezone.localdate().replace(day=1)
+        with tenant(other.pk):
+            MonthlySalary.objects.create(month_year=this_month, salary_amount=100_000)
+        response = self.client.post(reverse('admin:month_log_monthlysalary_add'),
+                                    {'month_year': this_month.isoformat(), 'salary_amount': '100.00'})
+        self.assertEqual(response.status_code, 302)
+        with tenant(self.admin_user.pk):
+            self.assertEqual(MonthlySalary.objects.get(month_year=this_month).salary_amount, 10_000)
+
+    def test_delete_action_credits_the_bank(self):
+        with tenant(self.admin_user.pk):
+            rent = Expense.objects.get(description='rent')
+        response = self.client.post(reverse('admin:month_log_expense_changelist'), {
+            'action': 'delete_with_reversal', '_selected_action': [rent.pk]})
+        self.assertEqual(response.status_code, 302)
+        with tenant(self.admin_user.pk):
+            self.assertEqual(list(Expense.objects.values_list('description', flat=True)), ['groceries'])
+            self.assertEqual(BankAccount.objects.get().current_balance, 100_000 - 4_000)
+            rollup = MonthlyRollup.objects.get(month_year=self.last_month)
+            self.assertEqual((rollup.total_spent, rollup.expense_count), (4_000, 1))
+
+    def test_changelist_search_uses_the_fts_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:month_log_expense_changelist'), {'q': 'rent'})
+        self.assertEqual([expense.description for expense in response.context['cl'].result_list], ['rent'])
+        self.assertTrue(any('MATCH' in query['sql'] for query in queries.captured_queries))
+
+    def test_stock_bulk_delete_is_not_offered(self):
+        response = self.client.get(reverse('admin:month_log_expense_changelist'))
+        actions = [name for name, _ in response.context['action_form'].fields['action'].choices]
+        self.assertIn('delete_with_reversal', actions)
+        self.assertNotIn('delete_selected', actions)
+
+    def test_close_action_archives_the_month(self):
+        with tenant(self.admin_user.pk):
+            pks = list(Expense.objects.values_list('pk', flat=True))
+        response = self.client.post(reverse('admin:month_log_expense_changelist'), {
+            'action': 'close_selected_months', '_selected_action': pks})
+        self.assertEqual(response.status_code, 302)
+        with tenant(self.admin_user.pk):
+            self.assertEqual(ClosedMonth.objects.get().month_year, self.last_month)
+            self.assertEqual(ArchivedExpense.objects.count(), 2)
+            self.assertEqual(ArchivedBankTransaction.objects.count(), 2)
+
+
+class SnapshotTests(TestCase):
+    """ export_snapshot / import_snapshot round trips, users matched by username """
+
+    @classmethod
+    def setUpTestData(cls):
+        this_month = timezone.localdate().replace(day=1)
+        cls.last_month = (this_month - timedelta(days=1)).replace(day=1)
+        cls.users = {}
+        for name in ('alice', 'bob'):
+            user = cls.users[name] = get_user_model().objects.create_user(name, password='x')
+            with tenant(user.pk):
+                BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+                for day in (3, 4):
+                    Expense.objects.create(amount=1_000 * day, description=f'{name} lunch {day}',
+                                           date_logged=timezone.make_aware(datetime.combine(cls.last_month.replace(day=day), time(12))))
+                Expense.objects.create(amount=700, description=f'{name} coffee')
+        with tenant(cls.users['alice'].pk):
+            MonthCloseService.close_month_sync(cls.last_month)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    @staticmethod
+    def _ledger():
+        """ (owner, description, amount, fingerprint) of every live and archived expense """
+        return sorted((get_user_model().objects.get(pk=user_id).username, description, amount, fingerprint)
+                      for source in (Expense, ArchivedExpense)
+                      for user_id, description, amount, fingerprint in source.objects.values_list(
+                          'user_id', 'description', 'amount', 'fingerprint'))
+
+    def _search(self, user, text):
+        with tenant(user.pk):
+            return [row['description'] for row in ListService.get_list_sync(ListServiceConfig(
+                app='month_log', model='Expense', hidden_columns=[], requested_columns=['description'],
+                query=text)).data]
+
+    def test_round_trip_into_the_same_database(self):
+        before = self._ledger()
+        export_snapshot(self.directory)
+        counts = import_snapshot(self.directory, flush=True)
+        self.assertEqual(counts['month_log.Expense'], 4)
+        self.assertEqual(counts['month_log.ArchivedExpense'], 2)
+        self.assertEqual(counts[get_user_model()._meta.label], 0)  # both users already exist
+        self.assertEqual(self._ledger(), before)
+        self.assertEqual(self._search(self.users['bob'], 'coffee'), ['bob coffee'])
+
+    def test_non_empty_ledger_needs_flush(self):
+        export_snapshot(self.directory)
+        with self.assertRaises(SnapshotError):
+            import_snapshot(self.directory)
+
+    def test_rows_follow_their_owner_by_username(self):
+        export_snapshot(self.directory)
+        alice_id = self.users['alice'].pk
+        get_user_model().objects.filter(pk__in=[user.pk for user in self.users.values()]).delete()
+        # The target numbers its users differently: bob exists under a new id, and
+        # alice's old id belongs to someone else.
+        bob = get_user_model().objects.create_user('bob', password='x')
+        get_user_model().objects.create_user('mallory', password='x', id=alice_id)
+        counts = import_snapshot(self.directory)
+        self.assertEqual(counts[get_user_model()._meta.label], 1)
+        alice = get_user_model().objects.get(username='alice')
+        self.assertNotIn(alice.pk, (alice_id, bob.pk))
+        self.assertEqual([owner for owner, *_ in self._ledger()], ['alice'] * 3 + ['bob'] * 3)
+        self.assertFalse(Expense.objects.filter(user_id=alice_id).exists())
+        for source in (Expense, ArchivedExpense):
+            for row in source.objects.all():
+                self.assertEqual(row.fingerprint, Expense(
+                    user_id=row.user_id, description=row.description, amount=row.amount,
+                    date_logged=row.date_logged).compute_fingerprint())
+        self.assertEqual(self._search(alice, 'coffee'), ['alice coffee'])
+        self.assertEqual(self._search(bob, 'coffee'), ['bob coffee'])
+        with tenant(alice.pk):
+            self.assertEqual(BankAccount.objects.get().current_balance, 100_000)
+
+
+class ExceptionHandlerTests(SimpleTestCase):
+    """ handle_exception maps each exception along its MRO to the most specific rule """
+
+    def _raised(self, exception):
+        with self.assertLogs('utilities.exception_handler') as logs, self.assertRaises(Exception) as raised:
+            handle_exception(exception, location='Caller.method')
+        self.assertIn('Caller.method', logs.output[0])
+        return raised.exception, logs.records[0].levelname
+
+    def test_most_specific_rule_wins(self):
+        class DuplicateRow(IntegrityError):
+            pass
+
+        cases = [
+            (IntegrityError('dup'), IntegrityError, ExceptionMessages.DATA_CONFLICT),
+            (DuplicateRow('dup'), IntegrityError, ExceptionMessages.DATA_CONFLICT),
+            (OperationalError('locked'), OperationalError, ExceptionMessages.SYSTEM_ERROR),
+            (DatabaseError('down'), DatabaseError, ExceptionMessages.DATABASE_ERROR),
+            (Expense.DoesNotExist(), ObjectDoesNotExist, ExceptionMessages.NOT_FOUND),
+            (FileNotFoundError('x'), FileNotFoundError, ExceptionMessages.FILE_NOT_FOUND),
+            (IsADirectoryError('x'), OSError, ExceptionMessages.REQUEST_FAILED),
+        ]
+        for exception, raised_class, message in cases:
+            raised, _ = self._raised(exception)
+            self.assertIs(type(raised), raised_class, exception)
+            self.assertEqual(str(raised), message, exception)
+
+    def test_value_errors_pass_through_and_unknown_errors_become_value_errors(self):
+        original = ValueError('bad month')
+        self.assertIs(self._raised(original)[0], original)
+
+        class Unlisted(Exception):
+            pass
+
+        raised, level = self._raised(Unlisted('boom'))
+        self.assertIs(type(raised), ValueError)
+        self.assertEqual(str(raised), ExceptionMessages.EXCEPTION_ERROR)
+        self.assertEqual(level, 'CRITICAL')
+
+    def test_location_defaults_to_the_calling_function(self):
+        def service_method():
+            handle_exception(KeyError('x'))
+
+        with self.assertLogs('utilities.exception_handler') as logs, self.assertRaises(KeyError):
+            service_method()
+        self.assertIn('service_method', logs.output[0])
+        self.assertTrue(get_class_function_name(0).endswith('test_location_defaults_to_the_calling_function'))
+
+    def test_decorator_wraps_sync_and_async_functions(self):
+        @handles_exceptions
+        def sync_lookup():
+            return {}['missing']
+
+        @handles_exceptions
+        async def async_lookup():
+            return [][1]
+
+        with self.assertLogs('utilities.exception_handler') as logs:
+            with self.assertRaisesMessage(KeyError, ExceptionMessages.MISSING_FIELDS):
+                sync_lookup()
+            with self.assertRaisesMessage(IndexError, ExceptionMessages.INDEX_OUT_OF_RANGE):
+                async_to_sync(async_lookup)()
+        self.assertIn('sync_lookup', logs.output[0])
+        self.assertIn('async_lookup', logs.output[1])
+
+
+class RequestTimingTests(TestCase):
+    """ PerformanceMiddleware's Server-Timing header and per-request log line """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('timed', password='x')
+        with tenant(cls.user.pk):
+            Expense.objects.create(amount=500, description='coffee')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_header_lists_the_request_spans(self):
+        with self.assertLogs('utilities.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('monthly_log:monthly_log_main'))
+        metrics = {metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')}
+        self.assertTrue({'total', 'db', 'tpl', 'svc.MonthlyIncomeService.get_expenses_context_data'} <= set(metrics))
+        timing = logs.records[-1].request_timing
+        self.assertEqual((timing['path'], timing['status'], timing['slow']),
+                         (reverse('monthly_log:monthly_log_main'), 200, False))
+        self.assertIn(f'desc="{timing["queries"]}x"', metrics['db'])
+
+    @override_settings(SERVER_TIMING_HEADER=False, PERF_MAX_QUERIES=0)
+    def test_query_heavy_request_is_a_warning_without_header(self):
+        with self.assertLogs('utilities.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('monthly_log:monthly_log_main'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(logs.records[-1].levelname, 'WARNING')
+        self.assertTrue(logs.records[-1].request_timing['slow'])
+
+
+class RequestProfilingTests(TestCase):
+    """ ProfilingMiddleware: staff-requested profiles kept in a ring buffer """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        cls.user = get_user_model().objects.create_user('plain', password='x')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PROFILE_DIR=directory.name, PROFILE_KEEP=2, PROFILE_SAMPLE_RATES={})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.staff)
+
+    def _get(self, mode):
+        return self.client.get(reverse('monthly_log:monthly_log_main'), headers={'X-Profile': mode})
+
+    def test_staff_request_writes_a_profile(self):
+        response = self._get('cprofile')
+        self.assertEqual([path.name for path in list_profiles()], [response['X-Profile-Name']])
+        self.assertTrue(response['X-Profile-Name'].endswith('.pstats'))
+        self.assertGreater(pstats.Stats(str(list_profiles()[0])).total_calls, 0)
+        self.assertTrue(self._get('sample')['X-Profile-Name'].endswith('.collapsed'))
+
+    def test_header_from_non_staff_is_ignored(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Profile-Name', self._get('cprofile'))
+        self.assertEqual(list_profiles(), [])
+
+    def test_only_the_newest_profiles_are_kept(self):
+        names = [self._get('cprofile')['X-Profile-Name'] for _ in range(3)]
+        self.assertEqual([path.name for path in list_profiles()], names[:0:-1])
+
+    def test_profiles_are_listed_and_served_to_staff_only(self):
+        name = self._get('cprofile')['X-Profile-Name']
+        self.assertContains(self.client.get(reverse('profile_list')), name)
+        download = self.client.get(reverse('profile_download', args=[name]))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), list_profiles()[0].read_bytes())
+        self.assertEqual(self.client.get(reverse('profile_download', args=['settings.py'])).status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+
+
+class SeedLedgerTests(TestCase):
+    """ seed_ledger allocates ids no existing, archived or deleted row ever had """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user('owner', password='x')
+        cls.fresh = get_user_model().objects.create_user('fresh', password='x')
+        this_month = timezone.localdate().replace(day=1)
+        last_month = (this_month - timedelta(days=1)).replace(day=1)
+        with tenant(cls.owner.pk):
+            BankAccount.objects.create(name='Main account', is_default=True, current_balance=100_000)
+            cls.expense_ids = [
+                async_to_sync(MonthlyIncomeService.add_expense)(ExpenseCreate(
+                    amount=Decimal('10.00'), description=description,
+                    date_logged=timezone.make_aware(datetime.combine(day, time(12)))))[0].pk
+                for day, description in ((last_month.replace(day=3), 'archived'), (this_month, 'kept'),
+                                         (this_month, 'deleted'))
+            ]
+            cls.posting_ids = list(BankTransaction.objects.values_list('pk', flat=True))
+            MonthCloseService.close_month_sync(last_month)
+            MonthlyIncomeService.delete_expenses_sync([cls.expense_ids[-1]])
+
+    def test_ids_start_above_every_id_handed_out(self):
+        counts = seed_ledger(self.fresh.pk, expenses=40, months=2, seed=1)
+        self.assertEqual(counts[Expense._meta.label], 40)
+        self.assertGreater(min(Expense.objects.filter(user=self.fresh).values_list('pk', flat=True)),
+                           max(self.expense_ids))
+        self.assertGreater(min(BankTransaction.objects.filter(user=self.fresh).values_list('pk', flat=True)),
+                           max(self.posting_ids))
+
+    def test_collision_is_a_seed_error(self):
+        with mock.patch('utilities.seeding._next_id', return_value=self.expense_ids[1]), \
+                self.assertRaises(SeedError):
+            seed_ledger(self.fresh.pk, expenses=10, months=1, seed=1)
+        self.assertFalse(Expense.objects.filter(user=self.fresh).exists())
@@ -13,10 +13,26 @@ urlpatterns = [
     path('expense/add-form/', views.add_expense_form_row_view, name='add_expense_form_row'),
     path('expense/save-new/', views.save_new_expense_view, name='save_new_expense'),
     path('expense/cancel-add/', views.cancel_add_expense_row_view, name='cancel_add_expense_row'),
+    path('expense/description-suggestions/', views.expense_description_suggestions_view, name='expense_description_suggestions'),
     
     path('expense/edit-form/<int:expense_id>/', views.edit_expense_form_row_view, name='edit_expense_form_row'),
     path('expense/save-edited/<int:expense_id>/', views.save_edited_expense_view, name='save_edited_expense'),
     path('expense/cancel-edit/<int:expense_id>/', views.cancel_edit_expense_row_view, name='cancel_edit_expense_row'),
     
     path('expense/delete/<int:expense_id>/', views.delete_expense_view, name='delete_expense'),
+
+    # Chart series (read from the rollup tables)
+    path('chart-data/', views.chart_data_view, name='chart_data'),
+    path('forecast/', views.forecast_panel_view, name='forecast_panel'),
+    path('compare/', views.month_comparison_view, name='month_comparison'),
+
+    # Categories and per-category budgets (read from the category rollups)
+    path('category/save/', views.save_category_view, name='save_category'),
+    path('category/breakdown/', views.category_breakdown_view, name='category_breakdown'),
+
+    # Recurring expense templates (materialized by `manage.py materialize_recurring`)
+    path('recurring/save/', views.save_recurring_expense_view, name='save_recurring_expense'),
+
+    # Month close: snapshot + archival of a past month's rows
+    path('month/close/', views.close_month_view, name='close_month'),
 ]
@@ -5,15 +5,22 @@ from pydantic import ValidationError
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils import timezone
-from datetime import datetime
+import calendar
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 import json
+import uuid
 
 from schema.month_log.month_log_schema import (
-    MonthlySalaryCreate, ExpenseCreate, ExpenseUpdate,
-    ExpenseFilterInputSchema, ExpenseSchema, MonthlyLogContextData  # Updated schema
+    MonthlySalaryCreate, CategoryCreate, RecurringExpenseCreate, ExpenseCreate, ExpenseUpdate,
+    ExpenseFilterInputSchema, ExpenseSchema, MonthlyLogContextData,  # Updated schema
+    ChartDataFilterInputSchema, ForecastInputSchema, MonthRangeInputSchema, MonthCloseInputSchema
 )
-from month_log.services import MonthlyIncomeService
+from month_log.models import Category
+from month_log.services import MonthlyIncomeService, MonthCloseService, RecurringExpenseService
+from bank_balance_log.models import BankAccount
+from month_log.forecast import ForecastService
+from utilities.variables import ErrorMessages
 from typing import Optional
 
 
@@ -34,7 +41,8 @@ def _get_filter_params_from_request(request_get_dict: dict) -> ExpenseFilterInpu
         'filter_date': request_get_dict.get('filter_date'),
         'page': int(request_get_dict.get('page', '1')),
         'page_size': int(request_get_dict.get('page_size', '10')),
-        'sort_by': request_get_dict.get('sort_by')
+        'sort_by': request_get_dict.get('sort_by'),
+        'search': request_get_dict.get('search') or None,
     }
     if filter_data.get('filter_date'):
         try:
@@ -51,17 +59,26 @@ def _get_filter_params_from_request(request_get_dict: dict) -> ExpenseFilterInpu
     except ValidationError:
         return ExpenseFilterInputSchema(filter_month_year=today.strftime('%Y-%m'), page=1, page_size=10)
 
+def _parse_chart_bound(value: Optional[str], default: date, end_of_month: bool = False) -> date:
+    """ Accepts YYYY-MM-DD or YYYY-MM; a bare month expands to its first (or last) day """
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        month_start = datetime.strptime(value, '%Y-%m').date()
+        if end_of_month:
+            return month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+        return month_start
+
 # --- Main View & Salary ---
 
 
 
-@require_GET
-async def monthly_log_main_view(request: HttpRequest) -> HttpResponse:
-    filters = _get_filter_params_from_request(request.GET.dict())
-    # Call the refactored service method
-    context_data: MonthlyLogContextData = await MonthlyIncomeService.get_expenses_context_data(filters)
-
-    context = {
+def _log_context(context_data: MonthlyLogContextData, filters) -> dict:
+    """ Context of the expense table (cotton/components/table/index.html) """
+    chart_month = filters.filter_date.strftime('%Y-%m') if filters.filter_date else (filters.filter_month_year or '')
+    return {
         'data': context_data,  # This now contains pagination and all other data
         # current_filters_applied is already in context_data.pagination
         'add_button': {
@@ -71,16 +88,24 @@ async def monthly_log_main_view(request: HttpRequest) -> HttpResponse:
             'swap': "afterend"
         },
         'url': reverse('monthly_log:monthly_log_main'),
+        'chart_url': f"{reverse('monthly_log:chart_data')}?start={chart_month}&end={chart_month}",
         'target': "tbody#Htb_Htable",
         'swap': "afterend"
     }
+
+
+@require_GET
+async def monthly_log_main_view(request: HttpRequest) -> HttpResponse:
+    filters = _get_filter_params_from_request(request.GET.dict())
+    # Call the refactored service method
+    context_data: MonthlyLogContextData = await MonthlyIncomeService.get_expenses_context_data(filters)
+    context = _log_context(context_data, filters)
     # Determine template based on HTMX headers (user will handle this)
     # For now, assuming table.html for HTMX and index.html for full load
     template_name = 'cotton/components/table/index.html' if request.htmx else 'month_log/index.html'
     # Example for targeting only table body
     if request.htmx and request.GET.get("target_body"):
         template_name = 'cotton/components/table/table_body.html'
-    print(context)
     return render(request, template_name, context)
 
 
@@ -110,11 +135,11 @@ async def set_monthly_salary_view(request: HttpRequest) -> HttpResponse:
     filters = _get_filter_params_from_request(request.GET.dict())
     context_data = await MonthlyIncomeService.get_expenses_context_data(filters)
     context = {
-        'log_data': context_data,
+        **_log_context(context_data, filters),
         'salary_update_success_message': "Salary updated successfully."  # Example message
     }
     # Render the main table partial which includes the summary
-    return render(request, 'cotton/components/table/table.html', context)
+    return render(request, 'cotton/components/table/index.html', context)
 
 
 # --- HTMX Inline Expense Row Views (largely same, but ensure context for row.html is correct) ---
@@ -122,7 +147,18 @@ async def set_monthly_salary_view(request: HttpRequest) -> HttpResponse:
 
 @require_GET
 async def add_expense_form_row_view(request: HttpRequest) -> HttpResponse:
-    return render(request, 'month_log/partials/add_row.html', {})
+    # Each rendered form carries its own key so a double-submitted row is only posted once.
+    return render(request, 'month_log/partials/add_row.html', {
+        'idempotency_key': uuid.uuid4().hex,
+        'categories': await MonthlyIncomeService.list_categories(),
+    })
+
+
+@require_GET
+async def expense_description_suggestions_view(request: HttpRequest) -> HttpResponse:
+    """ <option> list for the add row's description datalist, served from the in-memory index """
+    suggestions = await MonthlyIncomeService.suggest_descriptions(request.GET.get('description', '')[:100])
+    return render(request, 'month_log/partials/description_suggestions.html', {'suggestions': suggestions})
 
 
 
@@ -141,14 +177,25 @@ async def save_new_expense_view(request: HttpRequest) -> HttpResponse:
                 pass
         else:
             raw_data.pop('date_logged', None)
+        if not raw_data.get('category_id'):
+            raw_data.pop('category_id', None)
+        if not raw_data.get('idempotency_key'):
+            raw_data['idempotency_key'] = request.headers.get('Idempotency-Key')
         expense_data_create = ExpenseCreate.model_validate(raw_data)
     except ValidationError as e:
         return JsonResponse({'errors': e.errors(include_input=False)}, status=400)
     except Exception as e:
         return JsonResponse({'errors': f"Invalid input: {str(e)}"}, status=400)
 
+    # A saved row can still come back with a message: the category budget warning.
     new_expense_obj, error_message = await MonthlyIncomeService.add_expense(expense_data_create)
-    if error_message or not new_expense_obj:
+    if error_message == ErrorMessages.DUPLICATE_ENTRY:
+        # A retry carrying the same idempotency key gets the row it already created.
+        new_expense_obj = await MonthlyIncomeService.get_expense_by_idempotency_key(
+            expense_data_create.idempotency_key) if expense_data_create.idempotency_key else None
+        if not new_expense_obj:
+            return JsonResponse({'errors': error_message}, status=409)
+    elif not new_expense_obj:
         return JsonResponse({'errors': error_message or "Failed to save expense."}, status=400)
 
     expense_schema = ExpenseSchema.model_validate(new_expense_obj)
@@ -161,7 +208,11 @@ async def save_new_expense_view(request: HttpRequest) -> HttpResponse:
     expense_schema.balance_after_this_expense_in_month = salary_amount - total_spent_up_to
 
     context = {'row': expense_schema}
-    return render(request, 'month_log/partials/row.html', context)
+    response = render(request, 'month_log/partials/row.html', context)
+    if error_message and error_message != ErrorMessages.DUPLICATE_ENTRY:
+        response['HX-Trigger'] = json.dumps(
+            {'showInfoModal': {'message': error_message}})
+    return response
 
 
 
@@ -198,6 +249,8 @@ async def save_edited_expense_view(request: HttpRequest, expense_id: int) -> Htt
                     raw_data['date_logged'].replace('Z', '+00:00'))
             except ValueError:
                 pass
+        if raw_data.get('category_id') == '':
+            raw_data['category_id'] = None
         expense_update_data = ExpenseUpdate.model_validate(raw_data)
         if not expense_update_data.model_dump(exclude_unset=True):
             original_schema = ExpenseSchema.model_validate(expense_to_edit)
@@ -216,6 +269,8 @@ async def save_edited_expense_view(request: HttpRequest, expense_id: int) -> Htt
         return JsonResponse({'errors': f"Invalid input: {str(e)}"}, status=400)
 
     updated_obj, message = await MonthlyIncomeService.update_expense(expense_id, expense_update_data)
+    if message == ErrorMessages.DUPLICATE_ENTRY:
+        return JsonResponse({'errors': message}, status=409)
     if not updated_obj:
         return JsonResponse({'errors': message or "Update failed."}, status=400)
 
@@ -267,3 +322,146 @@ async def delete_expense_view(request: HttpRequest, expense_id: int) -> HttpResp
         response['HX-Trigger'] = json.dumps(
             {'showInfoModal': {'message': message}})
     return response
+
+
+
+@require_GET
+async def chart_data_view(request: HttpRequest) -> JsonResponse:
+    """ Time series for the table footer chart, served from the rollup tables """
+    today = timezone.now().date()
+    try:
+        params = ChartDataFilterInputSchema(
+            start_date=_parse_chart_bound(request.GET.get('start'), today.replace(day=1)),
+            end_date=_parse_chart_bound(request.GET.get('end'), today, end_of_month=True),
+        )
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False, include_context=False)}, status=400)
+    except ValueError:
+        return JsonResponse({'errors': "start and end must be YYYY-MM or YYYY-MM-DD."}, status=400)
+
+    chart_data = await MonthlyIncomeService.get_chart_data(params)
+    return JsonResponse(chart_data.model_dump(mode='json'))
+
+
+
+@require_GET
+async def forecast_panel_view(request: HttpRequest) -> HttpResponse:
+    """
+    Month-end projection and what-if panel, loaded lazily next to the summary.
+    Scenarios come in as repeated ?whatif=<category>:<percent> parameters.
+    """
+    today = timezone.now().date()
+    scenarios = []
+    for raw_scenario in request.GET.getlist('whatif'):
+        group, _, cut_percent = raw_scenario.rpartition(':')
+        if group and cut_percent:
+            scenarios.append({'group': group, 'cut_percent': cut_percent})
+    try:
+        params = ForecastInputSchema.model_validate({
+            'month_year': request.GET.get('month_year') or today.strftime('%Y-%m'),
+            'scenarios': scenarios,
+        })
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False, include_context=False)}, status=400)
+
+    try:
+        forecast = await ForecastService.get_forecast(params)
+    except ValueError as e:
+        return JsonResponse({'errors': str(e)}, status=400)
+    return render(request, 'month_log/partials/forecast_panel.html', {'forecast': forecast})
+
+
+
+@require_GET
+async def month_comparison_view(request: HttpRequest) -> HttpResponse:
+    """ Compact side-by-side table of ?start=YYYY-MM .. ?end=YYYY-MM (defaults to the last six months) """
+    today = timezone.now().date()
+    default_start = date(today.year, today.month, 1)
+    for _ in range(5):
+        default_start = (default_start - timedelta(days=1)).replace(day=1)
+    try:
+        params = MonthRangeInputSchema(
+            start_month=request.GET.get('start') or default_start.strftime('%Y-%m'),
+            end_month=request.GET.get('end') or today.strftime('%Y-%m'),
+        )
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False, include_context=False)}, status=400)
+
+    comparison = await MonthlyIncomeService.get_month_comparison(params)
+    return render(request, 'month_log/partials/month_comparison.html', {'comparison': comparison})
+
+
+
+@require_GET
+async def category_breakdown_view(request: HttpRequest) -> HttpResponse:
+    """ Per-category spend and budget headroom for ?month_year=YYYY-MM, served from the category rollups """
+    month_year = request.GET.get('month_year') or timezone.now().date().strftime('%Y-%m')
+    try:
+        datetime.strptime(month_year, '%Y-%m')
+    except ValueError:
+        return JsonResponse({'errors': "month_year must be in YYYY-MM format."}, status=400)
+
+    breakdown = await MonthlyIncomeService.get_category_breakdown(month_year)
+    return render(request, 'month_log/partials/category_breakdown.html', {'breakdown': breakdown})
+
+
+
+@require_POST
+async def save_category_view(request: HttpRequest) -> HttpResponse:
+    """ Creates a category, or sets the monthly budget of an existing one with the same name """
+    try:
+        raw_data = _parse_json_body(
+            request) if request.content_type == 'application/json' else request.POST.dict()
+        if raw_data is None:
+            return JsonResponse({'errors': "Invalid data format."}, status=400)
+        if not raw_data.get('monthly_budget'):
+            raw_data.pop('monthly_budget', None)
+        category_data = CategoryCreate.model_validate(raw_data)
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False)}, status=400)
+
+    category = await MonthlyIncomeService.save_category(category_data)
+    return JsonResponse(category.model_dump(mode='json'))
+
+
+@require_POST
+async def save_recurring_expense_view(request: HttpRequest) -> HttpResponse:
+    """ Creates a recurring expense template; its rows appear when the month is materialized """
+    try:
+        raw_data = _parse_json_body(
+            request) if request.content_type == 'application/json' else request.POST.dict()
+        if raw_data is None:
+            return JsonResponse({'errors': "Invalid data format."}, status=400)
+        for optional_field in ('category_id', 'account_id', 'end_month'):
+            if not raw_data.get(optional_field):
+                raw_data.pop(optional_field, None)
+        raw_data.setdefault('start_month', timezone.localdate().replace(day=1))
+        template_data = RecurringExpenseCreate.model_validate(raw_data)
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False, include_context=False)}, status=400)
+
+    try:
+        template = await RecurringExpenseService.save_template(template_data)
+    except Category.DoesNotExist:
+        return JsonResponse({'errors': "Category not found."}, status=404)
+    except BankAccount.DoesNotExist:
+        return JsonResponse({'errors': "Bank account not found."}, status=404)
+    return JsonResponse(template.model_dump(mode='json'))
+
+@require_POST
+async def close_month_view(request: HttpRequest) -> HttpResponse:
+    """ Closes a past month: snapshots its summary and moves its rows to the archive tables """
+    try:
+        raw_data = _parse_json_body(
+            request) if request.content_type == 'application/json' else request.POST.dict()
+        if raw_data is None:
+            return JsonResponse({'errors': "Invalid data format."}, status=400)
+        close_data = MonthCloseInputSchema.model_validate(raw_data)
+    except ValidationError as e:
+        return JsonResponse({'errors': e.errors(include_input=False, include_context=False)}, status=400)
+
+    try:
+        closed_month = await MonthCloseService.close_month(close_data)
+    except ValueError as e:
+        return JsonResponse({'errors': str(e)}, status=400)
+    return JsonResponse(closed_month.model_dump(mode='json'))
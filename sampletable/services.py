@@ -0,0 +1,111 @@
+# sampletable/services.py
+import random
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from faker import Faker
+
+from schema.list_schema import ColumnInfo, ListServiceConfig, ListServiceResponse
+from utilities.columnar import CATEGORY, TEXT, ColumnStore
+from utilities.grid import SortedGrid
+from utilities.instrumentation import instrument_service
+from utilities.list_service import ListService
+
+DEFAULT_ROWS = 50
+PAGE_SIZE = 25
+# Faker takes ~0.5 ms a row; rows are drawn from pools it fills once, so a million take seconds.
+POOL_SIZE = 500
+
+# Storage of each column (utilities.columnar): ages fit a byte, jobs and cities repeat.
+PEOPLE_SCHEMA = {'id': 'int32', 'name': TEXT, 'email': TEXT, 'age': 'int8', 'job': CATEGORY, 'city': CATEGORY}
+
+# Column metadata for the in-memory rows, in display order
+PEOPLE_COLUMNS = [
+    ColumnInfo(name=name, verbose_name=verbose_name, field_name=name, hidden=False)
+    for name, verbose_name in (
+        ('id', 'ID'), ('name', 'Name'), ('email', 'Email'), ('age', 'Age'), ('job', 'Job'), ('city', 'City'),
+    )
+]
+
+
+def iter_people(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """ `count` fake people, the same ones for the same seed """
+    fake = Faker()
+    fake.seed_instance(seed)
+    first_names = [fake.first_name() for _ in range(POOL_SIZE)]
+    last_names = [fake.last_name() for _ in range(POOL_SIZE)]
+    jobs = [fake.job() for _ in range(POOL_SIZE)]
+    cities = [fake.city() for _ in range(POOL_SIZE)]
+    domains = [fake.free_email_domain() for _ in range(10)]
+
+    rng = random.Random(seed)
+    for person_id in range(1, count + 1):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        yield {
+            'id': person_id,
+            'name': f"{first} {last}",
+            'email': f"{first}.{last}{person_id}@{rng.choice(domains)}".lower(),
+            'age': rng.randint(18, 90),
+            'job': rng.choice(jobs),
+            'city': rng.choice(cities),
+        }
+
+
+def generate_people(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    return list(iter_people(count, seed))
+
+
+def build_people_store(count: int, seed: int = 0) -> ColumnStore:
+    return ColumnStore.from_rows(PEOPLE_SCHEMA, iter_people(count, seed))
+
+
+@instrument_service
+class PeopleService:
+    """
+    The sample table's data: SAMPLETABLE_ROWS generated people in a column store, served
+    from a SortedGrid, so sorting and paging never re-sort the whole set.
+
+    Each process generates its own copy, unless SAMPLETABLE_STORE_DIR is set: the first
+    process to start then saves the store there and every process memory-maps that
+    copy, so workers share one set of pages (and the table becomes read-only).
+    """
+
+    _grid: Optional[SortedGrid] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def grid() -> SortedGrid:
+        if PeopleService._grid is None:
+            with PeopleService._lock:
+                if PeopleService._grid is None:
+                    PeopleService._grid = SortedGrid(PeopleService._load_store())
+        return PeopleService._grid
+
+    @staticmethod
+    def _load_store() -> ColumnStore:
+        count = getattr(settings, 'SAMPLETABLE_ROWS', DEFAULT_ROWS)
+        store_dir = getattr(settings, 'SAMPLETABLE_STORE_DIR', None)
+        if not store_dir:
+            return build_people_store(count)
+        directory = Path(store_dir) / f'people-{count}'
+        if not (directory / 'manifest.json').exists():
+            build_people_store(count).save(directory)
+        return ColumnStore.open(directory, PEOPLE_SCHEMA)
+
+    @staticmethod
+    def get_list(sort_by: str = "", page: int = 1, page_size: int = PAGE_SIZE) -> ListServiceResponse:
+        return ListService.get_list_from_grid(
+            ListServiceConfig(
+                app='sampletable', model='people', sort_by=sort_by, page=page, page_limit=page_size,
+                default_column=['name', 'email', 'age', 'job', 'city'],
+                hidden_columns=['id'],
+            ),
+            PeopleService.grid(), PEOPLE_COLUMNS,
+        )
+
+    @staticmethod
+    def regenerate(count: int, seed: int = 0) -> None:
+        """ Replaces every row; the grid drops its permutations and rebuilds them on the next sort """
+        PeopleService.grid().replace(build_people_store(count, seed))
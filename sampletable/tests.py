@@ -1,3 +1,110 @@
-from django.test import TestCase
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from sampletable.services import PEOPLE_SCHEMA, PeopleService, build_people_store, generate_people
+from utilities.columnar import ColumnStore, ColumnStoreError
+from utilities.grid import SortedGrid
+
+
+def _reference(rows, column, descending):
+    """ What the database would return: sorted by the column, ties by id (reversed when descending) """
+    return sorted(rows, key=lambda row: (row[column], row['id']), reverse=descending)
+
+
+class SortedGridTests(SimpleTestCase):
+
+    def setUp(self):
+        # Ages repeat often across 300 rows, so the tie order is exercised too.
+        self.rows = generate_people(300, seed=7)
+        self.grid = SortedGrid(ColumnStore.from_rows(PEOPLE_SCHEMA, self.rows))
+
+    def assertGridMatches(self):
+        rows = list(self.grid.rows)
+        for column in ('name', 'age', 'city'):
+            for descending in (False, True):
+                expected = _reference(rows, column, descending)
+                for start in (0, 25, len(rows) - 10):
+                    self.assertEqual(self.grid.page(column, descending, start, start + 25), expected[start:start + 25],
+                                     f"{'-' if descending else ''}{column} from {start}")
+
+    def test_pages_match_a_full_sort(self):
+        self.assertGridMatches()
+        self.assertEqual(self.grid.page(None, False, 10, 20), self.rows[10:20])
+        self.assertEqual(self.grid.page('age', True, 295, 320), _reference(self.rows, 'age', True)[295:])
+
+    def test_writes_keep_built_permutations_current(self):
+        self.assertGridMatches()
+        self.grid.append({'id': 301, 'name': 'Aaron Aardvark', 'email': 'a@example.com', 'age': 18,
+                          'job': 'Zookeeper', 'city': 'Zurich'})
+        self.grid.update(0, {'age': 90, 'city': 'Aachen'})
+        self.grid.update(1, {'name': self.rows[1]['name']})
+        self.assertGridMatches()
+
+    def test_replace_drops_permutations(self):
+        self.grid.page('age', False, 0, 10)
+        self.grid.replace(build_people_store(40, seed=8))
+        self.assertEqual(len(self.grid), 40)
+        self.assertGridMatches()
+
+
+class ColumnStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.rows = generate_people(200, seed=3)
+        self.store = ColumnStore.from_rows(PEOPLE_SCHEMA, self.rows)
+
+    def test_rows_round_trip(self):
+        self.assertEqual(list(self.store), self.rows)
+        self.assertEqual(self.store[-1], self.rows[-1])
+
+    def test_writes(self):
+        self.store.append({**self.rows[0], 'id': 201, 'city': 'Ünterstadt', 'name': 'Zoë Ångström'})
+        self.store.update(5, {'name': 'Al', 'job': 'Cartographer', 'age': 44})
+        self.assertEqual(self.store[200], {**self.rows[0], 'id': 201, 'city': 'Ünterstadt', 'name': 'Zoë Ångström'})
+        self.assertEqual(self.store[5], {**self.rows[5], 'name': 'Al', 'job': 'Cartographer', 'age': 44})
+        self.assertEqual(self.store[6], self.rows[6])
+        for column in ('name', 'city', 'age'):
+            values = [row[column] for row in self.store]
+            self.assertEqual(self.store.sort_order(column).tolist(), sorted(range(len(values)), key=values.__getitem__))
+
+    def test_saved_store_is_memory_mapped_and_read_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'people'
+            self.store.save(path)
+            self.store.save(path)  # a second writer keeps the first copy
+            opened = ColumnStore.open(path, PEOPLE_SCHEMA)
+            self.assertEqual(list(opened), self.rows)
+            self.assertEqual(opened.sort_order('email').tolist(), self.store.sort_order('email').tolist())
+            with self.assertRaises(ColumnStoreError):
+                opened.append(self.rows[0])
+            with self.assertRaises(ColumnStoreError):
+                ColumnStore.open(path, {**PEOPLE_SCHEMA, 'age': 'int16'})
+
+
+class PeopleViewTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('people', password='x'))
+        PeopleService._grid = SortedGrid(build_people_store(60))
+
+    def tearDown(self):
+        PeopleService._grid = None
+
+    def test_sort_table_pages(self):
+        response = self.client.get(reverse('sort_table'), {'sort': '-age', 'page': '3', 'page_size': '25'})
+        self.assertEqual(response.status_code, 200)
+        pagination = response.context['pagination']
+        self.assertEqual((pagination.current_page, pagination.total_pages, len(response.context['people'])), (3, 3, 10))
+        self.assertEqual(response.context['current_sort'], '-age')
+        self.assertEqual([person['name'] for person in response.context['people']],
+                         [row['name'] for row in _reference(PeopleService.grid().rows, 'age', True)[50:]])
+
+    def test_bad_paging_parameters_fall_back(self):
+        response = self.client.get(reverse('sort_table'), {'sort': 'nope', 'page': 'x', 'page_size': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pagination'].page_size, 1)
+        self.assertEqual(response.context['current_sort'], '')
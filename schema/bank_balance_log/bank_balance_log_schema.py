@@ -5,6 +5,7 @@ from datetime import date, datetime
 from typing import Optional, List, Literal
 
 from schema.list_schema import PaginationDetails
+from utilities.money import MoneyDecimal
 
 # --- Bank Account Schemas ---
 
@@ -14,13 +15,18 @@ class BankAccountBase(BaseModel):
 
 
 class BankAccountCreateOrUpdate(BankAccountBase):
-    pass
+    # Sets the balance of this account; without it, `name` opens (or updates) the account
+    # with that name, and with neither the default account is updated.
+    account_id: Optional[int] = None
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
 
 
 class BankAccountSchema(BaseModel):
     id: int
-    user_id: int
-    current_balance: Decimal
+    user_id: Optional[int] = None
+    name: str
+    is_default: bool
+    current_balance: MoneyDecimal  # stored as cents
     last_updated: datetime
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
@@ -36,15 +42,18 @@ class BankTransactionBase(BaseModel):
 
 
 class BankTransactionCreateRequest(BankTransactionBase):
-    pass
+    account_id: Optional[int] = None  # defaults to the default account
+    # Client-generated key; a retried submit with the same key is rejected by the unique index.
+    idempotency_key: Optional[str] = Field(None, max_length=64)
 
 
 class BankTransactionSchema(BankTransactionBase):
+    amount: MoneyDecimal  # stored as cents
     id: int
-    user_id: int
+    user_id: Optional[int] = None
     account_id: int
     date_logged: datetime
-    balance_after_transaction: Decimal
+    balance_after_transaction: MoneyDecimal
     created_at: datetime
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
@@ -66,6 +75,8 @@ class BankTransactionFilterInputSchema(BaseModel):
     page_size: int = Field(10, gt=0, le=100)
     sort_by: Optional[str] = None
     transaction_type: Optional[Literal['DEBIT', 'CREDIT']] = None
+    account_id: Optional[int] = None  # None lists every account
+    search: Optional[str] = Field(None, max_length=100)  # full-text search over descriptions
 
     @field_validator('filter_month_year')
     @classmethod
@@ -80,7 +91,9 @@ class BankTransactionFilterInputSchema(BaseModel):
 
 
 class BankLogContextData(BaseModel):  # Output from Service to View
-    bank_account: Optional[BankAccountSchema] = None
+    bank_account: Optional[BankAccountSchema] = None  # the selected account, if any
+    accounts: List[BankAccountSchema] = []
+    total_balance: MoneyDecimal = Decimal('0.00')  # sum of every account's running balance
     transactions: List[BankTransactionSchema] = []
     date_filters: List[BankDateFilterSchema] = []
     pagination: PaginationDetails
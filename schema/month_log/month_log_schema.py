@@ -1,10 +1,16 @@
 # month_log/schemas.py
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
 from decimal import Decimal
 from datetime import date, datetime
 from typing import Optional, List
 
 from schema.list_schema import PaginationDetails
+from utilities.money import MoneyDecimal
+
+# Ten years of daily points; keeps a single chart response bounded.
+CHART_MAX_RANGE_DAYS = 3660
+# Same bound for the month comparison table.
+COMPARISON_MAX_MONTHS = 120
 
 
 # --- Monthly Salary Schemas ---
@@ -26,12 +32,65 @@ class MonthlySalaryCreate(MonthlySalaryBase):
 
 
 class MonthlySalarySchema(MonthlySalaryBase):
+    salary_amount: MoneyDecimal  # stored as cents
     id: int
-    user_id: int
+    user_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+# --- Category Schemas ---
+
+
+class CategoryCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    monthly_budget: Optional[Decimal] = Field(None, gt=0)
+
+
+class CategorySchema(BaseModel):
+    id: int
+    name: str
+    monthly_budget: Optional[MoneyDecimal] = None  # stored as cents
+    model_config = ConfigDict(from_attributes=True)
+
+# --- Recurring Expense Schemas ---
+
+
+class RecurringExpenseCreate(BaseModel):
+    description: str = Field(..., min_length=1, max_length=255)
+    amount: Decimal = Field(..., gt=0)
+    day_of_month: int = Field(1, ge=1, le=31)
+    category_id: Optional[int] = None
+    account_id: Optional[int] = None  # defaults to the default bank account
+    start_month: date
+    end_month: Optional[date] = None
+
+    @field_validator('start_month', 'end_month')
+    @classmethod
+    def ensure_first_day_of_month(cls, v: Optional[date]) -> Optional[date]:
+        if v is not None and v.day != 1:
+            return date(v.year, v.month, 1)
+        return v
+
+    @model_validator(mode='after')
+    def validate_range(self) -> 'RecurringExpenseCreate':
+        if self.end_month is not None and self.end_month < self.start_month:
+            raise ValueError("end_month must not be before start_month")
+        return self
+
+
+class RecurringExpenseSchema(BaseModel):
+    id: int
+    description: str
+    amount: MoneyDecimal  # stored as cents
+    day_of_month: int
+    category_id: Optional[int] = None
+    account_id: Optional[int] = None
+    start_month: date
+    end_month: Optional[date] = None
+    is_active: bool
+    model_config = ConfigDict(from_attributes=True)
+
 # --- Expense Schemas ---
 
 
@@ -39,21 +98,25 @@ class ExpenseBase(BaseModel):
     amount: Decimal = Field(..., gt=0, description="Amount spent.")
     description: str = Field(..., min_length=1, max_length=255)
     date_logged: Optional[datetime] = Field(default_factory=datetime.now)
+    category_id: Optional[int] = None
 
 
 class ExpenseCreate(ExpenseBase):
-    pass
+    # Client-generated key; a retried submit with the same key is rejected by the unique index.
+    idempotency_key: Optional[str] = Field(None, max_length=64)
 
 
 class ExpenseUpdate(BaseModel):
     amount: Optional[Decimal] = Field(None, gt=0)
     description: Optional[str] = Field(None, min_length=1, max_length=255)
     date_logged: Optional[datetime] = Field(None)
+    category_id: Optional[int] = None
 
 
 class ExpenseSchema(ExpenseBase):
+    amount: MoneyDecimal  # stored as cents
     id: int
-    user_id: int
+    user_id: Optional[int] = None
     date_logged: datetime
     balance_after_this_expense_in_month: Optional[Decimal] = None
     created_at: datetime
@@ -75,6 +138,7 @@ class ExpenseFilterInputSchema(BaseModel):  # Input from View to Service
     page: int = Field(1, gt=0)
     page_size: int = Field(10, gt=0, le=100)
     sort_by: Optional[str] = None  # e.g., "date_logged", "-amount"
+    search: Optional[str] = Field(None, max_length=100)  # full-text search over descriptions
 
     @field_validator('filter_month_year')
     @classmethod
@@ -88,12 +152,190 @@ class ExpenseFilterInputSchema(BaseModel):  # Input from View to Service
             raise ValueError("filter_month_year must be in YYYY-MM format")
 
 
+# --- Month Close Schemas ---
+
+
+class MonthCloseInputSchema(BaseModel):  # Input from View to Service
+    month_year: str  # YYYY-MM
+
+    @field_validator('month_year')
+    @classmethod
+    def validate_month_year_format(cls, v: str) -> str:
+        try:
+            datetime.strptime(v, "%Y-%m")
+            return v
+        except ValueError:
+            raise ValueError("month_year must be in YYYY-MM format")
+
+
+class ClosedMonthSchema(BaseModel):
+    month_year: date
+    salary_amount: MoneyDecimal  # stored as cents
+    total_spent: MoneyDecimal
+    expense_count: int
+    total_debit: MoneyDecimal
+    total_credit: MoneyDecimal
+    closed_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
 class MonthlyLogContextData(BaseModel):  # Output from Service to View
     current_salary: Optional[MonthlySalarySchema] = None
-    total_spent_for_period: Decimal = Decimal('0.00')  # Renamed for clarity
-    saved_amount_for_period: Decimal = Decimal('0.00')  # Renamed for clarity
+    total_spent_for_period: MoneyDecimal = Decimal('0.00')  # Renamed for clarity
+    saved_amount_for_period: MoneyDecimal = Decimal('0.00')  # Renamed for clarity
     expenses: List[ExpenseSchema] = []
     date_filters: List[DateFilterSchema] = []
     pagination: PaginationDetails
+    # Set when the month shown is closed; its rows then come from the archive and are read-only
+    closed_month: Optional[ClosedMonthSchema] = None
     # For templates, direct access to current filters might be useful
     current_filters_applied: ExpenseFilterInputSchema
+
+
+# --- Category Breakdown Schemas ---
+
+
+class CategorySpendRow(BaseModel):
+    category_id: int
+    name: str
+    total_spent: MoneyDecimal
+    expense_count: int
+    monthly_budget: Optional[MoneyDecimal] = None
+    budget_remaining: Optional[MoneyDecimal] = None  # negative once over budget
+
+
+class CategoryBreakdownSchema(BaseModel):  # Output from Service to View
+    month_year: str  # YYYY-MM
+    categories: List[CategorySpendRow] = []
+    uncategorised_spent: MoneyDecimal = Decimal('0.00')
+    total_spent: MoneyDecimal = Decimal('0.00')
+
+
+# --- Chart Data Schemas ---
+
+
+class ChartDataFilterInputSchema(BaseModel):  # Input from View to Service
+    start_date: date
+    end_date: date
+
+    @model_validator(mode='after')
+    def validate_range(self) -> 'ChartDataFilterInputSchema':
+        if self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        if (self.end_date - self.start_date).days > CHART_MAX_RANGE_DAYS:
+            raise ValueError(f"chart range is limited to {CHART_MAX_RANGE_DAYS} days")
+        return self
+
+
+class DailySpendPoint(BaseModel):
+    date: date
+    total_spent: MoneyDecimal
+
+
+class CumulativeSpendPoint(BaseModel):
+    date: date
+    cumulative_spent: MoneyDecimal  # running total within the calendar month
+    salary_amount: MoneyDecimal
+
+
+class MonthlyFlowPoint(BaseModel):
+    month_year: str  # YYYY-MM
+    total_debit: MoneyDecimal
+    total_credit: MoneyDecimal
+
+
+class ChartDataSchema(BaseModel):  # Output from Service to View
+    start_date: date
+    end_date: date
+    daily_spend: List[DailySpendPoint] = []
+    cumulative_spend: List[CumulativeSpendPoint] = []
+    monthly_flow: List[MonthlyFlowPoint] = []
+
+
+# --- Forecast Schemas ---
+
+
+class WhatIfScenarioInput(BaseModel):
+    # Name of the category the cut applies to, matched case-insensitively
+    group: str = Field(..., min_length=1, max_length=255)
+    cut_percent: float = Field(..., gt=0, le=100)
+
+
+class ForecastInputSchema(BaseModel):  # Input from View to Service
+    month_year: str  # YYYY-MM being projected
+    history_months: int = Field(6, gt=0, le=36)
+    horizon_months: int = Field(12, gt=0, le=60)
+    scenarios: List[WhatIfScenarioInput] = []
+
+    @field_validator('month_year')
+    @classmethod
+    def validate_month_year_format(cls, v: str) -> str:
+        try:
+            datetime.strptime(v, "%Y-%m")
+            return v
+        except ValueError:
+            raise ValueError("month_year must be in YYYY-MM format")
+
+
+class ScenarioProjection(BaseModel):
+    label: str
+    monthly_spend: MoneyDecimal
+    monthly_savings: MoneyDecimal
+    cumulative_savings: List[MoneyDecimal] = []  # one point per horizon month
+    savings_delta: MoneyDecimal  # versus the baseline at the end of the horizon
+
+
+class ForecastSchema(BaseModel):  # Output from Service to View
+    month_year: str
+    days_elapsed: int
+    days_in_month: int
+    history_months_used: int
+    salary_amount: MoneyDecimal
+    spent_to_date: MoneyDecimal
+    projected_spend: MoneyDecimal
+    projected_savings: MoneyDecimal
+    projected_bank_balance: Optional[MoneyDecimal] = None
+    scenarios: List[ScenarioProjection] = []
+
+
+# --- Month Comparison Schemas ---
+
+
+class MonthRangeInputSchema(BaseModel):  # Input from View to Service
+    start_month: str  # YYYY-MM
+    end_month: str  # YYYY-MM
+
+    @field_validator('start_month', 'end_month')
+    @classmethod
+    def validate_month_year_format(cls, v: str) -> str:
+        try:
+            datetime.strptime(v, "%Y-%m")
+            return v
+        except ValueError:
+            raise ValueError("months must be in YYYY-MM format")
+
+    @model_validator(mode='after')
+    def validate_range(self) -> 'MonthRangeInputSchema':
+        if self.end_month < self.start_month:
+            raise ValueError("end_month must not be before start_month")
+        start_year, start_month = map(int, self.start_month.split('-'))
+        end_year, end_month = map(int, self.end_month.split('-'))
+        if (end_year - start_year) * 12 + end_month - start_month >= COMPARISON_MAX_MONTHS:
+            raise ValueError(f"comparison is limited to {COMPARISON_MAX_MONTHS} months")
+        return self
+
+
+class MonthComparisonRow(BaseModel):
+    month_year: str  # YYYY-MM
+    salary_amount: MoneyDecimal
+    total_spent: MoneyDecimal
+    saved_amount: MoneyDecimal
+    expense_count: int
+
+
+class MonthComparisonSchema(BaseModel):  # Output from Service to View
+    months: List[MonthComparisonRow] = []
+    total_salary: MoneyDecimal = Decimal('0.00')
+    total_spent: MoneyDecimal = Decimal('0.00')
+    total_saved: MoneyDecimal = Decimal('0.00')
+    total_expense_count: int = 0
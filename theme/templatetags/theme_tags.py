@@ -0,0 +1,21 @@
+import time
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def theme_stylesheet():
+    """
+    Link to the compiled Tailwind CSS, as django-tailwind's tailwind_css renders it; the
+    production profile leaves django-tailwind out. With DEBUG on, a time-based suffix
+    keeps the browser from caching the stylesheet between builds.
+    """
+    href = static(getattr(settings, 'TAILWIND_CSS_PATH', 'css/dist/styles.css'))
+    if settings.DEBUG:
+        href = f"{href}?v={int(time.time())}"
+    return format_html('<link rel="stylesheet" type="text/css" href="{}">', href)
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+
+class CottonRenderingTests(TestCase):
+    """ Pages are built from cotton components, which the template engine must expand """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('cotton', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_pages_expand_cotton_components(self):
+        for name in ('monthly_log:monthly_log_main', 'bank_balance_log:bank_log_main'):
+            with self.subTest(page=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, '<c-')
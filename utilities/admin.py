@@ -0,0 +1,132 @@
+# utilities/admin.py
+from typing import Optional
+
+from django import forms
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.lookups import Exact
+from django.utils.functional import cached_property
+
+from schema.list_schema import ListServiceConfig
+from utilities.list_service import ListService
+from utilities.money import from_cents
+from utilities.tenancy import get_current_user_id
+
+# Below this many rows an exact COUNT(*) is cheap, so it is used even when an estimate exists.
+ESTIMATE_MIN_ROWS = 10000
+
+
+def _tenant_only_filter(queryset: QuerySet) -> Optional[bool]:
+    """ False for an unfiltered queryset, True when it only filters on user_id, None otherwise """
+    conditions = queryset.query.where.children
+    if not conditions:
+        return False
+    if len(conditions) == 1 and isinstance(conditions[0], Exact) \
+            and getattr(conditions[0].lhs, 'target', None) is not None \
+            and conditions[0].lhs.target.attname == 'user_id':
+        return True
+    return None
+
+
+def estimated_row_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Row count of `queryset` from the database statistics, without scanning the table:
+    ``sqlite_stat1`` on SQLite (present after ANALYZE), ``pg_class.reltuples`` on PostgreSQL.
+    Only unfiltered and tenant-only querysets can be estimated; None otherwise, or when
+    there are no statistics yet.
+    """
+    tenant_only = _tenant_only_filter(queryset)
+    if tenant_only is None:
+        return None
+    model = queryset.model
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            if tenant_only:
+                # "rows rows-per-user ..." for an index led by the owner column
+                user_indexes = [index.name for index in model._meta.indexes if index.fields[0] == 'user']
+                if not user_indexes:
+                    return None
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx = %s",
+                               [model._meta.db_table, user_indexes[0]])
+                row = cursor.fetchone()
+                return int(row[0].split()[1]) if row else None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [model._meta.db_table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql' and not tenant_only:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Takes the changelist's total from estimated_row_count() when the table is large and unfiltered """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimated_row_count(self.object_list)
+            if estimate is not None and estimate >= ESTIMATE_MIN_ROWS:
+                return estimate
+        return super().count
+
+
+class TenantModelForm(forms.ModelForm):
+    """
+    ModelForm that also validates the unique constraints led by `user`. That field is not
+    editable, so ModelForm leaves it out of validate_unique() and a duplicate would only
+    surface as an IntegrityError on save; the instance is stamped with the current tenant
+    (as save() would) and the constraints are checked with it.
+    """
+
+    def validate_unique(self):
+        if self.instance.user_id is None:
+            self.instance.user_id = get_current_user_id()
+        try:
+            self.instance.validate_unique(exclude=self._get_validation_exclusions() - {'user'})
+        except ValidationError as e:
+            self._update_errors(e)
+
+
+class LedgerModelAdmin(admin.ModelAdmin):
+    """
+    Base admin for the large per-user ledger tables:
+
+    * no full-table COUNT(*) (show_full_result_count=False + EstimatedCountPaginator);
+    * search goes through the model's FTS5 index (the same path as the list pages)
+      instead of an icontains scan over every text column;
+    * subclasses set date_hierarchy to a column that leads one of the model's indexes
+      and list_select_related for the foreign keys they display;
+    * the change form checks the per-user unique constraints (TenantModelForm).
+    """
+    form = TenantModelForm
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    list_per_page = 50
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not self.search_fields:
+            return super().get_search_results(request, queryset, search_term)
+        config = ListServiceConfig(
+            app=self.model._meta.app_label, model=self.model.__name__,
+            query=search_term, hidden_columns=[],
+        )
+        searched, _ = ListService.search(config, queryset)
+        return searched, False
+
+
+def money_display(field_name: str, description: str):
+    """ ModelAdmin method (assign it to a class attribute) showing a cents column as a decimal amount """
+    @admin.display(description=description, ordering=field_name)
+    def display(modeladmin, obj):
+        value = getattr(obj, field_name)
+        return from_cents(value) if value is not None else None
+    return display
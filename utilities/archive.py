@@ -0,0 +1,93 @@
+# utilities/archive.py
+from datetime import date, datetime
+from typing import Optional, Union
+
+from django.apps import apps
+from django.db import connections, models
+from django.db.models import QuerySet
+from django.utils import timezone
+
+# Ledger models opt in to month archival by naming their archive model in an
+# ``ARCHIVE_MODEL`` attribute ("app_label.ModelName"). The archive model has the same
+# column names (primary key included), so rows move between the two keeping their ids.
+# Which months are closed is recorded by month_log.ClosedMonth, one row per user and month.
+CLOSED_MONTH_MODEL = ('month_log', 'ClosedMonth')
+
+
+class MonthClosedError(Exception):
+    """ Raised when a write would land in a closed (archived) month """
+
+    def __init__(self, month_year: date):
+        self.month_year = month_year
+        super().__init__(month_year.strftime('%b %Y'))
+
+
+def month_of(value: Union[date, datetime]) -> date:
+    """ First day of the local month `value` falls in """
+    if isinstance(value, datetime):
+        value = timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def is_month_closed(value: Union[date, datetime]) -> bool:
+    """ Whether the current tenant's month containing `value` is closed """
+    closed_month = apps.get_model(*CLOSED_MONTH_MODEL)
+    return closed_month._default_manager.filter(month_year=month_of(value)).exists()
+
+
+def ensure_month_open(*values: Optional[Union[date, datetime]]) -> None:
+    """ Raises MonthClosedError for the first of `values` in a closed month; call inside the write's transaction """
+    for value in values:
+        if value is not None and is_month_closed(value):
+            raise MonthClosedError(month_of(value))
+
+
+def get_archive_model(model: type[models.Model]) -> type[models.Model]:
+    return apps.get_model(model.ARCHIVE_MODEL)
+
+
+def source_model_for(model: type[models.Model], month_year: date) -> type[models.Model]:
+    """ `model`'s archive when the tenant closed `month_year`, else `model` itself """
+    return get_archive_model(model) if is_month_closed(month_year) else model
+
+
+def delete_rows(queryset: QuerySet) -> int:
+    """
+    Deletes the rows of `queryset` with one DELETE ... WHERE pk IN (<the queryset's SELECT>)
+    and returns how many went. Unlike QuerySet.delete() nothing is collected in Python and
+    no signals are sent, so on_delete is left to the database's foreign keys; meant for
+    tables nothing references, or for callers that delete the referencing rows first.
+    """
+    connection = connections[queryset.db]
+    select_sql, params = queryset.order_by().values_list('pk').query \
+        .get_compiler(connection=connection).as_sql()
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    pk_column = connection.ops.quote_name(queryset.model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {pk_column} IN ({select_sql})", params)
+        return cursor.rowcount
+
+
+def move_rows(queryset: QuerySet, target_model: type[models.Model]) -> int:
+    """
+    Moves every row of `queryset` into `target_model` (the columns the two share, ids
+    included) with one INSERT ... SELECT and one DELETE (see delete_rows); run inside a transaction.
+    Nothing passes through Python, so save() hooks and auto_now fields don't touch the
+    rows: fingerprints and timestamps come across unchanged. FTS triggers on either
+    table still fire. Target columns not in the source take their database default.
+    """
+    target_columns = {field.column for field in target_model._meta.concrete_fields}
+    fields = [field for field in queryset.model._meta.concrete_fields if field.column in target_columns]
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    select_sql, params = queryset.values_list(*[field.attname for field in fields]).query \
+        .get_compiler(connection=connection).as_sql()
+    column_list = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(target_model._meta.db_table)} ({column_list}) {select_sql}",
+            params)
+        moved = cursor.rowcount
+    if moved:
+        delete_rows(queryset)
+    return moved
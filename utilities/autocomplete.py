@@ -0,0 +1,159 @@
+# utilities/autocomplete.py
+import heapq
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from utilities.fingerprint import normalize_description
+from utilities.tenancy import get_current_user_id
+
+# A description used this many days ago counts half as much as one used today.
+RECENCY_HALF_LIFE_DAYS = 30
+DEFAULT_SUGGESTION_LIMIT = 8
+
+
+class _Entry:
+    __slots__ = ('display', 'count', 'last_used')
+
+    def __init__(self, display: str, count: int, last_used: datetime):
+        self.display = display
+        self.count = count
+        self.last_used = last_used
+
+
+class _Partition:
+    """ One tenant's sorted keys and entries """
+    __slots__ = ('keys', 'entries', 'built')
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.entries: Dict[str, _Entry] = {}
+        self.built = False
+
+
+class DescriptionIndex:
+    """
+    Per-process autocomplete over a model's ``description`` column.
+
+    Normalised descriptions are kept in a sorted list, so a prefix lookup is a bisect
+    plus a top-k pick over the matching slice, scored by use count decayed by recency.
+    The index is built lazily from one GROUP BY query and then kept current through
+    record()/forget() by the service that writes the rows; other processes catch up
+    on their next restart.
+
+    Each tenant (see utilities.tenancy) gets its own partition, built on its first
+    lookup from the rows the tenant-scoped default manager returns.
+    """
+
+    def __init__(self, app_label: str, model_name: str):
+        self.app_label = app_label
+        self.model_name = model_name
+        self._partitions: Dict[Optional[int], _Partition] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self) -> _Partition:
+        tenant_id = get_current_user_id()
+        partition = self._partitions.get(tenant_id)
+        if partition is None:
+            with self._lock:
+                partition = self._partitions.setdefault(tenant_id, _Partition())
+        return partition
+
+    def _build(self, partition: _Partition) -> None:
+        model = apps.get_model(self.app_label, self.model_name)
+        rows = model._default_manager.order_by().values('description').annotate(
+            count=Count('id'), last_used=Max('date_logged'))
+        entries: Dict[str, _Entry] = {}
+        variant_counts: Dict[str, int] = {}
+        for row in rows:
+            key = normalize_description(row['description'])
+            if not key:
+                continue
+            entry = entries.get(key)
+            if entry is None:
+                entries[key] = _Entry(row['description'].strip(), row['count'], row['last_used'])
+                variant_counts[key] = row['count']
+                continue
+            entry.count += row['count']
+            entry.last_used = max(entry.last_used, row['last_used'])
+            # Show the spelling people use most often.
+            if row['count'] > variant_counts[key]:
+                entry.display, variant_counts[key] = row['description'].strip(), row['count']
+        partition.entries = entries
+        partition.keys = sorted(entries)
+        partition.built = True
+
+    @property
+    def built(self) -> bool:
+        """ Whether the current tenant's partition is built """
+        return self._partition().built
+
+    def ensure_built(self) -> None:
+        """ Builds the current tenant's partition if needed; the only method that can touch the database """
+        partition = self._partition()
+        if not partition.built:
+            with self._lock:
+                if not partition.built:
+                    self._build(partition)
+
+    def record(self, description: str, used_at: Optional[datetime] = None) -> None:
+        """ Counts one more use of `description`; call after the row is committed """
+        partition = self._partition()
+        if not partition.built:
+            return  # the lazy build will read the committed row anyway
+        key = normalize_description(description)
+        if not key:
+            return
+        used_at = used_at or timezone.now()
+        with self._lock:
+            entry = partition.entries.get(key)
+            if entry is None:
+                partition.entries[key] = _Entry(description.strip(), 1, used_at)
+                insort(partition.keys, key)
+            else:
+                entry.count += 1
+                entry.last_used = max(entry.last_used, used_at)
+
+    def forget(self, description: str) -> None:
+        """ Reverses one record(), e.g. when the row is deleted """
+        partition = self._partition()
+        if not partition.built:
+            return
+        key = normalize_description(description)
+        with self._lock:
+            entry = partition.entries.get(key)
+            if entry is None:
+                return
+            entry.count -= 1
+            if entry.count <= 0:
+                del partition.entries[key]
+                del partition.keys[bisect_left(partition.keys, key)]
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_SUGGESTION_LIMIT) -> List[str]:
+        self.ensure_built()
+        key = normalize_description(prefix)
+        if not key:
+            return []
+        partition = self._partition()
+        now = timezone.now()
+        with self._lock:
+            start = bisect_left(partition.keys, key)
+            # Every key starting with `key` sorts before key + U+10FFFF.
+            end = bisect_left(partition.keys, key + '\U0010ffff', start)
+            candidates = [partition.entries[k] for k in partition.keys[start:end]]
+
+        def score(entry: _Entry) -> float:
+            age_days = max((now - entry.last_used).total_seconds(), 0) / 86400
+            return entry.count * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+        return [entry.display for entry in heapq.nlargest(limit, candidates, key=score)]
+
+    def reset(self) -> None:
+        """ Drops every partition; the next suggest() rebuilds from the database """
+        with self._lock:
+            self._partitions = {}
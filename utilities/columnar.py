@@ -0,0 +1,355 @@
+# utilities/columnar.py
+"""
+Column-at-a-time storage for in-memory tables (see utilities.grid.SortedGrid).
+
+Each column is one typed array instead of a field in millions of dicts:
+
+    numeric     a numpy array of the schema's dtype ('int8' ... 'int64', 'float64')
+    category    codes into a table of the distinct values (uint16, widened to uint32
+                past 65,535 values); for low-cardinality strings such as a city
+    text        UTF-8 bytes back to back, with int64 end offsets (rows + 1), as in
+                utilities.snapshot
+
+A store can be saved to a directory (manifest.json plus one .npy/.utf8 file per array,
+the snapshot layout) and opened memory-mapped: the arrays then live in the page cache,
+shared by every process that opens the same directory, and the store is read-only.
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+STORE_FORMAT = 'column-store'
+STORE_VERSION = 1
+CATEGORY = 'category'
+TEXT = 'text'
+
+
+class ColumnStoreError(Exception):
+    pass
+
+
+class _Growable:
+    """ A numpy array with spare capacity at the end, so appends are amortised O(1) """
+
+    def __init__(self, values: np.ndarray):
+        self._data = values
+        self._size = len(values)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._size]
+
+    def append(self, value: Any) -> None:
+        if self._size == len(self._data):
+            grown = np.empty(max(16, 2 * self._size), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def astype(self, dtype: Any) -> '_Growable':
+        return _Growable(self.values.astype(dtype))
+
+
+class _NumericColumn:
+    def __init__(self, kind: str, values: np.ndarray):
+        self.kind = kind
+        self._values = _Growable(values)
+
+    @classmethod
+    def build(cls, kind: str, values: List[Any]) -> '_NumericColumn':
+        return cls(kind, np.array(values, dtype=kind))
+
+    def __getitem__(self, index: int) -> Any:
+        return self._values.values[index].item()
+
+    def __setitem__(self, index: int, value: Any) -> None:
+        self._values.values[index] = value
+
+    def take(self, indexes: np.ndarray) -> List[Any]:
+        return self._values.values[indexes].tolist()
+
+    def append(self, value: Any) -> None:
+        self._values.append(value)
+
+    def sort_order(self) -> np.ndarray:
+        return np.argsort(self._values.values, kind='stable')
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'.npy': self._values.values}
+
+    def manifest(self) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def load(cls, kind: str, arrays: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> '_NumericColumn':
+        return cls(kind, arrays['.npy'])
+
+    def nbytes(self) -> int:
+        return self._values.values.nbytes
+
+
+class _CategoryColumn:
+    """ Codes into `values`; the codes follow first appearance, so sorting maps them to ranks first """
+    kind = CATEGORY
+
+    def __init__(self, codes: np.ndarray, values: List[str]):
+        self._codes = _Growable(codes)
+        self.values = values
+        self._code_of = {value: code for code, value in enumerate(values)}
+
+    @staticmethod
+    def _code_dtype(distinct: int) -> Any:
+        return np.uint16 if distinct <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+    @classmethod
+    def build(cls, kind: str, values: List[str]) -> '_CategoryColumn':
+        code_of: Dict[str, int] = {}
+        codes = [code_of.setdefault(value, len(code_of)) for value in values]
+        return cls(np.array(codes, dtype=cls._code_dtype(len(code_of))), list(code_of))
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[self._codes.values[index]]
+
+    def _code(self, value: str) -> int:
+        code = self._code_of.get(value)
+        if code is None:
+            code = self._code_of[value] = len(self.values)
+            self.values.append(value)
+            if self._code_dtype(len(self.values)) != self._codes.values.dtype:
+                self._codes = self._codes.astype(np.uint32)
+        return code
+
+    def __setitem__(self, index: int, value: str) -> None:
+        self._codes.values[index] = self._code(value)
+
+    def take(self, indexes: np.ndarray) -> List[str]:
+        values = self.values
+        return [values[code] for code in self._codes.values[indexes].tolist()]
+
+    def append(self, value: str) -> None:
+        self._codes.append(self._code(value))
+
+    def sort_order(self) -> np.ndarray:
+        ranks = np.empty(len(self.values), dtype=np.uint32)
+        ranks[sorted(range(len(self.values)), key=self.values.__getitem__)] = np.arange(len(self.values))
+        return np.argsort(ranks[self._codes.values], kind='stable')
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'.npy': self._codes.values}
+
+    def manifest(self) -> Dict[str, Any]:
+        return {'values': self.values}
+
+    @classmethod
+    def load(cls, kind: str, arrays: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> '_CategoryColumn':
+        return cls(arrays['.npy'], manifest['values'])
+
+    def nbytes(self) -> int:
+        return self._codes.values.nbytes + sum(len(value.encode()) for value in self.values)
+
+
+class _TextColumn:
+    """ UTF-8 values back to back; replacing one shifts the bytes after it (O(n), like a list insert) """
+    kind = TEXT
+
+    def __init__(self, offsets: np.ndarray, blob: Any):
+        self._offsets = _Growable(offsets)
+        self._blob = blob
+
+    @classmethod
+    def build(cls, kind: str, values: List[str]) -> '_TextColumn':
+        encoded = [value.encode() for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(offsets, bytearray(b''.join(encoded)))
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        offsets = self._offsets.values
+        if index < 0:
+            index += len(offsets) - 1
+        return int(offsets[index]), int(offsets[index + 1])
+
+    def __getitem__(self, index: int) -> str:
+        start, end = self._bounds(index)
+        return bytes(self._blob[start:end]).decode()
+
+    def __setitem__(self, index: int, value: str) -> None:
+        start, end = self._bounds(index)
+        encoded = value.encode()
+        self._blob[start:end] = encoded
+        self._offsets.values[index + 1:] += len(encoded) - (end - start)
+
+    def take(self, indexes: np.ndarray) -> List[str]:
+        offsets = self._offsets.values
+        blob = self._blob
+        return [bytes(blob[start:end]).decode()
+                for start, end in zip(offsets[indexes].tolist(), offsets[indexes + 1].tolist())]
+
+    def append(self, value: str) -> None:
+        self._blob += value.encode()
+        self._offsets.append(len(self._blob))
+
+    def sort_order(self) -> np.ndarray:
+        offsets = self._offsets.values.tolist()
+        blob = bytes(self._blob)
+        # Fixed-width byte strings sort in UTF-8 byte order, which is code point order, as str does.
+        encoded = np.array([blob[start:end] for start, end in zip(offsets, offsets[1:])], dtype=np.bytes_)
+        return np.argsort(encoded, kind='stable')
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        offsets = self._offsets.values
+        return {'.offsets.npy': offsets, '.utf8': np.frombuffer(self._blob, dtype=np.uint8)[:int(offsets[-1])]}
+
+    def manifest(self) -> Dict[str, Any]:
+        return {}
+
+    @classmethod
+    def load(cls, kind: str, arrays: Dict[str, np.ndarray], manifest: Dict[str, Any]) -> '_TextColumn':
+        return cls(arrays['.offsets.npy'], arrays['.utf8'])
+
+    def nbytes(self) -> int:
+        return self._offsets.values.nbytes + int(self._offsets.values[-1])
+
+
+def _column_class(kind: str):
+    if kind == CATEGORY:
+        return _CategoryColumn
+    if kind == TEXT:
+        return _TextColumn
+    try:
+        np.dtype(kind)
+    except TypeError:
+        raise ColumnStoreError(f"Unknown column kind '{kind}'")
+    return _NumericColumn
+
+
+class ColumnStore:
+    """
+    Rows kept column by column. Reads and writes go through row indexes: store[i] builds
+    the row's dict, value(column, i) reads one field, and sort_order(column) returns the
+    stable ascending permutation computed on the column's array.
+    """
+
+    def __init__(self, schema: Dict[str, str], columns: Dict[str, Any], rows: int, read_only: bool = False):
+        self.schema = dict(schema)
+        self._columns = columns
+        self._rows = rows
+        self.read_only = read_only
+
+    @classmethod
+    def from_rows(cls, schema: Dict[str, str], rows: Iterable[Dict[str, Any]]) -> 'ColumnStore':
+        values: Dict[str, List[Any]] = {name: [] for name in schema}
+        appenders = [(name, values[name].append) for name in schema]
+        count = 0
+        for row in rows:
+            for name, append in appenders:
+                append(row[name])
+            count += 1
+        columns = {name: _column_class(kind).build(kind, values.pop(name)) for name, kind in schema.items()}
+        return cls(schema, columns, count)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.schema)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if not -self._rows <= index < self._rows:
+            raise IndexError(index)
+        return {name: column[index] for name, column in self._columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[index] for index in range(self._rows))
+
+    def take(self, indexes: List[int]) -> List[Dict[str, Any]]:
+        """ The rows at `indexes`, reading each column once """
+        names = list(self._columns)
+        positions = np.asarray(indexes, dtype=np.intp)
+        values = [self._columns[name].take(positions) for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def value(self, column: str, index: int) -> Any:
+        return self._columns[column][index]
+
+    def sort_order(self, column: str) -> np.ndarray:
+        return self._columns[column].sort_order()
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ColumnStoreError("The store is memory-mapped read-only; build a new one and swap it in")
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self._check_writable()
+        for name, column in self._columns.items():
+            column.append(row[name])
+        self._rows += 1
+
+    def update(self, index: int, changes: Dict[str, Any]) -> None:
+        self._check_writable()
+        for name, value in changes.items():
+            self._columns[name][index] = value
+
+    def nbytes(self) -> Dict[str, int]:
+        """ Bytes held per column: arrays plus category value tables """
+        return {name: column.nbytes() for name, column in self._columns.items()}
+
+    # --- Files ---
+
+    def save(self, directory: Path) -> None:
+        """
+        Writes the store under `directory`, through a sibling temporary directory renamed
+        into place, so concurrent openers see all of it or nothing. If another process
+        got there first, its copy is kept.
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f'.{directory.name}.', dir=directory.parent))
+        manifest = {'format': STORE_FORMAT, 'version': STORE_VERSION, 'rows': self._rows, 'columns': []}
+        try:
+            for name, column in self._columns.items():
+                for suffix, array in column.arrays().items():
+                    if suffix.endswith('.npy'):
+                        np.save(staging / f'{name}{suffix}', np.ascontiguousarray(array))
+                    else:
+                        array.tofile(staging / f'{name}{suffix}')
+                manifest['columns'].append({'name': name, 'kind': self.schema[name], **column.manifest()})
+            (staging / 'manifest.json').write_text(json.dumps(manifest))
+            os.rename(staging, directory)
+        except OSError:
+            if not (directory / 'manifest.json').exists():
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @classmethod
+    def open(cls, directory: Path, schema: Optional[Dict[str, str]] = None) -> 'ColumnStore':
+        """ Memory-maps a saved store; `schema`, when given, must match the saved one """
+        directory = Path(directory)
+        manifest = json.loads((directory / 'manifest.json').read_text())
+        if manifest.get('format') != STORE_FORMAT or manifest.get('version') != STORE_VERSION:
+            raise ColumnStoreError(f"{directory} is not a version {STORE_VERSION} column store")
+        saved_schema = {column['name']: column['kind'] for column in manifest['columns']}
+        if schema is not None and saved_schema != dict(schema):
+            raise ColumnStoreError(f"{directory} holds columns {saved_schema}, expected {dict(schema)}")
+
+        columns = {}
+        for column in manifest['columns']:
+            arrays = {}
+            for path in directory.glob(f"{column['name']}.*"):
+                suffix = path.name[len(column['name']):]
+                if suffix.endswith('.npy'):
+                    arrays[suffix] = np.load(path, mmap_mode='r') if path.stat().st_size else np.empty(0)
+                elif path.stat().st_size:
+                    arrays[suffix] = np.memmap(path, dtype=np.uint8, mode='r')
+                else:
+                    arrays[suffix] = np.empty(0, dtype=np.uint8)
+            columns[column['name']] = _column_class(column['kind']).load(column['kind'], arrays, column)
+        return cls(saved_schema, columns, manifest['rows'], read_only=True)
@@ -0,0 +1,20 @@
+# utilities/dates.py
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from django.utils import timezone
+
+
+def add_month(month_start: date) -> date:
+    """ First day of the month after `month_start` """
+    return date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+
+
+def day_bounds(start: date, end: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    Aware [start, end) datetimes covering whole local days; `end` defaults to the day after `start`.
+    Range filters on date_logged can use its index, unlike __date/__year/__month lookups.
+    """
+    end = end or start + timedelta(days=1)
+    return (timezone.make_aware(datetime.combine(start, datetime.min.time())),
+            timezone.make_aware(datetime.combine(end, datetime.min.time())))
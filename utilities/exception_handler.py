@@ -1,116 +1,123 @@
+import functools
 import logging
-import inspect
-import traceback
+import sys
+from typing import Callable, Dict, NamedTuple, Optional
+
+from asgiref.sync import iscoroutinefunction
 from django.core.exceptions import (
     ValidationError, ObjectDoesNotExist, PermissionDenied, SuspiciousOperation
 )
 from django.db import DatabaseError, IntegrityError, OperationalError, DataError
 from django.http import Http404
 from django.utils.translation import gettext as _
-from utilities.variables import ExceptionMessages  
+from utilities.variables import ExceptionMessages
 
 logger = logging.getLogger(__name__)
 
-def get_class_function_name():
+
+class ExceptionRule(NamedTuple):
+    level: int
+    label: str
+    # Translated message of the exception raised in its place; None re-raises the original.
+    message: Optional[str]
+    exc_info: bool = True
+
+
+# Looked up along the exception's MRO, so the most specific class listed wins
+# (IntegrityError before DatabaseError, FileNotFoundError before OSError, ...).
+EXCEPTION_RULES: Dict[type, ExceptionRule] = {
+    ValidationError: ExceptionRule(logging.ERROR, "Validation error", ExceptionMessages.VALIDATION_ERROR),
+    ObjectDoesNotExist: ExceptionRule(logging.ERROR, "Object not found", ExceptionMessages.NOT_FOUND),
+    PermissionDenied: ExceptionRule(logging.WARNING, "Permission denied", ExceptionMessages.PERMISSION_DENIED, False),
+    Http404: ExceptionRule(logging.ERROR, "Page not found", ExceptionMessages.NOT_FOUND, False),
+    IntegrityError: ExceptionRule(logging.ERROR, "Integrity error", ExceptionMessages.DATA_CONFLICT),
+    OperationalError: ExceptionRule(logging.ERROR, "Operational error", ExceptionMessages.SYSTEM_ERROR),
+    DataError: ExceptionRule(logging.ERROR, "Data error", ExceptionMessages.INVALID_FORMAT),
+    DatabaseError: ExceptionRule(logging.ERROR, "Database error", ExceptionMessages.DATABASE_ERROR),
+    SuspiciousOperation: ExceptionRule(logging.WARNING, "Suspicious operation detected",
+                                       ExceptionMessages.INVALID_REQUEST, False),
+    TypeError: ExceptionRule(logging.ERROR, "Type error", ExceptionMessages.TYPE_MISMATCH),
+    KeyError: ExceptionRule(logging.ERROR, "Key error", ExceptionMessages.MISSING_FIELDS),
+    AttributeError: ExceptionRule(logging.ERROR, "Attribute error", ExceptionMessages.ATTRIBUTE_ERROR),
+    IndexError: ExceptionRule(logging.ERROR, "Index error", ExceptionMessages.INDEX_OUT_OF_RANGE),
+    TimeoutError: ExceptionRule(logging.ERROR, "Timeout error", ExceptionMessages.TIMEOUT_ERROR),
+    ConnectionError: ExceptionRule(logging.ERROR, "Connection error", ExceptionMessages.CONNECTION_ERROR),
+    FileNotFoundError: ExceptionRule(logging.ERROR, "File not found", ExceptionMessages.FILE_NOT_FOUND),
+    OSError: ExceptionRule(logging.ERROR, "Input/output error", ExceptionMessages.REQUEST_FAILED),
+    MemoryError: ExceptionRule(logging.CRITICAL, "Memory error", ExceptionMessages.SYSTEM_ERROR),
+    ValueError: ExceptionRule(logging.ERROR, "Value error", None),
+}
+UNEXPECTED_RULE = ExceptionRule(logging.CRITICAL, "Unexpected error", ExceptionMessages.EXCEPTION_ERROR)
+
+# Concrete exception class -> (rule, class to raise), filled on first sight of each class.
+_resolved: Dict[type, tuple] = {}
+
+
+def _resolve(exception_class: type) -> tuple:
+    resolved = _resolved.get(exception_class)
+    if resolved is None:
+        for base in exception_class.__mro__:
+            if base in EXCEPTION_RULES:
+                resolved = (EXCEPTION_RULES[base], base)
+                break
+        else:
+            resolved = (UNEXPECTED_RULE, ValueError)
+        _resolved[exception_class] = resolved
+    return resolved
+
+
+def get_class_function_name(depth: int = 1) -> str:
     """
-    Dynamically retrieves the current class name and function name.
-    Returns: "ClassName.function_name" if inside a class, otherwise just "function_name".
+    Qualified name ("ClassName.function_name", or just "function_name") of the function
+    `depth` frames above the caller; the default names the function that called the caller.
+    Reads that one frame instead of building the whole stack with inspect.
     """
-    stack = inspect.stack()
-    class_name = stack[2].frame.f_locals.get("self", None).__class__.__name__ if "self" in stack[2].frame.f_locals else ""
-    function_name = stack[1].function  # Get the current function name
+    code = sys._getframe(depth + 1).f_code
+    return getattr(code, 'co_qualname', code.co_name)
 
-    return f"{class_name}.{function_name}" if class_name else function_name
 
-def handle_exception(e, extra_info=""):
+def handle_exception(e, extra_info="", location: Optional[str] = None):
     """
     Handles and logs exceptions dynamically across all service files.
-    
+
     Args:
         e: The exception object.
         extra_info (str): Additional context information (like ID or query details).
-    
+        location (str): Where it happened; defaults to the calling function's qualified name.
+
     Raises:
-        ValueError with an appropriate translated error message.
+        The EXCEPTION_RULES class matching `e` with a translated message, `e` itself
+        for a ValueError, and ValueError for anything unlisted.
     """
-    error_location = get_class_function_name()
-
-    if isinstance(e, ValidationError):
-        logger.exception(f"Validation error: {error_location} {extra_info}: {str(e)}")
-        raise ValidationError(_(ExceptionMessages.VALIDATION_ERROR))
-
-    elif isinstance(e, ObjectDoesNotExist):
-        logger.error(f"Object not found: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise ObjectDoesNotExist(_(ExceptionMessages.NOT_FOUND))
-
-    elif isinstance(e, PermissionDenied):
-        logger.warning(f"Permission denied: {error_location} {extra_info}: {str(e)}")
-        raise PermissionDenied(_(ExceptionMessages.PERMISSION_DENIED))
-
-    elif isinstance(e, Http404):
-        logger.error(f"Page not found: {error_location} {extra_info}: {str(e)}")
-        raise Http404(_(ExceptionMessages.NOT_FOUND))
-
-    elif isinstance(e, IntegrityError):
-        logger.error(f"Integrity error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise IntegrityError(_(ExceptionMessages.DATA_CONFLICT))
-
-    elif isinstance(e, DatabaseError):
-        logger.error(f"Database error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise DatabaseError(_(ExceptionMessages.DATABASE_ERROR))
-
-    elif isinstance(e, OperationalError):
-        logger.error(f"Operational error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise OperationalError(_(ExceptionMessages.SYSTEM_ERROR))
-
-    elif isinstance(e, DataError):
-        logger.error(f"Data error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise DataError(_(ExceptionMessages.INVALID_FORMAT))
-
-    elif isinstance(e, SuspiciousOperation):
-        logger.warning(f"Suspicious operation detected: {error_location} {extra_info}: {str(e)}")
-        raise SuspiciousOperation(_(ExceptionMessages.INVALID_REQUEST))
-
-    elif isinstance(e, TypeError):
-        logger.exception(f"Type error: {error_location} {extra_info}: {str(e)}")
-        raise TypeError(_(ExceptionMessages.TYPE_MISMATCH))
-
-    elif isinstance(e, KeyError):
-        logger.exception(f"Key error: {error_location} {extra_info}: {str(e)}")
-        raise KeyError(_(ExceptionMessages.MISSING_FIELDS))
-
-    elif isinstance(e, AttributeError):
-        logger.exception(f"Attribute error: {error_location} {extra_info}: {str(e)}")
-        raise AttributeError(_(ExceptionMessages.ATTRIBUTE_ERROR))
-
-    elif isinstance(e, IndexError):
-        logger.exception(f"Index error: {error_location} {extra_info}: {str(e)}")
-        raise IndexError(_(ExceptionMessages.INDEX_OUT_OF_RANGE))
-
-    elif isinstance(e, TimeoutError):
-        logger.error(f"Timeout error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise TimeoutError(_(ExceptionMessages.TIMEOUT_ERROR))
-
-    elif isinstance(e, ConnectionError):
-        logger.error(f"Connection error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise ConnectionError(_(ExceptionMessages.CONNECTION_ERROR))
-
-    elif isinstance(e, FileNotFoundError):
-        logger.error(f"File not found: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise FileNotFoundError(_(ExceptionMessages.FILE_NOT_FOUND))
-
-    elif isinstance(e, IOError):
-        logger.error(f"Input/output error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise IOError(_(ExceptionMessages.REQUEST_FAILED))
-
-    elif isinstance(e, MemoryError):
-        logger.critical(f"Memory error: {error_location} {extra_info}: {str(e)}", exc_info=True)
-        raise MemoryError(_(ExceptionMessages.SYSTEM_ERROR))
-
-    elif isinstance(e, ValueError):
-        logger.exception(f"Value error: {error_location} {extra_info}: {str(e)}")
+    rule, exception_class = _resolve(type(e))
+    if location is None:
+        location = get_class_function_name()
+    logger.log(rule.level, "%s: %s %s: %s", rule.label, location, extra_info, e, exc_info=rule.exc_info)
+    if rule.message is None:
         raise e
+    raise exception_class(_(rule.message))
 
-    else:
-        logger.critical(f"Unexpected error: {error_location} {extra_info}: {str(e)}\n{traceback.format_exc()}")
-        raise ValueError(_(ExceptionMessages.EXCEPTION_ERROR))
+
+def handles_exceptions(func: Callable) -> Callable:
+    """
+    Decorator sending every exception raised by `func` (sync or async) through
+    handle_exception(), with the location bound once from func.__qualname__.
+    """
+    location = func.__qualname__
+
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                handle_exception(e, location=location)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            handle_exception(e, location=location)
+    return wrapper
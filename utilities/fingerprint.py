@@ -0,0 +1,30 @@
+# utilities/fingerprint.py
+import hashlib
+import re
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_description(description: str) -> str:
+    """ Collapse whitespace and casefold so "Groceries " and "groceries" match """
+    return _WHITESPACE_RE.sub(" ", description or "").strip().casefold()
+
+
+def compute_fingerprint(kind: str, description: str, amount: Decimal, date_logged: datetime) -> str:
+    """
+    Builds the content hash used by the unique ``fingerprint`` columns.
+
+    The timestamp is normalised to UTC at second precision, so a double-submitted
+    form produces the same hash while two genuine entries on the same day do not.
+    """
+    if date_logged.tzinfo is not None:
+        date_logged = date_logged.astimezone(dt_timezone.utc)
+    payload = "|".join((
+        kind,
+        normalize_description(description),
+        str(Decimal(amount).quantize(Decimal('0.01'))),
+        date_logged.replace(microsecond=0, tzinfo=None).isoformat(),
+    ))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
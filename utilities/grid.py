@@ -0,0 +1,113 @@
+# utilities/grid.py
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from utilities.columnar import ColumnStore
+
+
+class SortedGrid:
+    """
+    In-memory rows with one sort permutation per column, for lists that sort and page
+    without a database. The rows live in a utilities.columnar.ColumnStore.
+
+    A column's permutation (row indexes in ascending order of its values, ties in row
+    order) is built on the first sort by that column, from the column's array, and kept:
+    an ascending page is a slice of it, a descending page the mirrored slice read
+    backwards, so both directions share one sort and every later request costs O(page).
+    Ties come out in row order ascending and reversed descending, the same as
+    ListService's primary key tie-breaker on model lists.
+
+    Writes keep the built permutations current: append() and update() move the touched
+    rows with a bisect on (value, row index) and one array insert, and replace() or
+    invalidate() drop them for a lazy rebuild. Permutations are ``array('i')``, 4 bytes
+    per row per sorted column.
+    """
+
+    def __init__(self, store: ColumnStore):
+        self._store = store
+        self._orders: Dict[str, array] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    @property
+    def columns(self):
+        return self._store.columns
+
+    @property
+    def rows(self) -> ColumnStore:
+        """ The rows in insertion order; treat as read-only, writes go through the grid """
+        return self._store
+
+    def _key(self, column: str) -> Callable[[int], tuple]:
+        value = self._store.value
+        return lambda index: (value(column, index), index)
+
+    def _order(self, column: str) -> array:
+        """ The column's ascending permutation, built under the lock on first use """
+        order = self._orders.get(column)
+        if order is None:
+            if column not in self.columns:
+                raise KeyError(column)
+            with self._lock:
+                order = self._orders.get(column)
+                if order is None:
+                    order = array('i')
+                    order.frombytes(self._store.sort_order(column).astype(np.int32).tobytes())
+                    self._orders[column] = order
+        return order
+
+    def page(self, column: Optional[str], descending: bool, start: int, stop: int) -> List[Dict[str, Any]]:
+        """ Rows [start, stop) in the order of `column` (insertion order when None) """
+        if column is None:
+            with self._lock:
+                return self._store.take(list(range(start, min(stop, len(self._store)))))
+        order = self._order(column)
+        with self._lock:
+            total = len(order)
+            if descending:
+                indexes = order[max(total - stop, 0):max(total - start, 0)].tolist()[::-1]
+            else:
+                indexes = order[start:stop].tolist()
+            return self._store.take(indexes)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            index = len(self._store)
+            self._store.append(row)
+            for column, order in self._orders.items():
+                insort(order, index, key=self._key(column))
+            self.version += 1
+
+    def update(self, index: int, changes: Dict[str, Any]) -> None:
+        """ Applies `changes` to row `index`, moving it within the permutations of the changed columns """
+        with self._lock:
+            current = {column: self._store.value(column, index) for column in changes}
+            moved = [column for column in changes if column in self._orders and changes[column] != current[column]]
+            for column in moved:
+                order = self._orders[column]
+                del order[bisect_left(order, (current[column], index), key=self._key(column))]
+            self._store.update(index, changes)
+            for column in moved:
+                insort(self._orders[column], index, key=self._key(column))
+            self.version += 1
+
+    def replace(self, store: ColumnStore) -> None:
+        """ Swaps in a new set of rows; permutations are rebuilt on the next sort """
+        with self._lock:
+            self._store = store
+            self._orders = {}
+            self.version += 1
+
+    def invalidate(self, columns: Optional[List[str]] = None) -> None:
+        """ Drops the permutations of `columns` (all when None), e.g. after rows were changed in place """
+        with self._lock:
+            for column in list(self._orders) if columns is None else columns:
+                self._orders.pop(column, None)
+            self.version += 1
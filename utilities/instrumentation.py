@@ -0,0 +1,214 @@
+# utilities/instrumentation.py
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this (total wall time) or issuing more queries than this are logged
+# as warnings instead of info. Both can be overridden in settings.
+SLOW_REQUEST_MS = 500
+MAX_QUERIES = 50
+
+
+class RequestTimings:
+    """
+    Accumulated time per span name ("db", "template", "pydantic", "Service.method") for
+    one request. asgiref copies the context into sync_to_async threads, so the service
+    code running there records into the same object as the middleware.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}  # name -> [total seconds, count]
+        self._active: set = set()
+
+    def add(self, name: str, elapsed: float) -> None:
+        span = self.spans.setdefault(name, [0.0, 0])
+        span[0] += elapsed
+        span[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('current_timings', default=None)
+
+
+def get_current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+    Adds the block's duration to span `name` of the current request; free outside a
+    request. A block nested in another of the same name (an included template, a service
+    calling itself) is only counted once, by the outer one.
+    """
+    timings = _current_timings.get()
+    if timings is None or name in timings._active:
+        yield
+        return
+    timings._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+def instrument_service(cls: type) -> type:
+    """
+    Class decorator timing every public static method of a service class as span
+    "ClassName.method"; async methods (including sync_to_async ones) are awaited inside the span.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith('_') or not isinstance(attribute, staticmethod):
+            continue
+        setattr(cls, name, staticmethod(_timed_callable(attribute.__func__, f"{cls.__name__}.{name}")))
+    return cls
+
+
+def _timed_callable(func: Callable, span_name: str) -> Callable:
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with timed(span_name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with timed(span_name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# --- Database ---
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+
+
+def _install_query_recorder(connection, **kwargs) -> None:
+    # Installed once per connection object for its whole life (not per request with
+    # connection.execute_wrapper()), because async views run their queries on the
+    # sync_to_async thread's connection, not on the middleware's.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+
+# --- Templates ---
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self._template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """ DjangoTemplates backend whose templates record their render time as span "template" """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+# --- Middleware ---
+
+def _metric_name(name: str) -> str:
+    return {'db': 'db', 'template': 'tpl', 'pydantic': 'pydantic'}.get(name, f"svc.{name}")
+
+
+class PerformanceMiddleware:
+    """
+    Times each request: wall time, database queries (count and time), templates, pydantic
+    validation/serialisation and instrumented service methods. Emits them as a
+    ``Server-Timing`` header (when settings.SERVER_TIMING_HEADER, default DEBUG) and one
+    log line per request, a warning above settings.PERF_SLOW_REQUEST_MS or
+    settings.PERF_MAX_QUERIES. Goes first in MIDDLEWARE so it covers the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+        self.max_queries = getattr(settings, 'PERF_MAX_QUERIES', MAX_QUERIES)
+        self.send_header = getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG)
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        self._report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        self._report(request, response, timings)
+        return response
+
+    def _report(self, request, response, timings: RequestTimings) -> None:
+        total_ms = timings.elapsed_ms()
+        db_seconds, db_count = timings.spans.get('db', (0.0, 0))
+        if self.send_header:
+            metrics = [f'total;dur={total_ms:.1f}']
+            for name, (seconds, count) in timings.spans.items():
+                metrics.append(f'{_metric_name(name)};dur={seconds * 1000:.1f};desc="{count}x"')
+            response['Server-Timing'] = ', '.join(metrics)
+
+        spans = {name: round(seconds * 1000, 1) for name, (seconds, _) in timings.spans.items()}
+        slow = total_ms > self.slow_request_ms or db_count > self.max_queries
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "%s %s %s total_ms=%.1f queries=%d db_ms=%.1f",
+            request.method, request.path, response.status_code, total_ms, db_count, db_seconds * 1000,
+            extra={'request_timing': {
+                'method': request.method, 'path': request.path, 'status': response.status_code,
+                'total_ms': round(total_ms, 1), 'queries': db_count, 'spans_ms': spans, 'slow': slow,
+            }},
+        )
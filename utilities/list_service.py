@@ -0,0 +1,322 @@
+# utilities/list_service.py
+import math
+from datetime import timedelta
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.db import connections, models
+from django.db.models import Q, QuerySet
+
+from schema.list_schema import (
+    ColumnInfo, ListServiceConfig, ListServiceResponse, PaginationDetails
+)
+from utilities.grid import SortedGrid
+from utilities.instrumentation import instrument_service
+from utilities.search import FTS_DATE_COLUMN, build_fts_query, period_tokens
+from utilities.tenancy import get_current_user_id
+
+PER_PAGE_OPTIONS = [5, 10, 15, 20, 25]
+
+# Page links shown around the current page; lists with more pages show a window of them.
+PAGE_RANGE_SIZE = 15
+
+# bm25 ranking costs grow with the match count; broader searches keep the list's default order.
+SEARCH_RANK_MAX_MATCHES = 1000
+
+# Lookups a caller may use in ListServiceConfig.filter; anything else is rejected.
+ALLOWED_FILTER_LOOKUPS = frozenset({
+    'exact', 'iexact', 'gt', 'gte', 'lt', 'lte', 'in', 'range', 'isnull',
+    'date', 'year', 'month', 'day', 'icontains', 'istartswith',
+})
+
+
+def build_pagination(total_items: int, page: int, page_size: int) -> PaginationDetails:
+    """ Page maths shared by every list; `page` is clamped into [1, total_pages] """
+    total_pages = math.ceil(total_items / page_size) if page_size > 0 else 0
+    if total_pages == 0 and total_items > 0:
+        total_pages = 1
+
+    current_page = page
+    if current_page > total_pages and total_pages > 0:
+        current_page = total_pages
+    if current_page < 1:
+        current_page = 1
+
+    start_item_index = (current_page - 1) * page_size
+    end_item_index = start_item_index + page_size
+    first_link = min(max(current_page - PAGE_RANGE_SIZE // 2, 1), max(total_pages - PAGE_RANGE_SIZE + 1, 1))
+    return PaginationDetails(
+        current_page=current_page,
+        page_size=page_size,
+        total_items=total_items,
+        total_pages=total_pages,
+        page_range=list(range(first_link, min(first_link + PAGE_RANGE_SIZE, total_pages + 1))),
+        has_next_page=current_page < total_pages,
+        has_previous_page=current_page > 1,
+        next_page_number=current_page + 1 if current_page < total_pages else None,
+        previous_page_number=current_page - 1 if current_page > 1 else None,
+        start_item_index=start_item_index if total_items > 0 else None,
+        # -1 because end_item_index is exclusive for slicing
+        end_item_index=end_item_index - 1 if total_items > 0 else None,
+        display_start_item=start_item_index + 1 if total_items > 0 else 0,
+        display_end_item=min(end_item_index, total_items) if total_items > 0 else 0,
+        per_page_options=PER_PAGE_OPTIONS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_model_columns(model: type[models.Model]) -> Tuple[ColumnInfo, ...]:
+    """
+    Concrete columns of `model`, introspected once per process.
+    Foreign keys are listed under their attname (e.g. ``account_id``).
+    """
+    return tuple(
+        ColumnInfo(
+            name=field.attname,
+            verbose_name=str(field.verbose_name),
+            field_name=field.name,
+            hidden=False,
+        )
+        for field in model._meta.concrete_fields
+    )
+
+
+def parse_sort(sort_by: str) -> Tuple[Optional[str], bool]:
+    """
+    Splits the table header's sort token into (column, descending).
+    "amount" -> asc, "-amount" -> desc, "amount-" (third click) -> no sort.
+    """
+    if not sort_by or sort_by.endswith('-'):
+        return None, False
+    if sort_by.startswith('-'):
+        return sort_by[1:], True
+    return sort_by, False
+
+
+@instrument_service
+class ListService:
+    """
+    Generic filtered/sorted/paginated listing driven by ListServiceConfig.
+
+    * the model is resolved through the app registry from (app, model);
+    * sort and filter keys are checked against the model's columns, so request
+      input never reaches order_by()/filter() unvalidated;
+    * only the requested columns are fetched (``.values()``), and foreign_keys
+      entries ({"account": "current_balance"}) are projected through the JOIN as
+      ``account__current_balance`` in the same query;
+    * config.query searches through the model's FTS5 index when it declares FTS_TABLE.
+    """
+
+    @staticmethod
+    def resolve_model(config: ListServiceConfig) -> type[models.Model]:
+        return apps.get_model(config.app, config.model)
+
+    @staticmethod
+    def _resolve_columns(
+        config: ListServiceConfig, all_columns: Sequence[ColumnInfo]
+    ) -> Tuple[List[ColumnInfo], List[ColumnInfo]]:
+        """ Returns (all columns incl. foreign key paths, projected columns) with hidden flags applied """
+        foreign_columns = [
+            ColumnInfo(
+                name=f"{fk_name}__{related_field}",
+                verbose_name=f"{fk_name} {related_field}".replace('_', ' '),
+                field_name=f"{fk_name}__{related_field}",
+                hidden=False,
+            )
+            for fk_name, related_field in config.foreign_keys.items()
+        ]
+        hidden = set(config.hidden_columns)
+        all_columns = [
+            column.model_copy(update={'hidden': column.name in hidden})
+            for column in [*all_columns, *foreign_columns]
+        ]
+        by_name = {column.name: column for column in all_columns}
+
+        requested = config.requested_columns or config.default_column or [column.name for column in all_columns]
+        unknown = [name for name in requested if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown columns for {config.app}.{config.model}: {', '.join(unknown)}")
+        excluded = set(config.exclude_columns)
+        projected = [by_name[name] for name in requested if name not in excluded]
+        return all_columns, projected
+
+    @staticmethod
+    def _build_filter(config: ListServiceConfig, column_names: Iterable[str]) -> Q:
+        column_names = set(column_names)
+        condition = Q()
+        for key, value in config.filter.items():
+            column, _, lookup = key.partition('__')
+            if column not in column_names or (lookup and lookup not in ALLOWED_FILTER_LOOKUPS):
+                raise ValueError(f"Filter '{key}' is not allowed on {config.app}.{config.model}")
+            condition &= Q(**{key: value})
+        return condition
+
+    @staticmethod
+    def _build_response(
+        config: ListServiceConfig, data: List[Dict], all_columns: List[ColumnInfo],
+        projected: List[ColumnInfo], pagination: PaginationDetails, sorting: str
+    ) -> ListServiceResponse:
+        return ListServiceResponse(
+            data=data,
+            search=config.query,
+            columns=[column for column in projected if not column.hidden],
+            all_columns=all_columns,
+            pagination=pagination,
+            hidden_columns=config.hidden_columns,
+            requested_columns=[column.name for column in projected],
+            sorting=sorting,
+        )
+
+    @staticmethod
+    def _apply_search(
+        config: ListServiceConfig, model: type[models.Model], queryset: QuerySet,
+        model_columns: Sequence[ColumnInfo], projected: Sequence[ColumnInfo]
+    ) -> Tuple[QuerySet, bool]:
+        """
+        Narrows `queryset` to rows matching config.query and reports whether a
+        ``search_rank`` column is available to order by.
+
+        Models with an FTS_TABLE on SQLite join their FTS5 index on rowid, so the MATCH
+        and bm25 rank are computed in one pass over the index. A date_logged range in
+        the filter is also matched against the index's period tokens, which keeps a
+        month-scoped search from walking every match in the table; models with an
+        FTS_TENANT_COLUMN match the current user's token the same way. Everything else
+        falls back to icontains on the projected text columns.
+        """
+        fts_table = getattr(model, 'FTS_TABLE', None)
+        if fts_table and connections[queryset.db].vendor == 'sqlite':
+            date_filter = config.filter.get(f'{FTS_DATE_COLUMN}__date')
+            periods = period_tokens(date_filter, date_filter + timedelta(days=1)) if date_filter else period_tokens(
+                config.filter.get(f'{FTS_DATE_COLUMN}__gte'), config.filter.get(f'{FTS_DATE_COLUMN}__lt'))
+            tenant_id = get_current_user_id() if getattr(model, 'FTS_TENANT_COLUMN', None) else None
+            match = build_fts_query(config.query, periods, tenant_id)
+            if not match:
+                return queryset, False
+            # The ORM has no join to a virtual table, hence extra().
+            queryset = queryset.extra(
+                tables=[fts_table],
+                where=[
+                    f'"{fts_table}"."rowid" = "{model._meta.db_table}"."{model._meta.pk.column}"',
+                    f'"{fts_table}" MATCH %s',
+                ],
+                params=[match],
+                select={'search_rank': f'"{fts_table}"."rank"'},
+            )
+            return queryset, True
+
+        projected_names = {column.name for column in projected}
+        search = Q()
+        for column in model_columns:
+            if column.name in projected_names and \
+                    isinstance(model._meta.get_field(column.field_name), (models.CharField, models.TextField)):
+                search |= Q(**{f"{column.name}__icontains": config.query})
+        return queryset.filter(search), False
+
+    @staticmethod
+    def search(config: ListServiceConfig, queryset: QuerySet) -> Tuple[QuerySet, bool]:
+        """
+        Narrows `queryset` to the rows matching config.query, the way get_list_sync searches,
+        for callers that page and order the result themselves (e.g. the admin changelists).
+        Also reports whether a ``search_rank`` column is available to order by.
+        """
+        model = ListService.resolve_model(config)
+        model_columns = get_model_columns(model)
+        _, projected = ListService._resolve_columns(config, model_columns)
+        return ListService._apply_search(config, model, queryset, model_columns, projected)
+
+    @staticmethod
+    def get_list_sync(config: ListServiceConfig, queryset: Optional[QuerySet] = None) -> ListServiceResponse:
+        """
+        Runs the listing against the database: one COUNT and one projected page query.
+        `queryset` lets a caller narrow the base set (e.g. a pre-joined manager) before the config applies.
+        """
+        model = ListService.resolve_model(config)
+        model_columns = get_model_columns(model)
+        all_columns, projected = ListService._resolve_columns(config, model_columns)
+        sortable = {column.name for column in all_columns} | {column.field_name for column in model_columns}
+
+        queryset = queryset if queryset is not None else model._default_manager.all()
+        queryset = queryset.filter(ListService._build_filter(config, sortable))
+        ranked = False
+        if config.query:
+            queryset, ranked = ListService._apply_search(config, model, queryset, model_columns, projected)
+
+        total_items = queryset.count()
+        sort_column, descending = parse_sort(config.sort_by)
+        if sort_column not in sortable and not (ranked and total_items <= SEARCH_RANK_MAX_MATCHES):
+            sort_column, descending = parse_sort(config.sorting)
+        sorting = ""
+        if sort_column in sortable:
+            sorting = f"-{sort_column}" if descending else sort_column
+            # Primary key tie-breaker keeps pages stable when the sort column has duplicates.
+            queryset = queryset.order_by(sorting, '-pk' if descending else 'pk')
+        elif ranked:
+            # No explicit sort while searching: best matches first (FTS5 rank is lower-is-better).
+            queryset = queryset.order_by('search_rank', '-pk')
+
+        pagination = build_pagination(total_items, config.page, config.page_limit)
+        data: List[Dict[str, Any]] = []
+        if pagination.total_items:
+            start = pagination.start_item_index
+            data = list(queryset.values(*[column.name for column in projected])[start:start + config.page_limit])
+        return ListService._build_response(config, data, all_columns, projected, pagination, sorting)
+
+    @staticmethod
+    def get_list_from_rows(
+        config: ListServiceConfig, rows: Sequence[Dict[str, Any]], columns: Sequence[ColumnInfo]
+    ) -> ListServiceResponse:
+        """ Same contract as get_list_sync for data that lives in memory rather than in a model """
+        all_columns, projected = ListService._resolve_columns(config, columns)
+        column_names = {column.name for column in columns}
+
+        if config.filter:
+            rows = [row for row in rows if all(row.get(key) == value for key, value in config.filter.items())]
+        if config.query:
+            needle = config.query.casefold()
+            rows = [row for row in rows if any(
+                isinstance(row.get(column.name), str) and needle in row[column.name].casefold() for column in projected
+            )]
+
+        sort_column, descending = parse_sort(config.sort_by)
+        if sort_column not in column_names:
+            sort_column, descending = parse_sort(config.sorting)
+        sorting = ""
+        if sort_column in column_names:
+            sorting = f"-{sort_column}" if descending else sort_column
+            rows = sorted(rows, key=itemgetter(sort_column), reverse=descending)
+
+        pagination = build_pagination(len(rows), config.page, config.page_limit)
+        start = pagination.start_item_index or 0
+        projected_names = [column.name for column in projected]
+        data = [{name: row.get(name) for name in projected_names} for row in rows[start:start + config.page_limit]]
+        return ListService._build_response(config, data, all_columns, projected, pagination, sorting)
+
+    @staticmethod
+    def get_list_from_grid(
+        config: ListServiceConfig, grid: SortedGrid, columns: Sequence[ColumnInfo]
+    ) -> ListServiceResponse:
+        """
+        get_list_from_rows over a SortedGrid: a sorted page is a slice of the column's
+        cached permutation rather than a sort of every row. Filters and searches have no
+        index here and fall back to get_list_from_rows.
+        """
+        if config.filter or config.query:
+            return ListService.get_list_from_rows(config, grid.rows, columns)
+        all_columns, projected = ListService._resolve_columns(config, columns)
+        column_names = set(grid.columns)
+
+        sort_column, descending = parse_sort(config.sort_by)
+        if sort_column not in column_names:
+            sort_column, descending = parse_sort(config.sorting)
+        if sort_column not in column_names:
+            sort_column, descending = None, False
+        sorting = (f"-{sort_column}" if descending else sort_column) if sort_column else ""
+
+        pagination = build_pagination(len(grid), config.page, config.page_limit)
+        start = pagination.start_item_index or 0
+        projected_names = [column.name for column in projected]
+        data = [{name: row.get(name) for name in projected_names}
+                for row in grid.page(sort_column, descending, start, start + config.page_limit)]
+        return ListService._build_response(config, data, all_columns, projected, pagination, sorting)
@@ -0,0 +1,67 @@
+# utilities/money.py
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Annotated, Any
+
+from django import forms
+from django.db import models
+from pydantic import BeforeValidator
+
+CENTS_PER_UNIT = 100
+
+
+class MoneyFormField(forms.DecimalField):
+    """
+    Form field for a MoneyField: shows and accepts major units (12.50), cleans to int
+    minor units (1250), so ModelForms (and the admin) never expose raw cents.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['decimal_places'] = 2
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return from_cents(value)
+        return value
+
+    def clean(self, value):
+        amount = super().clean(value)
+        return None if amount is None else to_cents(amount)
+
+    def has_changed(self, initial, data):
+        return super().has_changed(self.prepare_value(initial), data)
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    Money stored as an integer number of minor units (paise/cents).
+    Values stay plain ints on the model so SUM() and arithmetic are exact and cheap;
+    convert with ``from_cents`` (or the ``MoneyDecimal`` schema type) only for display.
+    Model forms edit it in major units (see MoneyFormField).
+    """
+    description = "Money amount in minor units"
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': MoneyFormField, **kwargs})
+
+
+def to_cents(amount: Any) -> int:
+    """ Decimal/str/int major units -> int minor units, rounding half-up to the nearest cent """
+    return int((Decimal(str(amount)) * CENTS_PER_UNIT).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int | None) -> Decimal:
+    """ int minor units -> Decimal major units with two places """
+    # scaleb shifts the exponent only: exact, and much cheaper than divide + quantize.
+    return Decimal(cents or 0).scaleb(-2)
+
+
+def _cents_to_decimal(value: Any) -> Any:
+    # Only ints come from MoneyField columns; Decimals/strings are already major units.
+    if isinstance(value, int) and not isinstance(value, bool):
+        return from_cents(value)
+    return value
+
+
+# Schema type for values read from MoneyField columns
+MoneyDecimal = Annotated[Decimal, BeforeValidator(_cents_to_decimal)]
@@ -0,0 +1,230 @@
+# utilities/profiling.py
+"""
+Opt-in profiling of live requests.
+
+A request is profiled when a staff user sends ``X-Profile: sample`` (or ``cprofile``),
+or at random for the fractions in settings.PROFILE_SAMPLE_RATES ({path prefix: rate}).
+Two modes:
+
+* ``sample``: a background thread reads every thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds and writes collapsed stacks (``thread;outer;...;inner
+  count``, the input of flamegraph.pl / speedscope). It sees the sync_to_async threads
+  the async views run their queries in, and costs little whatever the code does; on a
+  busy server, stacks of concurrent requests show up too, under their thread names.
+* ``cprofile``: deterministic cProfile of the thread that runs the middleware, written
+  as ``.pstats``. Exact call counts, but high overhead, and under ASGI it only covers the
+  event loop thread (and whatever else runs on the loop meanwhile).
+
+Results go to settings.PROFILE_DIR, a ring buffer keeping the newest PROFILE_KEEP
+files, listed and downloadable by staff at profile_list_view.
+"""
+import cProfile
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('sample', 'cprofile')
+DEFAULT_MODE = 'sample'
+SAMPLE_INTERVAL = 0.005
+KEEP = 50
+_PROFILE_NAME = re.compile(r'^[\w.-]+\.(collapsed|pstats)$')
+
+# Innermost frames of a thread that is parked, not working: its samples are dropped.
+_IDLE_FRAMES = frozenset({
+    ('threading', 'Condition.wait'), ('threading', 'Event.wait'), ('queue', 'Queue.get'),
+    ('selectors', 'EpollSelector.select'), ('selectors', 'KqueueSelector.select'),
+    ('selectors', 'PollSelector.select'), ('selectors', 'SelectSelector.select'),
+})
+
+
+def get_profile_dir() -> Path:
+    return Path(getattr(settings, 'PROFILE_DIR', None) or Path(tempfile.gettempdir()) / 'expenses_log_profiles')
+
+
+def list_profiles() -> List[Path]:
+    """ Stored profiles, newest first (names start with their UTC timestamp) """
+    directory = get_profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted((path for path in directory.iterdir() if _PROFILE_NAME.match(path.name)),
+                  key=lambda path: path.name, reverse=True)
+
+
+def _new_profile_path(request, mode: str) -> Path:
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r'[^\w-]+', '_', request.path).strip('_')[:60] or 'root'
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    extension = 'pstats' if mode == 'cprofile' else 'collapsed'
+    return directory / f"{stamp}-{request.method}-{slug}.{extension}"
+
+
+def _trim_ring_buffer() -> None:
+    for path in list_profiles()[getattr(settings, 'PROFILE_KEEP', KEEP):]:
+        path.unlink(missing_ok=True)
+
+
+class StackSampler:
+    """ Counts the collapsed stacks of every other thread, sampled every `interval` seconds """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((frame.f_globals.get('__name__', '?'), getattr(code, 'co_qualname', code.co_name)))
+                    frame = frame.f_back
+                if stack[0] in _IDLE_FRAMES:
+                    continue
+                self.stacks[';'.join([names.get(thread_id, str(thread_id)),
+                                      *(f"{module}:{function}" for module, function in reversed(stack))])] += 1
+
+    def write(self, path: Path) -> None:
+        path.write_text(''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()))
+
+
+class _Session:
+    """ One profiled request """
+
+    def __init__(self, request, mode: str):
+        self.path = _new_profile_path(request, mode)
+        self.profiler = cProfile.Profile() if mode == 'cprofile' else StackSampler(
+            getattr(settings, 'PROFILE_SAMPLE_INTERVAL', SAMPLE_INTERVAL))
+
+    def start(self) -> None:
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self) -> None:
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def save(self, response) -> None:
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.dump_stats(self.path)
+        else:
+            self.profiler.write(self.path)
+        _trim_ring_buffer()
+        response['X-Profile-Name'] = self.path.name
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the request (see the module docstring) when asked to by a staff user's
+    X-Profile header or picked by PROFILE_SAMPLE_RATES. Goes after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rates = sorted(getattr(settings, 'PROFILE_SAMPLE_RATES', {}).items(),
+                                   key=lambda item: len(item[0]), reverse=True)
+        self.sampled_mode = getattr(settings, 'PROFILE_SAMPLE_MODE', DEFAULT_MODE)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self._requested_mode(request, request.user)
+        if mode is None:
+            return self.get_response(request)
+        session = _Session(request, mode)
+        session.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            session.stop()
+        session.save(response)
+        return response
+
+    async def __acall__(self, request):
+        header = request.headers.get(PROFILE_HEADER)
+        user = await request.auser() if header else None
+        mode = self._requested_mode(request, user)
+        if mode is None:
+            return await self.get_response(request)
+        session = _Session(request, mode)
+        session.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            session.stop()
+        session.save(response)
+        return response
+
+    def _requested_mode(self, request, user) -> Optional[str]:
+        header = request.headers.get(PROFILE_HEADER)
+        if header:
+            if user is not None and user.is_staff:
+                return header.lower() if header.lower() in MODES else DEFAULT_MODE
+            return None
+        for prefix, rate in self.sample_rates:
+            if request.path.startswith(prefix):
+                return self.sampled_mode if random.random() < rate else None
+        return None
+
+
+# --- Views (staff only) ---
+
+@staff_member_required
+def profile_list_view(request) -> HttpResponse:
+    rows = format_html_join(
+        '', '<tr><td><a href="{}">{}</a></td><td>{}</td><td>{}</td></tr>',
+        ((reverse('profile_download', args=[path.name]), path.name, path.stat().st_size,
+          time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(path.stat().st_mtime)))
+         for path in list_profiles()),
+    )
+    return HttpResponse(format_html(
+        '<!doctype html><title>Profiles</title><h1>Profiles</h1>'
+        '<p>Newest first; set the <code>{}</code> header to <code>sample</code> or '
+        '<code>cprofile</code> on a request to add one.</p>'
+        '<table><tr><th>File</th><th>Bytes</th><th>Written (UTC)</th></tr>{}</table>',
+        PROFILE_HEADER, rows,
+    ))
+
+
+@staff_member_required
+def profile_download_view(request, name: str) -> FileResponse:
+    path = get_profile_dir() / name
+    if not _PROFILE_NAME.match(name) or not path.is_file():
+        raise Http404(name)
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
@@ -0,0 +1,163 @@
+# utilities/search.py
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import Any, Iterable, Iterator, List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models opt in to full-text search by naming their FTS5 table in a ``FTS_TABLE`` attribute.
+# The index holds the description text plus UTC month/day tokens of date_logged
+# ("m202503 d20250315"), so a month-scoped search is a single index intersection.
+# Per-user models also name their owner column in ``FTS_TENANT_COLUMN``; the index then
+# carries a "u<id>" token and a search only walks the current user's postings.
+FTS_COLUMN = 'description'
+FTS_DATE_COLUMN = 'date_logged'
+FTS_TENANT_PREFIX = 'u'
+MAX_QUERY_TERMS = 8
+# Wider date ranges are left to the base table's own date filter.
+MAX_PERIOD_TOKENS = 12
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_PERIOD_SQL = "'m' || strftime('%Y%m', {row}.{date}) || ' d' || strftime('%Y%m%d', {row}.{date})"
+_TENANT_SQL = "'" + FTS_TENANT_PREFIX + "' || coalesce({row}.{tenant}, 0)"
+
+
+def build_fts_query(text: str, periods: Optional[List[str]] = None, tenant_id: Optional[int] = None) -> str:
+    """
+    Turns free text from the search box into a safe FTS5 MATCH expression.
+    Every word becomes a quoted prefix term ("gro"*), and terms are ANDed, so
+    search-as-you-type matches while the last word is still incomplete.
+    `periods` (see period_tokens) restricts the match to those months/days and
+    `tenant_id` to one user's rows (indexes built with a tenant column only).
+    Returns "" when the text has no searchable words.
+    """
+    terms = _TERM_RE.findall(text or "")[:MAX_QUERY_TERMS]
+    if not terms:
+        return ""
+    prefixes = " ".join(f'"{term}"*' for term in terms)
+    match = f"{FTS_COLUMN} : ({prefixes})"
+    if periods:
+        match += f" AND period : ({' OR '.join(periods)})"
+    if tenant_id is not None:
+        match += f" AND tenant : {FTS_TENANT_PREFIX}{int(tenant_id)}"
+    return match
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.astimezone(dt_timezone.utc) if value.tzinfo else value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return None
+
+
+def period_tokens(start: Any, end: Any) -> Optional[List[str]]:
+    """
+    Index tokens covering the half-open range [start, end): day tokens for ranges of a
+    few days, otherwise month tokens. None when the range is open or too wide to help.
+    Tokens are UTC, so ranges built from any local timezone stay correct (they may
+    just cover one extra UTC day/month; the exact filter still applies on the table).
+    """
+    start, end = _as_utc(start), _as_utc(end)
+    if start is None or end is None or end <= start:
+        return None
+    last = end - timedelta(microseconds=1)
+    days = (last.date() - start.date()).days + 1
+    if days <= 3:
+        return [f"d{(start + timedelta(days=offset)):%Y%m%d}" for offset in range(days)]
+    first_month = start.year * 12 + start.month - 1
+    last_month = last.year * 12 + last.month - 1
+    if last_month - first_month + 1 > MAX_PERIOD_TOKENS:
+        return None
+    return [f"m{index // 12:04d}{index % 12 + 1:02d}" for index in range(first_month, last_month + 1)]
+
+
+def fts_install_sql(table: str, fts_table: str, tenant_column: Optional[str] = None) -> List[str]:
+    """
+    SQLite statements creating a contentless FTS5 index over ``table.description`` (+ period
+    tokens, + owner tokens from `tenant_column`), the triggers that keep it in sync, and the
+    backfill from existing rows.
+
+    Idempotent apart from the backfill, so a migration that makes Django rebuild ``table``
+    (which drops its triggers) should run fts_uninstall_sql() and then this again.
+    """
+    quoted_table = f'"{table}"'
+
+    def indexed_values(row: str) -> str:
+        values = f"{row}.{FTS_COLUMN}, {_PERIOD_SQL.format(row=row, date=FTS_DATE_COLUMN)}"
+        if tenant_column:
+            values += f", {_TENANT_SQL.format(row=row, tenant=tenant_column)}"
+        return values
+
+    columns = f"{FTS_COLUMN}, period" + (", tenant" if tenant_column else "")
+    watched = f"{FTS_COLUMN}, {FTS_DATE_COLUMN}" + (f", {tenant_column}" if tenant_column else "")
+    delete_old = (f'INSERT INTO "{fts_table}"("{fts_table}", rowid, {columns}) '
+                  f"VALUES ('delete', old.id, {indexed_values('old')});")
+    insert_new = f'INSERT INTO "{fts_table}"(rowid, {columns}) VALUES (new.id, {indexed_values("new")});'
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts_table}" USING fts5('
+        f"{columns}, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS "{fts_table}_ai" AFTER INSERT ON "{table}" BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts_table}_ad" AFTER DELETE ON "{table}" BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts_table}_au" AFTER UPDATE OF {watched} '
+        f'ON "{table}" BEGIN {delete_old} {insert_new} END',
+        f'INSERT INTO "{fts_table}"(rowid, {columns}) SELECT id, {indexed_values(quoted_table)} FROM {quoted_table}',
+    ]
+
+
+def fts_uninstall_sql(fts_table: str) -> List[str]:
+    return [
+        f'DROP TRIGGER IF EXISTS "{fts_table}_ai"',
+        f'DROP TRIGGER IF EXISTS "{fts_table}_ad"',
+        f'DROP TRIGGER IF EXISTS "{fts_table}_au"',
+        f'DROP TABLE IF EXISTS "{fts_table}"',
+    ]
+
+
+def install_fts(schema_editor, table: str, fts_table: str, tenant_column: Optional[str] = None) -> None:
+    """ RunPython helper; FTS5 is SQLite-only, other backends fall back to LIKE search """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in fts_install_sql(table, fts_table, tenant_column):
+        schema_editor.execute(statement)
+
+
+def uninstall_fts(schema_editor, fts_table: str) -> None:
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in fts_uninstall_sql(fts_table):
+        schema_editor.execute(statement)
+
+
+@contextmanager
+def fts_suspended(models: Iterable[type], using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """
+    Drops the FTS5 indexes (and triggers) of `models` for the block and reinstalls them
+    afterwards with one backfill each. For bulk loads and deletes this is far cheaper than
+    firing the triggers row by row. Inside a transaction, an error in the block leaves the
+    indexes to its rollback; in autocommit (e.g. loads split over several processes, each
+    committing its own batches) they are rebuilt over whatever rows were committed.
+    """
+    connection = connections[using]
+    fts_models = [model for model in models
+                  if connection.vendor == 'sqlite' and getattr(model, 'FTS_TABLE', None)]
+
+    def reinstall():
+        with connection.cursor() as cursor:
+            for model in fts_models:
+                for statement in fts_install_sql(model._meta.db_table, model.FTS_TABLE,
+                                                 getattr(model, 'FTS_TENANT_COLUMN', None)):
+                    cursor.execute(statement)
+
+    with connection.cursor() as cursor:
+        for model in fts_models:
+            for statement in fts_uninstall_sql(model.FTS_TABLE):
+                cursor.execute(statement)
+    try:
+        yield
+    except BaseException:
+        if not connection.in_atomic_block:
+            reinstall()
+        raise
+    reinstall()
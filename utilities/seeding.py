@@ -0,0 +1,416 @@
+# utilities/seeding.py
+"""
+Synthetic ledgers for scale testing (seed_ledger command, endpoint benchmarks).
+
+A ledger is a run of calendar months, each with the month's salary, its expenses (lognormal
+amounts per category) and the bank postings that mirror them the way the service layer
+does: a salary credit, one "Monthly Expense" debit per expense (same amount and time, with
+the expense-<id> idempotency key) and a few bank-only debits, with running balances from
+one cumulative sum.
+
+Every month draws from its own random streams, keyed by the seed and the calendar month,
+and ids are assigned up front, so a month comes out the same whichever process writes it
+and however the range is split. Rows are generated as numpy columns and inserted with
+executemany in batches: Django's bulk_create prepares every value through its field and,
+on SQLite, caps a batch at 999 parameters, which is two orders of magnitude slower here.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from bank_balance_log.models import ArchivedBankTransaction, BankAccount, BankTransaction, MonthlyTransactionRollup
+from bank_balance_log.services import BankLogService
+from month_log.models import (
+    ArchivedExpense, Category, CategoryMonthlyRollup, DailyExpenseRollup, Expense, MonthlyRollup, MonthlySalary,
+)
+from month_log.services import ExpenseRollupService
+from utilities.archive import get_archive_model
+from utilities.search import fts_suspended
+from utilities.tenancy import tenant
+
+SEED_BATCH_ROWS = 20_000
+# Bank-only debits (cash, transfers, fees) per expense
+EXTRA_POSTING_RATE = 0.05
+# Salary of the seed's user in 2020 (cents) and its yearly raise
+SALARY_RANGE = (250_000, 650_000)
+SALARY_RAISE = 0.03
+# Seconds the SQLite workers wait for each other's batches
+WORKER_BUSY_TIMEOUT_MS = 120_000
+
+_US_PER_HOUR = 3_600_000_000
+_US_PER_DAY = 24 * _US_PER_HOUR
+_AMOUNT_STREAM, _DETAIL_STREAM, _SALARY_STREAM = 1, 2, 3
+
+
+class SeedError(Exception):
+    pass
+
+
+class CategoryProfile(NamedTuple):
+    name: Optional[str]  # None files the expense under no category
+    share: float
+    median: int  # cents
+    sigma: float  # of log(amount)
+    monthly_budget: Optional[int]
+    descriptions: Sequence[str]
+
+
+PROFILES = (
+    CategoryProfile('Groceries', 0.30, 3_500, 0.6, 60_000,
+                    ('Supermarket', 'Grocery store', 'Farmers market', 'Bakery', 'Butcher')),
+    CategoryProfile('Dining', 0.20, 1_800, 0.7, 30_000, ('Coffee', 'Lunch', 'Dinner', 'Takeaway', 'Pizza')),
+    CategoryProfile('Transport', 0.15, 1_500, 0.8, 20_000, ('Fuel', 'Train ticket', 'Bus pass', 'Taxi', 'Parking')),
+    CategoryProfile('Utilities', 0.05, 6_000, 0.4, 40_000,
+                    ('Electricity bill', 'Water bill', 'Internet', 'Phone bill', 'Gas bill')),
+    CategoryProfile('Health', 0.05, 2_500, 0.9, None, ('Pharmacy', 'Doctor visit', 'Dentist', 'Gym membership')),
+    CategoryProfile('Shopping', 0.12, 4_000, 1.0, 50_000, ('Clothes', 'Books', 'Electronics', 'Home supplies', 'Gift')),
+    CategoryProfile('Entertainment', 0.08, 2_000, 0.8, 15_000,
+                    ('Cinema', 'Concert', 'Streaming subscription', 'Games')),
+    CategoryProfile(None, 0.05, 1_200, 1.0, None, ('Cash purchase', 'Repairs', 'Donation', 'Misc')),
+)
+PLACES = ('downtown', 'near office', 'weekend', 'online', 'station', 'mall')
+EXTRA_DESCRIPTIONS = ('ATM withdrawal', 'Transfer to savings', 'Card fee', 'Transfer to family')
+
+_SHARES = np.array([profile.share for profile in PROFILES])
+_MEDIANS = np.array([profile.median for profile in PROFILES], dtype=np.float64)
+_SIGMAS = np.array([profile.sigma for profile in PROFILES])
+# Every description of every category, as one object array indexed by offset + pick
+_VOCABULARY = [[base] + [f"{base} - {place}" for place in PLACES]
+               for profile in PROFILES for base in profile.descriptions]
+_DESCRIPTION_OFFSETS = np.cumsum([0] + [len(profile.descriptions) * (len(PLACES) + 1) for profile in PROFILES])[:-1]
+_DESCRIPTION_COUNTS = np.array([len(profile.descriptions) * (len(PLACES) + 1) for profile in PROFILES])
+_DESCRIPTIONS = np.array([text for variants in _VOCABULARY for text in variants], dtype=object)
+_EXPENSE_POSTING_DESCRIPTIONS = np.array([f"Monthly Expense: {text}" for text in _DESCRIPTIONS], dtype=object)
+_MEAN_AMOUNT = float((_SHARES * _MEDIANS * np.exp(_SIGMAS ** 2 / 2)).sum())
+_MEAN_EXTRA_AMOUNT = 10_500
+
+
+class MonthPlan(NamedTuple):
+    key: int  # year * 12 + month - 1
+    start_us: int  # UTC epoch microseconds
+    end_us: int
+    expenses: int
+    extras: int
+    salary: int
+    first_expense_id: int
+    first_posting_id: int
+    opening_balance: int = 0
+
+    @property
+    def month_start(self) -> date:
+        return date(self.key // 12, self.key % 12 + 1, 1)
+
+    @property
+    def postings(self) -> int:
+        return 1 + self.expenses + self.extras
+
+
+def _epoch_us(moment: datetime) -> int:
+    return (moment - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)) // timedelta(microseconds=1)
+
+
+def _rng(seed: int, key: int, stream: int) -> np.random.Generator:
+    return np.random.default_rng([seed, key, stream])
+
+
+def _salary(seed: int, key: int, expenses: int, extras: int) -> int:
+    """ The user's salary for the month: a yearly raise, topped up to cover the month's expected spend """
+    base = int(np.random.default_rng([seed, _SALARY_STREAM]).integers(*SALARY_RANGE))
+    expected_spend = expenses * _MEAN_AMOUNT + extras * _MEAN_EXTRA_AMOUNT
+    salary = max(base * (1 + SALARY_RAISE) ** (key // 12 - 2020),
+                 expected_spend * _rng(seed, key, _SALARY_STREAM).uniform(1.0, 1.15))
+    return int(round(salary, -2))
+
+
+def plan_months(expenses: int, months: int, end_month: date, now: datetime, seed: int,
+                first_expense_id: int = 1, first_posting_id: int = 1, opening_balance: int = 0) -> List[MonthPlan]:
+    """
+    `months` months up to `end_month`, `expenses` spread evenly over them; the last month
+    stops at `now` if it is still running. Opening balances are carried from month to month.
+    """
+    end_key = end_month.year * 12 + end_month.month - 1
+    now_us = _epoch_us(now)
+    plans = []
+    for index in range(months):
+        key = end_key - months + 1 + index
+        start = datetime(key // 12, key % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        following = datetime((key + 1) // 12, (key + 1) % 12 + 1, 1, tzinfo=dt_timezone.utc)
+        start_us, end_us = _epoch_us(start), min(_epoch_us(following), now_us)
+        if end_us <= start_us:
+            raise SeedError(f"{start:%Y-%m} has not started yet")
+        count = expenses // months + (index < expenses % months)
+        extras = int(count * EXTRA_POSTING_RATE)
+        plan = MonthPlan(key, start_us, end_us, count, extras, _salary(seed, key, count, extras),
+                         first_expense_id, first_posting_id, opening_balance)
+        plans.append(plan)
+        first_expense_id += plan.expenses
+        first_posting_id += plan.postings
+        opening_balance += _month_net(seed, plan)
+    return plans
+
+
+def _month_amounts(seed: int, plan: MonthPlan):
+    """ Category indexes and amounts of the month's expenses, and the amounts of its bank-only debits """
+    rng = _rng(seed, plan.key, _AMOUNT_STREAM)
+    categories = rng.choice(len(PROFILES), size=plan.expenses, p=_SHARES)
+    amounts = np.rint(_MEDIANS[categories] * np.exp(_SIGMAS[categories] * rng.standard_normal(plan.expenses)))
+    extra_amounts = rng.integers(1, 21, size=plan.extras) * 1_000  # round sums
+    return categories, np.maximum(amounts, 1).astype(np.int64), extra_amounts.astype(np.int64)
+
+
+def _month_net(seed: int, plan: MonthPlan) -> int:
+    _, amounts, extra_amounts = _month_amounts(seed, plan)
+    return plan.salary - int(amounts.sum()) - int(extra_amounts.sum())
+
+
+def _timestamps(micros: np.ndarray, connection) -> List[str]:
+    """ UTC epoch microseconds as DB values; on SQLite the naive ISO strings Django itself writes """
+    values = micros.astype('datetime64[us]')
+    if connection.vendor != 'sqlite':
+        adapt = connection.ops.adapt_datetimefield_value
+        return [adapt(value.replace(tzinfo=dt_timezone.utc)) for value in values.astype(object)]
+    text = np.datetime_as_string(values, unit='us')
+    whole = micros % 1_000_000 == 0
+    if whole.any():  # str(datetime) drops a zero fraction
+        text[whole] = np.datetime_as_string(values[whole], unit='s')
+    return [value.replace('T', ' ') for value in text.tolist()]
+
+
+def _insert(connection, model, columns: Dict[str, Sequence]) -> None:
+    """ Inserts the rows of `columns` (column name -> values) in batches, one transaction each """
+    quote = connection.ops.quote_name
+    sql = (f"{connection.ops.insert_statement()} {quote(model._meta.db_table)} "
+           f"({', '.join(quote(column) for column in columns)}) VALUES ({', '.join(['%s'] * len(columns))})")
+    rows = list(zip(*columns.values()))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), SEED_BATCH_ROWS):
+            with transaction.atomic(using=connection.alias):
+                cursor.executemany(sql, rows[start:start + SEED_BATCH_ROWS])
+
+
+def _write_rollups(connection, plan: MonthPlan, user_id: int, account_id: int, category_ids: Sequence[Optional[int]],
+                   expense_times: np.ndarray, categories: np.ndarray, amounts: np.ndarray, signed: np.ndarray,
+                   updated_at: str) -> None:
+    """ The month's rows of the rollup tables, summed from its generated columns (UTC days and months) """
+    adapt_date = connection.ops.adapt_datefield_value
+    month_year = adapt_date(plan.month_start)
+    days, day_index = np.unique(expense_times // _US_PER_DAY, return_inverse=True)
+    day_totals = np.bincount(day_index, weights=amounts).astype(np.int64)
+    _insert(connection, DailyExpenseRollup, {
+        'user_id': [user_id] * len(days),
+        'day': [adapt_date(day) for day in days.astype('datetime64[D]').astype(object)],
+        'total_spent': day_totals.tolist(),
+        'expense_count': np.bincount(day_index).tolist(),
+        'updated_at': [updated_at] * len(days),
+    })
+    _insert(connection, MonthlyRollup, {
+        'user_id': [user_id], 'month_year': [month_year], 'total_spent': [int(amounts.sum())],
+        'expense_count': [plan.expenses], 'salary_amount': [plan.salary], 'updated_at': [updated_at],
+    })
+    category_totals = np.bincount(categories, weights=amounts, minlength=len(PROFILES)).astype(np.int64)
+    category_counts = np.bincount(categories, minlength=len(PROFILES))
+    filed = [index for index, category_id in enumerate(category_ids)
+             if category_id is not None and category_counts[index]]
+    _insert(connection, CategoryMonthlyRollup, {
+        'user_id': [user_id] * len(filed),
+        'category_id': [category_ids[index] for index in filed],
+        'month_year': [month_year] * len(filed),
+        'total_spent': [int(category_totals[index]) for index in filed],
+        'expense_count': [int(category_counts[index]) for index in filed],
+        'updated_at': [updated_at] * len(filed),
+    })
+    debits, credits = signed[signed < 0], signed[signed > 0]
+    _insert(connection, MonthlyTransactionRollup, {
+        'user_id': [user_id], 'account_id': [account_id], 'month_year': [month_year],
+        'total_debit': [-int(debits.sum())], 'total_credit': [int(credits.sum())],
+        'debit_count': [len(debits)], 'credit_count': [len(credits)], 'updated_at': [updated_at],
+    })
+
+
+def _write_month(connection, seed: int, plan: MonthPlan, user_id: int, account_id: int,
+                 category_ids: Sequence[Optional[int]], updated_us: Optional[int]) -> None:
+    """ Inserts the month's expenses and postings, and its rollup rows unless `updated_us` is None """
+    categories, amounts, extra_amounts = _month_amounts(seed, plan)
+    rng = _rng(seed, plan.key, _DETAIL_STREAM)
+    span = plan.end_us - plan.start_us
+    expense_times = plan.start_us + np.sort(rng.integers(0, span, size=plan.expenses))
+    picks = _DESCRIPTION_OFFSETS[categories] + rng.integers(0, 1 << 30, size=plan.expenses) % _DESCRIPTION_COUNTS[categories]
+    extra_times = plan.start_us + rng.integers(0, span, size=plan.extras)
+    extra_picks = rng.integers(0, len(EXTRA_DESCRIPTIONS), size=plan.extras)
+
+    expense_ids = np.arange(plan.first_expense_id, plan.first_expense_id + plan.expenses)
+    stamps = _timestamps(expense_times, connection)
+    _insert(connection, Expense, {
+        'id': expense_ids.tolist(),
+        'user_id': [user_id] * plan.expenses,
+        'monthly_salary_ref_id': [None] * plan.expenses,
+        'category_id': np.array(category_ids, dtype=object)[categories].tolist(),
+        'amount': amounts.tolist(),
+        'description': _DESCRIPTIONS[picks].tolist(),
+        'date_logged': stamps,
+        'fingerprint': [None] * plan.expenses,
+        'idempotency_key': [None] * plan.expenses,
+        'created_at': stamps,
+        'updated_at': stamps,
+    })
+
+    # Salary first, then the expense debits and the bank-only ones, merged by time
+    times = np.concatenate(([plan.start_us + min(9 * _US_PER_HOUR, span // 2)], expense_times, extra_times))
+    signed = np.concatenate(([plan.salary], -amounts, -extra_amounts))
+    order = np.argsort(times, kind='stable')
+    descriptions = np.concatenate((
+        np.array(['Salary'], dtype=object), _EXPENSE_POSTING_DESCRIPTIONS[picks],
+        np.array(EXTRA_DESCRIPTIONS, dtype=object)[extra_picks],
+    ))
+    keys = np.concatenate((
+        np.array([None], dtype=object), np.array([f"expense-{pk}" for pk in expense_ids.tolist()], dtype=object),
+        np.full(plan.extras, None, dtype=object),
+    ))
+    credit, debit = BankTransaction.TransactionType.CREDIT.value, BankTransaction.TransactionType.DEBIT.value
+    kinds = np.where(signed[order] > 0, credit, debit).astype(object)
+    stamps = _timestamps(times[order], connection)
+    _insert(connection, BankTransaction, {
+        'id': list(range(plan.first_posting_id, plan.first_posting_id + plan.postings)),
+        'user_id': [user_id] * plan.postings,
+        'account_id': [account_id] * plan.postings,
+        'transaction_type': kinds.tolist(),
+        'amount': np.abs(signed[order]).tolist(),
+        'description': descriptions[order].tolist(),
+        'balance_after_transaction': (plan.opening_balance + np.cumsum(signed[order])).tolist(),
+        'date_logged': stamps,
+        'fingerprint': [None] * plan.postings,
+        'idempotency_key': keys[order].tolist(),
+        'created_at': stamps,
+        'updated_at': stamps,
+    })
+    if updated_us is not None:
+        _write_rollups(connection, plan, user_id, account_id, category_ids, expense_times, categories, amounts,
+                       signed, _timestamps(np.array([updated_us]), connection)[0])
+
+
+def _write_months(using: str, seed: int, plans: Sequence[MonthPlan], user_id: int, account_id: int,
+                  category_ids: Sequence[Optional[int]], updated_us: Optional[int],
+                  busy_timeout_ms: Optional[int] = None) -> None:
+    """ Writes a range of months; runs in the calling process or in a worker """
+    connection = connections[using]
+    if busy_timeout_ms and connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout_ms)}')
+    for plan in plans:
+        _write_month(connection, seed, plan, user_id, account_id, category_ids, updated_us)
+
+
+def _prepare(user_id: int, opening_balance: int, using: str):
+    """
+    The user's categories (created if missing, by profile) and default account. Clears the
+    user's rollups, which can only hold salaries here: the seed replaces them.
+    """
+    if any(model._base_manager.using(using).filter(user_id=user_id).exists()
+           for model in (Expense, ArchivedExpense, BankTransaction, ArchivedBankTransaction)):
+        raise SeedError("The user already has expenses or bank postings; seed a fresh user")
+    for model in (DailyExpenseRollup, MonthlyRollup, CategoryMonthlyRollup, MonthlyTransactionRollup):
+        model._base_manager.using(using).filter(user_id=user_id).delete()
+    existing = dict(Category._base_manager.using(using).filter(user_id=user_id).values_list('name', 'pk'))
+    Category._base_manager.using(using).bulk_create([
+        Category(user_id=user_id, name=profile.name, monthly_budget=profile.monthly_budget)
+        for profile in PROFILES if profile.name and profile.name not in existing
+    ])
+    existing = dict(Category._base_manager.using(using).filter(user_id=user_id).values_list('name', 'pk'))
+    account = BankAccount._base_manager.using(using).filter(user_id=user_id, is_default=True).first()
+    if account is None:
+        account = BankAccount._base_manager.using(using).create(
+            user_id=user_id, name='Main account', is_default=True, current_balance=opening_balance)
+    return [existing.get(profile.name) for profile in PROFILES], account
+
+
+def _next_id(model, using: str) -> int:
+    """
+    First id above every one `model` has handed out: its live rows, its archive's (closed
+    months keep their ids and move back on reopen) and the table's id counter, which also
+    remembers deleted rows, so no generated row takes an id (or expense-<id> key) in use before.
+    """
+    top = max(source._base_manager.using(using).aggregate(top=Max('id'))['top'] or 0
+              for source in (model, get_archive_model(model)))
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [model._meta.db_table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, %s))",
+                           [model._meta.db_table, model._meta.pk.column])
+        else:
+            return top + 1
+        row = cursor.fetchone()
+    return max(top, row[0] if row and row[0] is not None else 0) + 1
+
+
+def seed_ledger(user_id: int, expenses: int, months: int = 36, end_month: Optional[date] = None, seed: int = 0,
+                opening_balance: int = 200_000, workers: int = 1, using: str = DEFAULT_DB_ALIAS) -> Dict[str, int]:
+    """
+    Generates `months` months of salaries, `expenses` expenses and their bank postings for a
+    user without ledger rows, with their rollups: summed from the generated columns when the
+    site runs on UTC (months and days are cut in UTC), otherwise rebuilt by the services
+    afterwards. With `workers` > 1 the month ranges are written by forked processes, each
+    committing its own batches (the database must be a file); otherwise the whole load is
+    one transaction. Returns rows per table.
+    """
+    connection = connections[using]
+    if workers > 1 and (connection.vendor != 'sqlite' or connection.is_in_memory_db()
+                        or 'fork' not in multiprocessing.get_all_start_methods()):
+        workers = 1
+    now = timezone.now()
+    end_month = end_month or now.date().replace(day=1)
+    # Rollups bucket by local day and month; the generated ones are right on UTC only.
+    updated_us = _epoch_us(now) if timezone.get_current_timezone_name() == 'UTC' else None
+
+    category_ids, account = _prepare(user_id, opening_balance, using)
+    plans = plan_months(expenses, months, end_month, now, seed, _next_id(Expense, using),
+                        _next_id(BankTransaction, using), account.current_balance)
+    closing_balance = plans[-1].opening_balance + _month_net(seed, plans[-1])
+
+    def finish():
+        MonthlySalary._base_manager.using(using).bulk_create(
+            [MonthlySalary(user_id=user_id, month_year=plan.month_start, salary_amount=plan.salary) for plan in plans],
+            update_conflicts=True, unique_fields=['user', 'month_year'], update_fields=['salary_amount'])
+        BankAccount._base_manager.using(using).filter(pk=account.pk).update(
+            current_balance=closing_balance, last_updated=now)
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(no_style(), [Expense, BankTransaction]):
+                cursor.execute(statement)
+        if updated_us is None:
+            with tenant(user_id):
+                ExpenseRollupService.rebuild_rollups_sync()
+                BankLogService.rebuild_rollups_sync()
+
+    try:
+        if workers == 1:
+            with transaction.atomic(using=using), fts_suspended([Expense, BankTransaction], using):
+                _write_months(using, seed, plans, user_id, account.pk, category_ids, updated_us)
+                finish()
+        else:
+            chunks = [chunk.tolist() for chunk in np.array_split(np.arange(len(plans)), min(workers, len(plans)))]
+            with fts_suspended([Expense, BankTransaction], using):
+                connections.close_all()  # forked workers open their own connections
+                with ProcessPoolExecutor(len(chunks), mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = [pool.submit(_write_months, using, seed, [plans[i] for i in chunk], user_id,
+                                           account.pk, category_ids, updated_us, WORKER_BUSY_TIMEOUT_MS)
+                               for chunk in chunks]
+                    for future in futures:
+                        future.result()
+            with transaction.atomic(using=using):
+                finish()
+    except IntegrityError as e:
+        # Ids are allocated above everything in use, so this means a concurrent writer.
+        raise SeedError(f"Generated rows collide with existing ones ({e}); seed again once the database is idle") from e
+    return {
+        MonthlySalary._meta.label: len(plans),
+        Expense._meta.label: sum(plan.expenses for plan in plans),
+        BankTransaction._meta.label: sum(plan.postings for plan in plans),
+    }
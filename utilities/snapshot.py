@@ -0,0 +1,374 @@
+# utilities/snapshot.py
+"""
+Columnar binary snapshots of the ledger (export_snapshot / import_snapshot commands).
+
+A snapshot is a directory with a ``manifest.json`` and one sub-directory per table,
+holding one typed column per file:
+
+    <column>.npy          int64 / bool / datetime64[us] (UTC) / datetime64[D] values
+    <column>.null.npy     bool mask, only for nullable columns
+    <column>.offsets.npy  int64 end offsets (rows + 1) into <column>.utf8, for text columns
+    <column>.utf8         the text values back to back
+
+Export streams each table in chunks into pre-sized memory-mapped .npy files, inside one
+transaction so every table comes from the same point in time. Import memory-maps the
+columns, inserts them in batches with executemany, and checks foreign keys once at the
+end, before the transaction commits. Users are matched by username, so ledger rows follow
+their owner even when the target database numbers its users differently. FTS5 indexes are dropped for the load and rebuilt
+with one backfill each, which is far cheaper than firing their triggers row by row.
+"""
+import json
+from datetime import timezone as dt_timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from utilities.archive import delete_rows
+from utilities.search import fts_suspended
+
+SNAPSHOT_FORMAT = 'ledger-columns'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_APPS = ('month_log', 'bank_balance_log')
+EXPORT_CHUNK_ROWS = 50_000
+IMPORT_BATCH_ROWS = 5_000
+
+_INTEGER_TYPES = frozenset({
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+})
+_TEXT_TYPES = frozenset({'CharField', 'TextField', 'EmailField', 'SlugField', 'URLField'})
+_DTYPES = {'int': np.int64, 'bool': np.bool_, 'datetime': 'datetime64[us]', 'date': 'datetime64[D]'}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_models() -> List[type[models.Model]]:
+    """ The user model (owner of every ledger row) followed by every model of the ledger apps """
+    ledger_models = [model for label in SNAPSHOT_APPS for model in apps.get_app_config(label).get_models()]
+    return [apps.get_model(settings.AUTH_USER_MODEL), *ledger_models]
+
+
+def _column_kind(field: models.Field) -> str:
+    internal_type = (field.target_field if field.is_relation else field).get_internal_type()
+    if internal_type in _INTEGER_TYPES:
+        return 'int'
+    if internal_type == 'BooleanField':
+        return 'bool'
+    if internal_type == 'DateTimeField':
+        return 'datetime'
+    if internal_type == 'DateField':
+        return 'date'
+    if internal_type in _TEXT_TYPES:
+        return 'text'
+    raise SnapshotError(f"{field.model._meta.label}.{field.name}: {internal_type} columns are not supported")
+
+
+# --- Export ---
+
+def _to_array(kind: str, values: Sequence[Any]) -> np.ndarray:
+    if kind == 'datetime':
+        # numpy has no timezones: store naive UTC.
+        values = [value.astimezone(dt_timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value
+                  for value in values]
+    return np.array(values, dtype=_DTYPES[kind])
+
+
+class _ColumnWriter:
+    """ Fills one column's files chunk by chunk """
+
+    def __init__(self, base: Path, kind: str, nullable: bool, rows: int):
+        self.kind = kind
+        self.nulls = self._open(base.with_name(base.name + '.null.npy'), np.bool_, rows) if nullable else None
+        if kind == 'text':
+            self.offsets = self._open(base.with_name(base.name + '.offsets.npy'), np.int64, rows + 1)
+            self.offsets[0] = 0
+            self.blob = open(base.with_name(base.name + '.utf8'), 'wb')
+            self.position = 0
+        else:
+            self.data = self._open(base.with_name(base.name + '.npy'), _DTYPES[kind], rows)
+
+    @staticmethod
+    def _open(path: Path, dtype: Any, rows: int) -> np.ndarray:
+        if rows == 0:
+            np.save(path, np.empty(0, dtype=dtype))  # nothing to map
+            return np.empty(0, dtype=dtype)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(rows,))
+
+    def write(self, start: int, values: Sequence[Any]) -> None:
+        end = start + len(values)
+        if self.nulls is not None:
+            mask = np.fromiter((value is None for value in values), dtype=np.bool_, count=len(values))
+            self.nulls[start:end] = mask
+            if mask.any():
+                filler = '' if self.kind == 'text' else (0 if self.kind in ('int', 'bool') else None)
+                values = [filler if value is None else value for value in values]
+        if self.kind == 'text':
+            encoded = [value.encode() for value in values]
+            ends = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+            self.offsets[start + 1:end + 1] = self.position + ends
+            self.blob.write(b''.join(encoded))
+            self.position += int(ends[-1]) if len(ends) else 0
+        else:
+            self.data[start:end] = _to_array(self.kind, values)
+
+    def close(self) -> None:
+        for array in (getattr(self, 'data', None), getattr(self, 'offsets', None), self.nulls):
+            if isinstance(array, np.memmap):
+                array.flush()
+        if self.kind == 'text':
+            self.blob.close()
+
+
+def _export_table(model: type[models.Model], directory: Path, using: str) -> Dict[str, Any]:
+    fields = model._meta.concrete_fields
+    queryset = model._base_manager.using(using).order_by('pk')
+    rows = queryset.count()
+    table_directory = directory / model._meta.label_lower
+    table_directory.mkdir(parents=True, exist_ok=True)
+    columns = [{'name': field.attname, 'column': field.column, 'kind': _column_kind(field), 'nullable': field.null}
+               for field in fields]
+    writers = [_ColumnWriter(table_directory / column['name'], column['kind'], column['nullable'], rows)
+               for column in columns]
+
+    written = 0
+
+    def flush(chunk: List[tuple]) -> None:
+        nonlocal written
+        for writer, values in zip(writers, zip(*chunk)):
+            writer.write(written, values)
+        written += len(chunk)
+
+    chunk: List[tuple] = []
+    try:
+        for row in queryset.values_list(*[field.attname for field in fields]).iterator(chunk_size=EXPORT_CHUNK_ROWS):
+            chunk.append(row)
+            if len(chunk) == EXPORT_CHUNK_ROWS:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    if written != rows:
+        raise SnapshotError(f"{model._meta.label} changed during export ({rows} counted, {written} read)")
+    return {'model': model._meta.label, 'table': model._meta.db_table, 'rows': rows, 'columns': columns}
+
+
+def export_snapshot(directory: Path, using: str = DEFAULT_DB_ALIAS) -> Dict[str, Any]:
+    """ Writes every snapshot_models() table under `directory`; returns the manifest """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+        'created_at': timezone.now().isoformat(), 'tables': [],
+    }
+    # One transaction: every table is read from the same snapshot of the database.
+    with transaction.atomic(using=using):
+        for model in snapshot_models():
+            manifest['tables'].append(_export_table(model, directory, using))
+    (directory / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+# --- Import ---
+
+def _load(path: Path) -> np.ndarray:
+    array = np.load(path, mmap_mode='r')
+    return array if array.size else np.empty(0, dtype=array.dtype)
+
+
+def _column_reader(base: Path, column: Dict[str, Any], connection) -> Callable[[int, int], List[Any]]:
+    """ Returns read(start, end) -> DB-ready values of rows [start, end) """
+    kind = column['kind']
+    nulls = _load(base.with_name(base.name + '.null.npy')) if column['nullable'] else None
+    if kind == 'text':
+        offsets = _load(base.with_name(base.name + '.offsets.npy'))
+        blob_path = base.with_name(base.name + '.utf8')
+        blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if blob_path.stat().st_size else np.empty(0, np.uint8)
+
+        def decode(start: int, end: int) -> List[Any]:
+            bounds = offsets[start:end + 1].tolist()
+            first = bounds[0]
+            text = blob[first:bounds[-1]].tobytes()  # one copy per batch, then plain bytes slicing
+            return [text[bounds[i] - first:bounds[i + 1] - first].decode() for i in range(end - start)]
+    else:
+        data = _load(base.with_name(base.name + '.npy'))
+        if kind == 'datetime':
+            adapt = connection.ops.adapt_datetimefield_value
+
+            def decode(start: int, end: int) -> List[Any]:
+                return [adapt(value.replace(tzinfo=dt_timezone.utc)) if value is not None else None
+                        for value in data[start:end].astype(object)]
+        elif kind == 'date':
+            adapt = connection.ops.adapt_datefield_value
+
+            def decode(start: int, end: int) -> List[Any]:
+                return [adapt(value) for value in data[start:end].astype(object)]
+        else:
+            def decode(start: int, end: int) -> List[Any]:
+                return data[start:end].tolist()
+
+    if nulls is None:
+        return decode
+
+    def read(start: int, end: int) -> List[Any]:
+        values = decode(start, end)
+        for index in np.flatnonzero(nulls[start:end]).tolist():
+            values[index] = None
+        return values
+    return read
+
+
+def _import_table(table: Dict[str, Any], directory: Path, connection,
+                  remap: Optional[Dict[str, Dict[int, int]]] = None, skip_ids: frozenset = frozenset()) -> int:
+    """
+    Inserts the snapshot rows of `table`, except those whose primary key is in `skip_ids`;
+    `remap` rewrites the values of the named columns (snapshot value -> local value).
+    Returns the rows inserted.
+    """
+    model = apps.get_model(table['model'])
+    table_directory = directory / model._meta.label_lower
+    known_columns = {field.column for field in model._meta.concrete_fields}
+    missing = known_columns - {column['column'] for column in table['columns']}
+    if missing:
+        raise SnapshotError(f"{table['model']}: snapshot lacks columns {', '.join(sorted(missing))}")
+    # Columns dropped since the snapshot was taken are skipped.
+    columns = [column for column in table['columns'] if column['column'] in known_columns]
+    readers = [_column_reader(table_directory / column['name'], column, connection) for column in columns]
+    pk_index = [column['column'] for column in columns].index(model._meta.pk.column)
+    remapped = [(index, (remap or {})[column['column']]) for index, column in enumerate(columns)
+                if (remap or {}).get(column['column'])]
+
+    quote = connection.ops.quote_name
+    sql = (f"INSERT INTO {quote(table['table'])} "
+           f"({', '.join(quote(column['column']) for column in columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, table['rows'], IMPORT_BATCH_ROWS):
+            end = min(start + IMPORT_BATCH_ROWS, table['rows'])
+            values = [read(start, end) for read in readers]
+            if skip_ids:
+                keep = [value not in skip_ids for value in values[pk_index]]
+                values = [[value for value, kept in zip(column, keep) if kept] for column in values]
+            for index, mapping in remapped:
+                values[index] = [mapping.get(value, value) for value in values[index]]
+            rows = list(zip(*values))
+            if rows:
+                cursor.executemany(sql, rows)
+            inserted += len(rows)
+    return inserted
+
+
+def _map_users(table: Dict[str, Any], directory: Path, connection, using: str) -> Tuple[Dict[int, int], frozenset]:
+    """
+    Matches the snapshot's users to local ones by USERNAME_FIELD. Returns the snapshot id ->
+    local id mapping, and the snapshot ids of users that already exist (not imported again).
+    New users keep their snapshot id unless a local user holds it; then they get a fresh one.
+    """
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    username_column = user_model._meta.get_field(user_model.USERNAME_FIELD).column
+    columns = {column['column']: column for column in table['columns']}
+    if username_column not in columns:
+        raise SnapshotError(f"{table['model']}: snapshot lacks column {username_column}")
+    table_directory = directory / user_model._meta.label_lower
+
+    def read(column: Dict[str, Any]) -> List[Any]:
+        return _column_reader(table_directory / column['name'], column, connection)(0, table['rows'])
+
+    snapshot_users = list(zip(read(columns[user_model._meta.pk.column]), read(columns[username_column])))
+    local_ids = dict(user_model._base_manager.using(using).values_list(user_model.USERNAME_FIELD, 'pk'))
+    taken = set(local_ids.values())
+    next_id = max([*taken, *(user_id for user_id, _ in snapshot_users)], default=0) + 1
+    user_ids: Dict[int, int] = {}
+    existing = set()
+    for snapshot_id, username in snapshot_users:
+        if username in local_ids:
+            user_ids[snapshot_id] = local_ids[username]
+            existing.add(snapshot_id)
+        elif snapshot_id not in taken:
+            user_ids[snapshot_id] = snapshot_id
+        else:
+            user_ids[snapshot_id] = next_id
+            next_id += 1
+        taken.add(user_ids[snapshot_id])
+    return user_ids, frozenset(existing)
+
+
+def _refingerprint(ledger_models: List[type[models.Model]], user_ids: List[int], using: str) -> None:
+    """
+    Fingerprints hash the owner's id, so rows that changed owner id on import get theirs
+    recomputed (archived copies included). Rows without one (legacy duplicates) keep none.
+    """
+    for model in ledger_models:
+        if not hasattr(model, 'compute_fingerprint'):
+            continue
+        sources = [model, apps.get_model(model.ARCHIVE_MODEL)] if hasattr(model, 'ARCHIVE_MODEL') else [model]
+        for source in sources:
+            rows = list(source._base_manager.using(using).filter(user_id__in=user_ids, fingerprint__isnull=False))
+            attnames = {field.attname for field in model._meta.concrete_fields}
+            for row in rows:
+                row.fingerprint = model(**{
+                    field.attname: getattr(row, field.attname)
+                    for field in source._meta.concrete_fields if field.attname in attnames
+                }).compute_fingerprint()
+            source._base_manager.using(using).bulk_update(rows, ['fingerprint'], batch_size=1000)
+
+
+def import_snapshot(directory: Path, using: str = DEFAULT_DB_ALIAS, flush: bool = False) -> Dict[str, int]:
+    """
+    Loads a snapshot written by export_snapshot() in one transaction. Ledger tables must be
+    empty unless `flush` deletes their rows first. Users are matched by username: existing
+    ones are kept and the ledger rows are re-pointed to their local ids (see _map_users).
+    Returns the rows inserted per model.
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / 'manifest.json').read_text())
+    if manifest.get('format') != SNAPSHOT_FORMAT or manifest.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot: {manifest.get('format')} v{manifest.get('version')}")
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    tables = manifest['tables']
+    user_table = next((table for table in tables if table['model'] == user_model._meta.label), None)
+    if user_table is None:
+        raise SnapshotError(f"Snapshot has no {user_model._meta.label} table")
+    ledger_models = [apps.get_model(table['model']) for table in tables if table is not user_table]
+
+    connection = connections[using]
+    counts: Dict[str, int] = {}
+    with transaction.atomic(using=using), fts_suspended(ledger_models, using):
+        for model in reversed(ledger_models):
+            rows = model._base_manager.using(using).all()
+            if flush:
+                delete_rows(rows)
+            elif rows.exists():
+                raise SnapshotError(f"{model._meta.label} is not empty; use --flush to replace its rows")
+        user_ids, existing_users = _map_users(user_table, directory, connection, using)
+        moved = {snapshot_id: local_id for snapshot_id, local_id in user_ids.items() if snapshot_id != local_id}
+        with connection.constraint_checks_disabled():
+            for table in tables:
+                model = apps.get_model(table['model'])
+                if table is user_table:
+                    remap, skip_ids = {model._meta.pk.column: moved}, existing_users
+                else:
+                    remap = {field.column: moved for field in model._meta.concrete_fields
+                             if field.is_relation and field.related_model is user_model}
+                    skip_ids = frozenset()
+                counts[table['model']] = _import_table(table, directory, connection, remap, skip_ids)
+        # Foreign keys are checked once, over the whole load.
+        connection.check_constraints(table_names=[table['table'] for table in tables])
+        if moved:
+            _refingerprint(ledger_models, list(moved.values()), using)
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(
+                    no_style(), [apps.get_model(table['model']) for table in tables]):
+                cursor.execute(statement)
+    return counts
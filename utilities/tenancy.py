@@ -0,0 +1,96 @@
+# utilities/tenancy.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import models
+
+# The user whose rows the current request (or command) may see. asgiref copies the
+# context into sync_to_async threads, so services read it without it being passed around.
+_current_user_id: ContextVar[Optional[int]] = ContextVar('current_user_id', default=None)
+
+
+def get_current_user_id() -> Optional[int]:
+    return _current_user_id.get()
+
+
+@contextmanager
+def tenant(user_id: Optional[int]) -> Iterator[None]:
+    """ Scopes every TenantManager query inside the block to `user_id` """
+    token = _current_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user_id.reset(token)
+
+
+class TenantManager(models.Manager):
+    """
+    Default manager of per-user models: filters on the current tenant when one is set.
+    With no tenant (migrations, management commands, the shell) every row is visible.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user_id = _current_user_id.get()
+        return queryset if user_id is None else queryset.filter(user_id=user_id)
+
+
+class TenantOwnedModel(models.Model):
+    """
+    Abstract base for rows owned by one user. New rows are stamped with the current tenant on save().
+    Subclasses declare their own user-leading index or unique constraint, which also serves
+    lookups on `user` alone, so the column gets no separate index.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='+', db_index=False, editable=False)
+
+    objects = TenantManager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            self.user_id = _current_user_id.get()
+        super().save(*args, **kwargs)
+
+
+class TenantMiddleware:
+    """ Sets the tenant to the authenticated user for the duration of the request """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with tenant(self._user_id(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        with tenant(user.pk if user.is_authenticated else None):
+            return await self.get_response(request)
+
+    @staticmethod
+    def _user_id(request) -> Optional[int]:
+        user = getattr(request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+def legacy_owner_id(apps) -> Optional[int]:
+    """
+    Migration helper: the user that rows created before per-user scoping are assigned to
+    (the first superuser, else the first user). None on a database without users, in
+    which case those rows stay unowned and only unscoped code (commands, shell) sees them.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    owner = User.objects.filter(is_superuser=True).order_by('pk').first() or User.objects.order_by('pk').first()
+    return owner.pk if owner else None
@@ -0,0 +1,50 @@
+# utilities/testing.py
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+def _shape(sql: str) -> str:
+    """ The SQL with its literal values blanked, so repeats of one statement compare equal """
+    return re.sub(r"'[^']*'|\b\d+\b", '?', sql)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    TestCase with assertQueryBudget(): an exact query count for a block, reported with
+    every captured statement and the ones that repeat (the usual N+1 suspects) on failure.
+
+    The test client runs the async views through async_to_sync, and their sync_to_async
+    service calls then run on the test's own thread and connection, so every query of
+    the request is captured.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget: int, label: str = '', using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+        with CaptureQueriesContext(connections[using]) as context:
+            yield
+        executed = len(context.captured_queries)
+        if executed == budget:
+            return
+        statements = [query['sql'] for query in context.captured_queries]
+        repeated = [(shape, count) for shape, count in Counter(map(_shape, statements)).items() if count > 1]
+        lines = [f"{label or 'block'}: {executed} queries, budget {budget}"]
+        lines += [f"{number}. {sql}" for number, sql in enumerate(statements, start=1)]
+        if repeated:
+            lines.append("Repeated:")
+            lines += [f"  {count}x {shape}" for shape, count in repeated]
+        self.fail('\n'.join(lines))
+
+    def assertRequestBudget(self, budget: int, method: str, url: str, data: dict | None = None,
+                            status: int = 200, headers: dict | None = None) -> HttpResponse:
+        """ One test-client request under assertQueryBudget, checked for `status` """
+        with self.assertQueryBudget(budget, f"{method.upper()} {url}"):
+            response = getattr(self.client, method)(url, data or {}, headers=headers or {})
+        self.assertEqual(response.status_code, status, response.content[:500])
+        return response
@@ -25,6 +25,8 @@ class ErrorMessages:
     INVALID_FILE_SIZE = _("File size too large. Maximum size is 5MB")
     INVALID_ID = _("Invalid user ID")
     INVALID_TOKEN = _("Invalid Token")
+    DUPLICATE_ENTRY = _("Duplicate entry. This record has already been logged.")
+    MONTH_CLOSED = _("{month} is closed; its entries are read-only.")
 
 class ExceptionMessages:    
     VALIDATION_ERROR = _("Invalid data provided. Please check your input.")